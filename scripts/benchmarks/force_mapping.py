@@ -0,0 +1,68 @@
+#! /usr/bin/env python3
+"""
+Benchmark of the aerodynamic to structural force mapping
+
+Compares the vectorised :func:`sharpy.aero.utils.mapping.aero2struct_force_mapping` (with and without precomputed
+index tables) against the reference nested-loop implementation on a multi-surface configuration.
+
+Usage:
+
+    python scripts/benchmarks/force_mapping.py [--n_surf 40] [--num_elem 10] [--m 8] [--repeat 10]
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+import sharpy.aero.utils.mapping as mapping
+from sharpy.utils.mapping_utils import aero2struct_force_mapping_loop, generate_wing_case
+
+
+def run_benchmark(n_surf, num_elem, m, repeat):
+    # the test case has two surfaces. Stack copies of it to get the desired number of surfaces
+    n_copies = max(n_surf // 2, 1)
+    forces, struct2aero_mapping, zeta, pos, psi, conn, cag, aero_dimensions = generate_wing_case(num_elem, m)
+    n_node = pos.shape[0]
+    big_mapping = []
+    for i_copy in range(n_copies):
+        for node_mapping in struct2aero_mapping:
+            big_mapping.append([{'i_surf': entry['i_surf'] + 2 * i_copy, 'i_n': entry['i_n']}
+                                for entry in node_mapping])
+    forces = forces * n_copies
+    zeta = zeta * n_copies
+    aero_dimensions = np.tile(aero_dimensions, (n_copies, 1))
+    pos = np.tile(pos, (n_copies, 1))
+    psi = np.tile(psi, (n_copies, 1, 1))
+    conn = np.concatenate([conn + i_copy * n_node for i_copy in range(n_copies)])
+
+    tables = mapping.aero2struct_mapping_tables(big_mapping, conn, aero_dimensions)
+
+    ref = aero2struct_force_mapping_loop(forces, big_mapping, zeta, pos, psi, conn, cag)
+    new = mapping.aero2struct_force_mapping(forces, big_mapping, zeta, pos, psi, None, conn, cag,
+                                            mapping_tables=tables)
+    print('Surfaces: {:d}, structural nodes: {:d}, lattice entries: {:d}'.format(2 * n_copies, pos.shape[0],
+                                                                                 tables['n_entries']))
+    print('Bit-for-bit equal: {}, max abs difference: {:.3e}'.format(np.array_equal(ref, new),
+                                                                     np.max(np.abs(ref - new))))
+
+    t_loop = min(timeit.repeat(lambda: aero2struct_force_mapping_loop(forces, big_mapping, zeta, pos, psi, conn,
+                                                                      cag),
+                               number=1, repeat=repeat))
+    t_tables = min(timeit.repeat(lambda: mapping.aero2struct_mapping_tables(big_mapping, conn, aero_dimensions),
+                                 number=1, repeat=repeat))
+    t_vec = min(timeit.repeat(lambda: mapping.aero2struct_force_mapping(forces, big_mapping, zeta, pos, psi, None,
+                                                                        conn, cag, mapping_tables=tables),
+                              number=1, repeat=repeat))
+    print('Nested loop:                  {:10.3f} ms'.format(t_loop * 1e3))
+    print('Index table generation (once): {:9.3f} ms'.format(t_tables * 1e3))
+    print('Vectorised with tables:       {:10.3f} ms (x{:.1f})'.format(t_vec * 1e3, t_loop / t_vec))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n_surf', type=int, default=40)
+    parser.add_argument('--num_elem', type=int, default=10)
+    parser.add_argument('--m', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.n_surf, args.num_elem, args.m, args.repeat)
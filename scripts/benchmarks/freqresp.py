@@ -0,0 +1,122 @@
+#! /usr/bin/env python3
+"""
+Benchmark of the multi-frequency response of linear state-space systems
+
+Compares the frequency response computed by :class:`sharpy.linear.src.libss.FrequencyResponseEngine` (a single
+Hessenberg reduction for dense systems, or a fixed sparsity pattern and ordering for sparse systems, with the
+frequencies spread among ``--num_workers`` threads) against a direct solve of
+:math:`(z\\mathbf{I} - \\mathbf{A})\\mathbf{X} = \\mathbf{B}` at each frequency. Wall time and the maximum relative
+difference between both responses are reported.
+
+The systems are either a random dense system of ``--n_states`` states or the linearised systems of the test cases:
+
+* ``goland``: aeroelastic and UVLM systems of the Goland wing flutter test (``tests/linear/goland_wing``)
+
+* ``horten``: aeroelastic system of the Horten wing test (``tests/linear/horten``)
+
+The test cases require the compiled UVLM and xbeam libraries.
+
+Usage:
+
+    python scripts/benchmarks/freqresp.py [--case random] [--n_states 400] [--num_freqs 100] [--num_workers 4]
+    python scripts/benchmarks/freqresp.py --case goland [--num_freqs 100] [--num_workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import sharpy.linear.src.libss as libss
+import sharpy.linear.src.libsparse as libsp
+
+
+def freqresp_direct(SS, wv):
+    if SS.dt is not None:
+        zv = np.exp(1.j * SS.dt * wv)
+    else:
+        zv = 1.j * wv
+    Eye = libsp.eye_as(SS.A)
+    D = libsp.dense(SS.D)
+    Yfreq = np.empty((SS.outputs, SS.inputs, len(wv)), dtype=complex)
+    for ii in range(len(wv)):
+        Yfreq[:, :, ii] = libsp.dot(SS.C, libsp.solve(zv[ii] * Eye - SS.A, SS.B), type_out=np.ndarray) + D
+    return Yfreq
+
+
+def random_system(n_states, n_inputs=3, n_outputs=6, dt=0.05):
+    np.random.seed(0)
+    A = np.random.rand(n_states, n_states)
+    A /= 1.1 * np.max(np.abs(np.linalg.eigvals(A)))
+    B = np.random.rand(n_states, n_inputs)
+    C = np.random.rand(n_outputs, n_states)
+    D = np.random.rand(n_outputs, n_inputs)
+    return {'random': libss.StateSpace(A, B, C, D, dt=dt)}
+
+
+def goland_systems():
+    from tests.linear.goland_wing.test_goland_flutter import TestGolandFlutter
+
+    test = TestGolandFlutter()
+    test.setup()
+    systems = {'goland aeroelastic': test.data.linear.ss,
+               'goland uvlm': test.data.linear.linear_system.uvlm.ss}
+    test.tearDown()
+    return systems
+
+
+def horten_systems():
+    from tests.linear.horten.test_horten import run_rom_convergence
+
+    route = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../tests/linear/horten'))
+    data = run_rom_convergence(case_name='horten_', case_route=route + '/cases/',
+                               output_folder=route + '/output/',
+                               M=4, N=11, Msf=5, trim=False)
+    return {'horten aeroelastic': data.linear.ss}
+
+
+def run_benchmark(name, SS, wv, num_workers):
+    t0 = time.perf_counter()
+    Y_direct = freqresp_direct(SS, wv)
+    t_direct = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    Y_serial = SS.freqresp(wv)
+    t_serial = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    Y_parallel = SS.freqresp(wv, num_workers=num_workers)
+    t_parallel = time.perf_counter() - t0
+
+    scale = np.max(np.abs(Y_direct))
+    print('{:s}: {:d} states, {:d} inputs, {:d} outputs, {:s}'.format(
+        name, SS.states, SS.inputs, SS.outputs, 'sparse' if libsp.csc_matrix == type(SS.A) else 'dense'))
+    print('\tdirect solve:          {:10.3f} s'.format(t_direct))
+    print('\treduced, 1 worker:     {:10.3f} s (x{:.1f}), max relative difference {:.2e}'.format(
+        t_serial, t_direct / t_serial, np.max(np.abs(Y_serial - Y_direct)) / scale))
+    print('\treduced, {:d} workers:    {:10.3f} s (x{:.1f}), max relative difference {:.2e}'.format(
+        num_workers, t_parallel, t_direct / t_parallel, np.max(np.abs(Y_parallel - Y_direct)) / scale))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--case', choices=['random', 'goland', 'horten'], default='random')
+    parser.add_argument('--n_states', type=int, default=400)
+    parser.add_argument('--num_freqs', type=int, default=100)
+    parser.add_argument('--num_workers', type=int, default=4)
+    args = parser.parse_args()
+
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+    if args.case == 'goland':
+        systems = goland_systems()
+    elif args.case == 'horten':
+        systems = horten_systems()
+    else:
+        systems = random_system(args.n_states)
+
+    for name, SS in systems.items():
+        wv = np.linspace(1e-3, 1., args.num_freqs)
+        if SS.dt is not None:
+            wv *= np.pi / SS.dt
+        run_benchmark(name, SS, wv, args.num_workers)
@@ -0,0 +1,145 @@
+#! /usr/bin/env python3
+"""
+Benchmark of the time step copies in the DynamicCoupled FSI loop
+
+Compares the allocation of new time steps with :meth:`copy` against the in-place
+:meth:`copy_into` on preallocated scratch time steps, reproducing the copies performed in every FSI iteration of
+:class:`sharpy.solvers.dynamiccoupled.DynamicCoupled`. Time and allocated memory (through ``tracemalloc``) are
+reported.
+
+With ``--hale``, the HALE test case in ``tests/coupled/dynamic/hale`` is run for ``--n_tstep`` time steps and the
+wall time and peak memory of the simulation are reported. The time steps of the last step of that simulation are
+then used for the copy benchmark. This option requires the compiled UVLM and xbeam libraries.
+
+Usage:
+
+    python scripts/benchmarks/timestep_copy.py [--n_surf 4] [--m 4] [--n 40] [--m_star 80] [--n_iter 50]
+    python scripts/benchmarks/timestep_copy.py --hale [--n_tstep 500] [--n_iter 50]
+"""
+import argparse
+import ctypes as ct
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import sharpy.utils.datastructures as datastructures
+
+
+def generate_timesteps(n_surf, m, n, m_star):
+    num_node_surf = n + 1
+    num_node = n_surf * num_node_surf
+    num_elem = num_node // 2
+    structural = datastructures.StructTimeStepInfo(num_node, num_elem, 3, ct.c_int(6 * (num_node - 1)), 1)
+    structural.pos[:] = np.random.rand(*structural.pos.shape)
+    structural.steady_applied_forces[:] = np.random.rand(*structural.steady_applied_forces.shape)
+
+    dimensions = np.array([[m, n]] * n_surf)
+    dimensions_star = np.array([[m_star, n]] * n_surf)
+    aero = datastructures.AeroTimeStepInfo(dimensions, dimensions_star)
+    for i_surf in range(n_surf):
+        aero.zeta[i_surf][:] = np.random.rand(*aero.zeta[i_surf].shape)
+        aero.gamma_star[i_surf][:] = np.random.rand(*aero.gamma_star[i_surf].shape)
+    return structural, aero
+
+
+def fsi_copies_allocating(structural, aero, n_iter):
+    controlled_structural = structural.copy()
+    controlled_aero = aero.copy()
+    for k in range(n_iter):
+        aero_kstep = controlled_aero.copy()
+        previous_kstep = structural.copy()
+        structural_kstep = controlled_structural.copy()
+        copy_structural_kstep = structural_kstep.copy()
+
+
+def fsi_copies_in_place(structural, aero, n_iter, scratch):
+    controlled_structural = structural.copy_into(scratch['controlled_structural'])
+    controlled_aero = aero.copy_into(scratch['controlled_aero'])
+    for k in range(n_iter):
+        controlled_aero.copy_into(scratch['aero'])
+        structural.copy_into(scratch['previous'])
+        controlled_structural.copy_into(scratch['structural'])
+        scratch['structural'].copy_into(scratch['copy'])
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run_copy_benchmark(structural, aero, n_iter):
+    scratch = {'controlled_structural': structural.copy(),
+               'previous': structural.copy(),
+               'structural': structural.copy(),
+               'copy': structural.copy(),
+               'controlled_aero': aero.copy(),
+               'aero': aero.copy()}
+
+    t_alloc, peak_alloc = measure(fsi_copies_allocating, structural, aero, n_iter)
+    t_in_place, peak_in_place = measure(fsi_copies_in_place, structural, aero, n_iter, scratch)
+
+    print('FSI iterations: {:d}'.format(n_iter))
+    print('copy():      {:10.3f} ms, peak allocated {:10.1f} kB'.format(t_alloc * 1e3, peak_alloc / 1024))
+    print('copy_into(): {:10.3f} ms, peak allocated {:10.1f} kB (x{:.1f})'.format(t_in_place * 1e3,
+                                                                                 peak_in_place / 1024,
+                                                                                 t_alloc / t_in_place))
+
+
+def run_hale(n_tstep):
+    import configobj
+    import resource
+    import sharpy.sharpy_main
+
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+    import tests.coupled.dynamic.hale.generate_hale as generate_hale
+
+    config = configobj.ConfigObj(generate_hale.route + '/' + generate_hale.case_name + '.sharpy')
+    config['NonLinearDynamicCoupledStep']['num_steps'] = n_tstep
+    config['StepUvlm']['n_time_steps'] = n_tstep
+    config['DynamicCoupled']['n_time_steps'] = n_tstep
+    config['DynamicCoupled']['structural_solver_settings'] = config['NonLinearDynamicCoupledStep']
+    config['DynamicCoupled']['aero_solver_settings'] = config['StepUvlm']
+    config['DynamicCoupled']['postprocessors'] = []
+    config.filename = generate_hale.route + '/' + generate_hale.case_name + '_benchmark.sharpy'
+    config.write()
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    data = sharpy.sharpy_main.main(['', config.filename])
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    generate_hale.clean_test_files()
+    os.remove(config.filename)
+
+    print('HALE time steps: {:d}'.format(n_tstep))
+    print('Wall time: {:10.3f} s ({:.3f} s per time step)'.format(elapsed, elapsed / n_tstep))
+    print('Peak traced memory: {:10.1f} MB, maximum resident set size: {:10.1f} MB'.format(
+        peak / 1024 ** 2, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+    return data.structure.timestep_info[-1], data.aero.timestep_info[-1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hale', action='store_true')
+    parser.add_argument('--n_tstep', type=int, default=500)
+    parser.add_argument('--n_surf', type=int, default=4)
+    parser.add_argument('--m', type=int, default=4)
+    parser.add_argument('--n', type=int, default=40)
+    parser.add_argument('--m_star', type=int, default=80)
+    parser.add_argument('--n_iter', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.hale:
+        structural, aero = run_hale(args.n_tstep)
+    else:
+        structural, aero = generate_timesteps(args.n_surf, args.m, args.n, args.m_star)
+    run_copy_benchmark(structural, aero, args.n_iter)
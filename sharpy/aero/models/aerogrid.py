@@ -9,9 +9,10 @@ import warnings
 import numpy as np
 import scipy.interpolate
 
+import sharpy.aero.utils.mapping as mapping
 import sharpy.utils.algebra as algebra
 import sharpy.utils.cout_utils as cout
-from sharpy.utils.datastructures import AeroTimeStepInfo
+from sharpy.utils.datastructures import AeroTimeStepInfo, append_copy
 import sharpy.utils.generator_interface as gen_interface
 
 
@@ -37,6 +38,8 @@ class Aerogrid(object):
         self.airfoil_db = dict()
         self.struct2aero_mapping = None
         self.aero2struct_mapping = []
+        self.force_mapping_tables = None
+        self.strip_info = None
 
         self.n_node = 0
         self.n_elem = 0
@@ -196,23 +199,13 @@ class Aerogrid(object):
 
     def add_timestep(self):
         try:
-            self.timestep_info.append(self.timestep_info[-1].copy())
+            append_copy(self.timestep_info, self.timestep_info[-1])
         except IndexError:
             self.timestep_info.append(self.ini_info.copy())
 
     def generate_zeta_timestep_info(self, structure_tstep, aero_tstep, beam, aero_settings, it=None, dt=None):
         if it is None:
             it = len(beam.timestep_info) - 1
-        global_node_in_surface = []
-        for i_surf in range(self.n_surf):
-            global_node_in_surface.append([])
-
-        # check that we have control surface information
-        try:
-            self.aero_dict['control_surface']
-            with_control_surfaces = True
-        except KeyError:
-            with_control_surfaces = False
 
         # check that we have sweep information
         try:
@@ -221,10 +214,56 @@ class Aerogrid(object):
             self.aero_dict['sweep'] = np.zeros_like(self.aero_dict['twist'])
 
         # Define first_twist for backwards compatibility
-        if 'first_twist' not in self.aero_dict:     
+        if 'first_twist' not in self.aero_dict:
             self.aero_dict['first_twist'] = [True]*self.aero_dict['surface_m'].shape[0]
-        
-        # one surface per element
+
+        if self.strip_info is None:
+            self.generate_strip_info()
+
+        control_surface_info = self.get_control_surface_info(aero_tstep, it, dt)
+        cga = structure_tstep.cga()
+
+        for i_surf in range(self.n_surf):
+            strip_info = self.strip_info[i_surf]
+            i_elem = strip_info['elem']
+            i_local_node = strip_info['local_node']
+            i_global_node = strip_info['node']
+            zeta, zeta_dot = generate_strips(strip_info,
+                                             structure_tstep.pos[i_global_node, :],
+                                             structure_tstep.pos_dot[i_global_node, :],
+                                             structure_tstep.psi[i_elem, i_local_node, :],
+                                             structure_tstep.psi_dot[i_elem, i_local_node, :],
+                                             cga,
+                                             orientation_in=aero_settings['freestream_dir'],
+                                             control_surface_info=control_surface_info,
+                                             calculate_zeta_dot=True)
+            aero_tstep.zeta[i_surf][:, :, strip_info['i_n']] = zeta.transpose((1, 2, 0))
+            aero_tstep.zeta_dot[i_surf][:, :, strip_info['i_n']] = zeta_dot.transpose((1, 2, 0))
+
+    def generate_strip_info(self):
+        """
+        Precomputes the static information of every chordwise strip of the lattice, grouped by surface, for the
+        batched grid generation in :func:`generate_strips`.
+
+        For each surface, the strips are sorted by their spanwise index ``i_n``. The structural node of each strip
+        is the first element and local node that visits it, as done in the strip-by-strip generation.
+
+        The resulting list of dictionaries is stored in ``self.strip_info``.
+        """
+        try:
+            self.aero_dict['control_surface']
+            with_control_surfaces = True
+        except KeyError:
+            with_control_surfaces = False
+
+        m_distribution = self.aero_dict['m_distribution'].decode('ascii')
+
+        strips_in_surface = []
+        global_node_in_surface = []
+        for i_surf in range(self.n_surf):
+            strips_in_surface.append([])
+            global_node_in_surface.append([])
+
         for i_elem in range(self.n_elem):
             i_surf = self.aero_dict['surface_distribution'][i_elem]
             # check if we have to generate a surface here
@@ -233,8 +272,6 @@ class Aerogrid(object):
 
             for i_local_node in range(len(self.beam.elements[i_elem].global_connectivities)):
                 i_global_node = self.beam.elements[i_elem].global_connectivities[i_local_node]
-                # i_global_node = self.beam.elements[i_elem].global_connectivities[
-                #     self.beam.elements[i_elem].ordering[i_local_node]]
                 if not self.aero_dict['aero_node'][i_global_node]:
                     continue
                 if i_global_node in global_node_in_surface[i_surf]:
@@ -242,11 +279,6 @@ class Aerogrid(object):
                 else:
                     global_node_in_surface[i_surf].append(i_global_node)
 
-                # master_elem, master_elem_node = beam.master[i_elem, i_local_node, :]
-                # if master_elem < 0:
-                    # master_elem = i_elem
-                    # master_elem_node = i_local_node
-
                 # find the i_surf and i_n data from the mapping
                 i_n = -1
                 ii_surf = -1
@@ -259,99 +291,127 @@ class Aerogrid(object):
                 if i_n == -1 or ii_surf == -1:
                     raise AssertionError('Error 12958: Something failed with the mapping in aerogrid.py. Check/report!')
 
-                # control surface implementation
-                control_surface_info = None
-                if with_control_surfaces:
-                # 1) check that this node and elem have a control surface
-                    if self.aero_dict['control_surface'][i_elem, i_local_node] >= 0:
-                        i_control_surface = self.aero_dict['control_surface'][i_elem, i_local_node]
-                        # 2) type of control surface + write info
-                        control_surface_info = dict()
-                        if self.aero_dict['control_surface_type'][i_control_surface] == 0:
-                            control_surface_info['type'] = 'static'
-                            control_surface_info['deflection'] = self.aero_dict['control_surface_deflection'][i_control_surface]
-                            control_surface_info['chord'] = self.aero_dict['control_surface_chord'][i_control_surface]
-                            try:
-                                control_surface_info['hinge_coords'] = self.aero_dict['control_surface_hinge_coords'][i_control_surface]
-                            except KeyError:
-                                control_surface_info['hinge_coords'] = None
-                        elif self.aero_dict['control_surface_type'][i_control_surface] == 1:
-                            control_surface_info['type'] = 'dynamic'
-                            control_surface_info['chord'] = self.aero_dict['control_surface_chord'][i_control_surface]
-                            try:
-                                control_surface_info['hinge_coords'] = self.aero_dict['control_surface_hinge_coords'][i_control_surface]
-                            except KeyError:
-                                control_surface_info['hinge_coords'] = None
-
-                            params = {'it': it}
-                            control_surface_info['deflection'], control_surface_info['deflection_dot'] = \
-                                self.cs_generators[i_control_surface](params)
-
-                        elif self.aero_dict['control_surface_type'][i_control_surface] == 2:
-                            control_surface_info['type'] = 'controlled'
-
-                            try:
-                                old_deflection = self.data.aero.timestep_info[-1].control_surface_deflection[i_control_surface]
-                            except AttributeError:
-                                try:
-                                    old_deflection = aero_tstep.control_surface_deflection[i_control_surface]
-                                except IndexError:
-                                    old_deflection = self.aero_dict['control_surface_deflection'][i_control_surface]
-
-                            try:
-                                control_surface_info['deflection'] = aero_tstep.control_surface_deflection[i_control_surface]
-                            except IndexError:
-                                control_surface_info['deflection'] = self.aero_dict['control_surface_deflection'][i_control_surface]
-
-                            if dt is not None:
-                                control_surface_info['deflection_dot'] = (
-                                        (control_surface_info['deflection'] - old_deflection)/dt)
-                            else:
-                                control_surface_info['deflection_dot'] = 0.0
-
-                            control_surface_info['chord'] = self.aero_dict['control_surface_chord'][i_control_surface]
-
-                            try:
-                                control_surface_info['hinge_coords'] = self.aero_dict['control_surface_hinge_coords'][i_control_surface]
-                            except KeyError:
-                                control_surface_info['hinge_coords'] = None
+                strips_in_surface[i_surf].append((i_n, i_elem, i_local_node, i_global_node))
 
-                        else:
-                            raise NotImplementedError(str(self.aero_dict['control_surface_type'][i_control_surface]) +
-                                ' control surfaces are not yet implemented')
-
-
-
-                node_info = dict()
-                node_info['i_node'] = i_global_node
-                node_info['i_local_node'] = i_local_node
-                node_info['chord'] = self.aero_dict['chord'][i_elem, i_local_node]
-                node_info['eaxis'] = self.aero_dict['elastic_axis'][i_elem, i_local_node]
-                node_info['twist'] = self.aero_dict['twist'][i_elem, i_local_node]
-                node_info['sweep'] = self.aero_dict['sweep'][i_elem, i_local_node]
-                node_info['M'] = self.aero_dimensions[i_surf, 0]
-                node_info['M_distribution'] = self.aero_dict['m_distribution'].decode('ascii')
-                node_info['airfoil'] = self.aero_dict['airfoil_distribution'][i_elem, i_local_node]
-                node_info['control_surface'] = control_surface_info
-                node_info['beam_coord'] = structure_tstep.pos[i_global_node, :]
-                node_info['pos_dot'] = structure_tstep.pos_dot[i_global_node, :]
-                node_info['beam_psi'] = structure_tstep.psi[i_elem, i_local_node, :]
-                node_info['psi_dot'] = structure_tstep.psi_dot[i_elem, i_local_node, :]
-                node_info['for_delta'] = beam.frame_of_reference_delta[i_elem, i_local_node, :]
-                node_info['elem'] = beam.elements[i_elem]
-                node_info['for_pos'] = structure_tstep.for_pos
-                node_info['cga'] = structure_tstep.cga()
-                if node_info['M_distribution'].lower() == 'user_defined':
-                    ielem_in_surf = i_elem - np.sum(self.surface_distribution < i_surf)
-                    node_info['user_defined_m_distribution'] = self.aero_dict['user_defined_m_distribution'][str(i_surf)][:, ielem_in_surf, i_local_node]
-                (aero_tstep.zeta[i_surf][:, :, i_n],
-                 aero_tstep.zeta_dot[i_surf][:, :, i_n]) = (
-                    generate_strip(node_info,
-                                   self.airfoil_db,
-                                   aero_settings['aligned_grid'],
-                                   orientation_in=aero_settings['freestream_dir'],
-                                   calculate_zeta_dot=True,
-                                   first_twist=self.aero_dict['first_twist'][i_surf]))
+        self.strip_info = []
+        for i_surf in range(self.n_surf):
+            strips = np.array(sorted(strips_in_surface[i_surf]), dtype=int).reshape((-1, 4))
+            n_strips = strips.shape[0]
+            i_elem = strips[:, 1]
+            i_local_node = strips[:, 2]
+            m = self.aero_dimensions[i_surf, 0]
+
+            twist = self.aero_dict['twist'][i_elem, i_local_node]
+            sweep = self.aero_dict['sweep'][i_elem, i_local_node]
+            twist_matrix = np.zeros((n_strips, 3, 3))
+            sweep_matrix = np.zeros((n_strips, 3, 3))
+            coords_b_frame = np.zeros((n_strips, 3, m + 1))
+            for i_strip in range(n_strips):
+                if np.abs(twist[i_strip]) > 1e-6:
+                    twist_matrix[i_strip] = algebra.rotation3d_x(twist[i_strip])
+                else:
+                    twist_matrix[i_strip] = np.eye(3)
+                if np.abs(sweep[i_strip]) > 1e-6:
+                    sweep_matrix[i_strip] = algebra.rotation3d_z(sweep[i_strip])
+                else:
+                    sweep_matrix[i_strip] = np.eye(3)
+
+                # airfoil coordinates in the x-z plane of the B frame, corrected by the elastic axis
+                if m_distribution == 'uniform':
+                    coords_b_frame[i_strip, 1, :] = np.linspace(0.0, 1.0, m + 1)
+                elif m_distribution == '1-cos':
+                    pass
+                else:
+                    raise NotImplementedError('M_distribution is ' + m_distribution +
+                                              ' and it is not yet supported')
+                coords_b_frame[i_strip, 2, :] = self.airfoil_db[
+                    self.aero_dict['airfoil_distribution'][i_elem[i_strip], i_local_node[i_strip]]](
+                    coords_b_frame[i_strip, 1, :])
+                coords_b_frame[i_strip, 1, :] -= self.aero_dict['elastic_axis'][i_elem[i_strip],
+                                                                                i_local_node[i_strip]]
+
+            if with_control_surfaces:
+                control_surface = self.aero_dict['control_surface'][i_elem, i_local_node].astype(int)
+            else:
+                control_surface = -np.ones((n_strips,), dtype=int)
+
+            self.strip_info.append({'i_n': strips[:, 0],
+                                    'elem': i_elem,
+                                    'local_node': i_local_node,
+                                    'node': strips[:, 3],
+                                    'M': m,
+                                    'M_distribution': m_distribution,
+                                    'chord': self.aero_dict['chord'][i_elem, i_local_node],
+                                    'twist_matrix': twist_matrix,
+                                    'sweep_matrix': sweep_matrix,
+                                    'first_twist': self.aero_dict['first_twist'][i_surf],
+                                    'coords_b_frame': coords_b_frame,
+                                    'control_surface': control_surface})
+
+    def get_control_surface_info(self, aero_tstep, it, dt=None):
+        """
+        Evaluates the deflection and deflection rate of every control surface at the current time step.
+
+        Args:
+            aero_tstep (AeroTimeStepInfo): current aerodynamic time step
+            it (int): time step index passed to the dynamic control surface generators
+            dt (float (optional)): time step increment to compute the rate of ``controlled`` control surfaces
+
+        Returns:
+            dict: Dictionary with the ``deflection``, ``deflection_dot``, ``chord`` and ``hinge_coords`` of each
+            control surface. ``with_velocity`` indicates whether the deflection rate contributes to ``zeta_dot``.
+        """
+        n_cs = self.n_control_surfaces
+        control_surface_info = {'deflection': np.zeros((n_cs,)),
+                                'deflection_dot': np.zeros((n_cs,)),
+                                'with_velocity': np.zeros((n_cs,), dtype=bool),
+                                'chord': np.zeros((n_cs,), dtype=int),
+                                'hinge_coords': [None]*n_cs}
+
+        for i_control_surface in range(n_cs):
+            control_surface_info['chord'][i_control_surface] = \
+                self.aero_dict['control_surface_chord'][i_control_surface]
+            try:
+                control_surface_info['hinge_coords'][i_control_surface] = \
+                    self.aero_dict['control_surface_hinge_coords'][i_control_surface]
+            except KeyError:
+                pass
+
+            if self.aero_dict['control_surface_type'][i_control_surface] == 0:
+                control_surface_info['deflection'][i_control_surface] = \
+                    self.aero_dict['control_surface_deflection'][i_control_surface]
+
+            elif self.aero_dict['control_surface_type'][i_control_surface] == 1:
+                params = {'it': it}
+                (control_surface_info['deflection'][i_control_surface],
+                 control_surface_info['deflection_dot'][i_control_surface]) = \
+                    self.cs_generators[i_control_surface](params)
+                control_surface_info['with_velocity'][i_control_surface] = True
+
+            elif self.aero_dict['control_surface_type'][i_control_surface] == 2:
+                try:
+                    old_deflection = self.data.aero.timestep_info[-1].control_surface_deflection[i_control_surface]
+                except AttributeError:
+                    try:
+                        old_deflection = aero_tstep.control_surface_deflection[i_control_surface]
+                    except IndexError:
+                        old_deflection = self.aero_dict['control_surface_deflection'][i_control_surface]
+
+                try:
+                    deflection = aero_tstep.control_surface_deflection[i_control_surface]
+                except IndexError:
+                    deflection = self.aero_dict['control_surface_deflection'][i_control_surface]
+
+                control_surface_info['deflection'][i_control_surface] = deflection
+                if dt is not None:
+                    control_surface_info['deflection_dot'][i_control_surface] = (deflection - old_deflection)/dt
+                control_surface_info['with_velocity'][i_control_surface] = True
+
+            else:
+                raise NotImplementedError(str(self.aero_dict['control_surface_type'][i_control_surface]) +
+                                          ' control surfaces are not yet implemented')
+
+        return control_surface_info
 
     def generate_zeta(self, beam, aero_settings, ts=-1, beam_ts=-1):
         self.generate_zeta_timestep_info(beam.timestep_info[beam_ts],
@@ -409,6 +469,11 @@ class Aerogrid(object):
                         continue
                     self.aero2struct_mapping[i_surf][i_n] = i_global_node
 
+        # index tables for the aerodynamic to structural force mapping
+        self.force_mapping_tables = mapping.aero2struct_mapping_tables(self.struct2aero_mapping,
+                                                                       self.beam.connectivities,
+                                                                       self.aero_dimensions)
+
     def update_orientation(self, quat, ts=-1):
         rot = algebra.quat2rotation(quat)
         self.timestep_info[ts].update_orientation(rot.T)
@@ -622,3 +687,124 @@ def generate_strip(node_info, airfoil_db, aligned_grid,
                                           zeta_dot_a_frame[:, i_M])
 
     return strip_coordinates_a_frame, zeta_dot_a_frame
+
+
+def generate_strips(strip_info, beam_coord, pos_dot, beam_psi, psi_dot, cga,
+                    orientation_in=np.array([1, 0, 0]),
+                    control_surface_info=None,
+                    calculate_zeta_dot=False):
+    """
+    Batched version of :func:`generate_strip` that generates all the chordwise strips of a surface at once.
+
+    The static strip information (airfoil camber lines, elastic axis, chord, twist and sweep) is precomputed by
+    :meth:`Aerogrid.generate_strip_info`, such that only the structural pose and the control surface deflections
+    are evaluated in each call.
+
+    Args:
+        strip_info (dict): Static information of the strips of the surface, as generated by
+          :meth:`Aerogrid.generate_strip_info`
+        beam_coord (np.ndarray): ``n_strips x 3`` position of the structural nodes in ``A``
+        pos_dot (np.ndarray): ``n_strips x 3`` velocity of the structural nodes in ``A``
+        beam_psi (np.ndarray): ``n_strips x 3`` CRV of the structural nodes
+        psi_dot (np.ndarray): ``n_strips x 3`` time derivative of the CRV of the structural nodes
+        cga (np.ndarray): Rotation matrix from ``A`` to ``G``
+        orientation_in (np.ndarray): Free stream direction
+        control_surface_info (dict (optional)): Control surface deflections, as given by
+          :meth:`Aerogrid.get_control_surface_info`
+        calculate_zeta_dot (bool): Compute the velocity of the grid
+
+    Returns:
+        tuple: Grid coordinates and velocities in ``G`` for each strip, as ``n_strips x 3 x (M + 1)`` arrays.
+    """
+    m = strip_info['M']
+    n_strips = beam_coord.shape[0]
+    strip_coordinates_b_frame = strip_info['coords_b_frame'].copy()
+    cs_velocity = np.zeros_like(strip_coordinates_b_frame)
+
+    # control surface deflection
+    i_cs = strip_info['control_surface']
+    cs_strips = np.where(i_cs >= 0)[0]
+    if len(cs_strips) > 0 and control_surface_info is not None:
+        i_cs = i_cs[cs_strips]
+        cs_chord = control_surface_info['chord'][i_cs]
+        hinge_coords = strip_coordinates_b_frame[cs_strips, :, m - cs_chord]
+        for i_strip in range(len(cs_strips)):
+            # support for different hinge location for fully articulated control surfaces
+            if control_surface_info['hinge_coords'][i_cs[i_strip]] is not None and m - cs_chord[i_strip] == 0:
+                hinge_coords[i_strip, :] = control_surface_info['hinge_coords'][i_cs[i_strip]]
+
+        deflection = control_surface_info['deflection'][i_cs]
+        cs_rotation = np.zeros((len(cs_strips), 3, 3))
+        cs_rotation[:, 0, 0] = 1.0
+        cs_rotation[:, 1, 1] = np.cos(-deflection)
+        cs_rotation[:, 1, 2] = -np.sin(-deflection)
+        cs_rotation[:, 2, 1] = np.sin(-deflection)
+        cs_rotation[:, 2, 2] = np.cos(-deflection)
+
+        relative_coords = np.matmul(cs_rotation, strip_coordinates_b_frame[cs_strips] - hinge_coords[:, :, None])
+        in_cs = np.arange(m + 1)[None, :] >= (m - cs_chord)[:, None]
+
+        # deflection velocity
+        deflection_dot = control_surface_info['deflection_dot'][i_cs]*control_surface_info['with_velocity'][i_cs]
+        omega_cs = np.zeros((len(cs_strips), 3))
+        omega_cs[:, 0] = -deflection_dot
+        cs_velocity[cs_strips] = np.where(in_cs[:, None, :],
+                                          np.cross(omega_cs[:, :, None], relative_coords, axis=1),
+                                          0.)
+
+        strip_coordinates_b_frame[cs_strips] = np.where(in_cs[:, None, :],
+                                                        relative_coords + hinge_coords[:, :, None],
+                                                        strip_coordinates_b_frame[cs_strips])
+
+    # chord scaling
+    strip_coordinates_b_frame *= strip_info['chord'][:, None, None]
+
+    # Cab transformation
+    cab = algebra.crv2rotation_vec(beam_psi)
+
+    # rotation about z_b to align the strip with the free stream
+    cross_orientation = np.cross(orientation_in, cab[:, :, 1])
+    dot_orientation = np.dot(cab[:, :, 1], orientation_in)
+    rot_angle = np.arctan2(np.linalg.norm(cross_orientation, axis=1), dot_orientation)
+    rot_angle[np.sum(cab[:, :, 2]*cross_orientation, axis=1) < 0] *= -1
+    rot_angle[np.sign(dot_orientation) < 0] += -2*np.pi
+    c_rot = np.zeros((n_strips, 3, 3))
+    c_rot[:, 0, 0] = np.cos(-rot_angle)
+    c_rot[:, 0, 1] = -np.sin(-rot_angle)
+    c_rot[:, 1, 0] = np.sin(-rot_angle)
+    c_rot[:, 1, 1] = np.cos(-rot_angle)
+    c_rot[:, 2, 2] = 1.0
+
+    # transformation from beam to beam prime (with sweep and twist)
+    if strip_info['first_twist']:
+        c_prime = np.matmul(strip_info['sweep_matrix'], np.matmul(c_rot, strip_info['twist_matrix']))
+    else:
+        c_prime = np.matmul(strip_info['twist_matrix'], np.matmul(c_rot, strip_info['sweep_matrix']))
+    strip_coordinates_a_frame = np.matmul(cab, np.matmul(c_prime, strip_coordinates_b_frame))
+    cs_velocity = np.matmul(cab, cs_velocity)
+
+    # zeta_dot
+    zeta_dot_a_frame = np.zeros_like(strip_coordinates_a_frame)
+    if calculate_zeta_dot:
+        # velocity due to pos_dot
+        zeta_dot_a_frame += pos_dot[:, :, None]
+
+        # velocity due to psi_dot
+        omega_a = np.matmul(algebra.crv2tan_vec(beam_psi).transpose((0, 2, 1)), psi_dot[:, :, None])[:, :, 0]
+        zeta_dot_a_frame += np.cross(omega_a[:, :, None], strip_coordinates_a_frame, axis=1)
+
+        # control surface deflection velocity contribution
+        zeta_dot_a_frame += cs_velocity
+
+    # add node coords
+    strip_coordinates_a_frame += beam_coord[:, :, None]
+
+    # add quarter-chord disp
+    if strip_info['M_distribution'] == 'uniform':
+        delta_c = (strip_coordinates_a_frame[:, :, -1] - strip_coordinates_a_frame[:, :, 0])/m
+        strip_coordinates_a_frame += 0.25*delta_c[:, :, None]
+    else:
+        warnings.warn("No quarter chord disp of grid for non-uniform grid distributions implemented", UserWarning)
+
+    # rotation from a to g
+    return np.matmul(cga, strip_coordinates_a_frame), np.matmul(cga, zeta_dot_a_frame)
@@ -11,7 +11,8 @@ def aero2struct_force_mapping(aero_forces,
                               master,
                               conn,
                               cag=np.eye(3),
-                              aero_dict=None):
+                              aero_dict=None,
+                              mapping_tables=None):
     r"""
     Maps the aerodynamic forces at the lattice to the structural nodes
 
@@ -40,41 +41,133 @@ def aero2struct_force_mapping(aero_forces,
         conn (np.ndarray): Connectivities matrix
         cag (np.ndarray): Transformation matrix between inertial and body-attached reference ``A``
         aero_dict (dict): Dictionary containing the grid's information.
+        mapping_tables (dict (optional)): Precomputed index tables from :func:`aero2struct_mapping_tables`. If not
+          given, they are generated from ``struct2aero_mapping`` and ``conn`` in every call.
 
     Returns:
         np.ndarray: structural forces in an ``n_node x 6`` vector
     """
 
+    if mapping_tables is None:
+        aero_dimensions = np.array([aero_forces[i_surf].shape[1:] for i_surf in range(len(aero_forces))],
+                                   dtype=int).reshape((-1, 2)) - 1
+        mapping_tables = aero2struct_mapping_tables(struct2aero_mapping, conn, aero_dimensions)
+
     n_node, _ = pos_def.shape
-    n_elem, _, _ = psi_def.shape
     struct_forces = np.zeros((n_node, 6))
+    if mapping_tables['n_entries'] == 0:
+        return struct_forces
+
+    # flatten the lattice quantities of all surfaces into a single array
+    forces_flat = np.concatenate([aero_forces[i_surf].reshape((6, -1)) for i_surf in range(len(aero_forces))],
+                                 axis=1)
+    zeta_flat = np.concatenate([zeta[i_surf].reshape((3, -1)) for i_surf in range(len(zeta))],
+                               axis=1)
+
+    # rotation matrices at each of the mapped nodes
+    mapped_node = mapping_tables['mapped_node']
+    cab = algebra.crv2rotation_vec(psi_def[mapping_tables['mapped_elem'], mapping_tables['mapped_local_node'], :])
+    cbg = np.matmul(cab.transpose((0, 2, 1)), cag)
+    pos_g = np.matmul(cag.T, pos_def[mapped_node, :, None])[:, :, 0]
+
+    # gather lattice and node quantities at each entry
+    vertex = mapping_tables['vertex']
+    entry_to_mapped = mapping_tables['entry_to_mapped']
+    f_g = forces_flat[0:3, vertex].T
+    m_g = forces_flat[3:6, vertex].T
+    chi_g = zeta_flat[:, vertex].T - pos_g[entry_to_mapped]
+    cbg_entry = cbg[entry_to_mapped]
+
+    moment_arm = np.zeros_like(f_g)
+    moment_arm[:, 0] = chi_g[:, 1]*f_g[:, 2] - chi_g[:, 2]*f_g[:, 1]
+    moment_arm[:, 1] = -chi_g[:, 0]*f_g[:, 2] + chi_g[:, 2]*f_g[:, 0]
+    moment_arm[:, 2] = chi_g[:, 0]*f_g[:, 1] - chi_g[:, 1]*f_g[:, 0]
+
+    n_entries = mapping_tables['n_entries']
+    f_b = np.matmul(cbg_entry, f_g[:, :, None])[:, :, 0]
+    # moment contributions interleaved as in the summation order of the original loop
+    m_b = np.zeros((2*n_entries, 3))
+    m_b[0::2, :] = np.matmul(cbg_entry, m_g[:, :, None])[:, :, 0]
+    m_b[1::2, :] = np.matmul(cbg_entry, moment_arm[:, :, None])[:, :, 0]
+
+    # scatter onto the structural nodes
+    entry_node = mapping_tables['entry_node']
+    np.add.at(struct_forces[:, 0:3], entry_node, f_b)
+    np.add.at(struct_forces[:, 3:6], np.repeat(entry_node, 2), m_b)
 
-    nodes = []
+    return struct_forces
 
-    for i_elem in range(n_elem):
-        for i_local_node in range(3):
 
+def aero2struct_mapping_tables(struct2aero_mapping, conn, aero_dimensions):
+    """
+    Generates the flat index tables used by :func:`aero2struct_force_mapping` to gather the lattice forces and scatter
+    them onto the structural nodes.
+
+    The tables depend only on the topology of the problem and therefore only need to be computed once for a given
+    aerodynamic grid (see :attr:`sharpy.aero.models.aerogrid.Aerogrid.force_mapping_tables`).
+
+    The entries are sorted as they are visited in the nested loop over elements, nodes, surfaces and chordwise
+    vertices such that the summation of the contributions at each node is carried out in the same order.
+
+    Args:
+        struct2aero_mapping (list): Structural to aerodynamic node mapping
+        conn (np.ndarray): Connectivities matrix
+        aero_dimensions (np.ndarray): ``n_surf x 2`` array with the number of chordwise and spanwise panels in each
+          surface
+
+    Returns:
+        dict: Dictionary of index arrays with keys:
+
+          * ``vertex``: index of each entry in the flattened (concatenated) lattice arrays.
+
+          * ``entry_node``: global structural node to which each entry is mapped.
+
+          * ``entry_to_mapped``: index of each entry's node in the ``mapped_`` arrays.
+
+          * ``mapped_node``, ``mapped_elem``, ``mapped_local_node``: global node, element and local node used to
+            obtain the nodal rotation for each mapped node.
+
+          * ``n_entries``: total number of entries.
+    """
+    n_elem, n_node_elem = conn.shape
+    surf_offset = np.zeros((len(aero_dimensions) + 1,), dtype=int)
+    surf_offset[1:] = np.cumsum((aero_dimensions[:, 0] + 1)*(aero_dimensions[:, 1] + 1))
+
+    vertex = []
+    entry_node = []
+    entry_to_mapped = []
+    mapped_node = []
+    mapped_elem = []
+    mapped_local_node = []
+    visited_nodes = set()
+
+    for i_elem in range(n_elem):
+        for i_local_node in range(n_node_elem):
             i_global_node = conn[i_elem, i_local_node]
-            if i_global_node in nodes:
+            if i_global_node in visited_nodes:
                 continue
 
-            nodes.append(i_global_node)
+            visited_nodes.add(i_global_node)
+            mapped_node.append(i_global_node)
+            mapped_elem.append(i_elem)
+            mapped_local_node.append(i_local_node)
             for mapping in struct2aero_mapping[i_global_node]:
                 i_surf = mapping['i_surf']
                 i_n = mapping['i_n']
-                _, n_m, _ = aero_forces[i_surf].shape
-
-                crv = psi_def[i_elem, i_local_node, :]
-                cab = algebra.crv2rotation(crv)
-                cbg = np.dot(cab.T, cag)
-
+                n_m = aero_dimensions[i_surf, 0] + 1
+                n_n = aero_dimensions[i_surf, 1] + 1
                 for i_m in range(n_m):
-                    chi_g = zeta[i_surf][:, i_m, i_n] - np.dot(cag.T, pos_def[i_global_node, :])
-                    struct_forces[i_global_node, 0:3] += np.dot(cbg, aero_forces[i_surf][0:3, i_m, i_n])
-                    struct_forces[i_global_node, 3:6] += np.dot(cbg, aero_forces[i_surf][3:6, i_m, i_n])
-                    struct_forces[i_global_node, 3:6] += np.dot(cbg, algebra.cross3(chi_g, aero_forces[i_surf][0:3, i_m, i_n]))
-
-    return struct_forces
+                    vertex.append(surf_offset[i_surf] + i_m*n_n + i_n)
+                    entry_node.append(i_global_node)
+                    entry_to_mapped.append(len(mapped_node) - 1)
+
+    return {'vertex': np.array(vertex, dtype=int),
+            'entry_node': np.array(entry_node, dtype=int),
+            'entry_to_mapped': np.array(entry_to_mapped, dtype=int),
+            'mapped_node': np.array(mapped_node, dtype=int),
+            'mapped_elem': np.array(mapped_elem, dtype=int),
+            'mapped_local_node': np.array(mapped_local_node, dtype=int),
+            'n_entries': len(vertex)}
 
 
 def total_forces_moments(forces_nodes_a,
@@ -16,7 +16,7 @@ Examples:
 
 """
 import numpy as np
-from abc import ABCMeta
+from abc import ABCMeta, abstractmethod
 import sharpy.utils.generator_interface as generator_interface
 import sharpy.utils.settings as settings
 from scipy.interpolate import interp1d
@@ -65,6 +65,27 @@ class BaseGust(metaclass=ABCMeta):
     def u_inf_direction(self, value):
         self._u_inf_direction = value
 
+    @abstractmethod
+    def gust_shape(self, x, y, z, time=0):
+        """
+        Gust velocity at the given coordinates in the G-frame.
+
+        The coordinates can be scalars or arrays of the same shape, so that whole surfaces are evaluated at once.
+
+        Args:
+            x (float or np.ndarray): ``x`` coordinates
+            y (float or np.ndarray): ``y`` coordinates
+            z (float or np.ndarray): ``z`` coordinates
+            time (float): time
+
+        Returns:
+            np.ndarray: gust velocity of shape ``(3,) + np.shape(x)``
+        """
+
+    @staticmethod
+    def zero_velocity(x):
+        return np.zeros((3,) + np.shape(x))
+
 
 @gust
 class one_minus_cos(BaseGust):
@@ -105,11 +126,13 @@ class one_minus_cos(BaseGust):
         gust_length = self.settings['gust_length']
         gust_intensity = self.settings['gust_intensity']
 
-        vel = np.zeros((3,))
-        if x > 0.0 or x < -gust_length:
+        vel = self.zero_velocity(x)
+        in_gust = (x <= 0.0) & (x >= -gust_length)
+        if not np.any(in_gust):
             return vel
 
-        vel[self.settings['gust_component']] = (1.0 - np.cos(2.0 * np.pi * x / gust_length)) * gust_intensity * 0.5
+        vel[self.settings['gust_component']] = np.where(
+            in_gust, (1.0 - np.cos(2.0 * np.pi * x / gust_length)) * gust_intensity * 0.5, 0.0)
         return vel
 
 
@@ -157,11 +180,13 @@ class DARPA(BaseGust):
         gust_intensity = self.settings['gust_intensity']
         span = self.settings['span']
 
-        vel = np.zeros((3,))
-        if x > 0.0 or x < -gust_length:
+        vel = self.zero_velocity(x)
+        in_gust = (x <= 0.0) & (x >= -gust_length)
+        if not np.any(in_gust):
             return vel
 
-        vel[self.settings['gust_component']] = (1.0 - np.cos(2.0 * np.pi * x / gust_length)) * gust_intensity * 0.5
+        vel[self.settings['gust_component']] = np.where(
+            in_gust, (1.0 - np.cos(2.0 * np.pi * x / gust_length)) * gust_intensity * 0.5, 0.0)
         vel[self.settings['gust_component']] *= -np.cos(y / span * np.pi)
         return vel
 
@@ -205,11 +230,13 @@ class continuous_sin(BaseGust):
         gust_length = self.settings['gust_length']
         gust_intensity = self.settings['gust_intensity']
 
-        vel = np.zeros((3,))
-        if x > 0.0:
+        vel = self.zero_velocity(x)
+        in_gust = x <= 0.0
+        if not np.any(in_gust):
             return vel
 
-        vel[self.settings['gust_component']] = 0.5 * gust_intensity * np.sin(2 * np.pi * x / gust_length)
+        vel[self.settings['gust_component']] = np.where(
+            in_gust, 0.5 * gust_intensity * np.sin(2 * np.pi * x / gust_length), 0.0)
         return vel
 
 
@@ -257,7 +284,7 @@ class time_varying_global(BaseGust):
                                                                             bounds_error=False,fill_value="extrapolate"))
 
     def gust_shape(self, x, y, z, time=0):
-        vel = np.zeros((3,))
+        vel = self.zero_velocity(x)
         for counter, idim in enumerate(self.settings['gust_component']):
             vel[idim] = self.list_interpolated_velocity_field_functions[counter](time)
         return vel
@@ -280,11 +307,12 @@ class time_varying(time_varying_global):
                                                                             bounds_error=False,fill_value="extrapolate"))
 
     def gust_shape(self, x, y, z, time=0):
-        vel = np.zeros((3,))
-        d = np.dot(np.array([x, y, z]), self.u_inf_direction)
-        if d <= 0.0:       
+        vel = self.zero_velocity(x)
+        d = x * self.u_inf_direction[0] + y * self.u_inf_direction[1] + z * self.u_inf_direction[2]
+        in_gust = d <= 0.0
+        if np.any(in_gust):
             for counter, idim in enumerate(self.settings['gust_component']):
-                vel[idim] = self.list_interpolated_velocity_field_functions[counter](d)
+                vel[idim] = np.where(in_gust, self.list_interpolated_velocity_field_functions[counter](d), 0.0)
         return vel
        
 @gust
@@ -334,14 +362,15 @@ class span_sine(BaseGust):
             self.settings['span_with_gust'] = self.settings['span']
 
     def gust_shape(self, x, y, z, time=0):
-        d = np.dot(np.array([x, y, z]), self.settings['span_dir'])
-        if np.abs(d) <= self.settings['span_with_gust'] / 2:
-            vel = 0.5 * self.settings['gust_intensity'] * np.sin(
-                d * 2. * np.pi / (self.settings['span'] / self.settings['periods_per_span']))
-        else:
-            vel = np.zeros((3,))
+        span_dir = self.settings['span_dir']
+        d = x * span_dir[0] + y * span_dir[1] + z * span_dir[2]
+        vel = np.where(np.abs(d) <= self.settings['span_with_gust'] / 2,
+                       0.5 * self.settings['gust_intensity'] * np.sin(
+                           d * 2. * np.pi / (self.settings['span'] / self.settings['periods_per_span'])),
+                       0.0)
 
-        return vel * self.settings['perturbation_dir']
+        perturbation_dir = self.settings['perturbation_dir'].reshape((3,) + (1,) * np.ndim(x))
+        return vel * perturbation_dir
 
 
 @generator_interface.generator
@@ -441,21 +470,20 @@ class GustVelocityField(generator_interface.BaseGenerator):
 
         for_pos = params['for_pos'][0:3]
 
+        total_offset_val = self.settings['offset']
+        if self.settings['relative_motion']:
+            total_offset_val -= self.settings['u_inf'] * t
+        total_offset = total_offset_val * self.settings['u_inf_direction'] + for_pos
+
         for i_surf in range(len(zeta)):
             if override:
                 uext[i_surf].fill(0.0)
 
-            for i in range(zeta[i_surf].shape[1]):
-                for j in range(zeta[i_surf].shape[2]):
-                    total_offset_val = self.settings['offset']
-                    if self.settings['relative_motion']:
-                        uext[i_surf][:, i, j] += self.settings['u_inf'] * self.settings['u_inf_direction']
-                        total_offset_val -= self.settings['u_inf'] * t
-
-                    total_offset = total_offset_val * self.settings['u_inf_direction'] + for_pos
-                    uext[i_surf][:, i, j] += self.gust.gust_shape(
-                        zeta[i_surf][0, i, j] + total_offset[0],
-                        zeta[i_surf][1, i, j] + total_offset[1],
-                        zeta[i_surf][2, i, j] + total_offset[2],
-                        t
-                    )
+            if self.settings['relative_motion']:
+                uext[i_surf] += (self.settings['u_inf'] * self.settings['u_inf_direction'])[:, None, None]
+
+            # the whole surface is evaluated at once
+            uext[i_surf] += self.gust.gust_shape(zeta[i_surf][0, :, :] + total_offset[0],
+                                                 zeta[i_surf][1, :, :] + total_offset[1],
+                                                 zeta[i_surf][2, :, :] + total_offset[2],
+                                                 t)
@@ -1,12 +1,11 @@
 import numpy as np
-import scipy.interpolate as interpolate
-import h5py as h5
 import os
 from lxml import objectify, etree
 
 import sharpy.utils.generator_interface as generator_interface
 import sharpy.utils.settings as settings
 import sharpy.utils.cout_utils as cout
+import sharpy.utils.inflowstore as inflowstore
 
 
 @generator_interface.generator
@@ -24,14 +23,18 @@ class TurbVelocityField(generator_interface.BaseGenerator):
 
     Supported files:
         - `field_id.xdmf`: Steady or Unsteady XDMF file
+        - `field_id.bts`: TurbSim binary file, read as a frozen field that is reoriented with ``new_orientation``
+          and fed at ``u_fed`` as in :class:`~sharpy.generators.turbvelocityfieldbts.TurbVelocityFieldBts`
+        - `field_id.npy`: inflow store previously converted by this generator
 
     This generator also performs time interpolation between two different time steps. For now, only linear interpolation is possible.
 
-    Space interpolation is done through `scipy.interpolate` trilinear interpolation. However, turbulent fields are
-    read directly from the binary file and not copied into memory. This is performed using `np.memmap`.
-    The overhead of this procedure is ~18% for the interpolation stage, however, initially reading the binary velocity field
-    (which will be much more common with time-domain simulations) is faster by a factor of 1e4.
-    Also, memory savings are quite substantial: from 6Gb for a typical field to a handful of megabytes for the whole program.
+    The snapshots of the field are converted once into an inflow store (see :mod:`sharpy.utils.inflowstore`):
+    a contiguous binary file with all the snapshots that is memory-mapped with `np.memmap`, so that the field is not
+    copied into memory. The conversion is reused in subsequent simulations as long as the store matches the size of the
+    field. At every time step, only the slabs of the two snapshots bounding the current time that are touched by the
+    lattice are read from the store, and the whole lattice is interpolated in space and time with a single trilinear
+    kernel.
 
     Args:
         in_dict (dict): Input data in the form of dictionary. See acceptable entries below:
@@ -55,7 +58,8 @@ class TurbVelocityField(generator_interface.BaseGenerator):
 
     settings_types['turbulent_field'] = 'str'
     settings_default['turbulent_field'] = None
-    settings_description['turbulent_field'] = 'XDMF file path of the velocity field'
+    settings_description['turbulent_field'] = 'XDMF file path of the velocity field. TurbSim ``.bts`` files and ' \
+                                              'inflow stores (``.npy``) are also accepted'
 
     settings_types['offset'] = 'list(float)'
     settings_default['offset'] = np.zeros((3,))
@@ -75,7 +79,30 @@ class TurbVelocityField(generator_interface.BaseGenerator):
 
     settings_types['store_field'] = 'bool'
     settings_default['store_field'] = False
-    settings_description['store_field'] = 'If ``True``, the xdmf snapshots are stored in memory. Only two at a time for the linear interpolation'
+    settings_description['store_field'] = 'If ``True``, the whole inflow store is loaded in memory instead of ' \
+                                          'memory-mapped'
+
+    settings_types['inflow_store'] = 'str'
+    settings_default['inflow_store'] = ''
+    settings_description['inflow_store'] = 'Path of the ``.npy`` inflow store the field is converted into. If empty, ' \
+                                           'it is ``<turbulent_field>.inflow.npy``'
+
+    settings_types['case_with_tower'] = 'bool'
+    settings_default['case_with_tower'] = False
+    settings_description['case_with_tower'] = 'Does the ``.bts`` file include the tower points?'
+
+    settings_types['new_orientation'] = 'str'
+    settings_default['new_orientation'] = 'xyz'
+    settings_description['new_orientation'] = 'New orientation of the axes of the ``.bts`` field'
+
+    settings_types['u_fed'] = 'list(float)'
+    settings_default['u_fed'] = np.zeros((3,))
+    settings_description['u_fed'] = 'Velocity at which the ``.bts`` field is fed into the solid. The field is ' \
+                                    'recirculated once it has been fed through. If zero, the field is not convected'
+
+    settings_types['extra_offset'] = 'float'
+    settings_default['extra_offset'] = 0.
+    settings_description['extra_offset'] = 'Distance [m] to displace the ``.bts`` field in the ``u_fed`` direction'
 
     settings_table = settings.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
@@ -89,22 +116,14 @@ class TurbVelocityField(generator_interface.BaseGenerator):
         self.extension = None
 
         self.grid_data = dict()
+        self.store = None
 
-        self.interpolator = 3*[None]
         self.x_periodicity = False
         self.y_periodicity = False
 
-        # variables for interpolator wrapper
-        self._t0 = -1
-        self._t1 = -1
-        self._it0 = -1
-        self._it1 = -1
-        self._interpolator0 = None
-        self._interpolator1 = None
-        self.coeff = 0.
-        self.double_initialisation = True
-        self.vel_holder0 = 3*[None]
-        self.vel_holder1 = 3*[None]
+        self.u_fed_dir = None
+        self.dist_to_recirculate = 0.
+        self.grid_size_ufed_dir = None
 
     def initialise(self, in_dict, restart=False):
         self.in_dict = in_dict
@@ -117,6 +136,9 @@ class TurbVelocityField(generator_interface.BaseGenerator):
             self.read_btl(self.settings['turbulent_field'])
         if self.extension == '.xdmf':
             self.read_xdmf(self.settings['turbulent_field'])
+        if self.extension in ['.bts', '.npy']:
+            self.read_store(self.settings['turbulent_field'])
+        self.init_store()
 
         if 'z' in self.settings['periodicity']:
             raise ValueError('Periodicitiy setting in TurbVelocityField cannot be z.\n A turbulent boundary layer is not periodic in the z direction!')
@@ -126,29 +148,63 @@ class TurbVelocityField(generator_interface.BaseGenerator):
         if 'y' in self.settings['periodicity']:
             self.y_periodicity = True
 
-    # ADC: VERY VERY UGLY. NEED A BETTER WAY
-    def interpolator_wrapper0(self, coords, i_dim=0):
-        coeff = self.get_coeff()
-        return (1.0 - self.coeff)*self._interpolator0[i_dim](coords) + self.coeff*self._interpolator1[i_dim](coords)
-    def interpolator_wrapper1(self, coords, i_dim=1):
-        coeff = self.get_coeff()
-        return (1.0 - self.coeff)*self._interpolator0[i_dim](coords) + self.coeff*self._interpolator1[i_dim](coords)
-    def interpolator_wrapper2(self, coords, i_dim=2):
-        coeff = self.get_coeff()
-        return (1.0 - self.coeff)*self._interpolator0[i_dim](coords) + self.coeff*self._interpolator1[i_dim](coords)
-
-    def get_coeff(self):
-        return self.coeff
-
-    def init_interpolator(self):
-        if self.settings['frozen']:
-            self.interpolator = self._interpolator0
-            return
+    def store_file(self):
+        if self.settings['inflow_store']:
+            return self.settings['inflow_store']
+        if self.extension == '.npy':
+            return self.settings['turbulent_field']
+        return os.path.splitext(self.settings['turbulent_field'])[0] + '.inflow.npy'
 
-        # continuing the ugliness
-        self.interpolator[0] = self.interpolator_wrapper0
-        self.interpolator[1] = self.interpolator_wrapper1
-        self.interpolator[2] = self.interpolator_wrapper2
+    def init_store(self):
+        """
+        Opens the inflow store of the field, converting the XDMF snapshots or the TurbSim file into it if it does not
+        exist yet.
+        """
+        store_file = self.store_file()
+        grid = (self.grid_data['initial_x_grid'],
+                self.grid_data['initial_y_grid'],
+                self.grid_data['initial_z_grid'])
+        if self.extension == '.xdmf':
+            shape = (self.grid_data['n_grid'], 3) + tuple(len(coord) for coord in grid)
+            if not inflowstore.store_matches(store_file, shape, sources=[self.settings['turbulent_field']]):
+                self.convert_xdmf(store_file)
+        self.store = inflowstore.InflowStore(store_file, grid=grid, in_memory=self.settings['store_field'])
+
+    def convert_xdmf(self, store_file):
+        """
+        Converts the binary snapshots of the XDMF field into the inflow store ``store_file``
+        """
+        if self.settings['print_info']:
+            cout.cout_wrap('Converting the turbulent field into the inflow store ' + store_file, 1)
+        grid = (self.grid_data['initial_x_grid'],
+                self.grid_data['initial_y_grid'],
+                self.grid_data['initial_z_grid'])
+        store = inflowstore.create_store(store_file,
+                                         grid,
+                                         self.grid_data['n_grid'],
+                                         time=self.grid_data['time'],
+                                         dtype=self.grid_data['grid'][0]['ux']['Precision'])
+        for i_grid in range(self.grid_data['n_grid']):
+            store.write_snapshot(i_grid, self.read_grid(i_grid))
+        store.flush()
+
+    def read_grid(self, i_grid):
+        """
+        Returns the ``(3, nx, ny, nz)`` velocity field of the snapshot ``i_grid`` of the XDMF field, memory-mapped from
+        its binary files.
+        """
+        velocities = ['ux', 'uy', 'uz']
+        vel = []
+        for i_dim in range(3):
+            file_name = self.grid_data['grid'][i_grid][velocities[i_dim]]['file']
+            vel.append(np.memmap(self.route + '/' + file_name,
+                                 dtype=self.grid_data['grid'][i_grid][velocities[i_dim]]['Precision'],
+                                 mode='r',
+                                 shape=(self.grid_data['dimensions'][2],
+                                        self.grid_data['dimensions'][1],
+                                        self.grid_data['dimensions'][0]),
+                                 order='F'))
+        return np.array(vel)
 
     # these functions need to define the interpolators
     def read_btl(self, in_file):
@@ -157,6 +213,37 @@ class TurbVelocityField(generator_interface.BaseGenerator):
         """
         raise NotImplementedError('The BTL reader is not up to date!')
 
+    def read_store(self, in_file):
+        """
+        Reads the grid of an inflow store (``.npy``), converting the TurbSim ``.bts`` file into a store first.
+
+        The ``offset`` setting is added to the stored grid.
+        """
+        store_file = self.store_file()
+        if self.extension == '.bts':
+            attributes = inflowstore.bts_attributes(self.settings['case_with_tower'],
+                                                    self.settings['new_orientation'])
+            if not inflowstore.store_matches(store_file, sources=[in_file], attributes=attributes):
+                inflowstore.bts_to_store(in_file, store_file, self.settings['case_with_tower'],
+                                         self.settings['new_orientation'])
+        store = inflowstore.InflowStore(store_file)
+        self.grid_data['n_grid'] = store.n_snapshots
+        self.grid_data['time'] = store.time
+        self.grid_data['initial_x_grid'] = store.grid[0] + self.settings['offset'][0]
+        self.grid_data['initial_y_grid'] = store.grid[1] + self.settings['offset'][1]
+        self.grid_data['initial_z_grid'] = store.grid[2] + self.settings['offset'][2]
+
+        self.bbox = self.get_field_bbox(self.grid_data['initial_x_grid'],
+                                        self.grid_data['initial_y_grid'],
+                                        self.grid_data['initial_z_grid'],
+                                        frame='G')
+        self.print_bbox()
+
+        self.dist_to_recirculate = 0.
+        if self.extension == '.bts' and np.linalg.norm(self.settings['u_fed']) > 0.:
+            self.u_fed_dir = self.settings['u_fed']/np.linalg.norm(self.settings['u_fed'])
+            self.grid_size_ufed_dir = np.abs(np.dot(np.abs(self.bbox[:, 1] - self.bbox[:, 0]), self.u_fed_dir))
+
     def read_xdmf(self, in_file):
         """
         Reads the xml file `<case_name>.xdmf`. Writes the self.grid_data data structure
@@ -252,6 +339,9 @@ class TurbVelocityField(generator_interface.BaseGenerator):
                                         self.grid_data['initial_y_grid'],
                                         self.grid_data['initial_z_grid'],
                                         frame='G')
+        self.print_bbox()
+
+    def print_bbox(self):
         if self.settings['print_info']:
             cout.cout_wrap('The domain bbox is:', 1)
             cout.cout_wrap(' x = [' + str(self.bbox[0, 0]) + ', ' + str(self.bbox[0, 1]) + ']', 1)
@@ -263,67 +353,26 @@ class TurbVelocityField(generator_interface.BaseGenerator):
         for_pos = params['for_pos']
         t = params['t']
 
-        self.update_cache(t)
-
-        self.update_coeff(t)
-
-        self.init_interpolator()
         self.interpolate_zeta(zeta,
                               for_pos,
-                              uext)
+                              uext,
+                              t=t,
+                              offset=self.feed_offset(t))
 
-    def update_cache(self, t):
-        self.double_initialisation = False
-        if self.settings['frozen']:
-            if self._interpolator0 is None:
-                self._t0 = self.timestep_2_time(0)
-                self._it0 = 0
-                self._interpolator0 = self.read_grid(self._it0, i_cache=0)
-            return
-        # most common case: t already in the [t0, t1] interval
-        if self._t0 <= t <= self._t1:
-            return
-
-        # t < t0, something weird (time going backwards)
-        if t < self._t0:
-            raise ValueError('Please make sure everything is ok. Your time is going backwards.')
-
-        # t > t1, need initialisation
-        if t > self._t1:
-            new_it = self.time_2_timestep(t)
-            # new timestep requires initialising the two of them (not likely at all)
-            # this means that the simulation timestep > LES timestep
-            if new_it > self._it1:
-                self.double_initialisation = True
-            else:
-                # t1 goes to t0
-                self._t0 = self._t1
-                self._it0 = self._it1
-                self._interpolator0 = self._interpolator1.copy()
-
-                # t1 updates to the next (new_it + 1)
-                self._it1 = new_it + 1
-                self._t1 = self.timestep_2_time(self._it1)
-                self._interpolator1 = self.read_grid(self._it1, i_cache=1)
-                return
-
-        # last case, both interp need to be initialised
-        if (self._t0 is None or self.double_initialisation):
-            self._t0 = self.timestep_2_time(new_it)
-            self._it0 = new_it
-            self._interpolator0 = self.read_grid(self._it0, i_cache=0)
-
-            self._it1 = new_it + 1
-            self._t1 = self.timestep_2_time(self._it1)
-            self._interpolator1 = self.read_grid(self._it1, i_cache=1)
-
-    def update_coeff(self, t):
-        if self.settings['frozen']:
-            self.coeff = 0.0
-            return
+    def feed_offset(self, t):
+        """
+        Offset of the points simulating that the ``.bts`` field is fed into the solid at ``u_fed``, as in
+        :class:`~sharpy.generators.turbvelocityfieldbts.TurbVelocityFieldBts`. The field is recirculated every time it
+        has been fed through.
+        """
+        if self.u_fed_dir is None:
+            return np.zeros((3,))
 
-        self.coeff = self.linear_coeff([self._t0, self._t1], t)
-        return
+        offset_mod = np.linalg.norm(self.settings['u_fed'])*t + self.settings['extra_offset']
+        while (offset_mod - self.dist_to_recirculate) > self.grid_size_ufed_dir > 0.:
+            cout.cout_wrap('Recirculate inflow', 2)
+            self.dist_to_recirculate += self.grid_size_ufed_dir
+        return (self.dist_to_recirculate - offset_mod)*self.u_fed_dir
 
     def time_2_timestep(self, t):
         return int(max(0, np.floor((t - self.grid_data['time'][0])/self.grid_data['time'][1])))
@@ -341,42 +390,38 @@ class TurbVelocityField(generator_interface.BaseGenerator):
             bbox[:, 1] = self.gstar_2_g(bbox[:, 1])
         return bbox
 
-    def create_interpolator(self, data, x_grid, y_grid, z_grid, i_dim):
-        interpolator = interpolate.RegularGridInterpolator((x_grid, y_grid, z_grid),
-                                                            data,
-                                                            bounds_error=False,
-                                                            fill_value=0.0)
-        return interpolator
+    def interpolate_zeta(self, zeta, for_pos, u_ext, t=None, offset=np.zeros((3))):
+        """
+        Interpolates the velocity field at the grid points of all the surfaces at once.
+
+        For frozen fields the first snapshot is used regardless of ``t``.
+        """
+        if self.settings['frozen']:
+            t = None
 
+        n_points = [zeta[isurf][0].size for isurf in range(len(zeta))]
+        points = np.concatenate([zeta[isurf].reshape(3, -1) for isurf in range(len(zeta))], axis=1)
+        points += (for_pos[0:3] + offset)[:, None]
+        points = self.g_2_gstar(self.apply_periodicity(points))
 
-    def interpolate_zeta(self, zeta, for_pos, u_ext, interpolator=None, offset=np.zeros((3))):
-        if interpolator is None:
-            interpolator = self.interpolator
+        vel = self.gstar_2_g(self.store.interpolate(points.T, t, fill_value=0.).T)
 
+        i_point = 0
         for isurf in range(len(zeta)):
-            _, n_m, n_n = zeta[isurf].shape
-            for i_m in range(n_m):
-                for i_n in range(n_n):
-                    coord = self.g_2_gstar(self.apply_periodicity(zeta[isurf][:, i_m, i_n] + for_pos[0:3] + offset))
-                    for i_dim in range(3):
-                        try:
-                            u_ext[isurf][i_dim, i_m, i_n] = self.interpolator[i_dim](coord)
-                        except ValueError:
-                            print(coord)
-                            raise ValueError()
-                    u_ext[isurf][:, i_m, i_n] = self.gstar_2_g(u_ext[isurf][:, i_m, i_n])
-
+            u_ext[isurf][:] = vel[:, i_point:i_point + n_points[isurf]].reshape(zeta[isurf].shape)
+            i_point += n_points[isurf]
 
     @staticmethod
     def periodicity(x, bbox):
-        try:
-            new_x = bbox[0] + divmod(x - bbox[0], bbox[1] - bbox[0])[1]
-        except ZeroDivisionError:
-            new_x = x
-        return new_x
+        if bbox[1] == bbox[0]:
+            return x
+        return bbox[0] + np.mod(x - bbox[0], bbox[1] - bbox[0])
 
 
     def apply_periodicity(self, coord):
+        """
+        Applies the periodicity of the field to the ``(3, ...)`` coordinates ``coord`` in the G frame
+        """
         new_coord = coord.copy()
         if self.x_periodicity:
             i = 0
@@ -442,67 +487,6 @@ class TurbVelocityField(generator_interface.BaseGenerator):
         # 1 when t == t_vec[1]
         return (t - t_vec[0])/(t_vec[1] - t_vec[0])
 
-    def read_grid(self, i_grid, i_cache=0):
-        """
-        This function returns an interpolator list of size 3 made of `scipy.interpolate.RegularGridInterpolator`
-        objects.
-        """
-        velocities = ['ux', 'uy', 'uz']
-        interpolator = list()
-        for i_dim in range(3):
-            file_name = self.grid_data['grid'][i_grid][velocities[i_dim]]['file']
-            if i_cache == 0:
-                if not self.settings['store_field']:
-                    # load file, but dont copy it
-                    self.vel_holder0[i_dim] = np.memmap(self.route + '/' + file_name,
-                                                   # dtype='float64',
-                                                   dtype=self.grid_data['grid'][i_grid][velocities[i_dim]]['Precision'],
-                                                   shape=(self.grid_data['dimensions'][2],
-                                                          self.grid_data['dimensions'][1],
-                                                          self.grid_data['dimensions'][0]),
-                                                   order='F')
-                else:
-                    # load and store file
-                    self.vel_holder0[i_dim] = (np.fromfile(open(self.route + '/' + file_name, 'rb'),
-                                                          dtype=self.grid_data['grid'][i_grid][velocities[i_dim]]['Precision']).\
-                                                          reshape((self.grid_data['dimensions'][2],
-                                                                   self.grid_data['dimensions'][1],
-                                                                   self.grid_data['dimensions'][0]),
-                                                                   order='F'))
-
-                interpolator.append(self.create_interpolator(self.vel_holder0[i_dim],
-                                                        self.grid_data['initial_x_grid'],
-                                                        self.grid_data['initial_y_grid'],
-                                                        self.grid_data['initial_z_grid'],
-                                                        i_dim=i_dim))
-            elif i_cache == 1:
-                if not self.settings['store_field']:
-                    # load file, but dont copy it
-                    self.vel_holder1[i_dim] = np.memmap(self.route + '/' + file_name,
-                                                   # dtype='float64',
-                                                   dtype=self.grid_data['grid'][i_grid][velocities[i_dim]]['Precision'],
-                                                   shape=(self.grid_data['dimensions'][2],
-                                                          self.grid_data['dimensions'][1],
-                                                          self.grid_data['dimensions'][0]),
-                                                   order='F')
-                else:
-                    # load and store file
-                    self.vel_holder1[i_dim] = (np.fromfile(open(self.route + '/' + file_name, 'rb'),
-                                                          dtype=self.grid_data['grid'][i_grid][velocities[i_dim]]['Precision']).\
-                                                          reshape((self.grid_data['dimensions'][2],
-                                                                   self.grid_data['dimensions'][1],
-                                                                   self.grid_data['dimensions'][0]),
-                                                                   order='F'))
-
-                interpolator.append(self.create_interpolator(self.vel_holder1[i_dim],
-                                                        self.grid_data['initial_x_grid'],
-                                                        self.grid_data['initial_y_grid'],
-                                                        self.grid_data['initial_z_grid'],
-                                                        i_dim=i_dim))
-            else:
-                raise Error('i_cache has to be 0 or 1')
-        return interpolator
-
     @staticmethod
     def g_2_gstar(coord_g):
         return np.array([coord_g[0], coord_g[2], -coord_g[1]])
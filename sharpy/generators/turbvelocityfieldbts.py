@@ -7,78 +7,63 @@ import sharpy.utils.cout_utils as cout
 
 
 def interp_rectgrid_vectorfield(points, grid, vector_field, out_value, regularGrid=False, num_cores=1):
-    # check: https://en.wikipedia.org/wiki/Trilinear_interpolation
+    """
+    Trilinear interpolation of a vector field defined in a rectilinear grid
+
+    All the points are interpolated at once. Check: https://en.wikipedia.org/wiki/Trilinear_interpolation
+
+    Args:
+        points (np.ndarray): ``(npoints, 3)`` coordinates of the points where the field is interpolated
+        grid (tuple): ``(x_grid, y_grid, z_grid)`` monotonically increasing coordinates of the grid
+        vector_field (np.ndarray): ``(3, nx, ny, nz)`` vector field in the grid
+        out_value (np.ndarray): value assigned to the points outside the grid
+        regularGrid (bool): the grid points are evenly spaced in each direction, so that cells are found without
+            searching
+        num_cores (int): unused
+
+    Returns:
+        np.ndarray: ``(npoints, 3)`` interpolated vector field
+    """
     npoints = points.shape[0]
     output = np.zeros((npoints, 3))
-    if regularGrid:
-        length = np.zeros((3))
-        npoints_grid = np.zeros((3), dtype=int)
-        delta = np.zeros((3))
-        for idim in range(3):
-            length[idim] = grid[idim][-1] - grid[idim][0]
-            npoints_grid[idim] = len(grid[idim])
-            delta[idim] = length[idim]/(npoints_grid[idim] - 1)
-
-    for ipoint in range(npoints):
-        # Check if the point is outside the box
-        isout = False
-        for idim in range(3):
-            if (points[ipoint, idim] > grid[idim][-1]) or (points[ipoint, idim] < grid[idim][0]):
-                isout = True
-                output[ipoint, :] = out_value
-                break
-
-        # If the point is in the grid
-        if not isout:
-            # Compute the position
-            igrid = np.zeros((3,), dtype=int)
-            if regularGrid:
-                for idim in range(3):
-                    igrid[idim] = int(np.ceil((points[ipoint, idim] - grid[idim][0])/delta[idim]))
-            else:
-                for idim in range(3):
-                    while points[ipoint, idim] >= grid[idim][igrid[idim]]:
-                        igrid[idim] += 1
-
-            xvec = np.array([grid[0][igrid[0] - 1],
-                             grid[0][igrid[0]    ]])
-            xvec = np.concatenate((xvec, xvec, xvec, xvec))
-            yvec = np.array([grid[1][igrid[1] - 1],
-                             grid[1][igrid[1] - 1],
-                             grid[1][igrid[1]    ],
-                             grid[1][igrid[1]    ]])
-            yvec = np.concatenate((yvec, yvec))
-            zvec = np.ones((8))
-            zvec[0:4] *= grid[2][igrid[2] - 1]
-            zvec[4:8] *= grid[2][igrid[2]    ]
-
-            A = np.zeros((8,8))
-            A[:, 0] = np.ones((8,))
-            A[:, 1] = xvec
-            A[:, 2] = yvec
-            A[:, 3] = zvec
-            A[:, 4] = xvec*yvec
-            A[:, 5] = xvec*zvec
-            A[:, 6] = yvec*zvec
-            A[:, 7] = xvec*yvec*zvec
-
-            Ainv = np.linalg.inv(A)
-            x = points[ipoint, 0]
-            y = points[ipoint, 1]
-            z = points[ipoint, 2]
-            for idim in range(3):
-                b = np.array([vector_field[idim, igrid[0] - 1, igrid[1] - 1, igrid[2] - 1],
-                              vector_field[idim, igrid[0]    , igrid[1] - 1, igrid[2] - 1],
-                              vector_field[idim, igrid[0] - 1, igrid[1]    , igrid[2] - 1],
-                              vector_field[idim, igrid[0]    , igrid[1]    , igrid[2] - 1],
-                              vector_field[idim, igrid[0] - 1, igrid[1] - 1, igrid[2]    ],
-                              vector_field[idim, igrid[0]    , igrid[1] - 1, igrid[2]    ],
-                              vector_field[idim, igrid[0] - 1, igrid[1]    , igrid[2]    ],
-                              vector_field[idim, igrid[0]    , igrid[1]    , igrid[2]    ]
-                             ])
-                f = np.dot(Ainv, b)
-                output[ipoint, idim] = f[0] + f[1]*x + f[2]*y + f[3]*z + f[4]*x*y + f[5]*x*z + f[6]*y*z + f[7]*x*y*z
-
+    output[:, :] = out_value
+
+    # Check if the points are inside the box
+    isin = np.ones((npoints,), dtype=bool)
+    for idim in range(3):
+        isin &= (points[:, idim] <= grid[idim][-1]) & (points[:, idim] >= grid[idim][0])
+    if not isin.any():
+        return output
+    inner_points = points[isin, :]
+
+    # Compute the position in the grid and the local coordinates in the cell
+    igrid = [None]*3
+    local_coord = [None]*3
+    for idim in range(3):
+        npoints_grid = len(grid[idim])
+        if regularGrid:
+            delta = (grid[idim][-1] - grid[idim][0])/(npoints_grid - 1)
+            igrid[idim] = np.ceil((inner_points[:, idim] - grid[idim][0])/delta).astype(int)
+        else:
+            igrid[idim] = np.searchsorted(grid[idim], inner_points[:, idim], side='right')
+        igrid[idim] = np.clip(igrid[idim], 1, npoints_grid - 1)
+        coord_0 = grid[idim][igrid[idim] - 1]
+        coord_1 = grid[idim][igrid[idim]]
+        local_coord[idim] = (inner_points[:, idim] - coord_0)/(coord_1 - coord_0)
+
+    ix, iy, iz = igrid
+    x, y, z = local_coord
+    inner_output = np.zeros((inner_points.shape[0], 3))
+    for corner_x in range(2):
+        weight_x = x if corner_x else 1. - x
+        for corner_y in range(2):
+            weight_y = y if corner_y else 1. - y
+            for corner_z in range(2):
+                weight_z = z if corner_z else 1. - z
+                corner_value = vector_field[:, ix - 1 + corner_x, iy - 1 + corner_y, iz - 1 + corner_z]
+                inner_output += (weight_x*weight_y*weight_z)[:, None]*corner_value.T
+
+    output[isin, :] = inner_output
     return output
 
 
@@ -210,10 +195,7 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
         if is_wake and not self.settings['interpolate_wake']:
             # The generator has received a wake and it will not be interpolated
             for isurf in range(len(uext)):
-                _, n_m, n_n = uext[isurf].shape
-                for i_m in range(n_m):
-                    for i_n in range(n_n):
-                        uext[isurf][:, i_m, i_n] = self.settings['u_out']
+                uext[isurf][:, :, :] = self.settings['u_out'][:, None, None]
 
         else:
             offset_mod = np.linalg.norm(self.settings['u_fed'])*t + self.settings['extra_offset']
@@ -229,11 +211,9 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
                 uext_3_4_chord = [None]*nsurf
                 for isurf in range(nsurf):
                     N = zeta[isurf].shape[2]
-                    zeta_3_4_chord[isurf] = np.zeros((3, 1, N))
                     uext_3_4_chord[isurf] = np.zeros((3, 1, N))
                     # Compute the 3/4 chord position
-                    for i_n in range(N):
-                        zeta_3_4_chord[isurf][:, 0, i_n] = (zeta[isurf][:, 0, i_n] + 3.*zeta[isurf][:, -1, i_n])/4.
+                    zeta_3_4_chord[isurf] = (zeta[isurf][:, 0:1, :] + 3.*zeta[isurf][:, -1:, :])/4.
 
                 # Interpolate at the 3/4 chord point
                 self.interpolate_zeta(zeta_3_4_chord,
@@ -243,10 +223,7 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
 
                 # Assign the values to all chord points
                 for isurf in range(nsurf):
-                    _, M, N = zeta[isurf].shape
-                    for i_n in range(N):
-                        for i_m in range(M):
-                            uext[isurf][:, i_m, i_n] = uext_3_4_chord[isurf][:, 0, i_n]
+                    uext[isurf][:, :, :] = uext_3_4_chord[isurf]
 
             else:
                 self.interpolate_zeta(zeta,
@@ -258,31 +235,24 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
         # if interpolator is None:
         #     interpolator = self.interpolator
 
+        # Gather the coordinates of all the surfaces
+        points_list = np.concatenate([zeta[isurf].reshape(3, -1) for isurf in range(len(zeta))], axis=1).T
+        points_list = points_list + for_pos[0:3] + offset
+
+        # Interpolate
+        list_uext = interp_rectgrid_vectorfield(points_list,
+                                                (self.x_grid, self.y_grid, self.z_grid),
+                                                self.vel,
+                                                self.settings['u_out'],
+                                                regularGrid=True,
+                                                num_cores=self.settings['num_cores'])
+
+        # Reorder the values
+        ipoint = 0
         for isurf in range(len(zeta)):
             _, n_m, n_n = zeta[isurf].shape
-
-            # Reorder the coordinates
-            points_list = np.zeros((n_m*n_n, 3))
-            ipoint = 0
-            for i_m in range(n_m):
-                for i_n in range(n_n):
-                    points_list[ipoint, :] = zeta[isurf][:, i_m, i_n] + for_pos[0:3] + offset
-                    ipoint += 1
-
-            # Interpolate
-            list_uext = interp_rectgrid_vectorfield(points_list,
-                                                 (self.x_grid, self.y_grid, self.z_grid),
-                                                 self.vel,
-                                                 self.settings['u_out'],
-                                                 regularGrid=True,
-                                                 num_cores=self.settings['num_cores'])
-
-            # Reorder the values
-            ipoint = 0
-            for i_m in range(n_m):
-                for i_n in range(n_n):
-                    u_ext[isurf][:, i_m, i_n] = list_uext[ipoint]
-                    ipoint += 1
+            u_ext[isurf][:, :, :] = list_uext[ipoint:ipoint + n_m*n_n, :].T.reshape(3, n_m, n_n)
+            ipoint += n_m*n_n
 
     @staticmethod
     def read_turbsim_bts(fname, case_with_tower=False):
@@ -355,17 +325,15 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
             cout.cout_wrap(("WARNING: I think there is something wrong with the case description. The length is not %d characters" %  n_char_description), 3)
             # print("Input", dictionary['n_char_description'], "as the number of characters of the case description")
 
-        # vel_aux = np.fromstring(dictionary['data'], dtype='>i2')
-        vel_aux = np.fromstring(dictionary['data'], dtype=np.int16)
-        vel = np.zeros((3,dictionary['ntime_steps'],dictionary['ny'],dictionary['nz']))
-
-        counter = -1
-        for ix in range(dictionary['ntime_steps']):
-            for iz in range(dictionary['nz']):
-                for iy in range(dictionary['ny']):
-                    for ivel in range(3):
-                        counter += 1
-                        vel[ivel,-ix,iy,iz] = (vel_aux[counter] - offset[ivel])/scaling[ivel]
+        # The data is stored as [time step, z, y, velocity component]
+        ntime_steps = dictionary['ntime_steps']
+        vel_aux = np.frombuffer(dictionary['data'], dtype=np.int16).reshape(ntime_steps,
+                                                                             dictionary['nz'],
+                                                                             dictionary['ny'],
+                                                                             3)
+        vel_aux = (vel_aux - offset)/scaling
+        # The time step ix is stored in the position -ix
+        vel = vel_aux.transpose(3, 0, 2, 1)[:, -np.arange(ntime_steps), :, :].astype(dtype=float, order='C')
 
         # Generate the grid
         height = dictionary['dz']*(dictionary['nz'] - 1)
@@ -441,24 +409,15 @@ class TurbVelocityFieldBts(generator_interface.BaseGenerator):
                 new_grid[ivel] = new_grid[ivel][::-1]
 
         new_vel = np.zeros((3,new_dim[0],new_dim[1],new_dim[2]))
-        # print("old_dim:", old_dim)
-        # print("new_dim:", new_dim)
-        # print("old_vel.shape:", old_vel.shape)
-        # print("new_vel.shape:", new_vel.shape)
-
-        # These loops will index variables associated with the new grid
-        for ix in range(new_dim[0]):
-            for iy in range(new_dim[1]):
-                for iz in range(new_dim[2]):
-                    new_i = np.array([ix, iy, iz])
-                    # old_i = np.array([new_i[position_in_old[0]]*sign[0], new_i[position_in_old[1]]*sign[1], new_i[position_in_old[2]]*sign[2]])
-                    old_i = np.array([new_i[position_in_old[0]], new_i[position_in_old[1]], new_i[position_in_old[2]]])
-                    for icoord in range(3):
-                        if sign[icoord] == -1:
-                            old_i[icoord] = -1*old_i[icoord] - 1
-                    for ivel in range(3):
-                        # print("moving: ", position_in_old[ivel], ix, iy, iz, "to: ", ivel,new_i[0],new_i[1],new_i[2])
-                        new_vel[ivel,new_i[0],new_i[1],new_i[2]] = old_vel[position_in_old[ivel], old_i[0], old_i[1], old_i[2]]*sign[ivel]
+
+        # Indices of the old grid associated with each point of the new grid
+        new_i = np.indices(new_dim, sparse=True)
+        old_i = [new_i[position_in_old[icoord]] for icoord in range(3)]
+        for icoord in range(3):
+            if sign[icoord] == -1:
+                old_i[icoord] = -1*old_i[icoord] - 1
+        for ivel in range(3):
+            new_vel[ivel, :, :, :] = old_vel[position_in_old[ivel], old_i[0], old_i[1], old_i[2]]*sign[ivel]
 
         return new_grid[0], new_grid[1], new_grid[2], new_vel
 
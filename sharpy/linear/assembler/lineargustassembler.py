@@ -516,6 +516,31 @@ def campbell(sigma_w, length_scale, velocity, dt=None):
     return ss_turb
 
 
+def one_minus_cosine(time, gust_length, gust_intensity, velocity, offset=0.):
+    r"""
+    Time history of a "1-cos" gust as seen at the leading edge, consistent with the ``1-cos`` shape of
+    :class:`~sharpy.generators.gustvelocityfield.GustVelocityField`:
+
+    .. math:: u_{gust}(t) = \frac{u_{de}}{2}\left[1-\cos\left(\frac{2\pi x}{S}\right)\right], \quad x = U_\infty t -
+        x_0
+
+    for :math:`0 \leq x \leq S` and zero otherwise.
+
+    Args:
+        time (np.ndarray): Time array.
+        gust_length (float): Length of the gust :math:`S`.
+        gust_intensity (float): Intensity of the gust :math:`u_{de}`.
+        velocity (float): Free stream velocity :math:`U_\infty`.
+        offset (float (optional)): Distance :math:`x_0` between the leading edge and the start of the gust.
+
+    Returns:
+        np.ndarray: Gust velocity at each time.
+    """
+    x = velocity * np.asarray(time) - offset
+    in_gust = (x >= 0.) & (x <= gust_length)
+    return np.where(in_gust, (1. - np.cos(2. * np.pi * x / gust_length)) * gust_intensity * 0.5, 0.)
+
+
 if __name__ == '__main__':
     pass
     # sys = campbell(90, 1750, 30, dt=0.1)
@@ -13,13 +13,18 @@ Includes:
           multi-surfaces configurations
         - ``uc_dncdzeta``: assemble derivative matrix dnc/dzeta*Uc at bound collocation
           points
+
+The derivatives of the induced velocities are evaluated by ``dvinddzeta_batch``
+at once for a whole set of target points and all the segments of a surface, and
+scattered into the derivative matrices through the panel to vertices maps of
+each surface (``maps.Mpv1d_scalar``).
 """
 
 import numpy as np
 import scipy.sparse as sparse
 import itertools
 
-from sharpy.aero.utils.uvlmlib import dvinddzeta_cpp, eval_panel_cpp
+from sharpy.aero.utils.uvlmlib import eval_panel_cpp
 import sharpy.linear.src.libsparse as libsp
 import sharpy.linear.src.lib_dbiot as dbiot
 import sharpy.linear.src.lib_ucdncdzeta as lib_ucdncdzeta
@@ -33,6 +38,78 @@ svec = [0, 1, 2, 3]  # seg. no.
 avec = [0, 1, 2, 3]  # 1st vertex no.
 bvec = [1, 2, 3, 0]  # 2nd vertex no.
 
+# maximum number of entries of the arrays of target point/segment pairs
+# evaluated at once by the vectorised derivatives
+batch_size = 2 ** 20
+
+
+def get_segments(Surf):
+    """
+    Returns the segments of all the panels of Surf, ordered as
+        [1D index of panel, segment number]
+    as a tuple with:
+    - ZetaA, ZetaB: (4*K,3) coordinates of the 1st and 2nd vertex
+    - gamma: (4*K,) circulation of the panel of each segment
+    - ind_a, ind_b: (4*K,) 1D index of the 1st and 2nd vertex
+    """
+
+    if not hasattr(Surf.maps, 'Mpv1d_scalar'):
+        Surf.maps.map_panels_to_vertices_1D_scalar()
+    ind_a = Surf.maps.Mpv1d_scalar[:, avec].astype(int).reshape(-1)
+    ind_b = Surf.maps.Mpv1d_scalar[:, bvec].astype(int).reshape(-1)
+    zeta_vert = Surf.zeta.reshape((3, Surf.maps.Kzeta)).T
+    gamma = np.repeat(Surf.gamma.reshape(-1), 4)
+
+    return zeta_vert[ind_a], zeta_vert[ind_b], gamma, ind_a, ind_b
+
+
+def target_chunks(n_targets, size_per_target):
+    """
+    Splits n_targets target points into slices such that the arrays of
+    size_per_target entries per target point have at most batch_size entries.
+    """
+    n_chunk = max(1, batch_size // max(1, size_per_target))
+    return [slice(ii, min(ii + n_chunk, n_targets)) for ii in range(0, n_targets, n_chunk)]
+
+
+def vertex_scatter_matrix(Kzeta, ind_vertices):
+    """
+    Sparse matrix of shape (3*Kzeta,3*n), with n=len(ind_vertices), mapping
+    the (x,y,z) components of n vectors, stored as [3*ii+cc], to the 1D index
+    of the vertex ind_vertices[ii] in a (3,M+1,N+1) array. Negative vertex
+    indices are not mapped.
+    """
+    n = len(ind_vertices)
+    rows = (np.arange(3)[None, :] * Kzeta + ind_vertices[:, None]).reshape(-1)
+    cols = np.arange(3 * n)
+    mapped = np.repeat(ind_vertices >= 0, 3)
+    return sparse.csc_matrix((np.ones(np.count_nonzero(mapped)), (rows[mapped], cols[mapped])),
+                             shape=(3 * Kzeta, 3 * n))
+
+
+def vertex_block_matrix(Kzeta, ind_rows, ind_cols, blocks):
+    """
+    Sparse matrix of shape (3*Kzeta,3*Kzeta) summing the (3,3) blocks[ii] at
+    the rows of vertex ind_rows[ii] and columns of vertex ind_cols[ii], with
+    vertices components ordered as in a (3,M+1,N+1) array.
+    """
+    comp = np.arange(3) * Kzeta
+    rows = np.broadcast_to(comp[None, :, None] + ind_rows[:, None, None], blocks.shape)
+    cols = np.broadcast_to(comp[None, None, :] + ind_cols[:, None, None], blocks.shape)
+    return sparse.coo_matrix((blocks.reshape(-1), (rows.reshape(-1), cols.reshape(-1))),
+                             shape=(3 * Kzeta, 3 * Kzeta))
+
+
+def get_te_segments(Surf):
+    """
+    Returns the 1D index of the 1st and 2nd vertex of the trailing edge segments
+    of the bound surface Surf. The segments run along the positive direction as
+    defined in the first row of wake panels, i.e. from vertex (M,n+1) to (M,n).
+    """
+    M, N = Surf.maps.M, Surf.maps.N
+    nn = np.arange(N)
+    return M * (N + 1) + nn + 1, M * (N + 1) + nn
+
 
 def AICs(Surfs, Surfs_star, target='collocation', Project=True):
     """
@@ -71,6 +148,55 @@ def AICs(Surfs, Surfs_star, target='collocation', Project=True):
     return AIC_list, AIC_star_list
 
 
+def AICs_block(Surfs, Surfs_star, Project=True):
+    """
+    Given a list of bound (Surfs) and wake (Surfs_star) instances of
+    surface.AeroGridSurface, returns the AIC matrices at the collocation points
+    of all bound surfaces, assembled in block format:
+        - AIC, of shape (K,K), from all bound surfaces
+        - AIC_star, of shape (K,K_star), from all wake surfaces
+    where K and K_star are the total number of bound and wake panels. These
+    are equal to np.block applied to the output of AICs. If Project is False,
+    the non-projected influence coefficients are returned, with an additional
+    leading dimension of size 3.
+
+    The collocation points of all bound surfaces are gathered in a single
+    array, such that the influence of each surface is computed at once over
+    all target points.
+    """
+
+    n_surf = len(Surfs)
+    assert len(Surfs_star) == n_surf, \
+        'Number of bound and wake surfaces much be equal'
+
+    for Surf in Surfs:
+        if not hasattr(Surf, 'zetac'):
+            Surf.generate_collocations()
+        if Project and not hasattr(Surf, 'normals'):
+            Surf.generate_normals()
+
+    ZetaTarget = np.concatenate([Surf.zetac.reshape((3, -1)) for Surf in Surfs], axis=1).T
+    if Project:
+        Normals = np.concatenate([Surf.normals.reshape((3, -1)) for Surf in Surfs], axis=1).T
+    else:
+        Normals = None
+
+    def assemble_aic(Surfs_in):
+        K_in_tot = sum([Surf_in.maps.K for Surf_in in Surfs_in])
+        if Project:
+            AIC = np.empty((ZetaTarget.shape[0], K_in_tot))
+        else:
+            AIC = np.empty((3, ZetaTarget.shape[0], K_in_tot))
+        K_in0 = 0
+        for Surf_in in Surfs_in:
+            K_in = Surf_in.maps.K
+            AIC[..., K_in0:K_in0 + K_in] = Surf_in.get_aic_at_points(ZetaTarget, Normals)
+            K_in0 += K_in
+        return AIC
+
+    return assemble_aic(Surfs), assemble_aic(Surfs_star)
+
+
 def nc_dqcdzeta_Sin_to_Sout(Surf_in, Surf_out, Der_coll, Der_vert, Surf_in_bound):
     """
     Computes derivative matrix of
@@ -115,45 +241,37 @@ def nc_dqcdzeta_Sin_to_Sout(Surf_in, Surf_out, Der_coll, Der_vert, Surf_in_bound
         N_in = Surf_in.maps.N
         M_bound_in = Kzeta_bound_in // (N_in + 1) - 1
 
-    # create mapping panels to vertices to loop
-    Surf_out.maps.map_panels_to_vertices_1D_scalar()
-    # Surf_in.maps.map_panels_to_vertices_1D_scalar()
+    # create mapping panels to vertices
+    if not hasattr(Surf_out.maps, 'Mpv1d_scalar'):
+        Surf_out.maps.map_panels_to_vertices_1D_scalar()
+    ind_vert_out = Surf_out.maps.Mpv1d_scalar.astype(int)
 
-    ##### loop collocation points
-    for cc_out in range(K_out):
+    # collocation points coordinates and normals ordered as 1D panel index
+    zetac_out = ZetaColl.reshape((3, K_out)).T
+    nc_out = Surf_out.normals.reshape((3, K_out)).T
 
-        # get (m,n) indices of collocation point
-        mm_out = Surf_out.maps.ind_2d_pan_scal[0][cc_out]
-        nn_out = Surf_out.maps.ind_2d_pan_scal[1][cc_out]
-
-        # get coords and normal
-        zetac_here = ZetaColl[:, mm_out, nn_out]  # .copy() # non-contiguous array !
-        nc_here = Surf_out.normals[:, mm_out, nn_out]
+    ##### loop chunks of collocation points
+    for chunk in target_chunks(K_out, 3 * Der_vert.shape[1]):
 
         # get derivative of induced velocity w.r.t. zetac
         if Surf_in_bound:
-            dvind_coll, dvind_vert = dvinddzeta_cpp(zetac_here, Surf_in,
-                                                    is_bound=Surf_in_bound,
-                                                    vortex_radius=Surf_in.vortex_radius)
+            dvind_coll, dvind_vert = dvinddzeta_batch(zetac_out[chunk], Surf_in, IsBound=True)
         else:
-            dvind_coll, dvind_vert = dvinddzeta_cpp(zetac_here, Surf_in,
-                                                    is_bound=Surf_in_bound,
-                                                    vortex_radius=Surf_in.vortex_radius,
-                                                    M_in_bound=M_bound_in)
+            dvind_coll, dvind_vert = dvinddzeta_batch(zetac_out[chunk], Surf_in, IsBound=False,
+                                                      M_in_bound=M_bound_in)
 
         ### Surf_in vertices contribution
-        Der_vert[cc_out, :] += np.dot(nc_here, dvind_vert)
+        Der_vert[chunk, :] += np.einsum('pi,pij->pj', nc_out[chunk], dvind_vert)
 
         ### Surf_out collocation point contribution
         # project
-        dvindnorm_coll = np.dot(nc_here, dvind_coll)
+        dvindnorm_coll = np.einsum('pi,pij->pj', nc_out[chunk], dvind_coll)
 
         # loop panel vertices
-        for vv, dm, dn in zip(range(4), dmver, dnver):
-            mm_v, nn_v = mm_out + dm, nn_out + dn
-            ii_v = [np.ravel_multi_index(
-                (cc, mm_v, nn_v), shape_zeta_out) for cc in range(3)]
-            Der_coll[cc_out, ii_v] += wcv_out[vv] * dvindnorm_coll
+        rows = np.arange(K_out)[chunk]
+        for vv in range(4):
+            for cc in range(3):
+                Der_coll[rows, cc * Kzeta_out + ind_vert_out[chunk, vv]] += wcv_out[vv] * dvindnorm_coll[:, cc]
 
     return Der_coll, Der_vert
 
@@ -492,38 +610,14 @@ def dfqsdzeta_vrel0(Surfs, Surfs_star):
         if Surf.u_input_seg is None:
             raise NameError('Input velocities at segments missing')
 
-        M, N = Surf.maps.M, Surf.maps.N
+        M = Surf.maps.M
         K = Surf.maps.K
         Kzeta = Surf.maps.Kzeta
-        shape_fqs = Surf.maps.shape_vert_vect  # (3,M+1,N+1)
 
         ##### unit gamma contribution of BOUND panels
-        Der = np.zeros((3 * Kzeta, 3 * Kzeta))
-
-        # loop panels (input, i.e. matrix columns)
-        for pp_in in range(K):
-            # get (m,n) indices of panel
-            mm_in = Surf.maps.ind_2d_pan_scal[0][pp_in]
-            nn_in = Surf.maps.ind_2d_pan_scal[1][pp_in]
-
-            for ll, aa, bb in zip(svec, avec, bvec):
-                vrel_seg = (Surf.u_input_seg[:, ll, mm_in, nn_in] +
-                            Surf.u_ind_seg[:, ll, mm_in, nn_in])
-                Df = algebra.skew((0.5 * Surf.rho * Surf.gamma[mm_in, nn_in]) * vrel_seg)
-
-                # get vertices m,n indices
-                mm_a, nn_a = mm_in + dmver[aa], nn_in + dnver[aa]
-                mm_b, nn_b = mm_in + dmver[bb], nn_in + dnver[bb]
-
-                # get vertices 1d index
-                ii_a = [np.ravel_multi_index(
-                    (cc, mm_a, nn_a), shape_fqs) for cc in range(3)]
-                ii_b = [np.ravel_multi_index(
-                    (cc, mm_b, nn_b), shape_fqs) for cc in range(3)]
-                Der[np.ix_(ii_a, ii_a)] += -Df
-                Der[np.ix_(ii_b, ii_a)] += -Df
-                Der[np.ix_(ii_a, ii_b)] += Df
-                Der[np.ix_(ii_b, ii_b)] += Df
+        _, _, gamma, ind_a, ind_b = get_segments(Surf)
+        vrel_seg = (Surf.u_input_seg + Surf.u_ind_seg).transpose((2, 3, 1, 0)).reshape((4 * K, 3))
+        Df = dbiot.skew_vect((0.5 * Surf.rho * gamma)[:, None] * vrel_seg)
 
         ##### contribution of WAKE TE segments.
         # This is added to Der, as only the bound vertices are included in the
@@ -532,25 +626,18 @@ def dfqsdzeta_vrel0(Surfs, Surfs_star):
         # loop TE bound segment but:
         # - using wake gamma
         # - using orientation of wake panel
-        for nn_in in range(N):
-            # get velocity at seg.3 of wake TE
-            vrel_seg = (Surf.u_input_seg[:, 1, M - 1, nn_in] + Surf.u_ind_seg[:, 1, M - 1, nn_in])
-            Df = Df = algebra.skew(
-                (0.5 * Surfs_star[ss].rho * Surfs_star[ss].gamma[0, nn_in]) * vrel_seg)
-
-            # get TE bound vertices m,n indices
-            nn_a = nn_in + dnver[2]
-            nn_b = nn_in + dnver[1]
-            # get vertices 1d index on bound
-            ii_a = [np.ravel_multi_index(
-                (cc, M, nn_a), shape_fqs) for cc in range(3)]
-            ii_b = [np.ravel_multi_index(
-                (cc, M, nn_b), shape_fqs) for cc in range(3)]
-
-            Der[np.ix_(ii_a, ii_a)] += -Df
-            Der[np.ix_(ii_b, ii_a)] += -Df
-            Der[np.ix_(ii_a, ii_b)] += Df
-            Der[np.ix_(ii_b, ii_b)] += Df
+        # - using velocity at seg.3 of wake TE
+        ind_te_a, ind_te_b = get_te_segments(Surf)
+        vrel_seg = (Surf.u_input_seg[:, 1, M - 1, :] + Surf.u_ind_seg[:, 1, M - 1, :]).T
+        Df_te = dbiot.skew_vect((0.5 * Surfs_star[ss].rho * Surfs_star[ss].gamma[0, :])[:, None] * vrel_seg)
+
+        ind_a = np.concatenate((ind_a, ind_te_a))
+        ind_b = np.concatenate((ind_b, ind_te_b))
+        Df = np.concatenate((Df, Df_te))
+        Der = vertex_block_matrix(Kzeta,
+                                  np.concatenate((ind_a, ind_b, ind_a, ind_b)),
+                                  np.concatenate((ind_a, ind_a, ind_b, ind_b)),
+                                  np.concatenate((-Df, -Df, Df, Df))).toarray()
         Der_list.append(Der)
 
     return Der_list
@@ -743,99 +830,38 @@ def dfqsdvind_gamma(Surfs, Surfs_star):
     for ss_out in range(n_surf):
 
         Surf_out = Surfs[ss_out]
-        M_out, N_out = Surf_out.maps.M, Surf_out.maps.N
+        M_out = Surf_out.maps.M
         K_out = Surf_out.maps.K
         Kzeta_out = Surf_out.maps.Kzeta
-        shape_fqs = Surf_out.maps.shape_vert_vect  # (3,M+1,N+1)
-
-        # get AICs over Surf_out
-        AICs = []
-        AICs_star = []
-        for ss_in in range(n_surf):
-            AICs.append(Surfs[ss_in].get_aic_over_surface(
-                Surf_out, target='segments', Project=False))
-            AICs_star.append(Surfs_star[ss_in].get_aic_over_surface(
-                Surf_out, target='segments', Project=False))
-
-        # allocate all derivative matrices
-        Der_list_sub = []
-        Der_star_list_sub = []
-        for ss_in in range(n_surf):
-            # bound
-            K_in = Surfs[ss_in].maps.K
-            Der_list_sub.append(np.zeros((3 * Kzeta_out, K_in)))
-            # wake
-            K_in = Surfs_star[ss_in].maps.K
-            Der_star_list_sub.append(np.zeros((3 * Kzeta_out, K_in)))
-
-        ### loop bound panels
-        for pp_out in range(K_out):
-            # get (m,n) indices of panel
-            mm_out = Surf_out.maps.ind_2d_pan_scal[0][pp_out]
-            nn_out = Surf_out.maps.ind_2d_pan_scal[1][pp_out]
-            # get panel vertices
-            # zetav_here=Surf_out.get_panel_vertices_coords(mm_out,nn_out)
-            zetav_here = Surf_out.zeta[:, [mm_out + 0, mm_out + 1, mm_out + 1, mm_out + 0],
-                         [nn_out + 0, nn_out + 0, nn_out + 1, nn_out + 1]].T
-
-            for ll, aa, bb in zip(svec, avec, bvec):
-
-                # get segment
-                lv = zetav_here[bb, :] - zetav_here[aa, :]
-                Lskew = algebra.skew((-0.5 * Surf_out.rho * Surf_out.gamma[mm_out, nn_out]) * lv)
-
-                # get vertices m,n indices
-                mm_a, nn_a = mm_out + dmver[aa], nn_out + dnver[aa]
-                mm_b, nn_b = mm_out + dmver[bb], nn_out + dnver[bb]
-
-                # get vertices 1d index
-                ii_a = [np.ravel_multi_index(
-                    (cc, mm_a, nn_a), shape_fqs) for cc in range(3)]
-                ii_b = [np.ravel_multi_index(
-                    (cc, mm_b, nn_b), shape_fqs) for cc in range(3)]
 
-                # update all derivatives
-                for ss_in in range(n_surf):
-                    # derivatives: size (3,K_in)
-                    Dfs = np.dot(Lskew, AICs[ss_in][:, :, ll, mm_out, nn_out])
-                    Dfs_star = np.dot(Lskew, AICs_star[ss_in][:, :, ll, mm_out, nn_out])
-                    # allocate
-                    Der_list_sub[ss_in][ii_a, :] += Dfs
-                    Der_list_sub[ss_in][ii_b, :] += Dfs
-                    Der_star_list_sub[ss_in][ii_a, :] += Dfs_star
-                    Der_star_list_sub[ss_in][ii_b, :] += Dfs_star
-
-        ### loop again trailing edge
-        # here we add the Gammaw_0*rho*skew(lv)*dvind/dgamma contribution hence:
+        # bound panels segments and trailing edge, where we add the
+        # Gammaw_0*rho*skew(lv)*dvind/dgamma contribution hence:
         # - we use Gammaw_0 over the TE
         # - we run along the positive direction as defined in the first row of
         # wake panels
-        for nn_out in range(N_out):
+        _, _, gamma, ind_a, ind_b = get_segments(Surf_out)
+        ind_te_a, ind_te_b = get_te_segments(Surf_out)
+        ind_a = np.concatenate((ind_a, ind_te_a))
+        ind_b = np.concatenate((ind_b, ind_te_b))
+        gamma = np.concatenate((gamma, Surfs_star[ss_out].gamma[0, :]))
 
-            # get TE bound vertices m,n indices
-            nn_a = nn_out + dnver[2]
-            nn_b = nn_out + dnver[1]
-
-            # get segment
-            lv = Surf_out.zeta[:, M_out, nn_b] - Surf_out.zeta[:, M_out, nn_a]
-            Lskew = algebra.skew((-0.5 * Surf_out.rho * Surfs_star[ss_out].gamma[0, nn_out]) * lv)
+        zeta_vert = Surf_out.zeta.reshape((3, Kzeta_out)).T
+        Lskew = dbiot.skew_vect((-0.5 * Surf_out.rho * gamma)[:, None] * (zeta_vert[ind_b] - zeta_vert[ind_a]))
+        scatter = vertex_scatter_matrix(Kzeta_out, ind_a) + vertex_scatter_matrix(Kzeta_out, ind_b)
 
-            # get vertices 1d index on bound
-            ii_a = [np.ravel_multi_index(
-                (cc, M_out, nn_a), shape_fqs) for cc in range(3)]
-            ii_b = [np.ravel_multi_index(
-                (cc, M_out, nn_b), shape_fqs) for cc in range(3)]
-
-            # update all derivatives
-            for ss_in in range(n_surf):
-                # derivatives: size (3,K_in)
-                Dfs = np.dot(Lskew, AICs[ss_in][:, :, 1, M_out - 1, nn_out])
-                Dfs_star = np.dot(Lskew, AICs_star[ss_in][:, :, 1, M_out - 1, nn_out])
-                # allocate
-                Der_list_sub[ss_in][ii_a, :] += Dfs
-                Der_list_sub[ss_in][ii_b, :] += Dfs
-                Der_star_list_sub[ss_in][ii_a, :] += Dfs_star
-                Der_star_list_sub[ss_in][ii_b, :] += Dfs_star
+        # allocate all derivative matrices
+        Der_list_sub = []
+        Der_star_list_sub = []
+        for ss_in in range(n_surf):
+            for Surf_in, Der_sub in zip([Surfs[ss_in], Surfs_star[ss_in]], [Der_list_sub, Der_star_list_sub]):
+                # get AICs over Surf_out segments, ordered as the segments
+                AIC = Surf_in.get_aic_over_surface(Surf_out, target='segments', Project=False)
+                K_in = AIC.shape[1]
+                AIC_seg = np.concatenate((AIC.transpose((3, 4, 2, 0, 1)).reshape((4 * K_out, 3, K_in)),
+                                          AIC[:, :, 1, M_out - 1, :].transpose((2, 0, 1))))
+                # derivatives: size (3,K_in) at each segment
+                Dfs = np.einsum('sij,sjk->sik', Lskew, AIC_seg)
+                Der_sub.append(scatter.dot(Dfs.reshape((-1, K_in))))
 
         Der_list.append(Der_list_sub)
         Der_star_list.append(Der_star_list_sub)
@@ -951,6 +977,68 @@ def dvinddzeta(zetac, Surf_in, IsBound, M_in_bound=None):
     return Dercoll, Dervert
 
 
+def dvinddzeta_batch(zetac, Surf_in, IsBound, M_in_bound=None):
+    """
+    Vectorised version of dvinddzeta for the set of target points zetac, of
+    shape (n_p,3). The contributions of all the segments of Surf_in are
+    evaluated at once and the derivatives w.r.t. the segments vertices are
+    scattered through the panel to vertices map of Surf_in.
+
+    As in dvinddzeta, if Surf_in is a wake (IsBound==False), only the TE
+    vertices contribute to Dervert, which is allocated using the chordwise
+    paneling M_in_bound of the associated bound surface.
+
+    The output derivatives are:
+    - Dercoll: n_p x 3 x 3 array
+    - Dervert: n_p x 3 x 3*Kzeta array (if Surf_in is a wake, Kzeta is that of
+    the bound)
+    """
+
+    N_in = Surf_in.maps.N
+    ZetaA, ZetaB, gamma, ind_a, ind_b = get_segments(Surf_in)
+
+    if IsBound:
+        # all segments contribute to Dervert
+        M_in_bound = Surf_in.maps.M
+        n_seg_vert = len(gamma)
+    else:
+        # only the segments of the first row of panels include TE vertices.
+        # Vertices of the first row of the wake are those of the last row of
+        # the bound surface
+        n_seg_vert = 4 * N_in
+        ind_a = np.where(ind_a < N_in + 1, M_in_bound * (N_in + 1) + ind_a, -1)
+        ind_b = np.where(ind_b < N_in + 1, M_in_bound * (N_in + 1) + ind_b, -1)
+
+    Kzeta_in_bound = (M_in_bound + 1) * (N_in + 1)
+    scatter = vertex_scatter_matrix(Kzeta_in_bound,
+                                    np.concatenate((ind_a[:n_seg_vert], ind_b[:n_seg_vert])))
+
+    n_p = zetac.shape[0]
+    Dercoll = np.zeros((n_p, 3, 3))
+    Dervert = np.zeros((n_p, 3, 3 * Kzeta_in_bound))
+
+    for chunk in target_chunks(n_p, 9 * len(gamma)):
+        der_zetac, der_zeta_a, der_zeta_b = dbiot.eval_seg_comp_vect(
+            zetac[chunk], ZetaA[:n_seg_vert], ZetaB[:n_seg_vert], Surf_in.vortex_radius,
+            gamma_seg=gamma[:n_seg_vert])
+        ### Mid-segment point contribution
+        Dercoll[chunk] = der_zetac.sum(axis=1)
+        if n_seg_vert < len(gamma):
+            der_zetac, _, _ = dbiot.eval_seg_comp_vect(
+                zetac[chunk], ZetaA[n_seg_vert:], ZetaB[n_seg_vert:], Surf_in.vortex_radius,
+                gamma_seg=gamma[n_seg_vert:], der_vertices=False)
+            Dercoll[chunk] += der_zetac.sum(axis=1)
+
+        ### Panel vertices contribution
+        # [segment, (x,y,z) of zeta] -> (x,y,z) of vertices
+        n_chunk = der_zetac.shape[0]
+        der_zeta_seg = np.concatenate((der_zeta_a, der_zeta_b), axis=1)
+        der_zeta_seg = der_zeta_seg.transpose((1, 3, 0, 2)).reshape((-1, 3 * n_chunk))
+        Dervert[chunk] = scatter.dot(der_zeta_seg).reshape((3 * Kzeta_in_bound, n_chunk, 3)).transpose((1, 2, 0))
+
+    return Dercoll, Dervert
+
+
 def dfqsdvind_zeta(Surfs, Surfs_star):
     """
     Assemble derivative of quasi-steady force w.r.t. induced velocities changes
@@ -973,136 +1061,57 @@ def dfqsdvind_zeta(Surfs, Surfs_star):
             Dervert_list_sub.append(np.zeros((3 * Kzeta_out, 3 * Kzeta_in)))
         Dervert_list.append(Dervert_list_sub)
 
+    Kzeta_in_max = max([Surf_in.maps.Kzeta for Surf_in in Surfs])
+
     for ss_out in range(n_surf):
 
         Surf_out = Surfs[ss_out]
-        M_out, N_out = Surf_out.maps.M, Surf_out.maps.N
-        K_out = Surf_out.maps.K
         Kzeta_out = Surf_out.maps.Kzeta
-        shape_fqs = Surf_out.maps.shape_vert_vect  # (3,M+1,N+1)
-        Dercoll = Dercoll_list[ss_out]  # <--link
 
-        ### Loop out (bound) surface panels
-        for pp_out in itertools.product(range(0, M_out), range(0, N_out)):
-            mm_out, nn_out = pp_out
-            # zeta_panel_out=Surf_out.get_panel_vertices_coords(mm_out,nn_out)
-            zeta_panel_out = Surf_out.zeta[:, [mm_out + 0, mm_out + 1, mm_out + 1, mm_out + 0],
-                             [nn_out + 0, nn_out + 0, nn_out + 1, nn_out + 1]].T
-
-            # Loop segments
-            for ll, aa, bb in zip(svec, avec, bvec):
-                zeta_mid = 0.5 * (zeta_panel_out[bb, :] + zeta_panel_out[aa, :])
-                lv = zeta_panel_out[bb, :] - zeta_panel_out[aa, :]
-                Lskew = algebra.skew((-Surf_out.rho * Surf_out.gamma[mm_out, nn_out]) * lv)
-
-                # get vertices m,n indices
-                mm_a, nn_a = mm_out + dmver[aa], nn_out + dnver[aa]
-                mm_b, nn_b = mm_out + dmver[bb], nn_out + dnver[bb]
-                # get vertices 1d index
-                ii_a = [np.ravel_multi_index(
-                    (cc, mm_a, nn_a), shape_fqs) for cc in range(3)]
-                ii_b = [np.ravel_multi_index(
-                    (cc, mm_b, nn_b), shape_fqs) for cc in range(3)]
-                del mm_a, mm_b, nn_a, nn_b
-
-                ### loop input surfaces coordinates
-                for ss_in in range(n_surf):
-                    ### Bound
-                    Surf_in = Surfs[ss_in]
-                    M_in_bound, N_in_bound = Surf_in.maps.M, Surf_in.maps.N
-                    shape_zeta_in_bound = (3, M_in_bound + 1, N_in_bound + 1)
-                    Dervert = Dervert_list[ss_out][ss_in]  # <- link
-                    # deriv wrt induced velocity
-                    dvind_mid, dvind_vert = dvinddzeta_cpp(
-                        zeta_mid, Surf_in, is_bound=True, vortex_radius=Surf_in.vortex_radius)
-                    # allocate coll
-                    Df = np.dot(0.25 * Lskew, dvind_mid)
-                    Dercoll[np.ix_(ii_a, ii_a)] += Df
-                    Dercoll[np.ix_(ii_b, ii_a)] += Df
-                    Dercoll[np.ix_(ii_a, ii_b)] += Df
-                    Dercoll[np.ix_(ii_b, ii_b)] += Df
-                    # allocate vert
-                    Df = np.dot(0.5 * Lskew, dvind_vert)
-                    Dervert[ii_a, :] += Df
-                    Dervert[ii_b, :] += Df
-
-                    ### wake
-                    # deriv wrt induced velocity
-                    dvind_mid, dvind_vert = dvinddzeta_cpp(
-                        zeta_mid, Surfs_star[ss_in],
-                        is_bound=False, vortex_radius=Surf_in.vortex_radius,
-                        M_in_bound=Surf_in.maps.M)
-                    # allocate coll
-                    Df = np.dot(0.25 * Lskew, dvind_mid)
-                    Dercoll[np.ix_(ii_a, ii_a)] += Df
-                    Dercoll[np.ix_(ii_b, ii_a)] += Df
-                    Dercoll[np.ix_(ii_a, ii_b)] += Df
-                    Dercoll[np.ix_(ii_b, ii_b)] += Df
-
-                    Df = np.dot(0.5 * Lskew, dvind_vert)
-                    Dervert[ii_a, :] += Df
-                    Dervert[ii_b, :] += Df
-
-        # Loop output surf. TE
+        # Out (bound) surface segments and output surf. TE, where:
         # - we use Gammaw_0 over the TE
         # - we run along the positive direction as defined in the first row of
         # wake panels
-        for nn_out in range(N_out):
-
-            # get TE bound vertices m,n indices
-            nn_a = nn_out + 1
-            nn_b = nn_out
-
-            # get segment and mid-point
-            zeta_mid = 0.5 * (Surf_out.zeta[:, M_out, nn_b] + Surf_out.zeta[:, M_out, nn_a])
-            lv = Surf_out.zeta[:, M_out, nn_b] - Surf_out.zeta[:, M_out, nn_a]
-            Lskew = algebra.skew((-Surf_out.rho * Surfs_star[ss_out].gamma[0, nn_out]) * lv)
-
-            # get vertices 1d index on bound
-            ii_a = [np.ravel_multi_index(
-                (cc, M_out, nn_a), shape_fqs) for cc in range(3)]
-            ii_b = [np.ravel_multi_index(
-                (cc, M_out, nn_b), shape_fqs) for cc in range(3)]
+        _, _, gamma, ind_a, ind_b = get_segments(Surf_out)
+        ind_te_a, ind_te_b = get_te_segments(Surf_out)
+        ind_a = np.concatenate((ind_a, ind_te_a))
+        ind_b = np.concatenate((ind_b, ind_te_b))
+        gamma = np.concatenate((gamma, Surfs_star[ss_out].gamma[0, :]))
+
+        # get segments and mid-points
+        zeta_vert = Surf_out.zeta.reshape((3, Kzeta_out)).T
+        zeta_mid = 0.5 * (zeta_vert[ind_b] + zeta_vert[ind_a])
+        Lskew = dbiot.skew_vect((-Surf_out.rho * gamma)[:, None] * (zeta_vert[ind_b] - zeta_vert[ind_a]))
+        scatter = vertex_scatter_matrix(Kzeta_out, ind_a) + vertex_scatter_matrix(Kzeta_out, ind_b)
+
+        ### loop chunks of mid-segment points
+        dvind_mid = np.zeros((len(gamma), 3, 3))
+        for chunk in target_chunks(len(gamma), 9 * Kzeta_in_max):
+            cols = slice(3 * chunk.start, 3 * chunk.stop)
 
             ### loop input surfaces coordinates
             for ss_in in range(n_surf):
                 ### Bound
                 Surf_in = Surfs[ss_in]
-                M_in_bound, N_in_bound = Surf_in.maps.M, Surf_in.maps.N
-                shape_zeta_in_bound = (3, M_in_bound + 1, N_in_bound + 1)
-                Dervert = Dervert_list[ss_out][ss_in]  # <- link
-                # deriv wrt induced velocity
-                dvind_mid, dvind_vert = dvinddzeta_cpp(zeta_mid, Surf_in,
-                                                       is_bound=True,
-                                                       vortex_radius=Surf_in.vortex_radius)
-                # allocate coll
-                Df = np.dot(0.25 * Lskew, dvind_mid)
-                Dercoll[np.ix_(ii_a, ii_a)] += Df
-                Dercoll[np.ix_(ii_b, ii_a)] += Df
-                Dercoll[np.ix_(ii_a, ii_b)] += Df
-                Dercoll[np.ix_(ii_b, ii_b)] += Df
-                # allocate vert
-                Df = np.dot(0.5 * Lskew, dvind_vert)
-                Dervert[ii_a, :] += Df
-                Dervert[ii_b, :] += Df
+                dvind_coll, dvind_vert = dvinddzeta_batch(zeta_mid[chunk], Surf_in, IsBound=True)
+                dvind_mid[chunk] += dvind_coll
 
                 ### wake
-                # deriv wrt induced velocity
-                dvind_mid, dvind_vert = dvinddzeta_cpp(
-                    zeta_mid, Surfs_star[ss_in],
-                    is_bound=False, vortex_radius=Surf_in.vortex_radius,
-                    M_in_bound=Surf_in.maps.M)
-                # allocate coll
-                Df = np.dot(0.25 * Lskew, dvind_mid)
-                Dercoll[np.ix_(ii_a, ii_a)] += Df
-                Dercoll[np.ix_(ii_b, ii_a)] += Df
-                Dercoll[np.ix_(ii_a, ii_b)] += Df
-                Dercoll[np.ix_(ii_b, ii_b)] += Df
+                dvind_coll, dvind_vert_star = dvinddzeta_batch(zeta_mid[chunk], Surfs_star[ss_in], IsBound=False,
+                                                               M_in_bound=Surf_in.maps.M)
+                dvind_mid[chunk] += dvind_coll
+                dvind_vert += dvind_vert_star
 
                 # allocate vert
-                Df = np.dot(0.5 * Lskew, dvind_vert)
-                Dervert[ii_a, :] += Df
-                Dervert[ii_b, :] += Df
+                Df = np.einsum('sij,sjk->sik', 0.5 * Lskew[chunk], dvind_vert)
+                Dervert_list[ss_out][ss_in] += scatter[:, cols].dot(Df.reshape((-1, Df.shape[2])))
+
+        # allocate coll
+        Df = np.einsum('sij,sjk->sik', 0.25 * Lskew, dvind_mid)
+        Dercoll_list[ss_out] += vertex_block_matrix(Kzeta_out,
+                                                    np.concatenate((ind_a, ind_b, ind_a, ind_b)),
+                                                    np.concatenate((ind_a, ind_a, ind_b, ind_b)),
+                                                    np.concatenate((Df, Df, Df, Df))).toarray()
 
     return Dercoll_list, Dervert_list
 
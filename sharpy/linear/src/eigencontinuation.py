@@ -0,0 +1,241 @@
+"""
+Eigenvalue continuation of parameter dependent linear systems
+
+The eigenpairs of a state-space system that depends on a scalar parameter (e.g. the free stream velocity of a scaled
+aeroelastic system) are tracked along the parameter with inverse iterations warm-started from the previous value of the
+parameter, instead of solving the full eigenvalue problem at each value.
+"""
+import numpy as np
+import scipy.linalg as scalg
+import scipy.sparse as sparse
+import scipy.sparse.linalg as spalg
+
+import sharpy.linear.src.libsparse as libsp
+import sharpy.utils.cout_utils as cout
+
+
+class EigenvalueContinuation():
+    r"""
+    Tracks a set of eigenpairs of a parameter dependent state-space system.
+
+    Starting from the eigenpairs at the first value of the parameter, each step to a new value :math:`p_{k+1}`
+    predicts the eigenvalues by linear extrapolation of the continuous time eigenvalues of the last two steps, which
+    are mapped to discrete time with the time step at :math:`p_{k+1}` for discrete time systems. Each eigenpair is then refined by inverse
+    iterations of :math:`\mathbf{A}(p_{k+1}) - \sigma\mathbf{I}`, shifted at the predicted eigenvalue and started from
+    the previous eigenvector. Dense state matrices are reduced once per step to upper Hessenberg form, such that each
+    iteration costs :math:`O(N_x^2)`. Sparse state matrices are factorised once per mode and step.
+
+    A step is rejected and halved, down to ``max_refinements`` halvings of the nominal step, if:
+
+    * the inverse iterations of any mode do not converge
+
+    * the modal assurance criterion (MAC) between the new and previous eigenvectors of any mode is below
+      ``mac_tolerance``, which indicates a mode switch
+
+    * the real part of the continuous time eigenvalue of any mode changes sign (damping zero crossing), such that the
+      crossing is located within a refined step
+
+    Args:
+        system_update (callable): Returns the ``libss.StateSpace`` at a given value of the parameter.
+        dimensional_time_step (callable (optional)): Returns the dimensional time step of a discrete time system given
+            the value of the parameter and the system. Defaults to the time step of the system.
+        max_refinements (int): Maximum number of halvings of the nominal parameter step.
+        mac_tolerance (float): Minimum MAC between the eigenvectors of a mode at consecutive steps.
+        tolerance (float): Relative tolerance on the residual of the eigenpairs.
+        max_iter (int): Maximum number of inverse iterations per mode and step.
+
+    Attributes:
+        parameter (np.ndarray): Values of the parameter at which the eigenpairs have been computed.
+        eigenvalues (np.ndarray): ``(len(parameter), num_modes)`` continuous time eigenvalues of the tracked modes.
+        crossings (list): ``(mode, parameter, frequency)`` of each damping zero crossing, linearly interpolated within
+            the refined step.
+    """
+
+    def __init__(self, system_update, dimensional_time_step=None, max_refinements=4, mac_tolerance=0.9,
+                 tolerance=1e-10, max_iter=20):
+
+        self.system_update = system_update
+        if dimensional_time_step is None:
+            self.dimensional_time_step = lambda parameter, system: system.dt
+        else:
+            self.dimensional_time_step = dimensional_time_step
+        self.max_refinements = max_refinements
+        self.mac_tolerance = mac_tolerance
+        self.tolerance = tolerance
+        self.max_iter = max_iter
+
+        self.parameter = None
+        self.eigenvalues = None
+        self.crossings = []
+
+    def track(self, parameter_values, eigenvalues, eigenvectors):
+        """
+        Tracks the eigenpairs along the parameter values.
+
+        Args:
+            parameter_values (np.ndarray): Increasing nominal values of the parameter. Refined values are added near
+                damping zero crossings and mode switches.
+            eigenvalues (np.ndarray): Eigenvalues of the modes to track at ``parameter_values[0]``, in the time domain
+                of the system (discrete time eigenvalues for discrete time systems).
+            eigenvectors (np.ndarray): Corresponding right eigenvectors (in columns).
+
+        Returns:
+            tuple(np.ndarray, np.ndarray): parameter values and ``(len(parameter), num_modes)`` continuous time
+            eigenvalues of the tracked modes.
+        """
+        parameter_values = np.asarray(parameter_values, dtype=float)
+        eigenvalues = np.array(eigenvalues, dtype=complex)
+        eigenvectors = np.array(eigenvectors, dtype=complex)
+        eigenvectors /= np.linalg.norm(eigenvectors, axis=0)
+
+        p = parameter_values[0]
+        system = self.system_update(p)
+        parameter_list = [p]
+        eigenvalues_list = [self.continuous_time(eigenvalues, p, system)]
+        self.crossings = []
+
+        p_prev, eigenvalues_prev = None, None
+        for p_next in parameter_values[1:]:
+            min_step = (p_next - p) / 2 ** self.max_refinements
+            step = p_next - p
+            while p < p_next:
+                p_new = p + step
+                if p_new > p_next - 1e-3 * min_step:
+                    p_new, step = p_next, p_next - p
+                system = self.system_update(p_new)
+
+                if p_prev is None:
+                    shifts = eigenvalues_list[-1]
+                else:
+                    shifts = eigenvalues_list[-1] + (eigenvalues_list[-1] - eigenvalues_prev) * (step / (p - p_prev))
+                shifts = self.system_time_domain(shifts, p_new, system)
+                eigenvalues_new, eigenvectors_new, converged = self.refine(system.A, shifts, eigenvectors)
+                eigenvalues_ct = self.continuous_time(eigenvalues_new, p_new, system)
+
+                mac = np.abs(np.sum(eigenvectors.conj() * eigenvectors_new, axis=0))
+                is_tracked = np.logical_and(converged, mac >= self.mac_tolerance)
+                crossing = self.is_crossing(eigenvalues_list[-1], eigenvalues_ct)
+
+                if step > min_step * (1 + 1e-10) and (not np.all(is_tracked) or np.any(crossing)):
+                    step /= 2.
+                    continue
+
+                if not np.all(is_tracked):
+                    cout.cout_wrap('Warning: eigenvalue continuation could not track modes {} at {:f}. '
+                                   'Consider increasing the number of refinements.'.format(
+                                    list(np.where(~is_tracked)[0]), p_new), 3)
+
+                for mode in np.where(crossing)[0]:
+                    real_a, real_b = eigenvalues_list[-1][mode].real, eigenvalues_ct[mode].real
+                    weight = real_a / (real_a - real_b)
+                    self.crossings.append((int(mode),
+                                           float(p + weight * (p_new - p)),
+                                           float(np.abs(eigenvalues_list[-1][mode].imag +
+                                                        weight * (eigenvalues_ct[mode].imag -
+                                                                  eigenvalues_list[-1][mode].imag)))))
+
+                p_prev, eigenvalues_prev = p, eigenvalues_list[-1]
+                p, eigenvectors = p_new, eigenvectors_new
+                parameter_list.append(p)
+                eigenvalues_list.append(eigenvalues_ct)
+                step = min(2. * step, p_next - p)
+
+        self.parameter = np.array(parameter_list)
+        self.eigenvalues = np.array(eigenvalues_list)
+
+        return self.parameter, self.eigenvalues
+
+    def refine(self, A, shifts, eigenvectors):
+        """
+        Inverse iterations of ``A`` for each of the shifts, started from the corresponding eigenvectors.
+
+        Args:
+            A (np.ndarray or libsparse.csc_matrix): State matrix.
+            shifts (np.ndarray): Predicted eigenvalues.
+            eigenvectors (np.ndarray): Starting vectors (in columns).
+
+        Returns:
+            tuple(np.ndarray, np.ndarray, np.ndarray): eigenvalues, unit norm eigenvectors and whether the residual
+            tolerance has been met for each mode.
+        """
+        num_modes = len(shifts)
+        eigenvalues = np.zeros(num_modes, dtype=complex)
+        eigenvectors_new = np.zeros_like(eigenvectors, dtype=complex)
+        converged = np.zeros(num_modes, dtype=bool)
+
+        if sparse.issparse(A):
+            A = sparse.csc_matrix(A)
+            eye = sparse.identity(A.shape[0], format='csc')
+            for mode in range(num_modes):
+                lu = spalg.splu((A - self.offset_shift(shifts[mode]) * eye).tocsc())
+                eigenvalues[mode], eigenvectors_new[:, mode], converged[mode] = \
+                    self.inverse_iteration(lu.solve, A.dot, eigenvectors[:, mode])
+            return eigenvalues, eigenvectors_new, converged
+
+        # reduction to upper Hessenberg form A = Q H Q^T and banded storage of H (see scipy.linalg.solve_banded)
+        H, Q = scalg.hessenberg(libsp.dense(A), calc_q=True)
+        n = H.shape[0]
+        H_banded = np.zeros((n + 1, n))
+        for diag in range(-(n - 1), 2):
+            H_banded[n - 1 + diag, max(0, -diag):n - max(0, diag)] = np.diagonal(H, -diag)
+
+        for mode in range(num_modes):
+            ab = H_banded.astype(complex)
+            ab[n - 1, :] -= self.offset_shift(shifts[mode])
+
+            def solve(x):
+                return scalg.solve_banded((1, n - 1), ab, x, check_finite=False)
+
+            eigenvalues[mode], y, converged[mode] = \
+                self.inverse_iteration(solve, H.dot, Q.T.dot(eigenvectors[:, mode]))
+            eigenvectors_new[:, mode] = Q.dot(y)
+
+        return eigenvalues, eigenvectors_new, converged
+
+    def inverse_iteration(self, solve, matvec, x):
+        """
+        Inverse iterations ``x = solve(x)`` with Rayleigh quotient eigenvalue estimates.
+
+        Returns:
+            tuple(complex, np.ndarray, bool): eigenvalue, unit norm eigenvector and convergence flag.
+        """
+        x = x / np.linalg.norm(x)
+        eigenvalue = np.vdot(x, matvec(x))
+        for it in range(self.max_iter):
+            x = solve(x)
+            x /= np.linalg.norm(x)
+            Ax = matvec(x)
+            eigenvalue = np.vdot(x, Ax)
+            if np.linalg.norm(Ax - eigenvalue * x) <= self.tolerance * max(1., np.abs(eigenvalue)):
+                return eigenvalue, x, True
+
+        return eigenvalue, x, False
+
+    def offset_shift(self, shift):
+        # shift moved away from the eigenvalue it predicts, such that the shifted matrix is not exactly singular
+        return shift + 1e-8 * max(1., np.abs(shift))
+
+    def continuous_time(self, eigenvalues, parameter, system):
+        """
+        Continuous time eigenvalues of the system at the given value of the parameter.
+        """
+        if system.dt:
+            return np.log(eigenvalues) / self.dimensional_time_step(parameter, system)
+        return eigenvalues
+
+    def system_time_domain(self, eigenvalues, parameter, system):
+        """
+        Continuous time eigenvalues mapped to the time domain of the system at the given value of the parameter.
+        """
+        if system.dt:
+            return np.exp(eigenvalues * self.dimensional_time_step(parameter, system))
+        return eigenvalues
+
+    def is_crossing(self, eigenvalues_a, eigenvalues_b):
+        """
+        Modes whose continuous time eigenvalue real part changes sign. Real parts that are zero to the residual
+        tolerance, e.g. those of rigid body modes, are not considered.
+        """
+        zero_a = np.abs(eigenvalues_a.real) <= np.sqrt(self.tolerance) * np.maximum(1., np.abs(eigenvalues_a))
+        zero_b = np.abs(eigenvalues_b.real) <= np.sqrt(self.tolerance) * np.maximum(1., np.abs(eigenvalues_b))
+        return np.logical_and(eigenvalues_a.real * eigenvalues_b.real < 0, ~np.logical_or(zero_a, zero_b))
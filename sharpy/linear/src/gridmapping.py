@@ -107,24 +107,14 @@ class AeroGridMap():
             [1d index of panel, index of vertex 0,1,2 or 3]
         """
 
-        self.Mpv1d_scalar = np.zeros((self.K, 4), dtype=self.intxx)
-
-        # Map: panels 1D -> 3d
-        if not hasattr(self, 'Mpv'):
-            self.map_panels_to_vertices()
+        # Map: panels 1D -> 2d
         mn_panels = np.unravel_index(range(self.K),
                                      shape=self.shape_pan_scal, order='C')
-        # Mpv_new=self.Mpv[mn_panels] # from k to vertices
-
-        for kk in range(self.K):
-
-            # map from kk-th panel to vertices (m,n)
-            mpv = self.Mpv[mn_panels[0][kk], mn_panels[1][kk], :, :]
-
-            # loop through vertices
-            for vv in range(4):
-                self.Mpv1d_scalar[kk, vv] = np.ravel_multi_index(mpv[vv, :],
-                                                                 dims=self.shape_vert_scal, order='C')
+        # vertices 2d -> 1D
+        self.Mpv1d_scalar = np.ravel_multi_index(
+            (mn_panels[0][:, None] + self.dmver[None, :],
+             mn_panels[1][:, None] + self.dnver[None, :]),
+            dims=self.shape_vert_scal, order='C').astype(self.intxx)
 
     def map_panels_to_vertices(self):
         """
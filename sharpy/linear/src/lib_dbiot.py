@@ -12,6 +12,8 @@ Methods:
 - eval_seg_comp and eval_seg_comp_loop: profide ders in format
     [Q_{x,y,z},ZetaPoint_{x,y,z}]
   and use compact analytical formula.
+- eval_seg_comp_vect: compact analytical formula evaluated at once for all the
+  pairs of target points and segments.
 """
 
 import numpy as np
@@ -486,6 +488,100 @@ def eval_panel_fast_coll(zetaP, ZetaPanel, vortex_radius, gamma_pan=1.0):
     return DerP
 
 
+def eval_seg_comp_vect(ZetaP, ZetaA, ZetaB, vortex_radius, gamma_seg=1.0, der_vertices=True):
+    """
+    Vectorised version of eval_seg_comp_loop. Derivatives of the induced
+    velocity Q at each target point w.r.t. the target point and segment
+    coordinates are computed at once for all the pairs of target points and
+    segments.
+
+    Inputs:
+    - ZetaP: (n_p,3) target points
+    - ZetaA, ZetaB: (n_s,3) first and second vertex of the segments
+    - gamma_seg: scalar or (n_s,) circulation of the segments
+    - der_vertices: if False, only the derivatives w.r.t. ZetaP are computed
+
+    Each output has shape (n_p,n_s,3,3) and format
+        [ target point, segment, (x,y,z) of Q, (x,y,z) of Zeta ]
+    If der_vertices is False, DerA and DerB are None.
+
+    Segments whose distance from the target point is below the vortex radius
+    give no contribution, as in eval_seg_comp_loop.
+    """
+
+    ZetaP = np.atleast_2d(ZetaP)
+    Cfact = cfact_biot * np.broadcast_to(gamma_seg, (ZetaA.shape[0],))
+
+    RA = ZetaP[:, None, :] - ZetaA[None, :, :]
+    RB = ZetaP[:, None, :] - ZetaB[None, :, :]
+    RAB = ZetaB - ZetaA
+    Vcr = np.cross(RA, RB)
+    vcr2 = np.einsum('psi,psi->ps', Vcr, Vcr)
+
+    # numerical radius
+    isfar = vcr2 >= (vortex_radius * vortex_radius) * np.einsum('si,si->s', RAB, RAB)[None, :]
+    vcr2[~isfar] = 1.
+    Cfact = np.where(isfar, Cfact[None, :], 0.)
+
+    ### other constants
+    ra2 = np.einsum('psi,psi->ps', RA, RA)
+    rb2 = np.einsum('psi,psi->ps', RB, RB)
+    ra2[~isfar] = 1.
+    rb2[~isfar] = 1.
+    rainv = 1. / np.sqrt(ra2)
+    rbinv = 1. / np.sqrt(rb2)
+    Tv = RA * rainv[:, :, None] - RB * rbinv[:, :, None]
+    dotprod = np.einsum('si,psi->ps', RAB, Tv)
+
+    ### cross-product derivatives, Dvcross = diag_fact*(I - 2 Vcr Vcr^T/vcr2)
+    vcr2inv = 1. / vcr2
+    diag_fact = Cfact * vcr2inv * dotprod
+    Vsc = Vcr * (vcr2inv * Cfact)[:, :, None]
+
+    def dvcross_by_skew(rv):
+        # Dvcross*skew(rv) = diag_fact*skew(rv) - 2*diag_fact/vcr2 Vcr (Vcr x rv)^T
+        Dskew = skew_vect(rv) * diag_fact[:, :, None, None]
+        Dskew -= (2. * diag_fact * vcr2inv)[:, :, None, None] * \
+                 Vcr[:, :, :, None] * np.cross(Vcr, rv)[:, :, None, :]
+        return Dskew
+
+    def ddiff_by_der_runit(R, rinv):
+        # Ddiff*der_runit(R), with Ddiff = Vsc RAB^T
+        return rinv[:, :, None, None] * Vsc[:, :, :, None] * RAB[None, :, None, :] - \
+               (rinv ** 3 * np.einsum('si,psi->ps', RAB, R))[:, :, None, None] * \
+               Vsc[:, :, :, None] * R[:, :, None, :]
+
+    if not der_vertices:
+        DerP = dvcross_by_skew(np.broadcast_to(RAB, RA.shape)) + \
+               ddiff_by_der_runit(RA, rainv) - ddiff_by_der_runit(RB, rbinv)
+        return DerP, None, None
+
+    dQ_dRAB = Vsc[:, :, :, None] * Tv[:, :, None, :]
+    dQ_dRA = dvcross_by_skew(-RB) + ddiff_by_der_runit(RA, rainv)
+    dQ_dRB = dvcross_by_skew(RA) - ddiff_by_der_runit(RB, rbinv)
+
+    DerP = dQ_dRA + dQ_dRB  # w.r.t. P
+    DerA = -dQ_dRAB - dQ_dRA  # w.r.t. A
+    DerB = dQ_dRAB - dQ_dRB  # w.r.t. B
+
+    return DerP, DerA, DerB
+
+
+def skew_vect(v):
+    """
+    Skew matrices of the vectors v stored along the last dimension. The output
+    has shape v.shape+(3,)
+    """
+    Skew = np.zeros(v.shape + (3,))
+    Skew[..., 0, 1] = -v[..., 2]
+    Skew[..., 0, 2] = v[..., 1]
+    Skew[..., 1, 0] = v[..., 2]
+    Skew[..., 1, 2] = -v[..., 0]
+    Skew[..., 2, 0] = -v[..., 1]
+    Skew[..., 2, 1] = v[..., 0]
+    return Skew
+
+
 if __name__ == '__main__':
 
     import cProfile
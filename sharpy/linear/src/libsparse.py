@@ -24,6 +24,8 @@ Methods:
 - dot: handles matrix dot products across different types.
 - solve: solves linear systems Ax=b with A and b dense, sparse or mixed.
 - dense: convert matrix to numpy array
+- map_threads: maps a function, which mostly factorises and solves, over a set of items
+in threads
 
 Warning:
 - only sparse types into SupportedTypes are supported!
@@ -32,6 +34,7 @@ To Do:
 - move these methods into an algebra module?
 '''
 
+import concurrent.futures
 import warnings
 import numpy as np
 import scipy.sparse as sparse
@@ -278,6 +281,30 @@ def solve(A,b):
 	return x
 
 
+def map_threads(function, items, num_workers=1):
+	'''
+	Returns [function(item) for item in items], distributing the items in
+	contiguous chunks among num_workers threads.
+
+	The threads only run concurrently while function is in the LAPACK and
+	SuperLU factorisations and solves, which release the GIL. The items are
+	evaluated in order in the calling thread if num_workers is 1.
+	'''
+
+	items = list(items)
+	n_chunks = min(max(1, num_workers), max(1, len(items)))
+	if n_chunks == 1:
+		return [function(item) for item in items]
+
+	def map_chunk(chunk):
+		return [function(items[ii]) for ii in chunk]
+
+	chunks = np.array_split(np.arange(len(items)), n_chunks)
+	with concurrent.futures.ThreadPoolExecutor(max_workers=n_chunks) as executor:
+		futures = [executor.submit(map_chunk, chunk) for chunk in chunks]
+		return [output for future in futures for output in future.result()]
+
+
 def dense(M):
 	''' If required, converts sparse array to dense. '''
 	if type(M) == csc_matrix:
@@ -394,6 +421,16 @@ if __name__=='__main__':
 			assert np.max(np.abs(X0-X3))<1e-12, 'Error in libsparse.solve'
 			assert np.max(np.abs(X0-X4))<1e-12, 'Error in libsparse.solve'
 
+		def test_map_threads(self):
+			A=np.random.rand(4,4)+4.*np.eye(4)
+			B=[np.random.rand(4,2) for ii in range(7)]
+			X0=[solve(A,bb) for bb in B]
+			for num_workers in [1,3,10]:
+				X1=map_threads(lambda bb: solve(A,bb),B,num_workers)
+				assert len(X1)==len(B), 'Error in libsparse.map_threads'
+				for x0,x1 in zip(X0,X1):
+					assert np.max(np.abs(x0-x1))<1e-12, 'Error in libsparse.map_threads'
+
 
 	outprint='Testing libsparse'
 	print('\n' + 70*'-')
@@ -18,6 +18,7 @@ Classes:
 Methods for state-space manipulation:
 - couple: feedback coupling. Does not support sparsity
 - freqresp: calculate frequency response. Supports sparsity.
+- FrequencyResponseEngine: reduces the system once to evaluate the frequency response at many frequencies
 - series: series connection between systems
 - parallel: parallel connection between systems
 - SSconv: convert state-space model with predictions and delays
@@ -27,6 +28,7 @@ Methods for state-space manipulation:
 - sum state-space models and/or gains
 - scale_SS: scale state-space model
 - simulate: simulates discrete time solution
+- DiscreteTimeSimulator: marches discrete time systems in chunks of time steps. Supports sparsity.
 - Hnorm_from_freq_resp: compute H norm of a frequency response
 - adjust_phase: remove discontinuities from a frequency response
 
@@ -40,6 +42,7 @@ Filtering:
 
 Utilities:
 - get_freq_from_eigs: clculate frequency corresponding to eigenvalues
+- eigs_shift_invert: eigenvalues closest to a set of shifts. Supports sparsity.
 
 Comments:
 - the module supports sparse matrices hence relies on libsparse.
@@ -57,6 +60,8 @@ import warnings
 import numpy as np
 import scipy.signal as scsig
 import scipy.linalg as scalg
+import scipy.sparse as sparse
+import scipy.sparse.linalg as spalg
 from sharpy.linear.utils.ss_interface import LinearVector, StateVariable, InputVariable, OutputVariable
 import scipy.interpolate as scint
 import h5py
@@ -225,16 +230,20 @@ class StateSpace:
     def get_mats(self):
         return self.A, self.B, self.C, self.D
 
-    def freqresp(self, wv):
+    def freqresp(self, wv, num_workers=1):
         """
         Calculate frequency response over frequencies wv
 
         Note: this wraps frequency response function.
+
+        Args:
+            wv (np.ndarray): frequencies
+            num_workers (int): number of threads among which the frequencies are distributed
         """
         dlti = True
         if self.dt is None:
             dlti = False
-        return freqresp(self, wv, dlti=dlti)
+        return freqresp(self, wv, dlti=dlti, num_workers=num_workers)
 
     def addGain(self, K, where):
         """
@@ -1229,22 +1238,22 @@ def retain_inout_channels(sys, retain_channels, where):
     return sys
 
 
-def freqresp(SS, wv, dlti=True):
+def freqresp(SS, wv, dlti=True, num_workers=1):
     """
     In-house frequency response function supporting dense/sparse types
 
+    The state matrix is reduced once by a :class:`FrequencyResponseEngine` so that the response at each frequency
+    is obtained at a fraction of the cost of a full solve of :math:`(z\mathbf{I} - \mathbf{A})\mathbf{X} =
+    \mathbf{B}`.
+
     Inputs:
     - SS: instance of StateSpace class, or scipy.signal.StateSpace*
     - wv: frequency range
     - dlti: True if discrete-time system is considered.
+    - num_workers: number of threads among which the frequencies are distributed
 
     Outputs:
     - Yfreq[outputs,inputs,len(wv)]: frequency response over wv
-
-    Warnings:
-    -  This function may not be very efficient for dense matrices (as A is not
-    reduced to upper Hessenberg form), but can exploit sparsity in the state-space
-    matrices.
     """
 
     assert type(SS) == StateSpace, \
@@ -1259,22 +1268,120 @@ def freqresp(SS, wv, dlti=True):
         # print('Assuming a continuous time system')
         zv = 1.j * wv
 
-    Nx = SS.A.shape[0]
-    Ny = SS.D.shape[0]
-    try:
-        Nu = SS.B.shape[1]
-    except IndexError:
-        Nu = 1
+    return FrequencyResponseEngine(SS, num_workers=num_workers).evaluate(zv)
+
+
+class FrequencyResponseEngine():
+    """
+    Evaluation of the frequency response :math:`\mathbf{Y}(z) = \mathbf{C}(z\mathbf{I} - \mathbf{A})^{-1}
+    \mathbf{B} + \mathbf{D}` at many values of :math:`z`.
+
+    The state matrix is reduced once, so that the response at each frequency is cheap:
+
+    - Dense systems: :math:`\mathbf{A}` is reduced to upper Hessenberg form :math:`\mathbf{A} = \mathbf{Q}
+      \mathbf{H}\mathbf{Q}^\top`. Each frequency then requires the banded LU solve (one sub-diagonal) of
+      :math:`z\mathbf{I} - \mathbf{H}`, which costs :math:`O(N_x^2)` instead of :math:`O(N_x^3)`.
+
+    - Sparse systems: the sparsity pattern of :math:`z\mathbf{I} - \mathbf{A}` and its fill-reducing column
+      ordering are computed once. Each frequency only updates the diagonal values and factorises the matrix with the
+      stored ordering.
+
+    The frequencies can be distributed among ``num_workers`` threads (see
+    :func:`sharpy.linear.src.libsparse.map_threads`).
+
+    Args:
+        SS (StateSpace): state-space system
+        num_workers (int): number of threads among which the frequencies are distributed
+    """
+
+    def __init__(self, SS, num_workers=1):
+        self.num_workers = max(1, num_workers)
+        self.states = SS.states
+        self.D = libsp.dense(SS.D)
+        self.sparse = self.states > 0 and sparse.issparse(SS.A)
+
+        if self.states == 0:
+            return
+
+        if self.sparse:
+            self._init_sparse(SS)
+        else:
+            self._init_dense(SS)
+
+    def _init_dense(self, SS):
+        A = libsp.dense(SS.A)
+        H, Q = scalg.hessenberg(A, calc_q=True)
+        self.B = np.dot(Q.T, libsp.dense(SS.B).reshape((self.states, -1)))
+        self.C = libsp.dot(SS.C, Q, type_out=np.ndarray)
+
+        # banded storage of H with one sub-diagonal (see scipy.linalg.solve_banded)
+        n = self.states
+        self.upper_bandwidth = n - 1
+        self.H_banded = np.zeros((n + 1, n))
+        for diag in range(-self.upper_bandwidth, 2):
+            self.H_banded[self.upper_bandwidth + diag, max(0, -diag):n - max(0, diag)] = np.diagonal(H, -diag)
+
+    def _init_sparse(self, SS):
+        n = self.states
+        A = sparse.coo_matrix(SS.A)
+        rows = np.concatenate((A.row, np.arange(n)))
+        cols = np.concatenate((A.col, np.arange(n)))
+
+        # -A and I with the same sparsity pattern, that of z I - A
+        minus_A = sparse.csc_matrix((np.concatenate((-A.data, np.zeros(n))), (rows, cols)), shape=(n, n))
+        eye = sparse.csc_matrix((np.concatenate((np.zeros_like(A.data), np.ones(n))), (rows, cols)), shape=(n, n))
+
+        # fill-reducing column ordering, computed once for the pattern
+        self.perm_c = spalg.splu((minus_A + eye).tocsc(), permc_spec='COLAMD').perm_c
+        self.minus_A = minus_A[:, self.perm_c]
+        self.eye_values = eye[:, self.perm_c].data
+        self.B = libsp.dense(SS.B).reshape((self.states, -1))
+        self.C = SS.C
+
+    def solve(self, z):
+        """
+        Solves :math:`(z\mathbf{I} - \mathbf{A}) \mathbf{X} = \mathbf{B}` in the reduced coordinates
+
+        Returns:
+            np.ndarray: ``(states, inputs)`` complex solution
+        """
+        if self.sparse:
+            matrix = sparse.csc_matrix((self.minus_A.data + z * self.eye_values,
+                                        self.minus_A.indices,
+                                        self.minus_A.indptr), shape=self.minus_A.shape)
+            lu = spalg.splu(matrix, permc_spec='NATURAL')
+            x = np.empty(self.B.shape, dtype=complex)
+            x[self.perm_c] = lu.solve(self.B.astype(complex))
+            return x
+
+        ab = -self.H_banded.astype(complex)
+        ab[self.upper_bandwidth, :] += z
+        return scalg.solve_banded((1, self.upper_bandwidth), ab, self.B,
+                                  overwrite_ab=True, check_finite=False)
+
+    def response(self, z):
+        """
+        Frequency response ``Y[outputs, inputs]`` at ``z``
+        """
+        if self.states == 0:
+            return self.D.astype(complex)
+        return libsp.dot(self.C, self.solve(z), type_out=np.ndarray) + self.D
 
-    Nw = len(wv)
+    def evaluate(self, zv):
+        """
+        Frequency response at all the values ``zv``
 
-    Yfreq = np.empty((Ny, Nu, Nw,), dtype=np.complex_)
-    Eye = libsp.eye_as(SS.A)
-    for ii in range(Nw):
-        sol_cplx = libsp.solve(zv[ii] * Eye - SS.A, SS.B)
-        Yfreq[:, :, ii] = libsp.dot(SS.C, sol_cplx, type_out=np.ndarray) + SS.D
+        Returns:
+            np.ndarray: ``Yfreq[outputs, inputs, len(zv)]``
+        """
+        Yfreq = np.empty(self.D.shape + (len(zv),), dtype=complex)
 
-    return Yfreq
+        def evaluate_point(ii):
+            Yfreq[:, :, ii] = self.response(zv[ii])
+
+        libsp.map_threads(evaluate_point, range(len(zv)), self.num_workers)
+
+        return Yfreq
 
 
 def series(SS01, SS02):
@@ -1830,6 +1937,145 @@ def simulate(SShere, U, x0=None):
     return Y, X
 
 
+class DiscreteTimeSimulator():
+    r"""
+    Recursive time marching of discrete time systems
+
+    .. math::
+        \mathbf{x}_{n+1} &= \mathbf{A}\mathbf{x}_n + \mathbf{B}\mathbf{u}_n \\
+        \mathbf{y}_n &= \mathbf{C}\mathbf{x}_n + \mathbf{D}\mathbf{u}_n
+
+    The system matrices are used directly, either dense or sparse (``libsparse.csc_matrix``), without the conversion
+    to dense arrays of ``scipy.signal``. Several input histories (cases) can be marched at once, in which case the state
+    is a matrix with one column per case.
+
+    The response is returned by :meth:`march` in chunks of ``chunk_size`` time steps, such that only the states of the
+    current chunk are kept in memory. The input contribution :math:`\mathbf{B}\mathbf{u}_n` and the outputs are
+    evaluated for all the time steps of a chunk at once.
+
+    Args:
+        SS (StateSpace): discrete time state-space system
+        chunk_size (int): number of time steps per chunk
+    """
+
+    def __init__(self, SS, chunk_size=100):
+        if SS.dt is None:
+            raise TypeError('DiscreteTimeSimulator requires a discrete time system')
+
+        self.chunk_size = max(1, chunk_size)
+        self.states = SS.states
+        self.inputs = SS.inputs
+        self.outputs = SS.outputs
+
+        if sparse.issparse(SS.A):
+            # faster matrix-vector products
+            self.A = sparse.csr_matrix(SS.A)
+        else:
+            self.A = SS.A
+        self.B = SS.B
+        self.C = SS.C
+        self.D = SS.D
+
+    def march(self, U, x0=None, save_states=True):
+        """
+        Generator marching the system in time from the initial state ``x0`` (zero by default).
+
+        Args:
+            U (np.ndarray): Input history of shape ``(n_steps, inputs)`` or, for several cases,
+                ``(n_steps, inputs, n_cases)``.
+            x0 (np.ndarray (optional)): Initial state of shape ``(states,)`` or ``(states, n_cases)``.
+            save_states (bool): Return the state history of each chunk.
+
+        Yields:
+            tuple(int, np.ndarray, np.ndarray): index of the first time step of the chunk, outputs of shape
+            ``(n_chunk, outputs[, n_cases])`` and states of shape ``(n_chunk, states[, n_cases])`` (``None`` if
+            ``save_states`` is ``False``).
+        """
+        single_case = U.ndim == 2
+        if U.ndim == 1:
+            U = U.reshape((-1, 1))
+            single_case = True
+        if single_case:
+            U = U[:, :, None]
+        n_steps, n_inputs, n_cases = U.shape
+        assert n_inputs == self.inputs, 'Input history has %g inputs but the system has %g' % (n_inputs, self.inputs)
+
+        x = np.zeros((self.states, n_cases))
+        if x0 is not None:
+            x += np.asarray(x0).reshape((self.states, -1))
+
+        for n0 in range(0, n_steps, self.chunk_size):
+            n_chunk = min(self.chunk_size, n_steps - n0)
+            # inputs in columns [input, (time step, case)]
+            U_chunk = U[n0:n0 + n_chunk].transpose((1, 0, 2)).reshape((self.inputs, -1))
+            BU = self.B.dot(U_chunk).reshape((self.states, n_chunk, n_cases))
+
+            X_chunk = np.empty((self.states, n_chunk, n_cases))
+            for nn in range(n_chunk):
+                X_chunk[:, nn, :] = x
+                x = self.A.dot(x) + BU[:, nn, :]
+
+            Y_chunk = self.C.dot(X_chunk.reshape((self.states, -1))) + \
+                      self.D.dot(U_chunk)
+            Y_chunk = Y_chunk.reshape((self.outputs, n_chunk, n_cases)).transpose((1, 0, 2))
+
+            if save_states:
+                X_chunk = X_chunk.transpose((1, 0, 2))
+                if single_case:
+                    X_chunk = X_chunk[:, :, 0]
+            else:
+                X_chunk = None
+            if single_case:
+                Y_chunk = Y_chunk[:, :, 0]
+
+            yield n0, Y_chunk, X_chunk
+
+    def simulate(self, U, x0=None, save_states=True):
+        """
+        Full time response, see :meth:`march`.
+
+        Returns:
+            tuple(np.ndarray, np.ndarray): outputs of shape ``(n_steps, outputs[, n_cases])`` and states of shape
+            ``(n_steps, states[, n_cases])`` (``None`` if ``save_states`` is ``False``).
+        """
+        Y_list, X_list = [], []
+        for n0, Y_chunk, X_chunk in self.march(U, x0, save_states):
+            Y_list.append(Y_chunk)
+            X_list.append(X_chunk)
+
+        if save_states:
+            return np.concatenate(Y_list), np.concatenate(X_list)
+        return np.concatenate(Y_list), None
+
+    def envelope(self, U, x0=None):
+        """
+        Extrema of the outputs of each case and envelope of the outputs over all cases, evaluated chunk by chunk
+        without storing the time response. See :meth:`march` for the input arguments.
+
+        Returns:
+            tuple(np.ndarray, np.ndarray, np.ndarray, np.ndarray): maximum and minimum of each output over time
+            ``(outputs, n_cases)`` and maximum and minimum of each output over all cases at each time step
+            ``(n_steps, outputs)``.
+        """
+        n_steps = U.shape[0]
+        envelope_max = np.zeros((n_steps, self.outputs))
+        envelope_min = np.zeros((n_steps, self.outputs))
+        y_max, y_min = None, None
+        for n0, Y_chunk, _ in self.march(U, x0, save_states=False):
+            if Y_chunk.ndim == 2:
+                Y_chunk = Y_chunk[:, :, None]
+            n_chunk = Y_chunk.shape[0]
+            envelope_max[n0:n0 + n_chunk] = Y_chunk.max(axis=2)
+            envelope_min[n0:n0 + n_chunk] = Y_chunk.min(axis=2)
+            if y_max is None:
+                y_max, y_min = Y_chunk.max(axis=0), Y_chunk.min(axis=0)
+            else:
+                y_max = np.maximum(y_max, Y_chunk.max(axis=0))
+                y_min = np.minimum(y_min, Y_chunk.min(axis=0))
+
+        return y_max, y_min, envelope_max, envelope_min
+
+
 def Hnorm_from_freq_resp(gv, method):
     """
     Given a frequency response over a domain kv, this funcion computes the
@@ -2043,6 +2289,71 @@ def eigvals(a, dlti=False):
     return eigs[order]
 
 
+def eigs_shift_invert(A, shifts, num_evals, tol_merge=1e-8):
+    r"""
+    Eigenvalues and eigenvectors of a dense or sparse (libsparse.csc_matrix) matrix closest to each of the
+    ``shifts``, computed with ARPACK in shift-invert mode. Only a factorisation of
+    :math:`\mathbf{A} - \sigma\mathbf{I}` per shift is required, such that the full set of eigenvalues is never
+    computed.
+
+    For real matrices, the complex conjugate of each complex eigenpair is also returned. Eigenvalues found from more
+    than one shift, i.e. within ``tol_merge`` (relative) of an eigenvalue found from a previous shift, are only
+    returned once. If ``num_evals`` is too large for ARPACK, all the eigenvalues are computed with the direct method.
+
+    Args:
+        A (np.ndarray or libsparse.csc_matrix): Square matrix.
+        shifts (np.ndarray): Shifts around which to find the eigenvalues.
+        num_evals (int): Number of eigenvalues to find around each shift.
+        tol_merge (float): Relative tolerance to identify eigenvalues found from different shifts.
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): eigenvalues and corresponding right eigenvectors (in columns), unsorted.
+    """
+
+    n = A.shape[0]
+    if num_evals >= n - 1:
+        return scalg.eig(libsp.dense(A))
+
+    is_real = not np.iscomplexobj(A)
+    if sparse.issparse(A):
+        A = sparse.csc_matrix(A)
+    A_complex = None
+
+    eigenvalues = np.zeros((0,), dtype=complex)
+    eigenvectors = np.zeros((n, 0), dtype=complex)
+    for sigma in np.atleast_1d(shifts):
+        if sigma.imag == 0:
+            sigma = sigma.real
+        if is_real and sigma.imag != 0:
+            if A_complex is None:
+                A_complex = A.astype(complex)
+            evals, evecs = spalg.eigs(A_complex, k=num_evals, sigma=sigma, which='LM')
+        else:
+            evals, evecs = spalg.eigs(A, k=num_evals, sigma=sigma, which='LM')
+
+        if is_real:
+            # complete complex conjugate pairs
+            evals_conj, evecs_conj = [], []
+            for ii in np.where(np.abs(evals.imag) > tol_merge * np.maximum(1., np.abs(evals)))[0]:
+                if np.min(np.abs(evals - evals[ii].conj())) > tol_merge * max(1., np.abs(evals[ii])):
+                    evals_conj.append(evals[ii].conj())
+                    evecs_conj.append(evecs[:, ii].conj())
+            if evals_conj:
+                evals = np.concatenate((evals, evals_conj))
+                evecs = np.concatenate((evecs, np.array(evecs_conj).T), axis=1)
+
+        # discard eigenvalues found from previous shifts
+        if len(eigenvalues) > 0:
+            is_new = [np.min(np.abs(eigenvalues - evals[ii])) > tol_merge * max(1., np.abs(evals[ii]))
+                      for ii in range(len(evals))]
+            evals, evecs = evals[is_new], evecs[:, is_new]
+
+        eigenvalues = np.concatenate((eigenvalues, evals))
+        eigenvectors = np.concatenate((eigenvectors, evecs), axis=1)
+
+    return eigenvalues, eigenvectors
+
+
 # --------------------------------------------------------------------- Testing
 
 
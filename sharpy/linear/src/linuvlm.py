@@ -156,8 +156,7 @@ class Static():
         List_uc_dncdzeta = ass.uc_dncdzeta(MS.Surfs)
         List_nc_dqcdzeta_coll, List_nc_dqcdzeta_vert = \
             ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star)
-        List_AICs, List_AICs_star = ass.AICs(MS.Surfs, MS.Surfs_star,
-                                             target='collocation', Project=True)
+        AIC, AIC_star = ass.AICs_block(MS.Surfs, MS.Surfs_star, Project=True)
         List_Wnv = []
         for ss in range(MS.n_surf):
             List_Wnv.append(
@@ -181,20 +180,18 @@ class Static():
         del List_Wnv
 
         ### Condense Gammaw terms
-        for ss_out in range(MS.n_surf):
-            K = MS.KK[ss_out]
-            for ss_in in range(MS.n_surf):
-                N_star = MS.NN_star[ss_in]
-                aic = List_AICs[ss_out][ss_in]  # bound
-                aic_star = List_AICs_star[ss_out][ss_in]  # wake
+        K_in0, K_star_in0 = 0, 0
+        for ss_in in range(MS.n_surf):
+            K_in, K_star_in, N_star = MS.KK[ss_in], MS.KK_star[ss_in], MS.NN_star[ss_in]
+            aic_star = AIC_star[:, K_star_in0:K_star_in0 + K_star_in]  # wake
 
-                # fold aic_star: sum along chord at each span-coordinate
-                aic_star_fold = np.zeros((K, N_star))
-                for jj in range(N_star):
-                    aic_star_fold[:, jj] += np.sum(aic_star[:, jj::N_star], axis=1)
-                aic[:, -N_star:] += aic_star_fold
+            # fold aic_star: sum along chord at each span-coordinate
+            AIC[:, K_in0 + K_in - N_star:K_in0 + K_in] += \
+                aic_star.reshape((self.K, -1, N_star)).sum(axis=1)
+            K_in0 += K_in
+            K_star_in0 += K_star_in
 
-        self.AIC = np.block(List_AICs)
+        self.AIC = AIC
 
         # ---------------------------------------------------------- output eq.
 
@@ -808,11 +805,7 @@ class Dynamic(Static):
         # - choice of sparse matrices format is optimised to reduce memory load
 
         # Aero influence coeffs
-        List_AICs, List_AICs_star = ass.AICs(MS.Surfs, MS.Surfs_star,
-                                             target='collocation', Project=True)
-        A0 = np.block(List_AICs)
-        A0W = np.block(List_AICs_star)
-        List_AICs, List_AICs_star = None, None
+        A0, A0W = ass.AICs_block(MS.Surfs, MS.Surfs_star, Project=True)
         LU, P = scalg.lu_factor(A0)
         AinvAW = scalg.lu_solve((LU, P), A0W)
         A0, A0W = None, None
@@ -1144,14 +1137,16 @@ class Dynamic(Static):
               points. If True, this option also allows to automatically tune the
               balanced model.
 
+            - ``num_workers``: number of threads among which the integration points
+              are distributed (see :func:`sharpy.rom.utils.librom.solve_frequency_points`).
+              Defaults to 1.
+
         Future options:
 
             - ``truncation_tolerance``: if ``get_frequency_response`` is True, allows
               to truncate the balanced model so as to achieved a prescribed
               tolerance in the low-frequwncy range.
 
-            - ``Ncpu``: for parallel run
-
         The following integration schemes are available:
 
             - ``trapz``: performs integration over equally spaced points using
@@ -1218,6 +1213,9 @@ class Dynamic(Static):
         if 'get_frequency_response' not in DictBalFreq:
             DictBalFreq['get_frequency_response'] = False
 
+        if 'num_workers' not in DictBalFreq:
+            DictBalFreq['num_workers'] = 1
+
         ### get integration points and weights
 
         # Nyquist frequency
@@ -1288,15 +1286,14 @@ class Dynamic(Static):
         wv = np.concatenate((wv_low, wv_high)) * self.SS.dt
         zv = np.cos(kvdt) + 1.j * np.sin(kvdt)
 
-        Qobs = np.zeros((self.SS.states, self.SS.outputs), dtype=np.complex_)
         Zc = np.zeros((self.SS.states, 2 * self.SS.inputs * len(kvdt)), )
         Zo = np.zeros((self.SS.states, 2 * self.SS.outputs * Nk_low), )
 
         if DictBalFreq['get_frequency_response']:
-            self.Yfreq = np.empty((self.SS.outputs, self.SS.inputs, Nk_low,), dtype=np.complex_)
+            self.Yfreq = np.empty((self.SS.outputs, self.SS.inputs, Nk_low,), dtype=complex)
             self.kv = kv_low
 
-        for kk in range(len(kvdt)):
+        def solve_point(kk):
 
             zval = zv[kk]
             Intfact = wv[kk]  # integration factor
@@ -1337,8 +1334,9 @@ class Dynamic(Static):
             ### ----- observability
             # solve (1./zval*I - A.T)^{-1} C^T (in low-frequency only)
             if kk >= Nk_low:
-                continue
+                return
 
+            Qobs = np.zeros((self.SS.states, self.SS.outputs), dtype=complex)
             zinv = 1. / zval
             Cw_cpx_H = Cw_cpx.conjugate().T
 
@@ -1356,7 +1354,7 @@ class Dynamic(Static):
 
             Eye_star = libsp.csc_matrix(
                 (zinv * np.ones((K_star,)), (range(K_star), range(K_star))),
-                shape=(K_star, K_star), dtype=np.complex_)
+                shape=(K_star, K_star), dtype=complex)
             Qobs[ii01, :] = libsp.solve(
                 Eye_star - self.SS.A[K:K + K_star, K:K + K_star].T,
                 np.dot(Pw.T, Qobs[ii00, :] + \
@@ -1367,10 +1365,7 @@ class Dynamic(Static):
             Zo[:, kkvec[:self.SS.outputs]] = Intfact * Qobs.real
             Zo[:, kkvec[self.SS.outputs:]] = Intfact * Qobs.imag
 
-        # delete full matrices
-        Kernel = None
-        Qctrl = None
-        Qobs = None
+        librom.solve_frequency_points(solve_point, len(kvdt), num_workers=DictBalFreq['num_workers'])
 
         # self.Zc=Zc
         # self.Zo=Zo
@@ -1921,11 +1916,7 @@ class DynamicBlock(Dynamic):
         # - choice of sparse matrices format is optimised to reduce memory load
 
         # Aero influence coeffs
-        List_AICs, List_AICs_star = ass.AICs(MS.Surfs, MS.Surfs_star,
-                                             target='collocation', Project=True)
-        A0 = np.block(List_AICs)
-        A0W = np.block(List_AICs_star)
-        List_AICs, List_AICs_star = None, None
+        A0, A0W = ass.AICs_block(MS.Surfs, MS.Surfs_star, Project=True)
         LU, P = scalg.lu_factor(A0)
         AinvAW = scalg.lu_solve((LU, P), A0W)
         A0, A0W = None, None
@@ -2187,14 +2178,16 @@ class DynamicBlock(Dynamic):
             points. If True, this option also allows to automatically tune the
             balanced model.
 
+            - 'num_workers': number of threads among which the integration points
+            are distributed (see :func:`sharpy.rom.utils.librom.solve_frequency_points`).
+            Defaults to 1.
+
         Future options:
 
             - 'truncation_tolerance': if 'get_frequency_response' is True, allows
             to truncatethe balanced model so as to achieved a prescribed
             tolerance in the low-frequwncy range.
 
-            - Ncpu: for parallel run
-
 
         The following integration schemes are available:
             - 'trapz': performs integration over equally spaced points using
@@ -2256,6 +2249,9 @@ class DynamicBlock(Dynamic):
         if 'get_frequency_response' not in DictBalFreq:
             DictBalFreq['get_frequency_response'] = False
 
+        if 'num_workers' not in DictBalFreq:
+            DictBalFreq['num_workers'] = 1
+
         ### get integration points and weights
 
         # Nyquist frequency
@@ -2322,15 +2318,14 @@ class DynamicBlock(Dynamic):
         wv = np.concatenate((wv_low, wv_high)) * self.SS.dt
         zv = np.cos(kvdt) + 1.j * np.sin(kvdt)
 
-        Qobs = np.zeros((self.SS.states, self.SS.outputs), dtype=np.complex_)
         Zc = np.zeros((self.SS.states, 2 * self.SS.inputs * len(kvdt)), )
         Zo = np.zeros((self.SS.states, 2 * self.SS.outputs * Nk_low), )
 
         if DictBalFreq['get_frequency_response']:
-            self.Yfreq = np.empty((self.SS.outputs, self.SS.inputs, Nk_low,), dtype=np.complex_)
+            self.Yfreq = np.empty((self.SS.outputs, self.SS.inputs, Nk_low,), dtype=complex)
             self.kv = kv_low
 
-        for kk in range(len(kvdt)):
+        def solve_point(kk):
 
             zval = zv[kk]
             Intfact = wv[kk]  # integration factor
@@ -2379,8 +2374,9 @@ class DynamicBlock(Dynamic):
             ### ----- observability
             # solve (1./zval*I - A.T)^{-1} C^T (in low-frequency only)
             if kk >= Nk_low:
-                continue
+                return
 
+            Qobs = np.zeros((self.SS.states, self.SS.outputs), dtype=complex)
             zinv = 1. / zval
             Qobs[ii02, :] = zinv * self.SS.C[0][2].T
             if self.integr_order == 1:
@@ -2397,7 +2393,7 @@ class DynamicBlock(Dynamic):
             # solve wake
             Eye_star = libsp.csc_matrix(
                 (zval * np.ones((K_star,)), (range(K_star), range(K_star))),
-                shape=(K_star, K_star), dtype=np.complex_)
+                shape=(K_star, K_star), dtype=complex)
             Qobs[ii01, :] = libsp.solve(
                 Eye_star - self.SS.A[1][1].T,
                 self.SS.C[0][1].T + np.dot(Pw.T, Qobs[ii00, :] + bp1 * Qobs[ii02, :]))
@@ -2406,10 +2402,7 @@ class DynamicBlock(Dynamic):
             Zo[:, kkvec[:self.SS.outputs]] = Intfact * Qobs.real
             Zo[:, kkvec[self.SS.outputs:]] = Intfact * Qobs.imag
 
-        # delete full matrices
-        Kernel = None
-        Qctrl = None
-        Qobs = None
+        librom.solve_frequency_points(solve_point, len(kvdt), num_workers=DictBalFreq['num_workers'])
 
         # LRSQM (optimised)
         U, hsv, Vh = scalg.svd(np.dot(Zo.T, Zc), full_matrices=False)
@@ -2747,11 +2740,7 @@ class Frequency(Static):
         # ----------------------------------------------------------- state eq.
 
         # Aero influence coeffs
-        List_AICs, List_AICs_star = ass.AICs(MS.Surfs, MS.Surfs_star,
-                                             target='collocation', Project=True)
-        A0 = np.block(List_AICs)
-        A0W = np.block(List_AICs_star)
-        List_AICs, List_AICs_star = None, None
+        A0, A0W = ass.AICs_block(MS.Surfs, MS.Surfs_star, Project=True)
 
         # zeta derivs
         List_nc_dqcdzeta = ass.nc_dqcdzeta(MS.Surfs, MS.Surfs_star, Merge=True)
@@ -7,9 +7,8 @@ S. Maraniello, 20 May 2018
 
 import numpy as np
 import itertools
-import sharpy.aero.utils.uvlmlib as uvlmlib  # SHARPy's main uvlm interface with cpp
 import sharpy.linear.src.uvlmutils as uvlmutils  # library with UVLM solution methods
-from sharpy.aero.utils.uvlmlib import get_aic3_cpp
+from sharpy.linear.src.assembly import target_chunks
 import sharpy.utils.cout_utils as cout
 
 dmver = np.array([0, 1, 1, 0])  # delta to go from (m,n) panel to (m,n) vertices
@@ -449,47 +448,143 @@ class AeroGridSurface(AeroGridGeo):
 
     # ------------------------------------------------------ induced velocities
 
-    def get_induced_velocity(self, zeta_target):
+    def get_unique_segments(self):
         """
-        Computes induced velocity at a point zeta_target.
+        Returns the vortex segments of the surface, where the segments shared
+        by adjacent panels are only stored once. The chord-wise segments,
+        (m,n)->(m+1,n), of shape (M,N+1) are followed by the span-wise segments,
+        (m,n)->(m,n+1), of shape (M+1,N). The output is a tuple with:
+        - ZetaA, ZetaB: (n_seg,3) coordinates of the 1st and 2nd vertex
+        - gamma: (n_seg,) net circulation of each segment
+
+        The chord-wise segment (m,n) is the segment 0 of panel (m,n) and the
+        segment 2, reversed, of panel (m,n-1). The span-wise segment (m,n) is
+        the segment 3, reversed, of panel (m,n) and the segment 1 of panel
+        (m-1,n).
         """
 
         M, N = self.maps.M, self.maps.N
-        uind_target = np.zeros((3,), order='C')
-        # uind_ref=np.zeros((3,),order='C')
+        zeta = self.zeta
 
-        for mm in range(M):
-            for nn in range(N):
-                # panel info
-                zetav_here = self.get_panel_vertices_coords(mm, nn)
-                uind_target += uvlmlib.biot_panel_cpp(zeta_target,
-                                                      zetav_here,
-                                                      self.vortex_radius,
-                                                      self.gamma[mm, nn])
+        gamma_chord = np.zeros((M, N + 1))
+        gamma_chord[:, :N] += self.gamma
+        gamma_chord[:, 1:] -= self.gamma
+        gamma_span = np.zeros((M + 1, N))
+        gamma_span[1:, :] += self.gamma
+        gamma_span[:M, :] -= self.gamma
 
-        return uind_target
+        ZetaA = np.concatenate((zeta[:, :M, :].reshape((3, -1)),
+                                zeta[:, :, :N].reshape((3, -1))), axis=1).T
+        ZetaB = np.concatenate((zeta[:, 1:, :].reshape((3, -1)),
+                                zeta[:, :, 1:].reshape((3, -1))), axis=1).T
+        gamma = np.concatenate((gamma_chord.reshape(-1), gamma_span.reshape(-1)))
 
-    def get_aic3(self, zeta_target):
+        return ZetaA, ZetaB, gamma
+
+    def get_unique_midsegments(self):
         """
-        Produces influence coefficinet matrix to calculate the induced velocity
-        at a target point. The aic3 matrix has shape (3,K)
+        Returns the (n_seg,3) mid-point of each segment of the surface, where
+        segments are ordered as in get_unique_segments.
         """
 
-        K = self.maps.K
-        aic3 = np.zeros((3, K))
+        zeta = self.zeta
+        Zeta_chord = 0.5 * (zeta[:, :-1, :] + zeta[:, 1:, :])
+        Zeta_span = 0.5 * (zeta[:, :, :-1] + zeta[:, :, 1:])
 
-        for cc in range(K):
-            # define panel
-            mm = self.maps.ind_2d_pan_scal[0][cc]
-            nn = self.maps.ind_2d_pan_scal[1][cc]
+        return np.concatenate((Zeta_chord.reshape((3, -1)),
+                               Zeta_span.reshape((3, -1))), axis=1).T
 
-            # get panel coordinates
-            zetav_here = self.get_panel_vertices_coords(mm, nn)
-            aic3[:, cc] = uvlmlib.biot_panel_cpp(zeta_target, zetav_here,
-                                                 self.vortex_radius,
-                                                 gamma=1.0)
+    def expand_unique_segments(self, Q):
+        """
+        Given an array Q of shape (...,n_seg) defined over the segments of the
+        surface ordered as in get_unique_segments, returns the array in the
+        redundant format (...,4,M,N), where the element
+
+            (...,ss,mm,nn)
+
+        refers to the ss-th segment of panel (mm,nn).
+        """
+
+        M, N = self.maps.M, self.maps.N
+        n_chord = M * (N + 1)
+        Q_chord = Q[..., :n_chord].reshape(Q.shape[:-1] + (M, N + 1))
+        Q_span = Q[..., n_chord:].reshape(Q.shape[:-1] + (M + 1, N))
+
+        return np.stack((Q_chord[..., :, :N], Q_span[..., 1:, :],
+                         Q_chord[..., :, 1:], Q_span[..., :M, :]), axis=-3)
+
+    def get_aic_at_points(self, ZetaTarget, Normals=None):
+        """
+        Produces the influence coefficient matrix of the surface over the
+        (n_t,3) target points ZetaTarget. Each panel influence is obtained
+        from the velocities induced by the segments of the surface, which are
+        evaluated once for all target points and shared between adjacent
+        panels (see get_unique_segments).
+
+        The output has shape (3,n_t,K). If the (n_t,3) array of Normals is
+        given, the influence coefficients are projected over these and the
+        output has shape (n_t,K).
+        """
+
+        M, N, K = self.maps.M, self.maps.N, self.maps.K
+        n_chord = M * (N + 1)
+        ZetaTarget = np.atleast_2d(ZetaTarget)
+        n_t = ZetaTarget.shape[0]
+
+        ZetaA, ZetaB, _ = self.get_unique_segments()
+        n_seg = ZetaA.shape[0]
+
+        if Normals is None:
+            AIC = np.empty((3, n_t, K))
+        else:
+            AIC = np.empty((n_t, K))
+
+        for sl in target_chunks(n_t, 3 * n_seg):
+            Vseg = uvlmutils.biot_segment_vect(ZetaTarget[sl], ZetaA, ZetaB,
+                                               self.vortex_radius)
+            Vchord = Vseg[:, :n_chord, :].reshape((-1, M, N + 1, 3))
+            Vspan = Vseg[:, n_chord:, :].reshape((-1, M + 1, N, 3))
+            aic = Vchord[:, :, :N, :] - Vchord[:, :, 1:, :] + \
+                  Vspan[:, 1:, :, :] - Vspan[:, :M, :, :]
+            aic = aic.reshape((-1, K, 3))
+            if Normals is None:
+                AIC[:, sl, :] = aic.transpose((2, 0, 1))
+            else:
+                AIC[sl, :] = np.einsum('pki,pi->pk', aic, Normals[sl])
+
+        return AIC
+
+    def get_induced_velocity_at_points(self, ZetaTarget):
+        """
+        Computes the (3,n_t) induced velocity of the surface at the (n_t,3)
+        target points ZetaTarget.
+        """
+
+        ZetaTarget = np.atleast_2d(ZetaTarget)
+        n_t = ZetaTarget.shape[0]
+        ZetaA, ZetaB, gamma = self.get_unique_segments()
 
-        return aic3
+        Uind = np.empty((3, n_t))
+        for sl in target_chunks(n_t, 3 * ZetaA.shape[0]):
+            Uind[:, sl] = uvlmutils.biot_segment_vect(
+                ZetaTarget[sl], ZetaA, ZetaB, self.vortex_radius, gamma).sum(axis=1).T
+
+        return Uind
+
+    def get_induced_velocity(self, zeta_target):
+        """
+        Computes induced velocity at a point zeta_target.
+        """
+
+        return self.get_induced_velocity_at_points(zeta_target)[:, 0]
+
+    def get_aic3(self, zeta_target):
+        """
+        Produces influence coefficinet matrix to calculate the induced velocity
+        at a target point. The aic3 matrix has shape (3,K)
+        """
+
+        return self.get_aic_at_points(zeta_target)[:, 0, :]
 
     def get_induced_velocity_over_surface(self, Surf_target,
                                           target='collocation', Project=False):
@@ -512,8 +607,9 @@ class AeroGridSurface(AeroGridGeo):
 
             (:,ss,mm,nn)
 
-        is the induced velocity over the ss-th segment of panel (mm,nn). A fast
-        looping is implemented to re-use previously computed velocities
+        is the induced velocity over the ss-th segment of panel (mm,nn). The
+        velocities are only evaluated once at each segment shared by adjacent
+        panels.
         """
 
         M_trg = Surf_target.maps.M
@@ -522,82 +618,21 @@ class AeroGridSurface(AeroGridGeo):
         if target == 'collocation':
             if not hasattr(Surf_target, 'zetac'):
                 Surf_target.generate_collocations()
-            ZetaTarget = Surf_target.zetac
+            Uind = self.get_induced_velocity_at_points(
+                Surf_target.zetac.reshape((3, -1)).T).reshape((3, M_trg, N_trg))
 
             if Project:
                 if not hasattr(Surf_target, 'normals'):
                     Surf_target.generate_normals()
-                Uind = np.empty((M_trg, N_trg))
-            else:
-                Uind = np.empty((3, M_trg, N_trg))
-
-            # loop target points
-            for pp in itertools.product(range(M_trg), range(N_trg)):
-                mm, nn = pp
-                uind = uvlmlib.get_induced_velocity_cpp(self.maps, self.zeta,
-                          self.gamma, ZetaTarget[:, mm, nn], self.vortex_radius)
-                if Project:
-                    Uind[mm, nn] = np.dot(uind, Surf_target.normals[:, mm, nn])
-                else:
-                    Uind[:, mm, nn] = uind
+                Uind = np.einsum('imn,imn->mn', Uind, Surf_target.normals)
 
         if target == 'segments':
 
             if Project:
                 raise NameError('Normal not defined for segment')
 
-            Uind = np.zeros((3, 4, M_trg, N_trg))
-
-            ##### panel (0,0): compute all
-            mm, nn = 0, 0
-            svec = [0, 1, 2, 3]  # seg. number
-            avec = [0, 1, 2, 3]  # 1st vertex of seg.
-            bvec = [1, 2, 3, 0]  # 2nd vertex of seg.
-            zetav_here = Surf_target.get_panel_vertices_coords(mm, nn)
-            for ss, aa, bb in zip(svec, avec, bvec):
-                zeta_mid = 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
-                Uind[:, ss, mm, nn] = uvlmlib.get_induced_velocity_cpp(self.maps,
-                             self.zeta, self.gamma, zeta_mid, self.vortex_radius)
-
-            ##### panels n=0: copy seg.3
-            nn = 0
-            svec = [0, 1, 2]  # seg. number
-            avec = [0, 1, 2]  # 1st vertex of seg.
-            bvec = [1, 2, 3]  # 2nd vertex of seg.
-            for mm in range(1, M_trg):
-                zetav_here = Surf_target.get_panel_vertices_coords(mm, nn)
-                for ss, aa, bb in zip(svec, avec, bvec):
-                    zeta_mid = 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
-                    Uind[:, ss, mm, nn] = uvlmlib.get_induced_velocity_cpp(self.maps,
-                                 self.zeta, self.gamma, zeta_mid, self.vortex_radius)
-                Uind[:, 3, mm, nn] = Uind[:, 1, mm - 1, nn]
-
-            ##### panels m=0: copy seg.0
-            mm = 0
-            svec = [1, 2, 3]  # seg. number
-            avec = [1, 2, 3]  # 1st vertex of seg.
-            bvec = [2, 3, 0]  # 2nd vertex of seg.
-            for nn in range(1, N_trg):
-                zetav_here = Surf_target.get_panel_vertices_coords(mm, nn)
-                for ss, aa, bb in zip(svec, avec, bvec):
-                    zeta_mid = 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
-                    Uind[:, ss, mm, nn] = uvlmlib.get_induced_velocity_cpp(self.maps,
-                                 self.zeta, self.gamma, zeta_mid, self.vortex_radius)
-                Uind[:, 0, mm, nn] = Uind[:, 2, mm, nn - 1]
-
-            ##### all others: copy seg. 0 and 3
-            svec = [1, 2]  # seg. number
-            avec = [1, 2]  # 1st vertex of seg.
-            bvec = [2, 3]  # 2nd vertex of seg.
-            for pp in itertools.product(range(1, M_trg), range(1, N_trg)):
-                mm, nn = pp
-                zetav_here = Surf_target.get_panel_vertices_coords(*pp)
-                for ss, aa, bb in zip(svec, avec, bvec):
-                    zeta_mid = 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
-                    Uind[:, ss, mm, nn] = uvlmlib.get_induced_velocity_cpp(self.maps,
-                                 self.zeta, self.gamma, zeta_mid, self.vortex_radius)
-                Uind[:, 0, mm, nn] = Uind[:, 2, mm, nn - 1]
-                Uind[:, 3, mm, nn] = Uind[:, 1, mm - 1, nn]
+            Uind = Surf_target.expand_unique_segments(
+                self.get_induced_velocity_at_points(Surf_target.get_unique_midsegments()))
 
         return Uind
 
@@ -626,97 +661,31 @@ class AeroGridSurface(AeroGridGeo):
 
             is the influence coefficient matrix associated to the induced
             velocity at segment ss of panel (mm,nn).
-        """
 
-        K_in = self.maps.K
+        The coefficients are computed at once for all target points through
+        get_aic_at_points.
+        """
 
         if target == 'collocation':
 
-            K_out = Surf_target.maps.K
             if not hasattr(Surf_target, 'zetac'):
                 Surf_target.generate_collocations()
-            ZetaTarget = Surf_target.zetac
+            ZetaTarget = Surf_target.zetac.reshape((3, -1)).T
 
             if Project:
                 if not hasattr(Surf_target, 'normals'):
                     Surf_target.generate_normals()
-                AIC = np.empty((K_out, K_in))
+                AIC = self.get_aic_at_points(
+                    ZetaTarget, Surf_target.normals.reshape((3, -1)).T)
             else:
-                AIC = np.empty((3, K_out, K_in))
-
-            # loop target points
-            for cc in range(K_out):
-                # retrieve panel coords
-                mm = Surf_target.maps.ind_2d_pan_scal[0][cc]
-                nn = Surf_target.maps.ind_2d_pan_scal[1][cc]
-                # retrieve influence coefficients
-                # ref_aic3=self.get_aic3(ZetaTarget[:,mm,nn])
-                aic3 = get_aic3_cpp(self.maps, self.zeta, ZetaTarget[:, mm, nn],
-                                    self.vortex_radius)
-                # assert np.max(np.abs(aic3-ref_aic3))<1e-13, embed()
-
-                if Project:
-                    AIC[cc, :] = np.dot(Surf_target.normals[:, mm, nn], aic3)
-                else:
-                    AIC[:, cc, :] = aic3
+                AIC = self.get_aic_at_points(ZetaTarget)
 
         if target == 'segments':
             if Project:
                 raise NameError('Normal not defined at collocation points')
 
-            M_trg, N_trg = Surf_target.maps.M, Surf_target.maps.N
-            AIC = np.zeros((3, K_in, 4, M_trg, N_trg))
-
-            ##### panel (0,0): compute all
-            mm, nn = 0, 0
-            svec = [0, 1, 2, 3]  # seg. number
-            avec = [0, 1, 2, 3]  # 1st vertex of seg.
-            bvec = [1, 2, 3, 0]  # 2nd vertex of seg.
-            zetav_here = Surf_target.get_panel_vertices_coords(mm, nn)
-            for ss, aa, bb in zip(svec, avec, bvec):
-                zeta_mid = 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
-                AIC[:, :, ss, mm, nn] = get_aic3_cpp(self.maps, self.zeta,
-                                                     zeta_mid, self.vortex_radius)
-
-            ##### panels n=0: copy seg.3
-            nn = 0
-            svec = [0, 1, 2]  # seg. number
-            avec = [0, 1, 2]  # 1st vertex of seg.
-            bvec = [1, 2, 3]  # 2nd vertex of seg.
-            for mm in range(1, M_trg):
-                zetav_here = Surf_target.get_panel_vertices_coords(mm, nn)
-                for ss, aa, bb in zip(svec, avec, bvec):
-                    zeta_mid = 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
-                    AIC[:, :, ss, mm, nn] = get_aic3_cpp(self.maps, self.zeta,
-                                                         zeta_mid, self.vortex_radius)
-                AIC[:, :, 3, mm, nn] = AIC[:, :, 1, mm - 1, nn]
-
-            ##### panels m=0: copy seg.0
-            mm = 0
-            svec = [1, 2, 3]  # seg. number
-            avec = [1, 2, 3]  # 1st vertex of seg.
-            bvec = [2, 3, 0]  # 2nd vertex of seg.
-            for nn in range(1, N_trg):
-                zetav_here = Surf_target.get_panel_vertices_coords(mm, nn)
-                for ss, aa, bb in zip(svec, avec, bvec):
-                    zeta_mid = 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
-                    AIC[:, :, ss, mm, nn] = get_aic3_cpp(self.maps, self.zeta,
-                                                         zeta_mid, self.vortex_radius)
-                AIC[:, :, 0, mm, nn] = AIC[:, :, 2, mm, nn - 1]
-
-            ##### all others: copy seg. 0 and 3
-            svec = [1, 2]  # seg. number
-            avec = [1, 2]  # 1st vertex of seg.
-            bvec = [2, 3]  # 2nd vertex of seg.
-            for pp in itertools.product(range(1, M_trg), range(1, N_trg)):
-                mm, nn = pp
-                zetav_here = Surf_target.get_panel_vertices_coords(*pp)
-                for ss, aa, bb in zip(svec, avec, bvec):
-                    zeta_mid = 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
-                    AIC[:, :, ss, mm, nn] = get_aic3_cpp(self.maps, self.zeta,
-                                                         zeta_mid, self.vortex_radius)
-                AIC[:, :, 3, mm, nn] = AIC[:, :, 1, mm - 1, nn]
-                AIC[:, :, 0, mm, nn] = AIC[:, :, 2, mm, nn - 1]
+            AIC = self.get_aic_at_points(Surf_target.get_unique_midsegments())
+            AIC = Surf_target.expand_unique_segments(AIC.transpose((0, 2, 1)))
 
         return AIC
 
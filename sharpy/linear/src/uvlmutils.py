@@ -52,6 +52,45 @@ def biot_segment(zetaP, zetaA, zetaB, vortex_radius, gamma=1.0):
     return q
 
 
+def biot_segment_vect(ZetaP, ZetaA, ZetaB, vortex_radius, gamma=1.0):
+    """
+    Vectorised version of biot_segment. Induced velocity of each segment A->B
+    over each target point P, where:
+    - ZetaP: (n_p,3) target points
+    - ZetaA, ZetaB: (n_s,3) 1st and 2nd vertex of the segments
+    - gamma: scalar or (n_s,) circulation of the segments
+
+    The output has shape (n_p,n_s,3). Segments whose distance from the target
+    point is below the vortex radius give no contribution, as in biot_segment.
+    """
+
+    ZetaP = np.atleast_2d(ZetaP)
+    Cfact = cfact_biot * np.broadcast_to(gamma, (ZetaA.shape[0],))
+
+    # differences
+    RA = ZetaP[:, None, :] - ZetaA[None, :, :]
+    RB = ZetaP[:, None, :] - ZetaB[None, :, :]
+    RAB = ZetaB - ZetaA
+    Vcross = np.cross(RA, RB)
+    vcross_sq = np.einsum('psi,psi->ps', Vcross, Vcross)
+
+    # numerical radius
+    isfar = vcross_sq >= \
+            (vortex_radius * vortex_radius) * np.einsum('si,si->s', RAB, RAB)[None, :]
+    vcross_sq[~isfar] = 1.
+    ra_norm = np.sqrt(np.einsum('psi,psi->ps', RA, RA))
+    rb_norm = np.sqrt(np.einsum('psi,psi->ps', RB, RB))
+    ra_norm[~isfar] = 1.
+    rb_norm[~isfar] = 1.
+
+    fact = (Cfact[None, :] / vcross_sq) * \
+           (np.einsum('si,psi->ps', RAB, RA) / ra_norm -
+            np.einsum('si,psi->ps', RAB, RB) / rb_norm)
+    fact[~isfar] = 0.
+
+    return Vcross * fact[:, :, None]
+
+
 def biot_panel(zetaC, ZetaPanel, vortex_radius, gamma=1.0):
     """
     Induced velocity over point ZetaC of a panel of vertices coordinates
@@ -177,7 +177,8 @@ class AeroForcesCalculator(BaseSolver):
                                                                  struct_tstep.psi,
                                                                  None,
                                                                  self.data.structure.connectivities,
-                                                                 struct_tstep.cag())
+                                                                 struct_tstep.cag(),
+                                                                 mapping_tables=self.data.aero.force_mapping_tables)
         return aero_forces_beam_dof
 
     def calculate_coefficients(self, fx, fy, fz, mx, my, mz):
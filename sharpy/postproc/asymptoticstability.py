@@ -10,6 +10,8 @@ import sharpy.solvers.lindynamicsim as lindynamicsim
 import sharpy.structure.utils.modalutils as modalutils
 import sharpy.utils.frequencyutils as frequencyutils
 import sharpy.linear.src.libss as libss
+import sharpy.linear.src.libsparse as libsp
+from sharpy.linear.src.eigencontinuation import EigenvalueContinuation
 import h5py
 
 
@@ -27,6 +29,12 @@ class AsymptoticStability(BaseSolver):
     The eigenvalues can be truncated, keeping a minimum ``num_evals`` (sorted by decreasing real part) or by limiting
     the higher frequency modes through ``frequency_cutoff``.
 
+    By default, all the eigenvalues of the (dense) state matrix are computed. For large systems, the ``shift_invert``
+    ``eigen_method`` computes only the ``num_evals`` eigenvalues closest to the stability boundary (imaginary axis for
+    continuous time systems, unit circle for discrete time systems) using ARPACK in shift-invert mode, for which
+    sparse state matrices are not converted to dense. The shifts are ``num_shifts`` evenly spaced frequencies in the
+    ``[0, frequency_cutoff]`` band, or zero frequency if no ``frequency_cutoff`` is given.
+
     Results can be saved to file using ``export_eigenvalues``. The setting ``display_root_locus`` shows a simple
     Argand diagram where the continuous time eigenvalues are displayed.
 
@@ -75,6 +83,19 @@ class AsymptoticStability(BaseSolver):
     settings_description['velocity_analysis'] = 'List containing min, max and number ' \
                                                 'of velocities to analyse the system'
 
+    settings_types['velocity_analysis_tracking'] = 'bool'
+    settings_default['velocity_analysis_tracking'] = False
+    settings_description['velocity_analysis_tracking'] = 'Track the eigenvalues along the velocity analysis by ' \
+                                                         'continuation from the previous velocity instead of ' \
+                                                         'computing all the eigenvalues at each velocity. Mode ' \
+                                                         'tracked V-g/V-f curves are saved.'
+
+    settings_types['velocity_analysis_refinements'] = 'int'
+    settings_default['velocity_analysis_refinements'] = 4
+    settings_description['velocity_analysis_refinements'] = 'Maximum number of halvings of the velocity step near ' \
+                                                            'damping zero crossings and mode switches when tracking ' \
+                                                            'the eigenvalues.'
+
     settings_types['target_system'] = 'list(str)'
     settings_default['target_system'] = ['aeroelastic']
     settings_description['target_system'] = 'System or systems for which to find frequency response.'
@@ -84,6 +105,18 @@ class AsymptoticStability(BaseSolver):
     settings_default['num_evals'] = 200
     settings_description['num_evals'] = 'Number of eigenvalues to retain.'
 
+    settings_types['eigen_method'] = 'str'
+    settings_default['eigen_method'] = 'direct'
+    settings_description['eigen_method'] = 'Eigenvalue solver. ``direct`` computes all the eigenvalues of the dense ' \
+                                           'state matrix, ``shift_invert`` only those closest to the stability ' \
+                                           'boundary in the frequency band of interest'
+    settings_options['eigen_method'] = ['direct', 'shift_invert']
+
+    settings_types['num_shifts'] = 'int'
+    settings_default['num_shifts'] = 1
+    settings_description['num_shifts'] = 'Number of shifts along the stability boundary, evenly spaced in the ' \
+                                         '``[0, frequency_cutoff]`` band, for the ``shift_invert`` eigen_method.'
+
     settings_types['modes_to_plot'] = 'list(int)'
     settings_default['modes_to_plot'] = []
     settings_description['modes_to_plot'] = 'List of mode numbers to plot. Plots the 0, 45, 90 and 135' \
@@ -195,10 +228,14 @@ class AsymptoticStability(BaseSolver):
         for ith, system in enumerate(ss_list):
             system_name = system_name_list[ith]
 
-            if self.print_info:
-                cout.cout_wrap('Calculating %s eigenvalues using direct method' % system_name)
-
-            eigenvalues, eigenvectors = sclalg.eig(system.A)
+            if self.settings['eigen_method'] == 'shift_invert':
+                if self.print_info:
+                    cout.cout_wrap('Calculating %s eigenvalues using shift-invert method' % system_name)
+                eigenvalues, eigenvectors = self.shift_invert_eigenvalues(system, not_scaled)
+            else:
+                if self.print_info:
+                    cout.cout_wrap('Calculating %s eigenvalues using direct method' % system_name)
+                eigenvalues, eigenvectors = sclalg.eig(libsp.dense(system.A))
 
             # Convert DT eigenvalues into CT
             if system.dt:
@@ -261,6 +298,21 @@ class AsymptoticStability(BaseSolver):
             discrete_time_eigenvalues (np.ndarray): Array of discrete time eigenvalues.
             not_scaled (bool): Treat the system as not scaled. No Scaling Factors will be searched in SHARPy.
         """
+        dt = self.get_dimensional_time_step(dt, not_scaled)
+
+        return np.log(discrete_time_eigenvalues) / dt
+
+    def get_dimensional_time_step(self, dt, not_scaled=False):
+        """
+        Dimensional time step of a discrete time system. See :meth:`convert_to_continuoustime`.
+
+        Args:
+            dt (float): Discrete time increment.
+            not_scaled (bool): Treat the system as not scaled. No Scaling Factors will be searched in SHARPy.
+
+        Returns:
+            float: Dimensional time step.
+        """
         if not_scaled:
             dt = dt
         else:
@@ -273,7 +325,48 @@ class AsymptoticStability(BaseSolver):
             except AttributeError:
                 dt = dt
 
-        return np.log(discrete_time_eigenvalues) / dt
+        return dt
+
+    def shift_invert_eigenvalues(self, system, not_scaled=True, dimensional_dt=None):
+        r"""
+        Computes the eigenvalues of the state-space closest to the stability boundary in the frequency band of
+        interest, without computing the full set of eigenvalues.
+
+        The shifts :math:`\sigma_j` are placed at ``num_shifts`` evenly spaced frequencies :math:`\omega_j` in the
+        ``[0, frequency_cutoff]`` band, such that :math:`\sigma_j = i\omega_j` for continuous time systems and
+        :math:`\sigma_j = e^{i\omega_j\Delta t}` for discrete time systems. The shifts are marginally moved to the
+        unstable side of the boundary, such that they do not coincide with the eigenvalues of rigid body modes.
+        ``num_evals`` eigenvalues are found around each shift (see :func:`sharpy.linear.src.libss.eigs_shift_invert`),
+        which are then sorted and truncated as those of the direct method.
+
+        Args:
+            system (libss.StateSpace): State-space, with dense or sparse matrices.
+            not_scaled (bool): Flag to indicate whether the systems are assembled in non-dimensional time
+            dimensional_dt (float (optional)): Dimensional time step of discrete time systems. If not given, it is
+                obtained as in :meth:`convert_to_continuoustime`.
+
+        Returns:
+            tuple(np.ndarray, np.ndarray): eigenvalues, in the same time domain as the system, and eigenvectors.
+        """
+        if np.isinf(self.frequency_cutoff):
+            if self.settings['num_shifts'] > 1:
+                cout.cout_wrap('Warning: no frequency_cutoff has been given, a single shift at zero frequency is '
+                               'used', 3)
+            frequencies = np.zeros(1)
+        else:
+            frequencies = np.linspace(0, self.frequency_cutoff, self.settings['num_shifts'])
+
+        shift_offset = 1e-6
+        if system.dt:
+            if dimensional_dt is None:
+                dt = self.get_dimensional_time_step(system.dt, not_scaled)
+            else:
+                dt = dimensional_dt
+            shifts = (1. + shift_offset) * np.exp(1j * frequencies * dt)
+        else:
+            shifts = shift_offset + 1j * frequencies
+
+        return libss.eigs_shift_invert(system.A, shifts, self.num_evals)
 
     def export_eigenvalues(self, num_evals, eigenvalues, eigenvectors, filename=None):
         """
@@ -343,6 +436,10 @@ class AsymptoticStability(BaseSolver):
 
         u_inf_vec = np.linspace(ulb, uub, int(num_u))
 
+        if self.settings['velocity_analysis_tracking']:
+            self.velocity_analysis_tracking(u_inf_vec)
+            return
+
         real_part_plot = []
         imag_part_plot = []
         uinf_part_plot = []
@@ -389,6 +486,79 @@ class AsymptoticStability(BaseSolver):
         if self.print_info:
             cout.cout_wrap('\t\tSuccessfully saved velocity analysis to {:s}'.format(velocity_file_name), 2)
 
+    def velocity_analysis_tracking(self, u_inf_vec):
+        """
+        Velocity analysis with mode tracking.
+
+        The eigenvalues of the least stable ``num_evals`` modes (one per complex conjugate pair) below the
+        ``frequency_cutoff`` are computed at the first velocity. These modes are then tracked along the velocities by
+        eigenvalue continuation (see :class:`sharpy.linear.src.eigencontinuation.EigenvalueContinuation`), where the
+        velocity step is refined near damping zero crossings.
+
+        The mode tracked V-g/V-f curves are saved to a ``.dat`` file where the columns correspond to the mode number,
+        the free stream velocity, the real and imaginary parts of the continuous time eigenvalue and the damping ratio.
+        The estimated damping zero crossings (mode number, velocity and frequency in rad/s) are saved to a
+        ``_crossings.dat`` file.
+
+        Args:
+            u_inf_vec (np.ndarray): Nominal free stream velocities.
+        """
+        length = self.data.linear.linear_system.uvlm.sys.ScalingFacts['length']
+
+        def dimensional_time_step(u_inf, system):
+            return length / u_inf * system.dt
+
+        ss_aeroelastic = self.data.linear.linear_system.update(u_inf_vec[0])
+        if ss_aeroelastic.dt:
+            dt = dimensional_time_step(u_inf_vec[0], ss_aeroelastic)
+        else:
+            dt = None
+
+        if self.settings['eigen_method'] == 'shift_invert':
+            eigs, eigenvectors = self.shift_invert_eigenvalues(ss_aeroelastic, dimensional_dt=dt)
+        else:
+            eigs, eigenvectors = sclalg.eig(libsp.dense(ss_aeroelastic.A))
+        if dt is not None:
+            eigs = np.log(eigs) / dt
+        eigs, eigenvectors = self.sort_eigenvalues(eigs, eigenvectors, self.frequency_cutoff,
+                                                   number_of_eigenvalues=min(self.num_evals, len(eigs)))
+
+        # one mode per complex conjugate pair
+        tracked_modes = eigs.imag >= 0
+        eigs, eigenvectors = eigs[tracked_modes], eigenvectors[:, tracked_modes]
+        if dt is not None:
+            eigs = np.exp(eigs * dt)
+
+        continuation = EigenvalueContinuation(self.data.linear.linear_system.update,
+                                              dimensional_time_step=dimensional_time_step,
+                                              max_refinements=self.settings['velocity_analysis_refinements'])
+        u_inf_tracked, eigs_cont = continuation.track(u_inf_vec, eigs, eigenvectors)
+
+        num_vel, num_modes = eigs_cont.shape
+        eigs_abs = np.abs(eigs_cont)
+        damping_ratio = np.zeros_like(eigs_abs)
+        np.divide(-eigs_cont.real, eigs_abs, out=damping_ratio, where=eigs_abs > 1e-8)
+        velocity_file_name = self.folder + '/velocity_analysis_tracked_min{:04g}_max{:04g}_nvel{:04g}'.format(
+            u_inf_vec[0] * 10,
+            u_inf_vec[-1] * 10,
+            len(u_inf_vec))
+        np.savetxt(velocity_file_name + '.dat',
+                   np.column_stack((np.repeat(np.arange(num_modes), num_vel),
+                                    np.tile(u_inf_tracked, num_modes),
+                                    eigs_cont.real.T.reshape(-1),
+                                    eigs_cont.imag.T.reshape(-1),
+                                    damping_ratio.T.reshape(-1))))
+        np.savetxt(velocity_file_name + '_crossings.dat', np.array(continuation.crossings).reshape((-1, 3)))
+
+        if self.settings['print_info']:
+            cout.cout_wrap('Tracked {:g} modes at {:g} velocities'.format(num_modes, num_vel), 1)
+            for mode, u_inf, frequency in continuation.crossings:
+                cout.cout_wrap('\tMode {:g} damping zero crossing at u: {:.2f} m/s, '
+                               'frequency {:.2f} rad/s'.format(mode, u_inf, frequency), 1)
+
+        if self.print_info:
+            cout.cout_wrap('\t\tSuccessfully saved velocity analysis to {:s}.dat'.format(velocity_file_name), 2)
+
     @staticmethod
     def display_root_locus(eigenvalues):
         """
@@ -84,6 +84,10 @@ class FrequencyResponse(solver_interface.BaseSolver):
     settings_default['num_freqs'] = 50
     settings_description['num_freqs'] = 'Number of frequencies to evaluate.'
 
+    settings_types['num_workers'] = 'int'
+    settings_default['num_workers'] = 1
+    settings_description['num_workers'] = 'Number of threads among which the frequencies are distributed.'
+
     settings_types['compute_hinf'] = 'bool'
     settings_default['compute_hinf'] = False
     settings_description['compute_hinf'] = 'Compute Hinfinity norm of the system.'
@@ -192,7 +196,7 @@ class FrequencyResponse(solver_interface.BaseSolver):
                 system_name = None  # For the case where the state-space is parsed in run().
 
             t0fom = time.time()
-            y_freq_fom = system.freqresp(self.wv)
+            y_freq_fom = system.freqresp(self.wv, num_workers=self.settings['num_workers'])
             tfom = time.time() - t0fom
 
             if self.settings['compute_hinf']:
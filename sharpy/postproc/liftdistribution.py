@@ -83,7 +83,8 @@ class LiftDistribution(BaseSolver):
             self.data.structure.node_master_elem,
             self.data.structure.connectivities,
             struct_tstep.cag(),
-            self.data.aero.aero_dict)
+            self.data.aero.aero_dict,
+            mapping_tables=self.data.aero.force_mapping_tables)
         # Prepare output matrix and file
         N_nodes = self.data.structure.num_node
         numb_col = 4
@@ -0,0 +1,202 @@
+import itertools
+import os
+import time
+
+import h5py as h5
+import numpy as np
+
+import sharpy.linear.src.libss as libss
+import sharpy.utils.cout_utils as cout
+import sharpy.utils.settings as settings_utils
+import sharpy.utils.solver_interface as solver_interface
+from sharpy.linear.assembler.lineargustassembler import one_minus_cosine
+from sharpy.utils.frequencyutils import find_target_system
+
+
+@solver_interface.solver
+class LinearGustEnvelope(solver_interface.BaseSolver):
+    """
+    Linear gust envelope.
+
+    Computes the response of the assembled linear system, which may be a reduced order model, to a batch of "1-cos"
+    gusts given by all the combinations of ``gust_lengths`` and ``gust_intensities``. The gust scenarios are marched
+    simultaneously in discrete time as columns of the input (see :class:`~sharpy.linear.src.libss.DiscreteTimeSimulator`),
+    such that the linearisation, assembly and reduction of the system are shared by the whole batch.
+
+    The gust profile, see :func:`~sharpy.linear.assembler.lineargustassembler.one_minus_cosine`, is applied to all the
+    channels of the ``u_gust`` input of the system, hence a linear gust assembler is required in the
+    ``LinearAssembler`` settings. The outputs are given in the units of the system (i.e. non-dimensional if the UVLM is
+    scaled).
+
+    The peak loads of each scenario, i.e. the maximum and minimum of each output, and the envelope of each output over
+    all scenarios at each time step are saved to ``<system>.gust_envelope.h5`` with the following datasets:
+
+        * ``gust_length`` and ``gust_intensity``: ``(n_scenarios,)`` parameters of each scenario.
+
+        * ``time``: ``(n_tsteps,)`` dimensional time.
+
+        * ``output_max`` and ``output_min``: ``(n_scenarios, outputs)`` peak loads of each scenario.
+
+        * ``envelope_max`` and ``envelope_min``: ``(n_tsteps, outputs)`` envelope over all scenarios.
+
+    """
+    solver_id = 'LinearGustEnvelope'
+    solver_classification = 'post-processor'
+
+    settings_types = dict()
+    settings_default = dict()
+    settings_description = dict()
+    settings_options = dict()
+
+    settings_types['print_info'] = 'bool'
+    settings_default['print_info'] = False
+    settings_description['print_info'] = 'Write output to screen.'
+
+    settings_types['target_system'] = 'str'
+    settings_default['target_system'] = 'aeroelastic'
+    settings_description['target_system'] = 'System for which to compute the gust envelope.'
+    settings_options['target_system'] = ['aeroelastic', 'aerodynamic']
+
+    settings_types['gust_lengths'] = 'list(float)'
+    settings_default['gust_lengths'] = []
+    settings_description['gust_lengths'] = 'Gust lengths :math:`S`.'
+
+    settings_types['gust_intensities'] = 'list(float)'
+    settings_default['gust_intensities'] = [1.]
+    settings_description['gust_intensities'] = 'Gust intensities :math:`u_{de}`.'
+
+    settings_types['gust_offset'] = 'float'
+    settings_default['gust_offset'] = 0.
+    settings_description['gust_offset'] = 'Distance between the leading edge and the start of the gusts.'
+
+    settings_types['n_tsteps'] = 'int'
+    settings_default['n_tsteps'] = 100
+    settings_description['n_tsteps'] = 'Number of time steps to run.'
+
+    settings_types['chunk_size'] = 'int'
+    settings_default['chunk_size'] = 100
+    settings_description['chunk_size'] = 'Number of time steps marched at once.'
+
+    settings_table = settings_utils.SettingsTable()
+    __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
+
+    def __init__(self):
+
+        self.settings = None
+        self.data = None
+        self.folder = None
+        self.print_info = False
+        self.caller = None
+
+    def initialise(self, data, custom_settings=None, caller=None, restart=False):
+
+        self.data = data
+
+        if not custom_settings:
+            self.settings = self.data.settings[self.solver_id]
+        else:
+            self.settings = custom_settings
+        settings_utils.to_custom_types(self.settings,
+                                       self.settings_types,
+                                       self.settings_default,
+                                       self.settings_options,
+                                       no_ctype=True)
+
+        self.print_info = self.settings['print_info']
+
+        self.folder = data.output_folder + '/lineargustenvelope/'
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        self.caller = caller
+
+    def run(self, **kwargs):
+        """
+        Computes the gust envelope of the linear state-space.
+
+        Args:
+            ss (sharpy.linear.src.libss.StateSpace (Optional)): State-space object for which to compute the envelope.
+              If not given, the previously assembled ``target_system`` is used.
+        """
+        ss = settings_utils.set_value_or_default(kwargs, 'ss', None)
+        system_name = None
+        if ss is None:
+            system_name = self.settings['target_system']
+            ss = find_target_system(self.data, system_name)
+
+        uvlm = self.data.linear.linear_system.uvlm
+        if uvlm.gust_assembler is None:
+            raise AttributeError('LinearGustEnvelope requires a linear gust assembler in the LinearUVLM settings')
+
+        # the system time step and gust inputs are non-dimensional if the UVLM is scaled
+        if uvlm.scaled:
+            scale_time = uvlm.sys.ScalingFacts['time']
+            scale_speed = uvlm.sys.ScalingFacts['speed']
+        else:
+            scale_time = 1.
+            scale_speed = 1.
+
+        gust_lengths, gust_intensities, time_dom, u_vec = self.input_vector(ss, uvlm.gust_assembler.u_inf,
+                                                                           scale_time, scale_speed)
+
+        if self.print_info:
+            cout.cout_wrap('Computing gust envelope for %g scenarios...' % len(gust_lengths))
+        t0 = time.time()
+        simulator = libss.DiscreteTimeSimulator(ss, chunk_size=self.settings['chunk_size'])
+        output_max, output_min, envelope_max, envelope_min = simulator.envelope(u_vec)
+        cout.cout_wrap('\tComputed the gust envelope in %f s' % (time.time() - t0), 2)
+
+        self.save_envelope(gust_lengths, gust_intensities, time_dom,
+                           output_max.T, output_min.T, envelope_max, envelope_min, system_name=system_name)
+
+        return self.data
+
+    def input_vector(self, ss, u_inf, scale_time=1., scale_speed=1.):
+        """
+        Input time histories of all the gust scenarios.
+
+        Args:
+            ss (libss.StateSpace): Discrete time state-space with a ``u_gust`` input.
+            u_inf (float): Free stream velocity.
+            scale_time (float): Time scaling factor of the system.
+            scale_speed (float): Speed scaling factor of the gust inputs of the system.
+
+        Returns:
+            tuple: gust length and intensity of each scenario, dimensional time and input vector
+            ``(n_tsteps, inputs, n_scenarios)``.
+        """
+        scenarios = list(itertools.product(self.settings['gust_lengths'], self.settings['gust_intensities']))
+        if len(scenarios) == 0:
+            raise ValueError('No gust scenarios given in the gust_lengths and gust_intensities settings')
+
+        time_dom = np.arange(self.settings['n_tsteps']) * ss.dt * scale_time
+        gust_cols = ss.input_variables('u_gust').cols_loc
+
+        u_vec = np.zeros((self.settings['n_tsteps'], ss.inputs, len(scenarios)))
+        for i_case, (gust_length, gust_intensity) in enumerate(scenarios):
+            u_vec[:, gust_cols, i_case] = one_minus_cosine(time_dom, gust_length, gust_intensity, u_inf,
+                                                           offset=self.settings['gust_offset'])[:, None] / scale_speed
+
+        gust_lengths, gust_intensities = np.array(scenarios).T
+        return gust_lengths, gust_intensities, time_dom, u_vec
+
+    def save_envelope(self, gust_lengths, gust_intensities, time_dom, output_max, output_min, envelope_max,
+                      envelope_min, system_name=None):
+        """
+        Saves the peak loads and gust envelope to a binary ``.h5`` file.
+        """
+        case_name = ''
+        if system_name is not None:
+            case_name += system_name + '.'
+
+        h5filename = self.folder + '/' + case_name + 'gust_envelope.h5'
+        with h5.File(h5filename, 'w') as f:
+            f.create_dataset('gust_length', data=gust_lengths)
+            f.create_dataset('gust_intensity', data=gust_intensities)
+            f.create_dataset('time', data=time_dom)
+            f.create_dataset('output_max', data=output_max)
+            f.create_dataset('output_min', data=output_min)
+            f.create_dataset('envelope_max', data=envelope_max)
+            f.create_dataset('envelope_min', data=envelope_min)
+
+        if self.print_info:
+            cout.cout_wrap('Saved .h5 file to %s with gust envelope data' % h5filename)
@@ -94,6 +94,25 @@ class SaveData(BaseSolver):
     settings_default['stride'] = 1
     settings_description['stride'] = 'Number of steps between the execution calls when run online'
 
+    settings_types['streaming'] = 'bool'
+    settings_default['streaming'] = False
+    settings_description['streaming'] = 'When run online, keep the ``.data.h5`` file open and append each time step ' \
+                                        'to a chunked and extendable dataset per variable in ' \
+                                        '``data/<structure|aero>/timeseries`` instead of creating a group per time ' \
+                                        'step. The file is written from a background thread. Variables whose ' \
+                                        'shape changes in time, such as ``zeta_star`` when the wake grows, need to ' \
+                                        'be added to ``skip_attr``'
+
+    settings_types['streaming_chunk_steps'] = 'int'
+    settings_default['streaming_chunk_steps'] = 10
+    settings_description['streaming_chunk_steps'] = 'Number of time steps per chunk and per batch written to disk ' \
+                                                    'when ``streaming``'
+
+    settings_types['streaming_compression'] = 'str'
+    settings_default['streaming_compression'] = ''
+    settings_description['streaming_compression'] = 'Compression filter of the datasets when ``streaming``'
+    settings_options['streaming_compression'] = ['', 'gzip', 'lzf']
+
     settings_table = settings_utils.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description,
                                        settings_options=settings_options)
@@ -109,11 +128,16 @@ class SaveData(BaseSolver):
         self.ts_max = 0
         self.caller = None
 
+        # open file and writers when streaming
+        self.hdfile = None
+        self.writers = dict()
+
         ### specify which classes are saved as hdf5 group
         # see initialise and add_as_grp
         self.ClassesToSave = (PreSharpy,)
 
     def initialise(self, data, custom_settings=None, caller=None, restart=False):
+        self.close_stream()
         self.data = data
         if custom_settings is None:
             self.settings = data.settings[self.solver_id]
@@ -205,6 +229,12 @@ class SaveData(BaseSolver):
 
         if ((online and (self.data.ts % self.settings['stride'] == 0)) or (not online)):
             if self.settings['format'] == 'h5':
+                if online and self.settings['streaming']:
+                    self.stream_timestep(self.data.ts)
+                    return self.data
+                # the streamed file needs to be closed before writing it again
+                self.close_stream()
+
                 file_exists = os.path.isfile(self.filename)
                 hdfile = h5py.File(self.filename, 'a')
 
@@ -298,6 +328,70 @@ class SaveData(BaseSolver):
 
         return self.data
 
+    def stream_timestep(self, ts):
+        """
+        Appends the time step ``ts`` to the time series datasets. On the first call, the file is created with the
+        data that does not change in time and the time series of the time steps already computed.
+        """
+        if self.hdfile is None:
+            self.hdfile = h5py.File(self.filename, 'a')
+            skip_attr_init = copy.deepcopy(self.settings['skip_attr'])
+            skip_attr_init.append('timestep_info')
+            h5utils.add_as_grp(self.data, self.hdfile, grpname='data',
+                               ClassesToSave=self.ClassesToSave, SkipAttr=skip_attr_init,
+                               compress_float=self.settings['compress_float'])
+
+            compression = self.settings['streaming_compression']
+            if compression == '':
+                compression = None
+            self.writers = dict()
+            if self.settings['save_struct']:
+                self.writers['structure'] = h5utils.TimeSeriesWriter(
+                    self.hdfile['data']['structure'].create_group('timeseries'),
+                    chunk_steps=self.settings['streaming_chunk_steps'],
+                    compression=compression,
+                    compress_float=self.settings['compress_float'])
+            if self.settings['save_aero']:
+                self.writers['aero'] = h5utils.TimeSeriesWriter(
+                    self.hdfile['data']['aero'].create_group('timeseries'),
+                    chunk_steps=self.settings['streaming_chunk_steps'],
+                    compression=compression,
+                    compress_float=self.settings['compress_float'])
+
+            steps = [it for it in range(ts) if self.data.structure.timestep_info[it] is not None]
+        else:
+            steps = []
+
+        for it in steps + [ts]:
+            for name, writer in self.writers.items():
+                tstep = getattr(self.data, name).timestep_info[it]
+                writer.write(it, {attr: value for attr, value in tstep.__dict__.items()
+                                  if attr not in self.settings['skip_attr']})
+
+    def close_stream(self):
+        """
+        Writes the remaining time steps of the stream and closes the file
+        """
+        if getattr(self, 'hdfile', None) is None:
+            return
+        try:
+            for writer in self.writers.values():
+                writer.close()
+        finally:
+            self.writers = dict()
+            self.hdfile.close()
+            self.hdfile = None
+
+    def teardown(self):
+        self.close_stream()
+
+    def __getstate__(self):
+        # the open file and the writer threads cannot be pickled
+        state = self.__dict__.copy()
+        state['hdfile'] = None
+        state['writers'] = dict()
+        return state
+
     @staticmethod
     def save_timestep(data, settings, ts, hdfile):
         if settings['save_aero']:
@@ -1,7 +1,9 @@
 import os
+import h5py
 import numpy as np
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings_utils
+import sharpy.utils.h5utils as h5utils
 
 
 @solver
@@ -13,6 +15,10 @@ class WriteVariablesTime(BaseSolver):
 
     It is a postprocessor that outputs the value of variables with time onto a text file.
 
+    The rows are kept in memory and written to the files every ``buffer_steps`` time steps, and when the solver is
+    torn down. Alternatively, all the variables can be written as columns of a single ``h5`` file, one dataset per
+    ``.dat`` file that would have been written otherwise.
+
     Attributes:
         settings_types (dict): Acceptable data types of the input data
         settings_default (dict): Default values for input data should the user not provide them
@@ -27,6 +33,7 @@ class WriteVariablesTime(BaseSolver):
     settings_types = dict()
     settings_default = dict()
     settings_description = dict()
+    settings_options = dict()
 
     settings_types['delimiter'] = 'str'
     settings_default['delimiter'] = ' '
@@ -92,8 +99,21 @@ class WriteVariablesTime(BaseSolver):
     settings_default['vel_field_points'] = np.array([0., 0., 0.])
     settings_description['vel_field_points'] = 'List of coordinates of the control points as x1, y1, z1, x2, y2, z2 ...'
 
+    settings_types['buffer_steps'] = 'int'
+    settings_default['buffer_steps'] = 1
+    settings_description['buffer_steps'] = 'Number of time steps kept in memory before writing them to the output ' \
+                                            'files. The remaining time steps are written when the calling solver ' \
+                                            'is torn down, hence they are lost if the simulation is interrupted'
+
+    settings_types['output_format'] = 'str'
+    settings_default['output_format'] = 'dat'
+    settings_description['output_format'] = 'Write one text file per variable (``dat``) or a single ``h5`` file ' \
+                                            '``<case>.variables.h5`` with a dataset per variable (``h5``). The ' \
+                                            '``h5`` file is overwritten in every simulation'
+    settings_options['output_format'] = ['dat', 'h5']
+
     settings_table = settings_utils.SettingsTable()
-    __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
+    __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
 
     def __init__(self):
         self.settings = None
@@ -105,13 +125,22 @@ class WriteVariablesTime(BaseSolver):
         self.caller = None
         self.velocity_generator = None
 
+        # rows not yet written to the files
+        self.buffers = dict()
+        self.n_buffered_steps = 0
+        self.step_variables = dict()
+        self.hdfile = None
+        self.h5_writer = None
+
     def initialise(self, data, custom_settings=None, caller=None, restart=False):
         self.data = data
         if custom_settings is None:
             self.settings = data.settings[self.solver_id]
         else:
             self.settings = custom_settings
-        settings_utils.to_custom_types(self.settings, self.settings_types, self.settings_default)
+        settings_utils.to_custom_types(self.settings, self.settings_types, self.settings_default,
+                                       options=self.settings_options)
+        self.close_files()
 
         self.folder = data.output_folder + '/WriteVariablesTime/'
         if not os.path.isdir(self.folder):
@@ -178,11 +207,16 @@ class WriteVariablesTime(BaseSolver):
                 if self.settings['cleanup_old_solution']:
                     if os.path.isfile(filename):
                         os.remove(filename)
-                if not os.path.isfile(filename):
+                if self.settings['output_format'] == 'dat' and not os.path.isfile(filename):
                     fid = open(filename, 'w')
                     fid.write(("#t[s]%suext_x[m/s]%suext_y[m/s]%suext_z[m/s]\n" % ((self.settings['delimiter'],)*3)))
                     fid.close()
 
+        if self.settings['output_format'] == 'h5':
+            self.hdfile = h5py.File(self.folder + data.settings['SHARPy']['case'] + '.variables.h5', 'w')
+            self.h5_writer = h5utils.TimeSeriesWriter(self.hdfile,
+                                                      chunk_steps=self.settings['buffer_steps'])
+
         # Initialise velocity generator
         self.caller = caller
         if ((not self.caller is None) and (not len(self.settings['vel_field_variables']) == 0)):
@@ -203,6 +237,7 @@ class WriteVariablesTime(BaseSolver):
             for it in range(len(self.data.structure.timestep_info)):
                 if self.data.structure.timestep_info[it] is not None:
                     self.data = self.write(it)
+            self.flush()
 
         return self.data
 
@@ -222,17 +257,16 @@ class WriteVariablesTime(BaseSolver):
             for ifor in range(len(self.settings['FoR_number'])):
                 filename = self.folder + "FoR_" + '%02d' % self.settings['FoR_number'][ifor] + "_" + self.settings['FoR_variables'][ivariable] + ".dat"
 
-                with open(filename, 'a') as fid:
-                    var = np.atleast_2d(getattr(tstep, self.settings['FoR_variables'][ivariable]))
-                    rows, cols = var.shape
-                    if ((cols == 1) and (rows == 1)):
-                        self.write_value_to_file(fid, self.data.ts, var, self.settings['delimiter'])
-                    elif ((cols > 1) and (rows == 1)):
-                        self.write_nparray_to_file(fid, self.data.ts, var, self.settings['delimiter'])
-                    elif ((cols == 1) and (rows >= 1)):
-                        self.write_value_to_file(fid, self.data.ts, var[ifor], self.settings['delimiter'])
-                    else:
-                        self.write_nparray_to_file(fid, self.data.ts, var[ifor,:], self.settings['delimiter'])
+                var = np.atleast_2d(getattr(tstep, self.settings['FoR_variables'][ivariable]))
+                rows, cols = var.shape
+                if ((cols == 1) and (rows == 1)):
+                    self.add_value(filename, self.data.ts, var)
+                elif ((cols > 1) and (rows == 1)):
+                    self.add_nparray(filename, self.data.ts, var)
+                elif ((cols == 1) and (rows >= 1)):
+                    self.add_value(filename, self.data.ts, var[ifor])
+                else:
+                    self.add_nparray(filename, self.data.ts, var[ifor,:])
 
         # Structure variables at nodes
         for ivariable in range(len(self.settings['structure_variables'])):
@@ -243,19 +277,17 @@ class WriteVariablesTime(BaseSolver):
             if num_indices == 1:
                 # Beam global variables (i.e. not node dependant)
                 filename = self.folder + "struct_" + self.settings['structure_variables'][ivariable] + ".dat"
-                with open(filename, 'a') as fid:
-                    self.write_nparray_to_file(fid, self.data.ts, var, self.settings['delimiter'])
+                self.add_nparray(filename, self.data.ts, var)
 
             else:  # These variables have nodal values (i.e the number of indices is either 2 or 3)
                 for inode in range(len(self.settings['structure_nodes'])):
                     node = self.settings['structure_nodes'][inode]
                     filename = self.folder + "struct_" + self.settings['structure_variables'][ivariable] + "_node" + str(node) + ".dat"
-                    with open(filename, 'a') as fid:
-                        if num_indices == 2:
-                            self.write_nparray_to_file(fid, self.data.ts, var[node,:], self.settings['delimiter'])
-                        elif num_indices == 3:
-                            ielem, inode_in_elem = self.data.structure.node_master_elem[node]
-                            self.write_nparray_to_file(fid, self.data.ts, var[ielem,inode_in_elem,:], self.settings['delimiter'])
+                    if num_indices == 2:
+                        self.add_nparray(filename, self.data.ts, var[node,:])
+                    elif num_indices == 3:
+                        ielem, inode_in_elem = self.data.structure.node_master_elem[node]
+                        self.add_nparray(filename, self.data.ts, var[ielem,inode_in_elem,:])
 
 
         # Aerodynamic variables at panels
@@ -269,9 +301,8 @@ class WriteVariablesTime(BaseSolver):
 
                 filename = self.folder + "aero_" + self.settings['aero_panels_variables'][ivariable] + "_panel" + "_isurf" + str(i_surf) + "_im"+ str(i_m) + "_in"+ str(i_n) + ".dat"
 
-                with open(filename, 'a') as fid:
-                    var = getattr(self.data.aero.timestep_info[it], self.settings['aero_panels_variables'][ivariable])
-                    self.write_value_to_file(fid, self.data.ts, var.gamma[i_surf][i_m,i_n], self.settings['delimiter'])
+                var = getattr(self.data.aero.timestep_info[it], self.settings['aero_panels_variables'][ivariable])
+                self.add_value(filename, self.data.ts, var[i_surf][i_m,i_n])
 
 
         # Aerodynamic variables at nodes
@@ -285,9 +316,8 @@ class WriteVariablesTime(BaseSolver):
 
                 filename = self.folder + "aero_" + self.settings['aero_nodes_variables'][ivariable] + "_node" + "_isurf" + str(i_surf) + "_im"+ str(i_m) + "_in"+ str(i_n) + ".dat"
 
-                with open(filename, 'a') as fid:
-                    var = getattr(self.data.aero.timestep_info[it], self.settings['aero_nodes_variables'][ivariable])
-                    self.write_nparray_to_file(fid, self.data.ts, var[i_surf][:,i_m,i_n], self.settings['delimiter'])
+                var = getattr(self.data.aero.timestep_info[it], self.settings['aero_nodes_variables'][ivariable])
+                self.add_nparray(filename, self.data.ts, var[i_surf][:,i_m,i_n])
 
         # Velocity field variables at points
         for ivariable in range(len(self.settings['vel_field_variables'])):
@@ -301,11 +331,85 @@ class WriteVariablesTime(BaseSolver):
                                     uext)
                 for ipoint in range(self.n_vel_field_points):
                     filename = self.folder + "vel_field_" + self.settings['vel_field_variables'][ivariable] + "_point" + str(ipoint) + ".dat"
-                    with open(filename, 'a') as fid:
-                        self.write_nparray_to_file(fid, self.data.ts, uext[0][:,ipoint,0], self.settings['delimiter'])
+                    self.add_nparray(filename, self.data.ts, uext[0][:,ipoint,0])
+
+        if self.h5_writer is not None:
+            self.h5_writer.write(self.data.ts, self.step_variables)
+            self.step_variables = dict()
+        self.n_buffered_steps += 1
+        if self.n_buffered_steps >= self.settings['buffer_steps']:
+            self.flush()
 
         return self.data
 
+    def add_nparray(self, filename, ts, nparray):
+        """
+        Adds a row with the time step and the values of ``nparray`` to the buffer of ``filename``. The row is written
+        with the same format as :meth:`write_nparray_to_file`.
+        """
+        if filename not in self.buffers:
+            delimiter = self.settings['delimiter']
+            if nparray.ndim == 1:
+                line_format = ("%e" + delimiter)*nparray.shape[0]
+            else:
+                line_format = (("%e" + delimiter)*(nparray.shape[1] - 1) + "%e")*nparray.shape[0]
+            self.buffers[filename] = {'format': "%d" + delimiter + line_format + "\n",
+                                      'rows': []}
+        self.add_row(filename, ts, nparray)
+
+    def add_value(self, filename, ts, value):
+        """
+        Adds a row with the time step and ``value`` to the buffer of ``filename``. The row is written with the same
+        format as :meth:`write_value_to_file`.
+        """
+        if filename not in self.buffers:
+            self.buffers[filename] = {'format': "%d" + self.settings['delimiter'] + "%e\n",
+                                      'rows': []}
+        self.add_row(filename, ts, value)
+
+    def add_row(self, filename, ts, values):
+        if self.h5_writer is not None:
+            self.step_variables[os.path.basename(filename)[:-len('.dat')]] = np.ravel(values).astype(float)
+        else:
+            self.buffers[filename]['rows'].append(np.concatenate(([ts], np.ravel(values))))
+
+    def flush(self):
+        """
+        Writes the buffered rows to the output files, opening each file once
+        """
+        for filename, buffer in self.buffers.items():
+            if len(buffer['rows']) == 0:
+                continue
+            rows = np.array(buffer['rows'], dtype=float)
+            with open(filename, 'a') as fid:
+                fid.write((buffer['format']*rows.shape[0]) % tuple(rows.ravel()))
+            buffer['rows'] = []
+        self.n_buffered_steps = 0
+
+    def close_files(self):
+        """
+        Writes the buffered rows and closes the ``h5`` file, if open
+        """
+        if getattr(self, 'buffers', None) is not None:
+            self.flush()
+        if getattr(self, 'hdfile', None) is not None:
+            try:
+                self.h5_writer.close()
+            finally:
+                self.h5_writer = None
+                self.hdfile.close()
+                self.hdfile = None
+
+    def teardown(self):
+        self.close_files()
+
+    def __getstate__(self):
+        # the open file and the writer thread cannot be pickled
+        state = self.__dict__.copy()
+        state['hdfile'] = None
+        state['h5_writer'] = None
+        return state
+
     def write_nparray_to_file(self, fid, ts, nparray, delimiter):
 
         fid.write("%d%s" % (ts,delimiter))
@@ -10,6 +10,8 @@ The main class is :class:`.Balanced` and the other available classes:
 
 * :class:`.FrequencyLimited`
 
+* :class:`.LowRankADI`
+
 correspond to the reduction algorithm.
 
 """
@@ -20,6 +22,7 @@ import sharpy.utils.cout_utils as cout
 import sharpy.utils.rom_interface as rom_interface
 import sharpy.rom.utils.librom as librom
 import sharpy.linear.src.libss as libss
+import sharpy.linear.src.libsparse as libsp
 import time
 from sharpy.linear.utils.ss_interface import LinearVector, StateVariable
 
@@ -197,6 +200,10 @@ class FrequencyLimited(BaseBalancedRom):
                                                      ' points. If True, this option also allows to automatically' \
                                                      ' tune the balanced model.'
 
+    settings_types['num_workers'] = 'int'
+    settings_default['num_workers'] = 1
+    settings_description['num_workers'] = 'Number of threads among which the integration points are distributed.'
+
     # Integrator options
     settings_options_types = dict()
     settings_options_default = dict()
@@ -290,9 +297,92 @@ class Iterative(BaseBalancedRom):
                                                        tolSmith=self.settings['smith_tol'],
                                                        tolSVD=self.settings['tolSVD'])
 
-        Ar = Tinv.dot(A.dot(T))
-        Br = Tinv.dot(B)
-        Cr = C.dot(T)
+        Ar = libsp.dot(Tinv, libsp.dot(A, T))
+        Br = libsp.dot(Tinv, B)
+        Cr = libsp.dot(C, T)
+
+        ssrom = libss.StateSpace(Ar, Br, Cr, D, dt=ss.dt)
+        return ssrom
+
+
+@bal_rom
+class LowRankADI(BaseBalancedRom):
+    __doc__ = librom.balreal_lradi.__doc__
+    _bal_rom_id = 'LowRankADI'
+
+    settings_types = dict()
+    settings_default = dict()
+    settings_description = dict()
+
+    settings_types['tolerance'] = 'float'
+    settings_default['tolerance'] = 1e-10
+    settings_description['tolerance'] = 'Relative tolerance on the residual of the Lyapunov equations'
+
+    settings_types['max_iter'] = 'int'
+    settings_default['max_iter'] = 300
+    settings_description['max_iter'] = 'Maximum number of ADI iterations'
+
+    settings_types['num_shifts'] = 'int'
+    settings_default['num_shifts'] = 20
+    settings_description['num_shifts'] = 'Number of ADI shifts'
+
+    settings_types['num_ritz'] = 'int'
+    settings_default['num_ritz'] = 30
+    settings_description['num_ritz'] = 'Number of Ritz values from which the shifts are selected'
+
+    settings_types['tolSVD'] = 'float'
+    settings_default['tolSVD'] = 1e-12
+    settings_description['tolSVD'] = 'SVD threshold for the truncation of the Gramian factors'
+
+    settings_types['num_states'] = 'int'
+    settings_default['num_states'] = 0
+    settings_description['num_states'] = 'Number of states of the ROM. If ``0``, the balanced system is truncated ' \
+                                         'according to ``hsv_tolerance``'
+
+    settings_types['hsv_tolerance'] = 'float'
+    settings_default['hsv_tolerance'] = 1e-6
+    settings_description['hsv_tolerance'] = 'Truncate states whose Hankel singular value relative to the largest is ' \
+                                            'below this tolerance'
+
+    settings_table = settings.SettingsTable()
+    __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
+
+    def __init__(self):
+        self.settings = dict()
+
+    def initialise(self, in_settings=None):
+        if in_settings is not None:
+            self.settings = in_settings
+
+        settings.to_custom_types(self.settings, self.settings_types, self.settings_default,
+                                 no_ctype=True)
+
+    def run(self, ss):
+        if self.print_info:
+            cout.cout_wrap('Reducing system using low-rank ADI balancing...')
+        t0 = time.time()
+        A, B, C, D = ss.get_mats()
+
+        s, T, Tinv = librom.balreal_lradi(A, B, C, DLTI=ss.dt is not None,
+                                          tol=self.settings['tolerance'],
+                                          max_iter=self.settings['max_iter'],
+                                          num_shifts=self.settings['num_shifts'],
+                                          num_ritz=self.settings['num_ritz'],
+                                          tolSVD=self.settings['tolSVD'])
+
+        if self.settings['num_states'] > 0:
+            nstates = min(self.settings['num_states'], len(s))
+        else:
+            nstates = np.sum(s >= self.settings['hsv_tolerance'] * s[0])
+        T = T[:, :nstates]
+        Tinv = Tinv[:nstates, :]
+
+        Ar = libsp.dot(Tinv, libsp.dot(A, T))
+        Br = libsp.dot(Tinv, B)
+        Cr = libsp.dot(C, T)
+
+        if self.print_info:
+            cout.cout_wrap('\t...completed balancing in %.2fs. ROM of %g states' % (time.time() - t0, nstates), 1)
 
         ssrom = libss.StateSpace(Ar, Br, Cr, D, dt=ss.dt)
         return ssrom
@@ -312,6 +402,8 @@ class Balanced(rom_interface.BaseRom):
 
         * Frequency limited balancing :class:`.FrequencyLimited`
 
+        * Low-rank ADI balancing of large sparse systems :class:`.LowRankADI`
+
     """
     rom_id = 'Balanced'
 
@@ -327,7 +419,7 @@ class Balanced(rom_interface.BaseRom):
     settings_types['algorithm'] = 'str'
     settings_default['algorithm'] = ''
     settings_description['algorithm'] = 'Balanced realisation method'
-    settings_options['algorithm'] = ['Direct', 'Iterative', 'FrequencyLimited']
+    settings_options['algorithm'] = ['Direct', 'Iterative', 'FrequencyLimited', 'LowRankADI']
 
     settings_types['algorithm_settings'] = 'dict'
     settings_default['algorithm_settings'] = dict()
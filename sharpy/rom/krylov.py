@@ -88,6 +88,17 @@ class Krylov(rom_interface.BaseRom):
     settings_default['restart_arnoldi'] = False
     settings_description['restart_arnoldi'] = 'Restart Arnoldi iteration with r-=1 if ROM is unstable'
 
+    settings_types['num_workers'] = 'int'
+    settings_default['num_workers'] = 1
+    settings_description['num_workers'] = 'Number of threads among which the interpolation points are distributed ' \
+                                          'in the ``dual_rational_arnoldi`` and ``mimo_rational_arnoldi`` algorithms.'
+
+    settings_types['cache_folder'] = 'str'
+    settings_default['cache_folder'] = ''
+    settings_description['cache_folder'] = 'Folder where the Krylov spaces of each interpolation point are cached, ' \
+                                           'such that re-running the reduction with additional interpolation points ' \
+                                           'only factorises the new points. Leave blank for no caching.'
+
     settings_table = settings.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
 
@@ -589,39 +600,20 @@ class Krylov(rom_interface.BaseRom):
         V = np.zeros((nx, rom_dim), dtype=complex)
         W = np.zeros((nx, rom_dim), dtype=complex)
 
+        requests = [(fc[i], rc[i], 'b', B.dot(right_tangent[:, i:i+1])) for i in range(len(fc))] + \
+                   [(fo[i], ro[i], 'c', C.T.dot(left_tangent[:, i:i+1])) for i in range(len(fo))]
+        spaces = krylovutils.build_krylov_spaces(A, requests,
+                                                 num_workers=self.settings['num_workers'],
+                                                 cache_folder=self.settings['cache_folder'])
+
         we = 0
-        dict_of_luas = dict()
         for i in range(len(fc)):
-            sigma = fc[i]
-            if sigma == np.inf:
-                approx_type = 'partial_realisation'
-                lu_A = A
-            else:
-                approx_type = 'Pade'
-                try:
-                    lu_A = dict_of_luas[sigma]
-                except KeyError:
-                    lu_A = krylovutils.lu_factor(sigma, A)
-                    dict_of_luas[sigma] = lu_A
-            V[:, we:we+rc[i]] = krylovutils.construct_krylov(rc[i], lu_A, B.dot(right_tangent[:, i:i+1]), approx_type, 'b')
-
+            V[:, we:we+rc[i]] = spaces[i]
             we += rc[i]
 
         we = 0
         for i in range(len(fo)):
-            sigma = fo[i]
-            if sigma == np.inf:
-                approx_type = 'partial_realisation'
-                lu_A = A
-            else:
-                approx_type = 'Pade'
-                try:
-                    lu_A = dict_of_luas[sigma]
-                except KeyError:
-                    lu_A = krylovutils.lu_factor(sigma, A)
-                    dict_of_luas[sigma] = lu_A
-            W[:, we:we+ro[i]] = krylovutils.construct_krylov(ro[i], lu_A, C.T.dot(left_tangent[:, i:i+1]), approx_type, 'c')
-
+            W[:, we:we+ro[i]] = spaces[len(fc) + i]
             we += ro[i]
 
         T = W.T.dot(V)
@@ -635,8 +627,6 @@ class Krylov(rom_interface.BaseRom):
         Br = W.T.dot(self.ss.B)
         Cr = self.ss.C.dot(V.dot(Tinv))
 
-        del dict_of_luas
-
         self.cpu_summary['algorithm'] = time.time() - t0
 
         return Ar, Br, Cr
@@ -690,28 +680,29 @@ class Krylov(rom_interface.BaseRom):
             r_c = r
             r_o = r
 
+        build_controllability = self.settings['single_side'] == 'controllability' or \
+                                self.settings['single_side'] == ''
+        build_observability = self.settings['single_side'] == 'observability' or self.settings['single_side'] == ''
+
+        # the Krylov spaces of each interpolation point are independent and are orthogonalised afterwards
+        requests = []
+        if build_controllability:
+            cout.cout_wrap('\tConstructing controllability space', 1)
+            requests += [(frequency[i], r_c, 'b', self.ss.B) for i in range(self.nfreq)]
+        if build_observability:
+            cout.cout_wrap('\tConstructing observability space', 1)
+            requests += [(frequency[i], r_o, 'c', self.ss.C.T) for i in range(self.nfreq)]
+        spaces = krylovutils.build_krylov_spaces(self.ss.A, requests,
+                                                 num_workers=self.settings['num_workers'],
+                                                 cache_folder=self.settings['cache_folder'])
+
         V = None
         W = None
-
-        for i in range(self.nfreq):
-
-            if self.settings['single_side'] == 'controllability' or self.settings['single_side'] == '':
-                cout.cout_wrap('\tConstructing controllability space', 1)
-                if i == 0:
-                    V = krylovutils.build_krylov_space(frequency[i], r_c, side='b', a=self.ss.A, b=self.ss.B)
-                else:
-                    Vi = krylovutils.build_krylov_space(frequency[i], r_c, side='b', a=self.ss.A, b=self.ss.B)
-                    V = np.hstack((V, Vi))
-                    V = krylovutils.mgs_ortho(V)
-
-            if self.settings['single_side'] == 'observability' or self.settings['single_side'] == '':
-                cout.cout_wrap('\tConstructing observability space', 1)
-                if i == 0:
-                    W = krylovutils.build_krylov_space(frequency[i], r_o, side='c', a=self.ss.A, b=self.ss.C.T)
-                else:
-                    Wi = krylovutils.build_krylov_space(frequency[i], r_o, side='c', a=self.ss.A, b=self.ss.C.T)
-                    W = np.hstack((W, Wi))
-                    W = krylovutils.mgs_ortho(W)
+        if build_controllability:
+            V = merge_krylov_spaces(spaces[:self.nfreq])
+            spaces = spaces[self.nfreq:]
+        if build_observability:
+            W = merge_krylov_spaces(spaces[:self.nfreq])
 
         if self.settings['single_side'] == 'controllability' or self.settings['single_side'] == 'observability':
             if self.settings['single_side'] == 'observability':
@@ -1030,6 +1021,23 @@ class Krylov(rom_interface.BaseRom):
         # pass
 
 
+def merge_krylov_spaces(spaces):
+    """
+    Concatenates the Krylov spaces of each interpolation point, orthogonalising the basis after each addition.
+
+    Args:
+        spaces (list): Krylov space of each interpolation point
+
+    Returns:
+        np.ndarray: Orthonormal basis
+    """
+    V = spaces[0]
+    for Vi in spaces[1:]:
+        V = np.hstack((V, Vi))
+        V = krylovutils.mgs_ortho(V)
+    return V
+
+
 def reduction_checks(T, Tinv):
 
     cout.cout_wrap('Tm condition = %e' % np.linalg.cond(T))
@@ -1,4 +1,6 @@
 """Krylov Model Reduction Methods Utilities"""
+import hashlib
+import os
 import scipy.sparse as scsp
 import numpy as np
 import scipy.linalg as sclalg
@@ -345,14 +347,15 @@ def construct_mimo_krylov(r, lu_A_input, B, approx_type='Pade', side='controllab
     return V[:, :t]
 
 
-def build_krylov_space(frequency, r, side, a, b):
+def build_krylov_space(frequency, r, side, a, b, lu_a=None):
 
     if frequency == np.inf or frequency.real == np.inf:
         approx_type = 'partial_realisation'
         lu_a = a
     else:
         approx_type = 'Pade'
-        lu_a = lu_factor(frequency, a)
+        if lu_a is None:
+            lu_a = lu_factor(frequency, a)
 
     try:
         nu = b.shape[1]
@@ -369,6 +372,93 @@ def build_krylov_space(frequency, r, side, a, b):
     return v
 
 
+def build_krylov_spaces(a, requests, num_workers=1, cache_folder=''):
+    r"""
+    Krylov spaces for a set of interpolation points, see :func:`build_krylov_space`.
+
+    The requests are grouped by interpolation point such that :math:`(\sigma \mathbf{I} - \mathbf{A})` is factorised
+    once per point. The points are independent and are distributed among ``num_workers`` threads (see
+    :func:`sharpy.linear.src.libsparse.map_threads`).
+
+    If a ``cache_folder`` is given, each space is saved to it under a hash of ``(a, b, frequency, r, side)``
+    and loaded from it when the same space is requested again, e.g. when re-running a reduction with additional
+    interpolation points. Points whose spaces are all cached are not factorised.
+
+    Args:
+        a (np.ndarray or csc_matrix): Dynamics matrix
+        requests (list): ``(frequency, r, side, b)`` tuple for each Krylov space
+        num_workers (int): Number of threads among which the interpolation points are distributed
+        cache_folder (str): Folder where the Krylov spaces are cached. Leave blank for no caching.
+
+    Returns:
+        list: Krylov space for each of the requests
+    """
+    if cache_folder:
+        os.makedirs(cache_folder, exist_ok=True)
+        a_hash = array_hash(a)
+
+    points = dict()
+    for i_request, (frequency, r, side, b) in enumerate(requests):
+        points.setdefault(complex(frequency), []).append(i_request)
+
+    def krylov_spaces_at_point(point_requests):
+        spaces = dict()
+        files = dict()
+        for i_request in point_requests:
+            frequency, r, side, b = requests[i_request]
+            if cache_folder:
+                key = hashlib.sha1(a_hash.encode())
+                key.update(array_hash(np.asarray(b)).encode())
+                key.update(repr((complex(frequency), int(r), side)).encode())
+                files[i_request] = os.path.join(cache_folder, 'krylov_%s.npy' % key.hexdigest())
+                if os.path.isfile(files[i_request]):
+                    spaces[i_request] = np.load(files[i_request])
+
+        missing = [i_request for i_request in point_requests if i_request not in spaces]
+        if missing:
+            frequency = requests[missing[0]][0]
+            lu_a = None
+            if not (frequency == np.inf or frequency.real == np.inf):
+                lu_a = lu_factor(frequency, a)
+            for i_request in missing:
+                frequency, r, side, b = requests[i_request]
+                spaces[i_request] = build_krylov_space(frequency, r, side, a, b, lu_a=lu_a)
+                if cache_folder:
+                    np.save(files[i_request], spaces[i_request])
+
+        return spaces
+
+    spaces = dict()
+    for result in libsp.map_threads(krylov_spaces_at_point, points.values(), num_workers):
+        spaces.update(result)
+
+    return [spaces[i_request] for i_request in range(len(requests))]
+
+
+def array_hash(a):
+    """
+    SHA1 hash of the contents of a dense or sparse matrix.
+
+    Args:
+        a (np.ndarray or sparse matrix): Matrix
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    h = hashlib.sha1()
+    if scsp.issparse(a):
+        a = scsp.csc_matrix(a, copy=True)
+        a.sort_indices()
+        h.update(repr(('sparse', a.shape, a.dtype.str)).encode())
+        for array in [a.data, a.indices, a.indptr]:
+            h.update(np.ascontiguousarray(array).tobytes())
+    else:
+        a = np.ascontiguousarray(a)
+        h.update(repr(('dense', a.shape, a.dtype.str)).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
 def evec(j):
     """j-th unit vector (in row format)
 
@@ -6,9 +6,12 @@ S. Maraniello, 14 Feb 2018
 import warnings
 import numpy as np
 import scipy.linalg as scalg
+import scipy.sparse as scsp
+import scipy.sparse.linalg
 
 import sharpy.linear.src.libsparse as libsp
 import sharpy.linear.src.libss as libss
+import sharpy.rom.utils.krylovutils as krylovutils
 
 
 def balreal_direct_py(A, B, C, DLTI=True, Schur=False, full_outputs=False):
@@ -695,8 +698,315 @@ def low_rank_smith(A, Q, tol=1e-10, Square=True, tolSVD=1e-12, tolAbs=False,
     return Zk
 
 
+def balreal_lradi(A, B, C, DLTI=True, tol=1e-10, max_iter=300, num_shifts=20, num_ritz=30, tolSVD=1e-12,
+                  Print=False):
+    r"""
+    Find balanced realisation of large, possibly sparse, LTI systems from low-rank factors of the Gramians computed
+    with the low-rank alternating direction implicit (LR-ADI) method, see :func:`lyap_lradi`.
+
+    Given the factors :math:`\mathbf{W_c} \approx \mathbf{Z_c\,Z_c^T}` and
+    :math:`\mathbf{W_o} \approx \mathbf{Z_o\,Z_o^T}`, the balancing transformation follows from the SVD
+    :math:`\mathbf{Z_o^T\,Z_c} = \mathbf{U\,\Sigma\,V^*}` as in :func:`balreal_iter`:
+
+    .. math::
+        \mathbf{T} &= \mathbf{Z_c\,V\,\Sigma}^{-1/2} \\
+        \mathbf{T}^{-1} &= \mathbf{\Sigma}^{-1/2}\,\mathbf{U^T\,Z_o^T}
+
+    such that the balanced system is :math:`\mathbf{A_b} = \mathbf{T^{-1}\,A\,T}`, with :math:`\mathbf{T}` of
+    size :math:`n \times r` and :math:`r` the rank of the Gramian factors. The state matrix is only used through
+    products and (sparse) factorisations, and is never converted to a dense array.
+
+    Args:
+        A (np.ndarray or libsp.csc_matrix): State matrix.
+        B (np.ndarray or libsp.csc_matrix): Input matrix.
+        C (np.ndarray or libsp.csc_matrix): Output matrix.
+        DLTI (bool): Discrete time system.
+        tol (float): Relative tolerance on the residual of the Lyapunov equations.
+        max_iter (int): Maximum number of ADI iterations.
+        num_shifts (int): Number of ADI shifts.
+        num_ritz (int): Number of Ritz values used to select the shifts, see :func:`lradi_shifts`.
+        tolSVD (float): Relative tolerance for the truncation of the Gramian factors and of the Hankel singular
+            values.
+        Print (bool): Print the convergence history.
+
+    Returns:
+        tuple: Hankel singular values and transformation matrices ``(s, T, Tinv)``.
+    """
+
+    # the right hand side factors are dense blocks of few columns
+    B = libsp.dense(B)
+    C = libsp.dense(C)
+
+    shifts = lradi_shifts(A, num_shifts, num_ritz, DLTI)
+    Zc, Zo = lyap_lradi(A, [B, C.T], shifts, DLTI=DLTI, tol=tol, max_iter=max_iter, tolSVD=tolSVD, Print=Print)
+
+    M = np.dot(Zo.T, Zc)
+    U, s, Vh = scalg.svd(M, full_matrices=False)
+    rank = np.sum(s > tolSVD * s[0])
+    U, s, Vh = U[:, :rank], s[:rank], Vh[:rank, :]
+    sinv = s ** (-0.5)
+    T = np.dot(Zc, Vh.T * sinv)
+    Tinv = np.dot((U * sinv).T, Zo.T)
+
+    return s, T, Tinv
+
+
+def lyap_lradi(A, rhs_factors, shifts, DLTI=True, tol=1e-10, max_iter=300, tolSVD=1e-12, Print=False):
+    r"""
+    Low-rank ADI solution of the controllability and observability Lyapunov equations
+
+    .. math::
+        \mathbf{A\,W_c\,A^T - W_c + B\,B^T} &= 0 \\
+        \mathbf{A^T\,W_o\,A - W_o + C^T\,C} &= 0
+
+    for discrete time systems, or :math:`\mathbf{A\,W_c + W_c\,A^T + B\,B^T} = 0` and
+    :math:`\mathbf{A^T\,W_o + W_o\,A + C^T\,C} = 0` for continuous time systems, in the factorised form
+    :math:`\mathbf{W} \approx \mathbf{Z\,Z^T}`.
+
+    Discrete time equations are mapped to continuous time through the Cayley transformation
+    :math:`\mathbf{A}_c = (\mathbf{A} - \mathbf{I})(\mathbf{A} + \mathbf{I})^{-1}`, with
+    :math:`\mathbf{B}_c = \sqrt{2}(\mathbf{A} + \mathbf{I})^{-1}\mathbf{B}`, which preserves the Gramian. The
+    residual based LR-ADI iteration [1] is then
+
+    .. math::
+        \mathbf{V}_k &= (\mathbf{A}_c + p_k \mathbf{I})^{-1}\mathbf{W}_{k-1} \\
+        \mathbf{W}_k &= \mathbf{W}_{k-1} - 2\,\text{Re}(p_k)\,\mathbf{V}_k \\
+        \mathbf{Z}_k &= [\mathbf{Z}_{k-1}, \sqrt{-2\,\text{Re}(p_k)}\,\mathbf{V}_k]
+
+    with :math:`\mathbf{W}_0 = \mathbf{B}_c`, until the relative residual norm
+    :math:`\|\mathbf{W}_k^H\mathbf{W}_k\|_2 / \|\mathbf{B}_c^T\mathbf{B}_c\|_2` falls below ``tol``. The
+    shifts are applied cyclically. A single LU factorisation of
+    :math:`(\mathbf{A}_c + p_k \mathbf{I})` (which is proportional to a shifted :math:`\mathbf{A}`) is computed per
+    shift, and the observability equation is solved with the transposed factors. For discrete time systems, the
+    shift :math:`p_k=-1` results in the Smith step :math:`\mathbf{V}_k = -(\mathbf{A} + \mathbf{I})\mathbf{W}_{k-1}/2`,
+    which requires no factorisation.
+
+    Complex shifts must be given in consecutive conjugate pairs, such that the real factor of the Gramian is
+    :math:`[\text{Re}(\mathbf{Z}), \text{Im}(\mathbf{Z})]`. The factors are compressed through a truncated SVD of
+    relative tolerance ``tolSVD``.
+
+    Args:
+        A (np.ndarray or libsp.csc_matrix): State matrix.
+        rhs_factors (list): Right hand side factors ``[B, C.T]``. Use ``None`` to skip either equation.
+        shifts (np.ndarray): ADI shifts for the continuous time (transformed) equation, with negative real part.
+        DLTI (bool): Discrete time system.
+        tol (float): Relative tolerance on the residual.
+        max_iter (int): Maximum number of iterations.
+        tolSVD (float): Relative tolerance for the compression of the factors.
+        Print (bool): Print the convergence history.
+
+    Returns:
+        list: Real low-rank factors :math:`\mathbf{Z}` of each Gramian.
+
+    References:
+        [1] P. Benner, P. Kuerschner and J. Saak, "An improved numerical method for balanced truncation for
+        symmetric second-order systems", 2013. / "Efficient handling of complex shift parameters in the low-rank ADI
+        method", Numerical Algorithms, 2013.
+    """
+
+    factorisations = dict()
+
+    def solve_shifted(p, rhs, trans):
+        # (A_c + p I)^{-1} rhs, or its transpose
+        if DLTI and p == -1.:
+            # Smith step, (A_c - I)^{-1} = -(A + I) / 2
+            if trans:
+                return - 0.5 * (rhs + libsp.dot(rhs.T, A).T)
+            return - 0.5 * (rhs + libsp.dot(A, rhs))
+        try:
+            lu_a = factorisations[p]
+        except KeyError:
+            if DLTI:
+                # (A_c + p I)^{-1} = (A + I) ((1 + p) A - (1 - p) I)^{-1}
+                lu_a = krylovutils.lu_factor(1. - p, (1. + p) * A)
+            else:
+                lu_a = krylovutils.lu_factor(-p, A)
+            factorisations[p] = lu_a
+        x = - krylovutils.lu_solve(lu_a, rhs, trans=trans)
+        if DLTI:
+            if trans:
+                return x + libsp.dot(x.T, A).T
+            return x + libsp.dot(A, x)
+        return x
+
+    if DLTI:
+        lu_plus = krylovutils.lu_factor(-1., A)  # -(A + I)
+
+    factors = []
+    for trans, Q in enumerate(rhs_factors):
+        if Q is None:
+            factors.append(None)
+            continue
+        if scsp.issparse(Q):
+            Q = Q.toarray()
+        Q = np.asarray(Q, dtype=float).reshape((A.shape[0], -1))
+        if DLTI:
+            W = - np.sqrt(2.) * krylovutils.lu_solve(lu_plus, Q, trans=trans)
+        else:
+            W = Q.copy()
+        W = W.astype(complex)
+        res0 = np.linalg.norm(W, 2) ** 2
+
+        Z_list = []
+        for kk in range(max_iter):
+            p = shifts[kk % len(shifts)]
+            V = solve_shifted(p, W, trans)
+            W = W - 2. * p.real * V
+            Z_list.append(np.sqrt(-2. * p.real) * V)
+
+            res = np.linalg.norm(W, 2) ** 2 / res0
+            if Print:
+                print('%.3d\t%.2e' % (kk, res))
+            # complete conjugate pairs before stopping
+            if res < tol and (p.imag == 0. or np.conj(p) == shifts[(kk - 1) % len(shifts)]):
+                break
+        else:
+            warnings.warn('LR-ADI did not converge to tolerance %.1e in %g iterations (relative residual %.1e)'
+                          % (tol, max_iter, res))
+
+        Z = np.concatenate(Z_list, axis=1)
+        Z = np.concatenate((Z.real, Z.imag[:, np.any(Z.imag != 0, axis=0)]), axis=1)
+
+        # column compression
+        Qz, Rz = scalg.qr(Z, mode='economic')
+        Uz, svz = scalg.svd(Rz, full_matrices=False)[:2]
+        rank = np.sum(svz > tolSVD * svz[0])
+        factors.append(np.dot(Qz, Uz[:, :rank] * svz[:rank]))
+
+    return factors
+
+
+def lradi_shifts(A, num_shifts=20, num_ritz=30, DLTI=True):
+    r"""
+    Heuristic ADI shifts of Penzl [1] for the continuous time (Cayley transformed, if ``DLTI``) state matrix
+    :math:`\mathbf{A}_c`. See :func:`penzl_shifts`.
+
+    For continuous time systems, the shifts are selected among the Ritz values of largest magnitude of
+    :math:`\mathbf{A}` and of its inverse. For discrete time systems, the candidates are the Cayley transform
+    :math:`(\lambda - 1)/(\lambda + 1)` of the Ritz values of largest magnitude of :math:`\mathbf{A}`, i.e. of
+    the slowest modes, and :math:`-1`. The latter is the image of :math:`\lambda=0`, for which the ADI step reduces
+    to a Smith step :math:`\mathbf{W}_k = -\mathbf{A\,W}_{k-1}`. Smith steps annihilate the (nearly nilpotent)
+    convective dynamics of the wake, whose Ritz values are not reliable due to their strong non-normality.
+
+    Args:
+        A (np.ndarray or libsp.csc_matrix): State matrix.
+        num_shifts (int): Number of shifts.
+        num_ritz (int): Number of Ritz values of :math:`\mathbf{A}` (and of its inverse for continuous time
+            systems).
+        DLTI (bool): Discrete time system.
+
+    Returns:
+        np.ndarray: ADI shifts, where complex shifts are given in conjugate pairs.
+
+    References:
+        [1] T. Penzl, "A cyclic low-rank Smith method for large sparse Lyapunov equations", SIAM Journal on
+        Scientific Computing, 2000.
+    """
+    n = A.shape[0]
+
+    def matvec(x):
+        return libsp.dot(A, x)
+
+    operators = [matvec]
+    if not DLTI:
+        lu_zero = krylovutils.lu_factor(0., A)  # -A
+
+        def matvec_inv(x):
+            return - krylovutils.lu_solve(lu_zero, x)
+
+        operators.append(matvec_inv)
+
+    if n <= 2 * num_ritz + 2:
+        ritz = np.linalg.eigvals(libsp.dense(A))
+    else:
+        ritz_list = []
+        for op in operators:
+            linear_operator = scsp.linalg.LinearOperator((n, n), matvec=op, dtype=complex)
+            try:
+                ritz_here = scsp.linalg.eigs(linear_operator, k=num_ritz, which='LM', return_eigenvectors=False,
+                                             v0=np.ones(n, dtype=complex))
+            except scsp.linalg.ArpackNoConvergence as err:
+                # approximate Ritz values are sufficient for the shifts
+                ritz_here = err.eigenvalues
+            ritz_list.append(ritz_here if op is matvec else 1. / ritz_here)
+        ritz = np.concatenate(ritz_list)
+
+    # Ritz values of non-normal matrices may lie outside the stable region even if the system is stable, in which
+    # case they are discarded as in [1]
+    if DLTI:
+        ritz = np.concatenate(((ritz[np.abs(ritz) < 1.] - 1.) / (ritz[np.abs(ritz) < 1.] + 1.), [-1.]))
+    else:
+        ritz = ritz[ritz.real < 0]
+        if len(ritz) == 0:
+            raise ValueError('No stable Ritz values found while selecting the ADI shifts. The system must be stable.')
+    # complete conjugate pairs
+    ritz = np.concatenate((ritz, ritz[ritz.imag != 0].conj()))
+
+    return penzl_shifts(ritz, num_shifts)
+
+
+def penzl_shifts(candidates, num_shifts):
+    r"""
+    Selection of ADI shifts among a set of candidates with negative real part (closed under conjugation) that
+    heuristically minimises the spectral radius of the ADI iteration
+
+    .. math:: \max_{t \in \mathcal{R}} \prod_{j} \left|\frac{t - p_j}{t + p_j}\right|
+
+    where :math:`\mathcal{R}` is the set of candidates [1]. Complex shifts are added with their conjugate.
+
+    Args:
+        candidates (np.ndarray): Candidate shifts, e.g. Ritz values of the state matrix.
+        num_shifts (int): Maximum number of shifts.
+
+    Returns:
+        np.ndarray: Shifts, where complex shifts are given in consecutive conjugate pairs.
+
+    References:
+        [1] T. Penzl, "A cyclic low-rank Smith method for large sparse Lyapunov equations", SIAM Journal on
+        Scientific Computing, 2000.
+    """
+    candidates = np.unique(np.round(candidates, 12))
+
+    def spectral_radius(shifts):
+        return np.prod(np.abs((candidates[:, None] - shifts[None, :]) / (candidates[:, None] + shifts[None, :])),
+                       axis=1)
+
+    def add_shift(shifts, p):
+        if np.abs(p.imag) > 1e-12 * np.abs(p):
+            return shifts + [p, np.conj(p)]
+        return shifts + [p.real]
+
+    radius = [np.max(spectral_radius(np.array([p, np.conj(p)]))) for p in candidates]
+    shifts = add_shift([], candidates[np.argmin(radius)])
+
+    while len(shifts) < num_shifts:
+        p = candidates[np.argmax(spectral_radius(np.array(shifts)))]
+        if np.any(np.abs(np.array(shifts) - p) < 1e-12 * np.abs(p)):
+            break
+        shifts = add_shift(shifts, p)
+
+    return np.array(shifts, dtype=complex)
+
+
 ### utilities for balfreq
 
+def solve_frequency_points(solve_point, num_points, num_workers=1):
+    """
+    Calls ``solve_point(kk)`` for each of the ``num_points`` integration points of the frequency limited Gramians.
+
+    The integration points are independent, hence they are distributed among ``num_workers`` threads (see
+    :func:`sharpy.linear.src.libsparse.map_threads`). The threads share the system matrices and ``solve_point`` writes
+    the solution at each point directly into its own columns of the preallocated Gramian factors, such that no copies
+    are made when assembling the factors.
+
+    Args:
+        solve_point (callable): Function of the index of the integration point.
+        num_points (int): Number of integration points.
+        num_workers (int): Number of threads among which the integration points are distributed.
+    """
+    libsp.map_threads(solve_point, range(num_points), num_workers)
+
+
 def get_trapz_weights(k0, kend, Nk, knyq=False):
     """
     Returns uniform frequency grid (kv of length Nk) and weights (wv) for
@@ -810,9 +1120,8 @@ def balfreq(SS, DictBalFreq):
           points. If True, this option also allows to automatically tune the
           balanced model.
 
-
-    Future options:
-        - Ncpu: for parallel run
+        - ``num_workers``: number of threads among which the integration points
+          are distributed (see :func:`solve_frequency_points`). Defaults to 1.
 
 
     The following integration schemes are available:
@@ -887,6 +1196,9 @@ def balfreq(SS, DictBalFreq):
     if 'get_frequency_response' not in DictBalFreq:
         DictBalFreq['get_frequency_response'] = False
 
+    if 'num_workers' not in DictBalFreq:
+        DictBalFreq['num_workers'] = 1
+
     ### get integration points and weights
 
     # Nyquist frequency
@@ -935,10 +1247,10 @@ def balfreq(SS, DictBalFreq):
     Zo = np.zeros((SS.states, 2 * SS.outputs * Nk_low), )
 
     if DictBalFreq['get_frequency_response']:
-        Yfreq = np.empty((SS.outputs, SS.inputs, Nk_low,), dtype=np.complex_)
+        Yfreq = np.empty((SS.outputs, SS.inputs, Nk_low,), dtype=complex)
         kv = kv_low
 
-    for kk in range(len(kvdt)):
+    def solve_point(kk):
 
         zval = zv[kk]
         Intfact = wv[kk]  # integration factor
@@ -955,7 +1267,7 @@ def balfreq(SS, DictBalFreq):
 
         ### ----- observability
         if kk >= Nk_low:
-            continue
+            return
 
         Qobs = Intfact * libsp.solve(np.conj(zval) * Eye - SS.A.T, SS.C.T)
 
@@ -963,10 +1275,7 @@ def balfreq(SS, DictBalFreq):
         Zo[:, kkvec[:SS.outputs]] = Intfact * Qobs.real
         Zo[:, kkvec[SS.outputs:]] = Intfact * Qobs.imag
 
-    # delete full matrices
-    Kernel = None
-    Qctrl = None
-    Qobs = None
+    solve_frequency_points(solve_point, len(kvdt), num_workers=DictBalFreq['num_workers'])
 
     # LRSQM (optimised)
     U, hsv, Vh = scalg.svd(np.dot(Zo.T, Zc), full_matrices=False)
@@ -1,4 +1,5 @@
 import ctypes as ct
+import math
 import time
 import copy
 import threading
@@ -15,9 +16,11 @@ import sharpy.utils.controller_interface as controller_interface
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings_utils
 import sharpy.utils.algebra as algebra
+import sharpy.utils.datastructures as datastructures
 import sharpy.utils.exceptions as exc
 import sharpy.io.network_interface as network_interface
 import sharpy.utils.generator_interface as gen_interface
+import sharpy.utils.fsiacceleration as fsiacceleration
 
 
 @solver
@@ -113,6 +116,26 @@ class DynamicCoupled(BaseSolver):
     settings_description['dynamic_relaxation'] = 'Controls if relaxation factor is modified during the FSI iteration ' \
                                                  'process'
 
+    settings_types['fsi_accelerator'] = 'str'
+    settings_default['fsi_accelerator'] = 'Relaxation'
+    settings_description['fsi_accelerator'] = 'Convergence accelerator of the FSI iteration. ``Relaxation`` uses the ' \
+                                              '``relaxation_factor``, modified with ``dynamic_relaxation``. The rest ' \
+                                              'use ``relaxation_factor`` in their plain relaxation iterations. See ' \
+                                              ':py:mod:`sharpy.utils.fsiacceleration`'
+    settings_options['fsi_accelerator'] = ['Relaxation', 'Aitken', 'IQN-ILS']
+
+    settings_types['fsi_accelerator_settings'] = 'dict'
+    settings_default['fsi_accelerator_settings'] = dict()
+    settings_description['fsi_accelerator_settings'] = 'Settings of the ``fsi_accelerator``'
+
+    settings_types['predictor_order'] = 'int'
+    settings_default['predictor_order'] = 0
+    settings_description['predictor_order'] = 'Order of the polynomial extrapolation of the structural state and ' \
+                                              'forces of the previous time steps used as initial guess of the FSI ' \
+                                              'iteration. ``0`` starts from the previous time step. If the FSI ' \
+                                              'iteration does not converge from the prediction, the time step is ' \
+                                              'repeated starting from the previous time step'
+
     settings_types['postprocessors'] = 'list(str)'
     settings_default['postprocessors'] = list()
     settings_description['postprocessors'] = 'List of the postprocessors to run at the end of every time step'
@@ -137,6 +160,15 @@ class DynamicCoupled(BaseSolver):
     settings_description['cleanup_previous_solution'] = 'Controls if previous ``timestep_info`` arrays are ' \
                                                         'reset before running the solver'
 
+    settings_types['history_length'] = 'int'
+    settings_default['history_length'] = 0
+    settings_description['history_length'] = 'Number of time steps retained in memory in ``timestep_info``. ' \
+                                              'Older time steps are replaced by ``None`` once the online ' \
+                                              'postprocessors have been run on them. If ``0``, the full history ' \
+                                              'is kept. At least the last 3 time steps are retained, as required ' \
+                                              'by the unsteady aerodynamic forces. Note that the filtering ' \
+                                              'of ``gamma_dot`` only uses the retained time steps'
+
     settings_types['include_unsteady_force_contribution'] = 'bool'
     settings_default['include_unsteady_force_contribution'] = False
     settings_description['include_unsteady_force_contribution'] = 'If on, added mass contribution is added to the ' \
@@ -181,6 +213,9 @@ class DynamicCoupled(BaseSolver):
     settings_table = settings_utils.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
 
+    # time steps needed by the solvers (``compute_gamma_dot`` uses the last 3 aerodynamic time steps)
+    min_history_length = 3
+
     def __init__(self):
         self.data = None
         self.settings = None
@@ -193,6 +228,7 @@ class DynamicCoupled(BaseSolver):
         self.res_dqddt = 0.0
 
         self.previous_force = None
+        self.accelerator = None
 
         self.dt = 0.
         self.substep_dt = 0.
@@ -219,6 +255,9 @@ class DynamicCoupled(BaseSolver):
         self.runtime_generators = dict()
         self.with_runtime_generators = False
 
+        # preallocated time steps reused through the time loop
+        self.scratch_steps = dict()
+
     def get_g(self):
         """
         Getter for ``g``, the gravity value
@@ -267,11 +306,15 @@ class DynamicCoupled(BaseSolver):
         self.initial_n_substeps = self.settings['structural_substeps']
 
         self.print_info = self.settings['print_info']
+        self.scratch_steps = dict()
         if self.settings['cleanup_previous_solution']:
             # if there's data in timestep_info[>0], copy the last one to
             # timestep_info[0] and remove the rest
             self.cleanup_timestep_info()
 
+        if self.settings['history_length'] > 0:
+            self.set_history_length(max(self.settings['history_length'], self.min_history_length))
+
         if not restart:
             self.structural_solver = solver_interface.initialise_solver(
                 self.settings['structural_solver'])
@@ -285,6 +328,12 @@ class DynamicCoupled(BaseSolver):
                                     restart=restart)
         self.data = self.aero_solver.data
 
+        self.accelerator = None
+        if self.settings['fsi_accelerator'] != 'Relaxation':
+            self.accelerator = fsiacceleration.initialise_accelerator(self.settings['fsi_accelerator'],
+                                                                      self.settings['relaxation_factor'],
+                                                                      self.settings['fsi_accelerator_settings'])
+
         # initialise postprocessors
         if self.settings['postprocessors']:
             self.with_postprocessors = True
@@ -376,6 +425,19 @@ class DynamicCoupled(BaseSolver):
 
         self.data.ts = 0
 
+    def set_history_length(self, history_length):
+        """
+        Bounds the number of time steps kept in memory by the aerodynamic and
+        structural ``timestep_info``. See :class:`~sharpy.utils.datastructures.TimeStepHistory`.
+
+        Args:
+            history_length (int): number of time steps retained
+        """
+        self.data.structure.timestep_info = datastructures.TimeStepHistory(self.data.structure.timestep_info,
+                                                                           history_length)
+        self.data.aero.timestep_info = datastructures.TimeStepHistory(self.data.aero.timestep_info,
+                                                                      history_length)
+
     def process_controller_output(self, controlled_state):
         """
         This function modified the solver properties and parameters as
@@ -523,8 +585,8 @@ class DynamicCoupled(BaseSolver):
                 self.logger.debug('Time loop - received {}'.format(values))
                 self.set_of_variables.update_timestep(self.data, values)
 
-            structural_kstep = self.data.structure.timestep_info[-1].copy()
-            aero_kstep = self.data.aero.timestep_info[-1].copy()
+            structural_kstep = self.copy_to_scratch(self.data.structure.timestep_info[-1], 'structural_kstep')
+            aero_kstep = self.copy_to_scratch(self.data.aero.timestep_info[-1], 'aero_kstep')
             self.logger.debug('Time step {}'.format(self.data.ts))
 
             # Add the controller here
@@ -554,12 +616,28 @@ class DynamicCoupled(BaseSolver):
 
             # Copy the controlled states so that the interpolation does not
             # destroy the previous information
-            controlled_structural_kstep = structural_kstep.copy()
-            controlled_aero_kstep = aero_kstep.copy()
-
-            for k in range(self.settings['fsi_substeps'] + 1):
+            controlled_structural_kstep = self.copy_to_scratch(structural_kstep, 'controlled_structural_kstep')
+            controlled_aero_kstep = self.copy_to_scratch(aero_kstep, 'controlled_aero_kstep')
+            previous_runtime_steady_forces = self.copy_to_scratch(structural_kstep.runtime_steady_forces,
+                                                                  'previous_runtime_steady_forces')
+            previous_runtime_unsteady_forces = self.copy_to_scratch(structural_kstep.runtime_unsteady_forces,
+                                                                    'previous_runtime_unsteady_forces')
+
+            predicted_kstep = self.predict_structural_step(controlled_structural_kstep)
+            generate_runtime_forces = self.with_runtime_generators
+            if self.accelerator is not None:
+                self.accelerator.new_step()
+            k = -1
+            while k < self.settings['fsi_substeps']:
+                k += 1
                 if (k == self.settings['fsi_substeps'] and
                         self.settings['fsi_substeps']):
+                    if predicted_kstep is not None:
+                        predicted_kstep = None
+                        structural_kstep = self.repeat_time_step(structural_kstep, controlled_structural_kstep)
+                        generate_runtime_forces = False
+                        k = -1
+                        continue
                     print_res = 0 if self.res == 0. else np.log10(self.res)
                     print_res_dqdt = 0 if self.res_dqdt == 0. else np.log10(self.res_dqdt)
                     cout.cout_wrap(("The FSI solver did not converge!!! residuals: %f %f" % (print_res, print_res_dqdt)))
@@ -568,8 +646,11 @@ class DynamicCoupled(BaseSolver):
                         aero_kstep)
                     break
 
+                if k == 0 and predicted_kstep is not None:
+                    structural_kstep = predicted_kstep
+
                 # generate new grid (already rotated)
-                aero_kstep = controlled_aero_kstep.copy()
+                aero_kstep = self.copy_to_scratch(controlled_aero_kstep, 'aero_kstep')
                 self.aero_solver.update_custom_grid(
                     structural_kstep,
                     aero_kstep)
@@ -585,10 +666,10 @@ class DynamicCoupled(BaseSolver):
                         else:
                             force_coeff = 1.
 
-                previous_runtime_steady_forces = structural_kstep.runtime_steady_forces.astype(dtype=ct.c_double, order='F', copy=True)
-                previous_runtime_unsteady_forces = structural_kstep.runtime_unsteady_forces.astype(dtype=ct.c_double, order='F', copy=True)
+                previous_runtime_steady_forces[:] = structural_kstep.runtime_steady_forces
+                previous_runtime_unsteady_forces[:] = structural_kstep.runtime_unsteady_forces
                 # Add external forces
-                if self.with_runtime_generators:
+                if generate_runtime_forces:
                     structural_kstep.runtime_steady_forces.fill(0.)
                     structural_kstep.runtime_unsteady_forces.fill(0.)
                     params = dict()
@@ -607,12 +688,12 @@ class DynamicCoupled(BaseSolver):
                                                  unsteady_contribution=unsteady_contribution)
                 self.time_aero += time.perf_counter() - ini_time_aero
 
-                previous_kstep = structural_kstep.copy()
-                structural_kstep = controlled_structural_kstep.copy()
-                structural_kstep.runtime_steady_forces = previous_kstep.runtime_steady_forces.astype(dtype=ct.c_double, order='F', copy=True)
-                structural_kstep.runtime_unsteady_forces = previous_kstep.runtime_unsteady_forces.astype(dtype=ct.c_double, order='F', copy=True)
-                previous_kstep.runtime_steady_forces = previous_runtime_steady_forces.astype(dtype=ct.c_double, order='F', copy=True)
-                previous_kstep.runtime_unsteady_forces = previous_runtime_unsteady_forces.astype(dtype=ct.c_double, order='F', copy=True)
+                previous_kstep = self.copy_to_scratch(structural_kstep, 'previous_structural_kstep')
+                structural_kstep = self.copy_to_scratch(controlled_structural_kstep, 'structural_kstep')
+                structural_kstep.runtime_steady_forces[:] = previous_kstep.runtime_steady_forces
+                structural_kstep.runtime_unsteady_forces[:] = previous_kstep.runtime_unsteady_forces
+                previous_kstep.runtime_steady_forces[:] = previous_runtime_steady_forces
+                previous_kstep.runtime_unsteady_forces[:] = previous_runtime_unsteady_forces
 
                 # move the aerodynamic surface according the the structural one
                 self.aero_solver.update_custom_grid(structural_kstep,
@@ -623,11 +704,16 @@ class DynamicCoupled(BaseSolver):
                                 force_coeff)
 
                 # relaxation
-                relax_factor = self.relaxation_factor(k)
-                relax(self.data.structure,
-                      structural_kstep,
-                      previous_kstep,
-                      relax_factor)
+                if self.accelerator is not None:
+                    accelerate(self.accelerator,
+                               structural_kstep,
+                               previous_kstep)
+                else:
+                    relax_factor = self.relaxation_factor(k)
+                    relax(self.data.structure,
+                          structural_kstep,
+                          previous_kstep,
+                          relax_factor)
 
                 # check if nan anywhere.
                 # if yes, raise exception
@@ -636,7 +722,7 @@ class DynamicCoupled(BaseSolver):
                 if np.isnan(structural_kstep.unsteady_applied_forces).any():
                     raise exc.NotConvergedSolver('NaN found in unsteady_applied_forces!')
 
-                copy_structural_kstep = structural_kstep.copy()
+                copy_structural_kstep = self.copy_to_scratch(structural_kstep, 'copy_structural_kstep')
                 ini_time_struc = time.perf_counter()
                 for i_substep in range(
                         self.settings['structural_substeps'] + 1):
@@ -669,13 +755,18 @@ class DynamicCoupled(BaseSolver):
                         aero_kstep)
                     break
 
+            if self.accelerator is not None:
+                self.accelerator.end_step()
+
             # move the aerodynamic surface according the the structural one
             self.aero_solver.update_custom_grid(structural_kstep, aero_kstep)
 
+            # the new time steps are allocated by add_step, or recycled from those released by a bounded history, so
+            # they are filled in place
             self.aero_solver.add_step()
-            self.data.aero.timestep_info[-1] = aero_kstep.copy()
+            aero_kstep.copy_into(self.data.aero.timestep_info[-1])
             self.structural_solver.add_step()
-            self.data.structure.timestep_info[-1] = structural_kstep.copy()
+            structural_kstep.copy_into(self.data.structure.timestep_info[-1])
 
             final_time = time.perf_counter()
 
@@ -710,10 +801,110 @@ class DynamicCoupled(BaseSolver):
                     self.logger.debug('Data output Queue is full - clearing output')
                 out_queue.put(self.set_of_variables)
 
+        if self.accelerator is not None and self.print_info:
+            cout.cout_wrap(self.accelerator.summary(), 1)
+
         if finish_event:
             finish_event.set()
             self.logger.info('Time loop - Complete')
 
+    def copy_to_scratch(self, source, name):
+        """
+        Copies ``source`` into the preallocated scratch variable ``name``.
+
+        The scratch variables are allocated the first time they are requested and are
+        overwritten in place afterwards, such that the FSI iterations do not allocate
+        new time steps.
+
+        Args:
+            source (AeroTimeStepInfo, StructTimeStepInfo or np.ndarray): variable to copy
+            name (str): name of the scratch variable
+
+        Returns:
+            The scratch variable, containing a copy of ``source``
+        """
+        try:
+            scratch = self.scratch_steps[name]
+        except KeyError:
+            scratch = None
+
+        if isinstance(source, np.ndarray):
+            if scratch is None or scratch.shape != source.shape:
+                scratch = source.astype(dtype=ct.c_double, order='F', copy=True)
+            else:
+                scratch[:] = source
+        elif scratch is None:
+            scratch = source.copy()
+        elif scratch is not source:
+            source.copy_into(scratch)
+
+        self.scratch_steps[name] = scratch
+        return scratch
+
+    def predict_structural_step(self, structural_kstep):
+        """
+        Initial guess of the structural state and forces of the current time step for the FSI iteration.
+
+        The ``predicted_variables`` are extrapolated with a polynomial of order ``predictor_order`` through the last
+        time steps in ``timestep_info``. The extrapolated increment from the last time step is added to
+        ``structural_kstep``, such that the changes introduced by the controllers are retained.
+
+        Args:
+            structural_kstep (StructTimeStepInfo): Structural time step at the start of the FSI iteration.
+
+        Returns:
+            StructTimeStepInfo: Predicted time step, ``None`` if the predictor is off or there are not enough
+            previous time steps.
+        """
+        steps = []
+        for step in reversed(self.data.structure.timestep_info):
+            if step is None or len(steps) > self.settings['predictor_order']:
+                break
+            steps.append(step)
+        order = len(steps) - 1
+        if order < 1:
+            return None
+
+        coefficients = extrapolation_coefficients(order)
+        predicted_kstep = self.copy_to_scratch(structural_kstep, 'predicted_structural_kstep')
+        for name in predicted_variables:
+            variable = getattr(predicted_kstep, name)
+            variable += (coefficients[0] - 1.)*getattr(steps[0], name)
+            for coeff, step in zip(coefficients[1:], steps[1:]):
+                variable += coeff*getattr(step, name)
+        predicted_kstep.quat[:] = algebra.unit_vector(predicted_kstep.quat)
+
+        return predicted_kstep
+
+    def repeat_time_step(self, structural_kstep, controlled_structural_kstep):
+        """
+        Restarts the FSI iteration of the current time step from the controlled state, after it did not converge from
+        the predicted one.
+
+        The runtime forces of the last iteration are kept and the runtime generators are not run again in the repeated
+        iteration. The iterations from the predicted state are discarded by the accelerator, such that their secant
+        information is not reused.
+
+        Args:
+            structural_kstep (StructTimeStepInfo): Structural time step of the last FSI iteration.
+            controlled_structural_kstep (StructTimeStepInfo): Structural time step at the start of the time step,
+                including the changes introduced by the controllers.
+
+        Returns:
+            StructTimeStepInfo: Structural time step to restart the FSI iteration from.
+        """
+        cout.cout_wrap('The FSI solver did not converge from the predicted state, repeating the time step from the '
+                       'previous one', 3)
+        runtime_steady_forces = structural_kstep.runtime_steady_forces.copy()
+        runtime_unsteady_forces = structural_kstep.runtime_unsteady_forces.copy()
+        structural_kstep = self.copy_to_scratch(controlled_structural_kstep, 'structural_kstep')
+        structural_kstep.runtime_steady_forces[:] = runtime_steady_forces
+        structural_kstep.runtime_unsteady_forces[:] = runtime_unsteady_forces
+
+        if self.accelerator is not None:
+            self.accelerator.restart_step()
+        return structural_kstep
+
     def convergence(self, k, tstep, previous_tstep,
                     struct_solver, aero_solver, with_runtime_generators):
         r"""
@@ -802,7 +993,8 @@ class DynamicCoupled(BaseSolver):
             self.data.structure.node_master_elem,
             self.data.structure.connectivities,
             structural_kstep.cag(),
-            self.data.aero.aero_dict)
+            self.data.aero.aero_dict,
+            mapping_tables=self.data.aero.force_mapping_tables)
         dynamic_struct_forces = mapping.aero2struct_force_mapping(
             aero_kstep.dynamic_forces,
             self.data.aero.struct2aero_mapping,
@@ -812,7 +1004,8 @@ class DynamicCoupled(BaseSolver):
             self.data.structure.node_master_elem,
             self.data.structure.connectivities,
             structural_kstep.cag(),
-            self.data.aero.aero_dict)
+            self.data.aero.aero_dict,
+            mapping_tables=self.data.aero.force_mapping_tables)
 
         if self.correct_forces:
             struct_forces = \
@@ -902,15 +1095,45 @@ class DynamicCoupled(BaseSolver):
                 rg.teardown()
 
 
+# variables of the structural time step extrapolated by the FSI predictor
+predicted_variables = ['q', 'dqdt', 'pos', 'pos_dot', 'psi', 'psi_dot', 'for_pos', 'for_vel', 'quat',
+                       'steady_applied_forces', 'unsteady_applied_forces']
+
+
+def extrapolation_coefficients(order):
+    """
+    Coefficients of the polynomial extrapolation of order ``order`` to the next time step from the values at the last
+    ``order + 1`` time steps (latest first), with a constant time step.
+    """
+    return np.array([(-1)**j*math.comb(order + 1, j + 1) for j in range(order + 1)], dtype=float)
+
+
+relaxed_forces = ['steady_applied_forces', 'unsteady_applied_forces',
+                  'runtime_steady_forces', 'runtime_unsteady_forces']
+
+
 def relax(beam, timestep, previous_timestep, coeff):
-    timestep.steady_applied_forces = ((1.0 - coeff)*timestep.steady_applied_forces +
-            coeff*previous_timestep.steady_applied_forces)
-    timestep.unsteady_applied_forces = ((1.0 - coeff)*timestep.unsteady_applied_forces +
-            coeff*previous_timestep.unsteady_applied_forces)
-    timestep.runtime_steady_forces = ((1.0 - coeff)*timestep.runtime_steady_forces +
-            coeff*previous_timestep.runtime_steady_forces)
-    timestep.runtime_unsteady_forces = ((1.0 - coeff)*timestep.runtime_unsteady_forces +
-            coeff*previous_timestep.runtime_unsteady_forces)
+    for name in relaxed_forces:
+        forces = getattr(timestep, name)
+        forces *= (1.0 - coeff)
+        forces += coeff*getattr(previous_timestep, name)
+
+
+def accelerate(accelerator, timestep, previous_timestep):
+    """
+    Replaces the forces in ``timestep`` by those of the next FSI iteration given by the ``accelerator``
+    (see :py:mod:`sharpy.utils.fsiacceleration`). The forces of ``previous_timestep`` are the ones applied in the
+    current iteration.
+    """
+    x_tilde = np.concatenate([getattr(timestep, name).ravel() for name in relaxed_forces])
+    x = np.concatenate([getattr(previous_timestep, name).ravel() for name in relaxed_forces])
+    x_new = accelerator.update(x_tilde, x)
+
+    i_start = 0
+    for name in relaxed_forces:
+        forces = getattr(timestep, name)
+        forces[:] = x_new[i_start:i_start + forces.size].reshape(forces.shape)
+        i_start += forces.size
 
 
 def normalise_quaternion(tstep):
@@ -159,3 +159,10 @@ class DynamicUVLM(BaseSolver):
             cout.cout_wrap('...Finished', 1)
 
         return self.data
+
+    def teardown(self):
+
+        self.aero_solver.teardown()
+        if self.with_postprocessors:
+            for pp in self.postprocessors.values():
+                pp.teardown()
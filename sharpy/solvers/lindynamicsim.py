@@ -6,7 +6,7 @@ import sharpy.utils.settings as settings_utils
 import sharpy.linear.src.libss as libss
 import scipy.linalg as sclalg
 import sharpy.utils.h5utils as h5utils
-from sharpy.utils.datastructures import LinearTimeStepInfo
+from sharpy.utils.datastructures import LinearTimeStepInfo, TimeStepHistory
 from sharpy.linear.utils.ss_interface import InputVariable, LinearVector
 import sharpy.utils.cout_utils as cout
 import time
@@ -67,6 +67,18 @@ class LinDynamicSim(BaseSolver):
     settings_types['dt'] = 'float'
     settings_description['dt'] = 'Time increment for the solution of systems without a specified dt'
 
+    settings_types['chunk_size'] = 'int'
+    settings_default['chunk_size'] = 100
+    settings_description['chunk_size'] = 'Number of time steps marched at once by the discrete time simulator before ' \
+                                         'the results are written and passed to the postprocessors'
+
+    settings_types['history_length'] = 'int'
+    settings_default['history_length'] = 0
+    settings_description['history_length'] = 'Number of time steps retained in memory in the linear, aerodynamic and ' \
+                                              'structural ``timestep_info``. Older time steps are replaced by ' \
+                                              '``None`` once the online postprocessors have been run on them. If ' \
+                                              '``0``, the full history is kept'
+
     settings_types['postprocessors'] = 'list(str)'
     settings_default['postprocessors'] = list()
 
@@ -172,9 +184,9 @@ class LinDynamicSim(BaseSolver):
             cout.cout_wrap('Number of beam inputs: %g' % self.data.linear.linear_system.beam.ss.inputs, 3)
             breakpoint()
 
-        try:
-            dt = ss.dt
-        except AttributeError:
+        dt = ss.dt
+        if dt is None:
+            # continuous time system
             dt = self.settings['dt']
 
         # Total time to run
@@ -190,42 +202,80 @@ class LinDynamicSim(BaseSolver):
             ss = self.data.linear.linear_system.update(self.settings['reference_velocity'])
         t_dom = np.linspace(0, T, n_steps)
 
-        # Use the scipy linear solver
-        sys = libss.ss_to_scipy(ss)
-        cout.cout_wrap('Solving linear system using scipy...')
+        write_dat = dict()
+        for var_name in self.settings['write_dat']:
+            if var_name in ['x', 'y', 'u', 't']:
+                write_dat[var_name] = open(self.folder + '/%s_out.dat' % var_name, 'w')
+        if write_dat:
+            cout.cout_wrap('Writing linear simulation output .dat files to %s' % self.folder)
+
+        if self.settings['history_length'] > 0:
+            self.set_history_length(self.settings['history_length'])
+
         t0 = time.time()
-        out = sys.output(u, t=t_dom, x0=x0)
+        try:
+            if ss.dt is not None:
+                # Discrete time systems are marched on their own (sparse) matrices, streaming the results in chunks
+                cout.cout_wrap('Solving discrete time linear system and plotting results every %g time steps...'
+                               % self.settings['chunk_size'])
+                simulator = libss.DiscreteTimeSimulator(ss, chunk_size=self.settings['chunk_size'])
+                for n0, y_chunk, x_chunk in simulator.march(u, x0=x0):
+                    n_chunk = y_chunk.shape[0]
+                    self.process_chunk(t_dom[n0:n0 + n_chunk], x_chunk, y_chunk, u[n0:n0 + n_chunk],
+                                       write_dat, is_last=n0 + n_chunk == n_steps)
+            else:
+                # Use the scipy linear solver
+                sys = libss.ss_to_scipy(ss)
+                cout.cout_wrap('Solving linear system using scipy...')
+                t_out, y_out, x_out = sys.output(u, T=t_dom, X0=x0)
+                cout.cout_wrap('Plotting results...')
+                self.process_chunk(t_out, x_out, y_out, u, write_dat, is_last=True)
+        finally:
+            for file_handle in write_dat.values():
+                file_handle.close()
         ts = time.time() - t0
         cout.cout_wrap('\tSolved in %.2fs' % ts, 1)
 
-        t_out = out[0]
-        x_out = out[2]
-        y_out = out[1]
+        return self.data
 
-        if self.settings['write_dat']:
-            cout.cout_wrap('Writing linear simulation output .dat files to %s' % self.folder)
-            if 'y' in self.settings['write_dat']:
-                np.savetxt(self.folder + '/y_out.dat', y_out)
-                cout.cout_wrap('Output vector written', 2)
-            if 'x' in self.settings['write_dat']:
-                np.savetxt(self.folder + '/x_out.dat', x_out)
-                cout.cout_wrap('State vector written', 2)
-            if 'u' in self.settings['write_dat']:
-                np.savetxt(self.folder + '/u_out.dat', u)
-                cout.cout_wrap('Input vector written', 2)
-            if 't' in self.settings['write_dat']:
-                np.savetxt(self.folder + '/t_out.dat', t_out)
-                cout.cout_wrap('Time domain written', 2)
-            cout.cout_wrap('Success', 1)
+    def set_history_length(self, history_length):
+        """
+        Bounds the number of time steps kept in memory by the linear, aerodynamic and structural ``timestep_info``.
+        See :class:`~sharpy.utils.datastructures.TimeStepHistory`.
+
+        Args:
+            history_length (int): number of time steps retained
+        """
+        self.data.linear.timestep_info = TimeStepHistory(self.data.linear.timestep_info, history_length)
+        self.data.aero.timestep_info = TimeStepHistory(self.data.aero.timestep_info, history_length)
+        self.data.structure.timestep_info = TimeStepHistory(self.data.structure.timestep_info, history_length)
+
+    def process_chunk(self, t_chunk, x_chunk, y_chunk, u_chunk, write_dat, is_last=False):
+        """
+        Writes a chunk of the time response to the ``.dat`` files and packs each time step into the linear, aero and
+        structural time step infos before running the postprocessors. The vectors of each time step are copied, such
+        that the chunk is released once processed.
+
+        Args:
+            t_chunk (np.ndarray): Time of each step in the chunk.
+            x_chunk (np.ndarray): State vectors ``(n_chunk, states)``.
+            y_chunk (np.ndarray): Output vectors ``(n_chunk, outputs)``.
+            u_chunk (np.ndarray): Input vectors ``(n_chunk, inputs)``.
+            write_dat (dict): Open file handles of the vectors to write.
+            is_last (bool): The chunk contains the final time step, which is not packed into the time step infos.
+        """
+        for var_name, var_chunk in zip(['x', 'y', 'u', 't'], [x_chunk, y_chunk, u_chunk, t_chunk]):
+            if var_name in write_dat:
+                np.savetxt(write_dat[var_name], var_chunk)
 
         # Pack state variables into linear timestep info
-        cout.cout_wrap('Plotting results...')
-        for n in range(len(t_out)-1):
+        n_chunk = len(t_chunk) - 1 if is_last else len(t_chunk)
+        for n in range(n_chunk):
             tstep = LinearTimeStepInfo()
-            tstep.x = x_out[n, :]
-            tstep.y = y_out[n, :]
-            tstep.t = t_out[n]
-            tstep.u = u[n, :]
+            tstep.x = x_chunk[n, :].copy()
+            tstep.y = y_chunk[n, :].copy()
+            tstep.t = t_chunk[n]
+            tstep.u = u_chunk[n, :].copy()
             self.data.linear.timestep_info.append(tstep)
             # TODO: option to save to h5
 
@@ -243,7 +293,11 @@ class LinDynamicSim(BaseSolver):
                 for postproc in self.postprocessors:
                     self.data = self.postprocessors[postproc].run(online=True)
 
-        return self.data
+    def teardown(self):
+
+        if self.with_postprocessors:
+            for pp in self.postprocessors.values():
+                pp.teardown()
 
     def read_files(self):
 
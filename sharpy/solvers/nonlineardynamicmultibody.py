@@ -1,6 +1,9 @@
 import ctypes as ct
 import numpy as np
 import os
+import scipy.linalg as sclalg
+import scipy.sparse as sp
+import scipy.sparse.linalg as ssl
 
 from sharpy.utils.solver_interface import solver, BaseSolver, solver_from_string
 import sharpy.utils.settings as settings_utils
@@ -62,6 +65,25 @@ class NonLinearDynamicMultibody(_BaseStructural):
     settings_default['zero_ini_dot_ddot'] = False
     settings_description['zero_ini_dot_ddot'] = 'Set to zero the position and crv derivatives at the first time step'
 
+    settings_types['sparse_solver'] = 'bool'
+    settings_default['sparse_solver'] = False
+    settings_description['sparse_solver'] = 'Assemble the system in sparse format from the blocks of each body and ' \
+                                            'constraint and solve it with a sparse LU factorisation. The condition ' \
+                                            'numbers written with ``write_lm`` are then 1-norm estimates'
+
+    settings_types['newton_method'] = 'str'
+    settings_default['newton_method'] = 'full'
+    settings_description['newton_method'] = 'Newton-Raphson iterations. ``full`` factorises the system matrix in ' \
+                                            'every iteration. ``modified`` reuses the factorisation of the first ' \
+                                            'iteration of the time step until the convergence stalls'
+    settings_options['newton_method'] = ['full', 'modified']
+
+    settings_types['modified_newton_ratio'] = 'float'
+    settings_default['modified_newton_ratio'] = 0.5
+    settings_description['modified_newton_ratio'] = 'In the ``modified`` Newton method, the system matrix is ' \
+                                                    'factorised again when the residual is not reduced below this ' \
+                                                    'ratio of the residual of the previous iteration'
+
     settings_table = settings_utils.SettingsTable()
     __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
 
@@ -83,9 +105,13 @@ class NonLinearDynamicMultibody(_BaseStructural):
         self.beta = None
 
         self.prev_Dq = None
+        self.lu = None  # factorisation of the system matrix reused by the modified Newton method
 
         self.out_files = None  # dict: containing output_variable:file_path if desired to write output
 
+        self.MB_beam = None  # structural information of each body, built once (see get_bodies)
+        self.MB_beam_version = None  # Beam.fortran_version of the structure when the bodies were built
+
     def initialise(self, data, custom_settings=None, restart=False):
 
         self.data = data
@@ -128,6 +154,10 @@ class NonLinearDynamicMultibody(_BaseStructural):
         # Define the number of dofs
         self.define_sys_size()
 
+        # The topology of the bodies does not change in time, only their timestep information is split every step
+        self.MB_beam = None
+        self.get_bodies()
+
         self.prev_Dq = np.zeros((self.sys_size + self.num_LM_eq))
 
         self.settings['time_integrator_settings']['sys_size'] = self.sys_size
@@ -146,6 +176,24 @@ class NonLinearDynamicMultibody(_BaseStructural):
     def next_step(self):
         pass
 
+    def get_bodies(self):
+        """
+        Structural information of each body (see :func:`~sharpy.utils.multibody.get_bodies`).
+
+        The bodies are built once and reused. If the Fortran arrays of the multibody structure have been regenerated
+        since, as the ``ModifyStructure`` generator does when it changes the lumped masses at run time, the masses and
+        applied forces of the bodies are refreshed (see :func:`~sharpy.utils.multibody.refresh_bodies`).
+
+        Returns:
+            list(:class:`~sharpy.structure.models.beam.Beam`): each entry represents a body
+        """
+        if self.MB_beam is None:
+            self.MB_beam = mb.get_bodies(self.data.structure)
+        elif self.MB_beam_version != self.data.structure.fortran_version:
+            mb.refresh_bodies(self.data.structure, self.MB_beam)
+        self.MB_beam_version = self.data.structure.fortran_version
+        return self.MB_beam
+
     def define_sys_size(self):
         """
         This function defines the number of degrees of freedom in a multibody systems
@@ -192,14 +240,23 @@ class NonLinearDynamicMultibody(_BaseStructural):
             Lambda_dot (np.ndarray): Time derivarive of ``Lambda``
             MBdict (dict): Dictionary including the multibody information
 
+        With the ``sparse_solver`` setting, the matrices are assembled as ``scipy.sparse.csc_matrix`` from the
+        non-zero entries of the blocks of each body and constraint.
+
         Returns:
             MB_Asys (np.ndarray): Matrix of the systems of equations
             MB_Q (np.ndarray): Vector of the systems of equations
         """
 
-        MB_M = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
-        MB_C = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
-        MB_K = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
+        sparse = self.settings['sparse_solver']
+        if sparse:
+            MB_M = lagrangeconstraints.SparseMatrixAccumulator(self.sys_size)
+            MB_C = lagrangeconstraints.SparseMatrixAccumulator(self.sys_size)
+            MB_K = lagrangeconstraints.SparseMatrixAccumulator(self.sys_size)
+        else:
+            MB_M = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
+            MB_C = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
+            MB_K = np.zeros((self.sys_size, self.sys_size), dtype=ct.c_double, order='F')
         MB_Q = np.zeros((self.sys_size,), dtype=ct.c_double, order='F')
         first_dof = 0
         last_dof = 0
@@ -225,9 +282,15 @@ class NonLinearDynamicMultibody(_BaseStructural):
 
             ############### Assembly into the global matrices
             # Flexible and RBM contribution to Asys
-            MB_M[first_dof:last_dof, first_dof:last_dof] = M.astype(dtype=ct.c_double, copy=True, order='F')
-            MB_C[first_dof:last_dof, first_dof:last_dof] = C.astype(dtype=ct.c_double, copy=True, order='F')
-            MB_K[first_dof:last_dof, first_dof:last_dof] = K.astype(dtype=ct.c_double, copy=True, order='F')
+            if sparse:
+                body_dofs = np.arange(first_dof, last_dof)
+                MB_M.add_block(body_dofs, body_dofs, M)
+                MB_C.add_block(body_dofs, body_dofs, C)
+                MB_K.add_block(body_dofs, body_dofs, K)
+            else:
+                MB_M[first_dof:last_dof, first_dof:last_dof] = M
+                MB_C[first_dof:last_dof, first_dof:last_dof] = C
+                MB_K[first_dof:last_dof, first_dof:last_dof] = K
 
             #Q
             MB_Q[first_dof:last_dof] = Q
@@ -246,7 +309,13 @@ class NonLinearDynamicMultibody(_BaseStructural):
             dt,
             Lambda,
             Lambda_dot,
-            "dynamic")
+            "dynamic",
+            sparse=sparse)
+
+        if sparse:
+            MB_M = MB_M.tocsc()
+            MB_C = MB_C.tocsc()
+            MB_K = MB_K.tocsc()
 
         # Include the matrices associated to Lagrange Multipliers
         MB_C += LM_C[:self.sys_size, :self.sys_size]
@@ -307,8 +376,9 @@ class NonLinearDynamicMultibody(_BaseStructural):
             return
 
         # TODO the output of this routine is wrong. check at some point.
-        LM_C, LM_K, LM_Q = lagrangeconstraints.generate_lagrange_matrix(self.lc_list, MB_beam, MB_tstep, ts, self.num_LM_eq, self.sys_size, dt, Lambda, Lambda_dot, "dynamic")
-        F = -np.dot(LM_C[:, -self.num_LM_eq:], Lambda_dot) - np.dot(LM_K[:, -self.num_LM_eq:], Lambda)
+        LM_C, LM_K, LM_Q = lagrangeconstraints.generate_lagrange_matrix(self.lc_list, MB_beam, MB_tstep, ts, self.num_LM_eq, self.sys_size, dt, Lambda, Lambda_dot, "dynamic",
+                                                                        sparse=self.settings['sparse_solver'])
+        F = -LM_C[:, -self.num_LM_eq:].dot(Lambda_dot) - LM_K[:, -self.num_LM_eq:].dot(Lambda)
 
         first_dof = 0
         for ibody in range(len(MB_beam)):
@@ -327,6 +397,51 @@ class NonLinearDynamicMultibody(_BaseStructural):
             first_dof = last_dof
         # TODO: right now, these forces are only used as an output, they are not read when the multibody is splitted
 
+    def factorise(self, Asys):
+        """
+        LU factorisation of the system matrix, dense or sparse
+        """
+        if sp.issparse(Asys):
+            return ssl.splu(sp.csc_matrix(Asys))
+        return sclalg.lu_factor(Asys)
+
+    @staticmethod
+    def lu_solve(lu, rhs):
+        if isinstance(lu, tuple):
+            return sclalg.lu_solve(lu, rhs)
+        return lu.solve(rhs)
+
+    def solve_system(self, Asys, rhs, refactorise=True):
+        """
+        Solves the system of equations of a Newton iteration.
+
+        In the ``modified`` Newton method, the factorisation of ``Asys`` is only computed when ``refactorise`` is
+        ``True`` and it is otherwise reused from a previous iteration.
+        """
+        if self.settings['newton_method'] == 'modified':
+            if refactorise or self.lu is None:
+                self.lu = self.factorise(Asys)
+            return self.lu_solve(self.lu, rhs)
+
+        if sp.issparse(Asys):
+            return self.factorise(Asys).solve(rhs)
+        return np.linalg.solve(Asys, rhs)
+
+    @staticmethod
+    def condition_number(Asys):
+        """
+        Condition number of the system matrix. For sparse matrices, the 1-norm condition number is estimated without
+        building the dense inverse.
+        """
+        if sp.issparse(Asys):
+            lu = ssl.splu(sp.csc_matrix(Asys))
+            inverse = ssl.LinearOperator(Asys.shape,
+                                         matvec=lu.solve,
+                                         rmatvec=lambda x: lu.solve(x, trans='T'),
+                                         dtype=Asys.dtype)
+            return ssl.onenormest(Asys)*ssl.onenormest(inverse)
+        return np.linalg.cond(Asys)
+
     def write_lm_cond_num(self, iteration, Lambda, Lambda_dot, Lambda_ddot, cond_num, cond_num_lm):
         # Maybe not the most efficient way to output this, as files are opened and closed every time data is written
         # However, containing the writing in the with statement prevents from files remaining open in the previous
@@ -362,7 +477,8 @@ class NonLinearDynamicMultibody(_BaseStructural):
             self.data.structure,
             structural_step,
             MBdict,
-            self.data.ts)
+            self.data.ts,
+            MB_beam=self.get_bodies())
 
         self.define_rigid_dofs(MB_beam)
         num_LM_eq = self.num_LM_eq
@@ -400,6 +516,8 @@ class NonLinearDynamicMultibody(_BaseStructural):
         LM_old_Dq = 1.0
 
         skip_step = False
+        stalled = False
+        prev_res = None
         for iteration in range(self.settings['max_iterations']):
             # Check if the maximum of iterations has been reached
             if iteration == self.settings['max_iterations'] - 1:
@@ -425,20 +543,22 @@ class NonLinearDynamicMultibody(_BaseStructural):
                                                         kBnh, LM_Q)
 
             if self.settings['write_lm']:
-                cond_num = np.linalg.cond(Asys[:self.sys_size, :self.sys_size])
-                cond_num_lm = np.linalg.cond(Asys)
+                cond_num = self.condition_number(Asys[:self.sys_size, :self.sys_size])
+                cond_num_lm = self.condition_number(Asys)
 
+            # The modified Newton method factorises the matrix in the first iteration and when convergence stalls
+            refactorise = iteration == 0 or stalled
             if self.settings['rigid_bodies']:
                 rigid_LM_dofs = self.rigid_dofs + (np.arange(self.num_LM_eq, dtype=int) + self.sys_size).tolist()
 
-                rigid_Asys = Asys[np.ix_(rigid_LM_dofs, rigid_LM_dofs)].copy()
+                rigid_Asys = Asys[rigid_LM_dofs, :][:, rigid_LM_dofs]
                 rigid_Q = Q[rigid_LM_dofs].copy()
-                rigid_Dq = np.linalg.solve(rigid_Asys, -rigid_Q)
+                rigid_Dq = self.solve_system(rigid_Asys, -rigid_Q, refactorise)
                 Dq = np.zeros((self.sys_size + self.num_LM_eq))
                 Dq[rigid_LM_dofs] = rigid_Dq.copy()
 
             else:
-                Dq = np.linalg.solve(Asys, -Q)
+                Dq = self.solve_system(Asys, -Q, refactorise)
 
             # Relaxation
             relax_Dq = np.zeros_like(Dq)
@@ -480,6 +600,10 @@ class NonLinearDynamicMultibody(_BaseStructural):
             if (res < self.settings['min_delta']) and (LM_res < self.settings['min_delta']):
                 break
 
+            if prev_res is not None:
+                stalled = max(res, LM_res) > self.settings['modified_newton_ratio']*prev_res
+            prev_res = max(res, LM_res)
+
         Lambda, Lambda_dot = mb.state2disp_and_accel(q, dqdt, dqddt, MB_beam, MB_tstep, num_LM_eq)
         if self.settings['write_lm']:
             self.write_lm_cond_num(iteration, Lambda, Lambda_dot, Lambda_ddot, cond_num, cond_num_lm)
@@ -491,7 +615,8 @@ class NonLinearDynamicMultibody(_BaseStructural):
                 self.data.structure,
                 structural_step,
                 MBdict,
-                self.data.ts)
+                self.data.ts,
+                MB_beam=self.get_bodies())
             # Perform rigid body motions
             self.integrate_position(MB_beam, MB_tstep, dt)
             for ibody in range(0, len(MB_tstep)):
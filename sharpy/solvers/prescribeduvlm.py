@@ -171,6 +171,13 @@ class PrescribedUvlm(BaseSolver):
 
         return self.data
 
+    def teardown(self):
+
+        self.aero_solver.teardown()
+        if self.with_postprocessors:
+            for pp in self.postprocessors.values():
+                pp.teardown()
+
 #
 #     def map_forces(self, aero_kstep, structural_kstep, unsteady_forces_coeff=1.0):
 #         # set all forces to 0
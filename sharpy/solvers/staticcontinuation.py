@@ -0,0 +1,376 @@
+import os
+
+import numpy as np
+
+import sharpy.utils.cout_utils as cout
+import sharpy.utils.solver_interface as solver_interface
+from sharpy.utils.solver_interface import solver, BaseSolver
+import sharpy.utils.settings as settings_utils
+import sharpy.utils.algebra as algebra
+import sharpy.utils.exceptions as exc
+
+
+@solver
+class StaticContinuation(BaseSolver):
+    """
+    Static aeroelastic continuation along a parameter.
+
+    The ``solver``, :class:`~sharpy.solvers.staticcoupled.StaticCoupled` or
+    :class:`~sharpy.solvers.statictrim.StaticTrim`, is run at a series of values of the ``parameter`` between
+    ``start_value`` and ``end_value``. Each point starts from the converged structural and aerodynamic state of the
+    previous one, corrected with a tangent predictor, i.e. the structural deformations (or the trim inputs) are
+    linearly extrapolated from the last two converged points. Only the first point uses the ``n_load_steps`` of the
+    ``solver``. ``StaticTrim`` is run with ``warm_start`` from the structural state of the previous point, and with
+    the Jacobian of its trim instead of the finite difference gradients.
+
+    The parameter step is adapted to the iterations of the ``solver``, the FSI iterations for ``StaticCoupled`` and the
+    trim iterations for ``StaticTrim``, such that each point takes about ``target_iterations``, between
+    ``initial_step`` and ``max_step``. The step is halved and the point repeated from the last converged state if the
+    ``solver`` does not converge, down to ``max_refinements`` halvings of ``initial_step``.
+
+    Supported parameters are:
+
+        * ``u_inf``: free stream velocity of the velocity field generator of the aerodynamic solver and of the wake
+          shape generator.
+
+        * ``rho``: air density of the aerodynamic solver.
+
+        * ``alpha``: angle of attack, i.e. pitch of the body attached frame (only with ``StaticCoupled``).
+
+        * ``lumped_mass``: mass of the lumped masses given by ``lumped_mass_indices``.
+
+    The ``postprocessors`` are run on each converged point as they are found. The converged points are stored in
+    ``timestep_info`` such that ``data.ts`` is the index of the point, and their parameter values in
+    ``parameter_values``.
+    """
+    solver_id = 'StaticContinuation'
+    solver_classification = 'Coupled'
+
+    settings_types = dict()
+    settings_default = dict()
+    settings_description = dict()
+    settings_options = dict()
+
+    settings_types['print_info'] = 'bool'
+    settings_default['print_info'] = True
+    settings_description['print_info'] = 'Write status to screen'
+
+    settings_types['solver'] = 'str'
+    settings_default['solver'] = 'StaticCoupled'
+    settings_description['solver'] = 'Static solver run at each point'
+    settings_options['solver'] = ['StaticCoupled', 'StaticTrim']
+
+    settings_types['solver_settings'] = 'dict'
+    settings_default['solver_settings'] = dict()
+    settings_description['solver_settings'] = 'Settings of the ``solver``'
+
+    settings_types['parameter'] = 'str'
+    settings_default['parameter'] = 'u_inf'
+    settings_description['parameter'] = 'Continuation parameter'
+    settings_options['parameter'] = ['u_inf', 'rho', 'alpha', 'lumped_mass']
+
+    settings_types['start_value'] = 'float'
+    settings_default['start_value'] = None
+    settings_description['start_value'] = 'Value of the parameter at the first point'
+
+    settings_types['end_value'] = 'float'
+    settings_default['end_value'] = None
+    settings_description['end_value'] = 'Value of the parameter at the last point'
+
+    settings_types['initial_step'] = 'float'
+    settings_default['initial_step'] = None
+    settings_description['initial_step'] = 'Absolute value of the first parameter step'
+
+    settings_types['max_step'] = 'float'
+    settings_default['max_step'] = 0.
+    settings_description['max_step'] = 'Maximum absolute value of the parameter step. ``0`` is unbounded'
+
+    settings_types['max_refinements'] = 'int'
+    settings_default['max_refinements'] = 4
+    settings_description['max_refinements'] = 'Maximum number of halvings of ``initial_step`` when the ``solver`` ' \
+                                               'does not converge'
+
+    settings_types['target_iterations'] = 'int'
+    settings_default['target_iterations'] = 6
+    settings_description['target_iterations'] = 'Desired number of iterations of the ``solver`` per point'
+
+    settings_types['lumped_mass_indices'] = 'list(int)'
+    settings_default['lumped_mass_indices'] = []
+    settings_description['lumped_mass_indices'] = 'Indices of the lumped masses whose mass is the parameter with ' \
+                                                  '``parameter = lumped_mass``'
+
+    settings_types['postprocessors'] = 'list(str)'
+    settings_default['postprocessors'] = list()
+    settings_description['postprocessors'] = 'List of the postprocessors to run at each converged point'
+
+    settings_types['postprocessors_settings'] = 'dict'
+    settings_default['postprocessors_settings'] = dict()
+    settings_description['postprocessors_settings'] = 'Dictionary with the applicable settings for every ' \
+                                                      '``postprocessor``. Every ``postprocessor`` needs its entry, ' \
+                                                      'even if empty'
+
+    settings_table = settings_utils.SettingsTable()
+    __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
+
+    def __init__(self):
+        self.data = None
+        self.settings = None
+        self.solver = None
+        self.coupled_solver = None
+        self.print_info = False
+
+        self.postprocessors = dict()
+        self.with_postprocessors = False
+
+        self.parameter_values = []
+        self.iterations = []
+        self.structure_history = []
+        self.aero_history = []
+        self.trim_history = []
+        self.trim_jacobian = None
+
+        self.residual_table = None
+        self.folder = None
+
+    def initialise(self, data, custom_settings=None, restart=False):
+        self.data = data
+        if custom_settings is None:
+            self.settings = data.settings[self.solver_id]
+        else:
+            self.settings = custom_settings
+        settings_utils.to_custom_types(self.settings,
+                                       self.settings_types,
+                                       self.settings_default,
+                                       options=self.settings_options,
+                                       no_ctype=True)
+        self.print_info = self.settings['print_info']
+
+        if self.settings['parameter'] == 'alpha' and self.settings['solver'] == 'StaticTrim':
+            raise ValueError('The angle of attack is a trim variable of StaticTrim and cannot be the continuation '
+                             'parameter')
+        if self.settings['parameter'] == 'lumped_mass' and not self.settings['lumped_mass_indices']:
+            raise ValueError('No lumped_mass_indices given for the lumped_mass continuation parameter')
+
+        self.solver = solver_interface.initialise_solver(self.settings['solver'])
+        self.solver.initialise(self.data, self.settings['solver_settings'], restart=restart)
+        self.data = self.solver.data
+        if self.settings['solver'] == 'StaticTrim':
+            self.coupled_solver = self.solver.solver
+            # each point is started from the structural state of the previous one
+            self.solver.settings['warm_start'] = True
+        else:
+            self.coupled_solver = self.solver
+
+        # initialise postprocessors
+        self.postprocessors = dict()
+        self.with_postprocessors = False
+        if self.settings['postprocessors']:
+            self.with_postprocessors = True
+        for postproc in self.settings['postprocessors']:
+            self.postprocessors[postproc] = solver_interface.initialise_solver(postproc)
+            self.postprocessors[postproc].initialise(self.data, self.settings['postprocessors_settings'][postproc],
+                                                     caller=self, restart=restart)
+
+        self.folder = self.data.output_folder + '/staticcontinuation/'
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+        if self.print_info:
+            self.residual_table = cout.TablePrinter(4, 12, ['g', 'e', 'e', 'g'],
+                                                    filename=self.folder + 'continuation.txt')
+            self.residual_table.field_length[0] = 5
+            self.residual_table.field_length[3] = 5
+            self.residual_table.print_header(['point', self.settings['parameter'], 'step', 'iter'])
+
+    def run(self, **kwargs):
+        start_value = self.settings['start_value']
+        end_value = self.settings['end_value']
+        direction = np.sign(end_value - start_value)
+        min_step = self.settings['initial_step']/2**self.settings['max_refinements']
+        max_step = self.settings['max_step']
+        if not max_step:
+            max_step = np.abs(end_value - start_value)
+
+        self.parameter_values = []
+        self.iterations = []
+        self.structure_history = []
+        self.aero_history = []
+        self.trim_history = []
+        self.trim_jacobian = None
+
+        # first point with the solver settings, including its load steps
+        self.set_parameter(start_value)
+        if not self.solve():
+            raise exc.NotConvergedSolver('StaticContinuation did not converge at the start value %s = %f' %
+                                         (self.settings['parameter'], start_value))
+        self.accept_point(start_value, 0.)
+        self.set_load_steps(0)
+
+        parameter = start_value
+        step = min(self.settings['initial_step'], max_step)
+        while direction*(end_value - parameter) > 1e-10*max(np.abs(end_value), 1.):
+            new_parameter = parameter + direction*step
+            if direction*(new_parameter - end_value) > -1e-3*min_step:
+                new_parameter = end_value
+
+            self.set_parameter(new_parameter)
+            self.predict(new_parameter)
+            try:
+                converged = self.solve()
+            except exc.NotConvergedSolver:
+                converged = False
+
+            if not converged:
+                self.restore_last_point()
+                if step <= min_step*(1 + 1e-10):
+                    raise exc.NotConvergedSolver('StaticContinuation did not converge at %s = %f' %
+                                                 (self.settings['parameter'], new_parameter))
+                step /= 2.
+                continue
+
+            self.accept_point(new_parameter, new_parameter - parameter)
+            parameter = new_parameter
+
+            # adapt the step to the iterations of the last point, only halvings after non-converged points go
+            # below the initial step
+            factor = min(max(self.settings['target_iterations']/max(self.iterations[-1], 1), 0.5), 2.)
+            step = min(max(step*factor, min(step, self.settings['initial_step'])), max_step)
+
+        self.set_history()
+        if self.with_postprocessors:
+            for postproc in self.postprocessors:
+                try:
+                    self.postprocessors[postproc].shutdown()
+                except AttributeError:
+                    pass
+
+        return self.data
+
+    def solve(self):
+        """
+        Runs the ``solver`` from the current state.
+
+        Returns:
+            bool: convergence of the ``solver``.
+        """
+        self.data.ts = 0
+        if self.settings['solver'] == 'StaticTrim':
+            self.data = self.solver.run(jacobian=self.trim_jacobian)
+            return True
+        self.data = self.solver.run()
+        return self.solver.converged
+
+    def accept_point(self, parameter, step):
+        """
+        Stores the converged point, runs the postprocessors on it and leaves its state as the only time step to start
+        the next point from.
+        """
+        structure_step = self.data.structure.timestep_info[-1].copy()
+        aero_step = self.data.aero.timestep_info[-1].copy()
+
+        self.parameter_values.append(parameter)
+        self.iterations.append(self.solver.n_iterations)
+        self.structure_history.append(structure_step)
+        self.aero_history.append(aero_step)
+        if self.settings['solver'] == 'StaticTrim':
+            self.trim_history.append(np.array(self.solver.trimmed_values, dtype=float))
+            if self.solver.jacobian is not None:
+                self.trim_jacobian = self.solver.jacobian.copy()
+
+        if self.print_info:
+            self.residual_table.print_line([len(self.parameter_values) - 1, parameter, step, self.iterations[-1]])
+
+        # converged points as time steps for the postprocessors
+        self.set_history()
+        if self.with_postprocessors:
+            for postproc in self.postprocessors:
+                self.data = self.postprocessors[postproc].run(online=True)
+
+        self.restore_last_point()
+
+    def set_history(self):
+        """
+        Sets the converged points as the time steps of ``data``.
+        """
+        self.data.structure.timestep_info = list(self.structure_history)
+        self.data.aero.timestep_info = list(self.aero_history)
+        self.data.ts = len(self.structure_history) - 1
+
+    def restore_last_point(self):
+        """
+        Resets the state to the last converged point. With ``StaticTrim``, it is the only state its evaluations are
+        warm-started from.
+        """
+        self.data.structure.timestep_info = [self.structure_history[-1].copy()]
+        self.data.aero.timestep_info = [self.aero_history[-1].copy()]
+        self.data.ts = 0
+        if self.settings['solver'] == 'StaticTrim':
+            self.solver.converged_states = [(self.trim_history[-1].copy(), self.structure_history[-1].copy())]
+
+    def predict(self, parameter):
+        """
+        Tangent predictor of the state at ``parameter``, linearly extrapolated from the last two converged points.
+
+        With ``StaticTrim`` the trim inputs are extrapolated and used as its initial values. Otherwise the nodal
+        positions and rotations of the structure are extrapolated and the aerodynamic grid is updated.
+        """
+        if len(self.parameter_values) < 2:
+            return
+
+        weight = ((parameter - self.parameter_values[-1]) /
+                  (self.parameter_values[-1] - self.parameter_values[-2]))
+
+        if self.settings['solver'] == 'StaticTrim':
+            alpha, deflection_gamma, thrust = self.trim_history[-1] + weight*(self.trim_history[-1] -
+                                                                              self.trim_history[-2])
+            self.solver.settings['initial_alpha'] = alpha
+            self.solver.settings['initial_deflection'] = deflection_gamma - alpha
+            self.solver.settings['initial_thrust'] = thrust
+            return
+
+        tstep = self.data.structure.timestep_info[0]
+        for name in ['pos', 'psi']:
+            getattr(tstep, name)[:] += weight*(getattr(self.structure_history[-1], name) -
+                                               getattr(self.structure_history[-2], name))
+        self.coupled_solver.aero_solver.update_step()
+
+    def set_parameter(self, value):
+        """
+        Sets the continuation parameter in the solvers and the structure.
+        """
+        parameter = self.settings['parameter']
+        aero_solver = self.coupled_solver.aero_solver
+        structure = self.data.structure
+        if parameter == 'u_inf':
+            aero_solver.settings['velocity_field_input']['u_inf'] = value
+            aero_solver.velocity_generator.initialise(aero_solver.settings['velocity_field_input'])
+            # the wake panels are sized with the free stream velocity
+            wake_shape_generator = self.data.aero.wake_shape_generator
+            wake_shape_generator.in_dict['u_inf'] = value
+            wake_shape_generator.initialise(self.data, wake_shape_generator.in_dict)
+        elif parameter == 'rho':
+            aero_solver.settings['rho'] = value
+        elif parameter == 'alpha':
+            quat = algebra.euler2quat(np.array([0.0, value, 0.0]))
+            structure.ini_info.quat[:] = quat
+            structure.timestep_info[self.data.ts].quat[:] = quat
+            aero_solver.update_step()
+        elif parameter == 'lumped_mass':
+            for i_lumped in self.settings['lumped_mass_indices']:
+                delta_mass = value - structure.lumped_mass[i_lumped]
+                structure.lumped_mass[i_lumped] = value
+                structure.add_lumped_mass_to_element(structure.lumped_mass_nodes[i_lumped],
+                                                     structure.generate_mass_matrix(delta_mass,
+                                                                                    structure.lumped_mass_position[
+                                                                                        i_lumped, :],
+                                                                                    np.zeros((3, 3))))
+            structure.generate_fortran()
+
+    def set_load_steps(self, n_load_steps):
+        self.coupled_solver.settings['n_load_steps'] = n_load_steps
+
+    def teardown(self):
+        self.solver.teardown()
+        if self.with_postprocessors:
+            for pp in self.postprocessors.values():
+                pp.teardown()
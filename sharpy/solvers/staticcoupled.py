@@ -8,6 +8,7 @@ from sharpy.utils.solver_interface import solver, BaseSolver, initialise_solver
 import sharpy.utils.settings as settings_utils
 import sharpy.utils.algebra as algebra
 import sharpy.utils.generator_interface as gen_interface
+import sharpy.utils.fsiacceleration as fsiacceleration
 
 @solver
 class StaticCoupled(BaseSolver):
@@ -59,6 +60,17 @@ class StaticCoupled(BaseSolver):
     settings_default['relaxation_factor'] = 0.
     settings_description['relaxation_factor'] = 'Relaxation parameter in the FSI iteration. 0 is no relaxation and -> 1 is very relaxed'
 
+    settings_types['fsi_accelerator'] = 'str'
+    settings_default['fsi_accelerator'] = 'Relaxation'
+    settings_description['fsi_accelerator'] = 'Convergence accelerator of the FSI iteration. ``Relaxation`` uses the ' \
+                                              'constant ``relaxation_factor``, the rest use it in their first ' \
+                                              'iteration. See :py:mod:`sharpy.utils.fsiacceleration`'
+    settings_options['fsi_accelerator'] = ['Relaxation', 'Aitken', 'IQN-ILS']
+
+    settings_types['fsi_accelerator_settings'] = 'dict'
+    settings_default['fsi_accelerator_settings'] = dict()
+    settings_description['fsi_accelerator_settings'] = 'Settings of the ``fsi_accelerator``'
+
     settings_types['correct_forces_method'] = 'str'
     settings_default['correct_forces_method'] = ''
     settings_description['correct_forces_method'] = 'Function used to correct aerodynamic forces. ' \
@@ -86,6 +98,11 @@ class StaticCoupled(BaseSolver):
         self.aero_solver = None
 
         self.previous_force = None
+        self.accelerator = None
+
+        # FSI iterations and convergence of the last run
+        self.n_iterations = 0
+        self.converged = False
 
         self.residual_table = None
 
@@ -115,6 +132,12 @@ class StaticCoupled(BaseSolver):
         self.aero_solver.initialise(self.structural_solver.data, self.settings['aero_solver_settings'], restart=restart)
         self.data = self.aero_solver.data
 
+        self.accelerator = None
+        if self.settings['fsi_accelerator'] != 'Relaxation':
+            self.accelerator = fsiacceleration.initialise_accelerator(self.settings['fsi_accelerator'],
+                                                                      self.settings['relaxation_factor'],
+                                                                      self.settings['fsi_accelerator_settings'])
+
         if self.print_info:
             self.residual_table = cout.TablePrinter(9, 8, ['g', 'g', 'f', 'f', 'f', 'f', 'f', 'f', 'f'])
             self.residual_table.field_length[0] = 3
@@ -161,6 +184,10 @@ class StaticCoupled(BaseSolver):
         self.data.ts = 0
 
     def run(self, **kwargs):
+        self.n_iterations = 0
+        # forces the structure is deformed by, which the accelerator takes as the forces of the current iteration
+        applied_forces = (self.data.structure.timestep_info[self.data.ts].steady_applied_forces -
+                          self.data.structure.ini_info.steady_applied_forces)
         for i_step in range(self.settings['n_load_steps'] + 1):
             if (i_step == self.settings['n_load_steps'] and
                     self.settings['n_load_steps'] > 0):
@@ -175,7 +202,11 @@ class StaticCoupled(BaseSolver):
             if i_step > 0:
                 self.increase_ts()
 
+            if self.accelerator is not None:
+                self.accelerator.new_step()
+            self.converged = False
             for i_iter in range(self.settings['max_iter']):
+                self.n_iterations += 1
                 # run aero
                 self.data = self.aero_solver.run()
 
@@ -189,7 +220,8 @@ class StaticCoupled(BaseSolver):
                     self.data.structure.node_master_elem,
                     self.data.structure.connectivities,
                     self.data.structure.timestep_info[self.data.ts].cag(),
-                    self.data.aero.aero_dict)
+                    self.data.aero.aero_dict,
+                    mapping_tables=self.data.aero.force_mapping_tables)
 
                 if self.correct_forces:
                     struct_forces = \
@@ -215,7 +247,10 @@ class StaticCoupled(BaseSolver):
                     struct_forces += self.data.structure.timestep_info[self.data.ts].runtime_steady_forces
                     struct_forces += self.data.structure.timestep_info[self.data.ts].runtime_unsteady_forces
 
-                if not self.settings['relaxation_factor'] == 0.:
+                if self.accelerator is not None:
+                    struct_forces = self.accelerator.update(struct_forces, applied_forces)
+                    applied_forces = struct_forces.copy()
+                elif not self.settings['relaxation_factor'] == 0.:
                     if i_iter == 0:
                         self.previous_force = struct_forces.copy()
 
@@ -244,8 +279,15 @@ class StaticCoupled(BaseSolver):
                     # create q and dqdt vectors
                     self.structural_solver.update(self.data.structure.timestep_info[self.data.ts])
                     self.cleanup_timestep_info()
+                    self.converged = True
                     break
 
+            if self.accelerator is not None:
+                self.accelerator.end_step()
+
+        if self.accelerator is not None and self.print_info:
+            cout.cout_wrap(self.accelerator.summary(), 1)
+
         return self.data
 
     def convergence(self, i_iter, i_step):
@@ -303,10 +345,18 @@ class StaticCoupled(BaseSolver):
 
         return return_value
 
-    def change_trim(self, alpha, thrust, thrust_nodes, tail_deflection, tail_cs_index):
+    def change_trim(self, alpha, thrust, thrust_nodes, tail_deflection, tail_cs_index, initial_structural_step=None):
+        """
+        Modifies the trim inputs of the problem and resets the structure to the undeformed state, or to
+        ``initial_structural_step`` if given, which warm-starts the next solution. The warm-started structure keeps
+        the aerodynamic forces it was converged with as the forces of the first FSI iteration.
+        """
         # self.cleanup_timestep_info()
         self.data.structure.timestep_info = []
-        self.data.structure.timestep_info.append(self.data.structure.ini_info.copy())
+        if initial_structural_step is None:
+            self.data.structure.timestep_info.append(self.data.structure.ini_info.copy())
+        else:
+            self.data.structure.timestep_info.append(initial_structural_step.copy())
         aero_copy = self.data.aero.timestep_info[-1]
         self.data.aero.timestep_info = []
         self.data.aero.timestep_info.append(aero_copy)
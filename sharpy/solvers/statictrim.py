@@ -1,9 +1,13 @@
+import multiprocessing
+import threading
+
 import numpy as np
 
 import sharpy.utils.cout_utils as cout
 import sharpy.utils.solver_interface as solver_interface
 from sharpy.utils.solver_interface import solver, BaseSolver
 import sharpy.utils.settings as settings_utils
+import sharpy.utils.exceptions as exc
 import os
 
 
@@ -18,6 +22,17 @@ class StaticTrim(BaseSolver):
     equilibrium. The output angles are shown in degrees.
 
     The results from the trimming iteration can be saved to a text file by using the `save_info` option.
+
+    The gradients are computed in the first iteration by finite differences, unless an initial Jacobian is given with
+    the ``jacobian`` argument of :meth:`run`, e.g. that of a previous trim at nearby conditions. The perturbed
+    evaluations can be run concurrently in ``num_workers`` processes forked from the current one, each with its own
+    copy of ``data``, as long as no other thread is running. By default, each output is updated in the next iterations
+    with the secant gradient with respect to its own input. With ``jacobian_update = 'Broyden'``, the full Jacobian is
+    computed from the same perturbed evaluations and it is updated with Broyden rank one updates, in the variables
+    scaled by ``initial_angle_eps`` and ``initial_thrust_eps``.
+
+    With ``warm_start`` on, each evaluation starts the static solution from the converged structural state of the
+    closest previous evaluation in the scaled variables, instead of the undeformed structure.
     """
     solver_id = 'StaticTrim'
     solver_classification = 'Flight Dynamics'
@@ -25,6 +40,7 @@ class StaticTrim(BaseSolver):
     settings_types = dict()
     settings_default = dict()
     settings_description = dict()
+    settings_options = dict()
 
     settings_types['print_info'] = 'bool'
     settings_default['print_info'] = True
@@ -90,8 +106,28 @@ class StaticTrim(BaseSolver):
     settings_default['save_info'] = False
     settings_description['save_info'] = 'Save trim results to text file'
 
+    settings_types['jacobian_update'] = 'str'
+    settings_default['jacobian_update'] = 'Secant'
+    settings_description['jacobian_update'] = 'Update of the gradients after the first iteration. ``Secant`` ' \
+                                              'updates the gradient of each output with respect to its own input ' \
+                                              'and ``Broyden`` updates the full Jacobian'
+    settings_options['jacobian_update'] = ['Secant', 'Broyden']
+
+    settings_types['num_workers'] = 'int'
+    settings_default['num_workers'] = 1
+    settings_description['num_workers'] = 'Number of processes running the perturbed evaluations of the finite ' \
+                                          'difference gradients. The processes are forked, hence more than one ' \
+                                          'worker requires a platform supporting ``fork``. The evaluations are ' \
+                                          'run serially if other threads are running, e.g. the writers of ' \
+                                          '``SaveData``, since they cannot be safely forked'
+
+    settings_types['warm_start'] = 'bool'
+    settings_default['warm_start'] = False
+    settings_description['warm_start'] = 'Start each evaluation from the converged structural state of the closest ' \
+                                         'previous evaluation'
+
     settings_table = settings_utils.SettingsTable()
-    __doc__ += settings_table.generate(settings_types, settings_default, settings_description)
+    __doc__ += settings_table.generate(settings_types, settings_default, settings_description, settings_options)
 
     def __init__(self):
         self.data = None
@@ -110,14 +146,24 @@ class StaticTrim(BaseSolver):
         self.output_history = []
         self.gradient_history = []
         self.trimmed_values = np.zeros((3,))
+        self.jacobian = None
+        self.n_iterations = 0
+
+        # inputs and converged structural time steps of the previous evaluations
+        self.converged_states = []
 
         self.table = None
         self.folder = None
 
-    def initialise(self, data, restart=False):
+    def initialise(self, data, custom_settings=None, restart=False):
         self.data = data
-        self.settings = data.settings[self.solver_id]
-        settings_utils.to_custom_types(self.settings, self.settings_types, self.settings_default)
+        if custom_settings is None:
+            self.settings = data.settings[self.solver_id]
+        else:
+            self.settings = custom_settings
+        settings_utils.to_custom_types(self.settings, self.settings_types, self.settings_default,
+                                       options=self.settings_options)
+        self.converged_states = []
 
         self.solver = solver_interface.initialise_solver(self.settings['solver'])
         self.solver.initialise(self.data, self.settings['solver_settings'], restart=restart)
@@ -136,6 +182,7 @@ class StaticTrim(BaseSolver):
         self.aero_solver.next_step()
 
     def run(self, **kwargs):
+        jacobian = settings_utils.set_value_or_default(kwargs, 'jacobian', None)
 
         # In the event the modal solver has been run prior to StaticCoupled (i.e. to get undeformed modes), copy
         # results and then attach to the resulting timestep
@@ -145,7 +192,7 @@ class StaticTrim(BaseSolver):
         except AttributeError:
             modal_exists = False
 
-        self.trim_algorithm()
+        self.trim_algorithm(jacobian)
 
         if modal_exists:
             self.data.structure.timestep_info[-1].modal = modal
@@ -169,18 +216,26 @@ class StaticTrim(BaseSolver):
 
         return return_value
 
-    def trim_algorithm(self):
+    def trim_algorithm(self, jacobian=None):
         """
         Trim algorithm method
 
         The trim condition is found iteratively.
 
+        Args:
+            jacobian (np.array): Initial Jacobian of the outputs ``[fz, m, fx]`` with respect to the inputs
+                ``[alpha, gamma, thrust]``. If ``None``, it is computed by finite differences.
+
         Returns:
             np.array: array of trim values for angle of attack, control surface deflection and thrust.
         """
+        self.input_history = []
+        self.output_history = []
+        self.gradient_history = []
         for self.i_iter in range(self.settings['max_iter'] + 1):
+            self.n_iterations = self.i_iter + 1
             if self.i_iter == self.settings['max_iter']:
-                raise Exception('The Trim routine reached max iterations without convergence!')
+                raise exc.NotConvergedSolver('The Trim routine reached max iterations without convergence!')
 
             self.input_history.append([])
             self.output_history.append([])
@@ -212,32 +267,30 @@ class StaticTrim(BaseSolver):
                     self.trimmed_values = self.input_history[self.i_iter]
                     return
 
-                # compute gradients
-                # dfz/dalpha
-                (l, m, d) = self.evaluate(self.input_history[self.i_iter][0] + self.settings['initial_angle_eps'],
-                                          self.input_history[self.i_iter][1],
-                                          self.input_history[self.i_iter][2])
+                # compute gradients, unless given
+                if jacobian is None:
+                    # perturbed evaluations in alpha, gamma and thrust
+                    perturbations = np.diag(self.scaling())
+                    outputs = self.evaluate_perturbations(list(np.array(self.input_history[self.i_iter]) +
+                                                               perturbations))
 
-                self.gradient_history[self.i_iter][0] = ((l - self.output_history[self.i_iter][0]) /
-                                                         self.settings['initial_angle_eps'])
+                    # jacobian[i_output, i_input] with outputs [fz, m, fx] and inputs [alpha, gamma, thrust]
+                    self.jacobian = ((np.array(outputs) - np.array(self.output_history[self.i_iter])).T /
+                                     self.scaling())
+                else:
+                    self.jacobian = np.array(jacobian, dtype=float)
 
-                # dm/dgamma
-                (l, m, d) = self.evaluate(self.input_history[self.i_iter][0],
-                                          self.input_history[self.i_iter][1] + self.settings['initial_angle_eps'],
-                                          self.input_history[self.i_iter][2])
+                # dfz/dalpha, dm/dgamma and dfx/dthrust
+                for i_input in range(self.n_input):
+                    self.gradient_history[self.i_iter][i_input] = self.jacobian[i_input, i_input]
 
-                self.gradient_history[self.i_iter][1] = ((m - self.output_history[self.i_iter][1]) /
-                                                         self.settings['initial_angle_eps'])
-
-                # dfx/dthrust
-                (l, m, d) = self.evaluate(self.input_history[self.i_iter][0],
-                                          self.input_history[self.i_iter][1],
-                                          self.input_history[self.i_iter][2] +
-                                          self.settings['initial_thrust_eps'])
-
-                self.gradient_history[self.i_iter][2] = ((d - self.output_history[self.i_iter][2]) /
-                                                         self.settings['initial_thrust_eps'])
+                continue
 
+            if self.settings['jacobian_update'] == 'Broyden':
+                if all(self.broyden_iteration()):
+                    self.trimmed_values = self.input_history[self.i_iter]
+                    self.table.close_file()
+                    return
                 continue
 
             # if not all(np.isfinite(self.gradient_history[self.i_iter - 1]))
@@ -315,6 +368,133 @@ class StaticTrim(BaseSolver):
                 self.table.close_file()
                 return
 
+    def broyden_iteration(self):
+        """
+        Quasi-Newton iteration with the Broyden update of the Jacobian.
+
+        Returns:
+            np.array: convergence of the vertical force, moment and horizontal force.
+        """
+        input_previous = np.array(self.input_history[self.i_iter - 1])
+        output_previous = np.array(self.output_history[self.i_iter - 1])
+
+        self.input_history[self.i_iter] = list(input_previous - np.linalg.solve(self.jacobian, output_previous))
+        (self.output_history[self.i_iter][0],
+         self.output_history[self.i_iter][1],
+         self.output_history[self.i_iter][2]) = self.evaluate(*self.input_history[self.i_iter])
+
+        # rank one update in the scaled inputs
+        delta_input = (np.array(self.input_history[self.i_iter]) - input_previous)/self.scaling()
+        delta_output = np.array(self.output_history[self.i_iter]) - output_previous
+        scaled_jacobian = self.jacobian*self.scaling()
+        scaled_jacobian += (np.outer(delta_output - scaled_jacobian.dot(delta_input), delta_input) /
+                            delta_input.dot(delta_input))
+        self.jacobian = scaled_jacobian/self.scaling()
+        for i_input in range(self.n_input):
+            self.gradient_history[self.i_iter][i_input] = self.jacobian[i_input, i_input]
+
+        return self.convergence(*self.output_history[self.i_iter])
+
+    def scaling(self):
+        """
+        Perturbations of the finite difference gradients, used as scaling of the inputs.
+        """
+        return np.array([self.settings['initial_angle_eps'],
+                         self.settings['initial_angle_eps'],
+                         self.settings['initial_thrust_eps']])
+
+    def evaluate_perturbations(self, inputs):
+        """
+        Evaluates the perturbed inputs ``(alpha, deflection_gamma, thrust)`` of the finite difference gradients.
+
+        With ``num_workers > 1`` the evaluations are run in processes forked from the current one, such that each of
+        them runs the solver on its own copy of ``data``.
+
+        Returns:
+            list: ``(fz, m, fx)`` of each input.
+        """
+        global _forked_trim
+        num_workers = min(self.settings['num_workers'], len(inputs))
+        if num_workers > 1 and not self.fork_is_safe():
+            cout.cout_wrap('StaticTrim: the perturbed evaluations are run serially, since the process cannot be '
+                           'safely forked', 3)
+            num_workers = 1
+
+        if num_workers > 1:
+            _forked_trim = self
+            try:
+                with multiprocessing.get_context('fork').Pool(num_workers) as pool:
+                    results = pool.map(_forked_solve, inputs)
+            finally:
+                _forked_trim = None
+        else:
+            results = [self.solve(*input_values) for input_values in inputs]
+
+        outputs = []
+        for input_values, (forces, moments, converged_step) in zip(inputs, results):
+            # the converged states of the forked processes are merged here
+            self.store_converged_state(input_values, converged_step)
+            self.print_evaluation(*input_values, forces, moments)
+            outputs.append((forces[2], moments[1], forces[0]))
+        return outputs
+
+    @staticmethod
+    def fork_is_safe():
+        """
+        Whether the evaluations can be run in forked processes. Only the forking thread is copied into the child
+        processes, hence other running threads (e.g. the writer threads of
+        :class:`~sharpy.utils.h5utils.TimeSeriesWriter`) could leave their locks and files in an undefined state.
+        """
+        return 'fork' in multiprocessing.get_all_start_methods() and threading.active_count() == 1
+
+    def solve(self, alpha, deflection_gamma, thrust):
+        """
+        Runs the solver at the given trim inputs.
+
+        Returns:
+            tuple: total forces and moments, and the converged structural time step with ``warm_start`` (``None``
+            otherwise), to be stored with :meth:`store_converged_state`.
+        """
+        initial_structural_step = None
+        if self.settings['warm_start']:
+            initial_structural_step = self.closest_converged_state(alpha, deflection_gamma, thrust)
+
+        # modify the trim in the static_coupled solver
+        self.solver.change_trim(alpha,
+                                thrust,
+                                self.settings['thrust_nodes'],
+                                deflection_gamma - alpha,
+                                self.settings['tail_cs_index'],
+                                initial_structural_step=initial_structural_step)
+        # run the solver
+        self.solver.run()
+        # extract resultants
+        forces, moments = self.solver.extract_resultants()
+
+        converged_step = None
+        if self.settings['warm_start']:
+            converged_step = self.solver.data.structure.timestep_info[-1].copy()
+
+        return forces, moments, converged_step
+
+    def store_converged_state(self, inputs, converged_step):
+        """
+        Stores the converged structural time step of the evaluation at ``inputs``, if any.
+        """
+        if converged_step is not None:
+            self.converged_states.append((np.array(inputs, dtype=float), converged_step))
+
+    def closest_converged_state(self, alpha, deflection_gamma, thrust):
+        """
+        Converged structural time step of the previous evaluation closest to the given inputs, ``None`` if there are
+        no previous evaluations.
+        """
+        if not self.converged_states:
+            return None
+        distances = [np.linalg.norm((inputs - np.array([alpha, deflection_gamma, thrust]))/self.scaling())
+                     for inputs, _ in self.converged_states]
+        return self.converged_states[int(np.argmin(distances))][1]
+
     def evaluate(self, alpha, deflection_gamma, thrust):
         if not np.isfinite(alpha):
             import pdb; pdb.set_trace()
@@ -328,16 +508,9 @@ class StaticTrim(BaseSolver):
         # cout.cout_wrap('Alpha: ' + str(alpha*180/np.pi), 2)
         # cout.cout_wrap('CS deflection: ' + str((deflection_gamma - alpha)*180/np.pi), 2)
         # cout.cout_wrap('Thrust: ' + str(thrust), 2)
-        # modify the trim in the static_coupled solver
-        self.solver.change_trim(alpha,
-                                thrust,
-                                self.settings['thrust_nodes'],
-                                deflection_gamma - alpha,
-                                self.settings['tail_cs_index'])
-        # run the solver
-        self.solver.run()
-        # extract resultants
-        forces, moments = self.solver.extract_resultants()
+        forces, moments, converged_step = self.solve(alpha, deflection_gamma, thrust)
+        self.store_converged_state([alpha, deflection_gamma, thrust], converged_step)
+        self.print_evaluation(alpha, deflection_gamma, thrust, forces, moments)
 
         forcez = forces[2]
         forcex = forces[0]
@@ -347,6 +520,9 @@ class StaticTrim(BaseSolver):
         # cout.cout_wrap('fy = ' + str(forces[1]) + ' my = ' + str(moments[1]), 2)
         # cout.cout_wrap('fz = ' + str(forces[2]) + ' mz = ' + str(moments[2]), 2)
 
+        return forcez, moment, forcex
+
+    def print_evaluation(self, alpha, deflection_gamma, thrust, forces, moments):
         self.table.print_line([self.i_iter,
                                alpha*180/np.pi,
                                (deflection_gamma - alpha)*180/np.pi,
@@ -358,4 +534,10 @@ class StaticTrim(BaseSolver):
                                moments[1],
                                moments[2]])
 
-        return forcez, moment, forcex
+
+# trim solver running the evaluations in the forked processes of StaticTrim.evaluate_perturbations
+_forked_trim = None
+
+
+def _forked_solve(input_values):
+    return _forked_trim.solve(*input_values)
@@ -191,7 +191,8 @@ class StaticUvlm(BaseSolver):
                     self.data.structure.node_master_elem,
                     self.data.structure.connectivities,
                     structure_tstep.cag(),
-                    self.data.aero.aero_dict)
+                    self.data.aero.aero_dict,
+                    mapping_tables=self.data.aero.force_mapping_tables)
 
         return self.data
 
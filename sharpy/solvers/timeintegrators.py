@@ -1,5 +1,6 @@
 import numpy as np
 import ctypes as ct
+import scipy.sparse as sp
 
 import sharpy.utils.settings as settings_utils
 from sharpy.utils.solver_interface import solver
@@ -34,6 +35,36 @@ class _BaseTimeIntegrator():
     def build_matrix(self, M, C, K):
         pass
 
+    def assemble_system(self, A, Q, kBnh, LM_Q, coeff_kBnh):
+        """
+        Assembles the system of equations from the matrix ``A`` of the degrees of freedom of the structure and the
+        matrix ``kBnh`` of the non-holonomic constraints.
+
+        If ``A`` is a ``scipy.sparse`` matrix, the system matrix is returned in CSC format.
+        """
+        sys_size = self.sys_size
+        num_LM_eq = self.num_LM_eq
+
+        Qout = np.zeros((sys_size + num_LM_eq), dtype=ct.c_double, order='F')
+        Qout[:sys_size] = Q
+        Qout[sys_size:] = LM_Q
+
+        if sp.issparse(A):
+            if num_LM_eq == 0:
+                return sp.csc_matrix(A), Qout
+            kBnh = sp.csr_matrix(kBnh)
+            Asys = sp.bmat([[A, kBnh.T],
+                            [coeff_kBnh*kBnh, None]], format='csc')
+            return Asys, Qout
+
+        Asys = np.zeros((sys_size + num_LM_eq, sys_size + num_LM_eq),
+                         dtype=ct.c_double, order='F')
+        Asys[:sys_size, :sys_size] = A
+        Asys[sys_size:, :sys_size] = coeff_kBnh*kBnh
+        Asys[:sys_size, sys_size:] = kBnh.T
+
+        return Asys, Qout
+
 
     def corrector(self, q, dqdt, dqddt, Dq):
         pass
@@ -105,21 +136,11 @@ class NewmarkBeta(_BaseTimeIntegrator):
 
     def build_matrix(self, M, C, K, Q, kBnh, LM_Q):
 
-        sys_size = self.sys_size
-        num_LM_eq = self.num_LM_eq
-
-        Asys = np.zeros((sys_size + num_LM_eq, sys_size + num_LM_eq),
-                         dtype=ct.c_double, order='F')
-        Qout = np.zeros((sys_size + num_LM_eq), dtype=ct.c_double, order='F')
-
-        Asys[:sys_size, :sys_size] = K + C*self.gamma/(self.beta*self.dt) + M/(self.beta*self.dt*self.dt)
-        Qout[:sys_size] = Q.copy()
-
-        Asys[sys_size:, :sys_size] = (self.gamma/self.beta/self.dt)*kBnh
-        Asys[:sys_size, sys_size:] = kBnh.T
-        Qout[sys_size:] = LM_Q.copy()
-
-        return Asys, Qout
+        return self.assemble_system(K + C*self.gamma/(self.beta*self.dt) + M/(self.beta*self.dt*self.dt),
+                                    Q,
+                                    kBnh,
+                                    LM_Q,
+                                    self.gamma/self.beta/self.dt)
 
     def corrector(self, q, dqdt, dqddt, Dq):
 
@@ -209,24 +230,13 @@ class GeneralisedAlpha(_BaseTimeIntegrator):
 
     def build_matrix(self, M, C, K, Q, kBnh, LM_Q):
 
-        sys_size = self.sys_size
-        num_LM_eq = self.num_LM_eq
-
-        Asys = np.zeros((sys_size + num_LM_eq, sys_size + num_LM_eq),
-                         dtype=ct.c_double, order='F')
-        Qout = np.zeros((sys_size + num_LM_eq), dtype=ct.c_double, order='F')
-
-        Asys[:sys_size, :sys_size] = (self.om_af*K +
-                                      self.gamma*self.om_af/self.beta/self.dt*C +
-                                      self.om_am/(self.beta*self.dt*self.dt)*M)
-
-        Qout[:sys_size] = Q.copy()
-
-        Asys[sys_size:, :sys_size] = (self.gamma*self.om_af/self.beta/self.dt)*kBnh
-        Asys[:sys_size, sys_size:] = kBnh.T
-        Qout[sys_size:] = LM_Q.copy()
-
-        return Asys, Qout
+        return self.assemble_system(self.om_af*K +
+                                    self.gamma*self.om_af/self.beta/self.dt*C +
+                                    self.om_am/(self.beta*self.dt*self.dt)*M,
+                                    Q,
+                                    kBnh,
+                                    LM_Q,
+                                    self.gamma*self.om_af/self.beta/self.dt)
 
     def corrector(self, q, dqdt, dqddt, Dq):
 
@@ -5,7 +5,7 @@ import copy
 from sharpy.structure.basestructure import BaseStructure
 import sharpy.structure.models.beamstructures as beamstructures
 import sharpy.utils.algebra as algebra
-from sharpy.utils.datastructures import StructTimeStepInfo
+from sharpy.utils.datastructures import StructTimeStepInfo, append_copy
 import sharpy.utils.multibody as mb
 
 
@@ -57,6 +57,7 @@ class Beam(BaseStructure):
         self.num_dof = 0
 
         self.fortran = dict()
+        self.fortran_version = 0  # number of times the Fortran arrays have been generated
 
         # Multibody variabes
         self.ini_mb_dict = dict()
@@ -66,6 +67,7 @@ class Beam(BaseStructure):
 
         self.global_nodes_num = None
         self.global_elems_num = None
+        self.body_index_maps = None  # elements, nodes and first dof in the multibody system (see get_body)
 
 
     def generate(self, in_data, settings):
@@ -375,7 +377,7 @@ class Beam(BaseStructure):
             # copy from ini_info
             timestep_info.append(self.ini_info.copy())
         else:
-            timestep_info.append(self.timestep_info[-1].copy())
+            append_copy(timestep_info, self.timestep_info[-1])
 
     def next_step(self):
         self.add_timestep(self.timestep_info)
@@ -412,6 +414,9 @@ class Beam(BaseStructure):
 
 
     def generate_fortran(self):
+        # the structure has been (re)generated, e.g. after a change of the lumped masses at run time
+        self.fortran_version += 1
+
         # steady, no time-dependant information
         self.fortran['num_nodes'] = np.zeros((self.num_elem,), dtype=ct.c_int, order='F')
         for elem in self.elements:
@@ -526,7 +531,8 @@ class Beam(BaseStructure):
         ibody_beam = Beam()
 
         # Define the nodes and elements belonging to the body
-        ibody_beam.global_elems_num, ibody_beam.global_nodes_num = mb.get_elems_nodes_list(self, ibody)
+        ibody_beam.body_index_maps = mb.get_body_index_maps(self, ibody)
+        ibody_beam.global_elems_num, ibody_beam.global_nodes_num = ibody_beam.body_index_maps[:2]
 
         # Renaming for clarity
         ibody_elements = ibody_beam.global_elems_num
@@ -539,12 +545,10 @@ class Beam(BaseStructure):
         ibody_beam.num_node = len(ibody_beam.global_nodes_num)
         ibody_beam.num_elem = len(ibody_beam.global_elems_num)
 
-        ibody_beam.connectivities = self.connectivities[ibody_elements,:]
-        # Renumber the connectivities
+        # Renumber the connectivities (ibody_nodes is sorted)
         int_list_nodes = np.arange(0, ibody_beam.num_node, 1)
-        for ielem in range(ibody_beam.num_elem):
-            for inode_in_elem in range(ibody_beam.num_node_elem):
-                ibody_beam.connectivities[ielem, inode_in_elem] = int_list_nodes[ibody_nodes == ibody_beam.connectivities[ielem, inode_in_elem]]
+        ibody_beam.connectivities = np.searchsorted(ibody_nodes, self.connectivities[ibody_elements, :]).astype(
+            self.connectivities.dtype)
 
         # TODO: I could copy only the needed stiffness and masses to save storage
         ibody_beam.elem_stiffness = self.elem_stiffness[ibody_elements].astype(dtype=ct.c_int, order='F', copy=True)
@@ -600,8 +604,10 @@ class Beam(BaseStructure):
 
         ibody_beam.generate_dof_arrays()
 
-        ibody_beam.ini_info = self.ini_info.get_body(self, ibody_beam.num_dof, ibody)
-        ibody_beam.timestep_info = self.timestep_info[-1].get_body(self, ibody_beam.num_dof, ibody)
+        ibody_beam.ini_info = self.ini_info.get_body(self, ibody_beam.num_dof, ibody,
+                                                     index_maps=ibody_beam.body_index_maps)
+        ibody_beam.timestep_info = self.timestep_info[-1].get_body(self, ibody_beam.num_dof, ibody,
+                                                                   index_maps=ibody_beam.body_index_maps)
 
         # generate the Element array
         for ielem in range(ibody_beam.num_elem):
@@ -39,6 +39,7 @@ import sharpy.utils.cout_utils as cout
 import os
 import ctypes as ct
 import numpy as np
+import scipy.sparse as sp
 import sharpy.utils.algebra as ag
 from sharpy.utils.settings import set_value_or_default
 
@@ -104,6 +105,73 @@ def initialise_lc(lc_name, print_info=True):
     return lc
 
 
+class SparseMatrixAccumulator(object):
+    """
+    Square matrix accumulated as COO triplets
+
+    It supports the ``matrix[rows, cols] += block`` and ``matrix[rows, cols] -= block`` operations used by the Lagrange
+    Constraints to add their contributions to ``LM_C`` and ``LM_K``, so that the same equations generate either dense
+    or sparse matrices. Only the non-zero entries of each block are stored and repeated entries are summed when the
+    matrix is converted with :meth:`tocsc`.
+
+    Args:
+        size (int): number of rows and columns of the matrix
+    """
+    def __init__(self, size):
+        self.shape = (size, size)
+        self.rows = []
+        self.cols = []
+        self.values = []
+
+    def __getitem__(self, index):
+        return _SparseBlock()
+
+    def __setitem__(self, index, block):
+        if not isinstance(block, _SparseBlock):
+            raise NotImplementedError('Only the += and -= operations are supported by SparseMatrixAccumulator')
+        rows = np.atleast_1d(np.arange(self.shape[0])[index[0]])
+        cols = np.atleast_1d(np.arange(self.shape[1])[index[1]])
+        self.add_block(rows, cols, block.value)
+
+    def add_block(self, rows, cols, block):
+        """
+        Adds the dense ``block`` to the entries ``[rows, cols]``
+
+        Args:
+            rows (np.ndarray): row indices of the block
+            cols (np.ndarray): column indices of the block
+            block (np.ndarray): values to be added, broadcastable to ``(len(rows), len(cols))``
+        """
+        block = np.broadcast_to(block, (len(rows), len(cols)))
+        i_row, i_col = np.nonzero(block)
+        self.rows.append(rows[i_row])
+        self.cols.append(cols[i_col])
+        self.values.append(block[i_row, i_col])
+
+    def tocsc(self):
+        if not self.values:
+            return sp.csc_matrix(self.shape, dtype=ct.c_double)
+        return sp.coo_matrix((np.concatenate(self.values),
+                              (np.concatenate(self.rows), np.concatenate(self.cols))),
+                             shape=self.shape, dtype=ct.c_double).tocsc()
+
+
+class _SparseBlock(object):
+    """
+    Contribution to a block of a :class:`SparseMatrixAccumulator` in an augmented assignment
+    """
+    def __init__(self):
+        self.value = 0.
+
+    def __iadd__(self, other):
+        self.value = self.value + other
+        return self
+
+    def __isub__(self, other):
+        self.value = self.value - other
+        return self
+
+
 class BaseLagrangeConstraint(metaclass=ABCMeta):
     __doc__ = """
     BaseLagrangeConstraint
@@ -2018,7 +2086,8 @@ def define_num_LM_eq(lc_list):
     return num_LM_eq
 
 
-def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size, dt, Lambda, Lambda_dot, dynamic_or_static):
+def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size, dt, Lambda, Lambda_dot, dynamic_or_static,
+                             sparse=False):
     """
     generate_lagrange_matrix
 
@@ -2035,6 +2104,8 @@ def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size
         Lambda(np.ndarray): list of Lagrange multipliers values
         Lambda_dot(np.ndarray): list of the first derivative of the Lagrange multipliers values
         dynamic_or_static (str): string defining if the computation is dynamic or static
+        sparse (bool): return ``LM_C`` and ``LM_K`` as ``scipy.sparse.csc_matrix``, accumulated from the non-zero
+            entries of each constraint
 
     Returns:
         LM_C (np.ndarray): Damping matrix associated to the Lagrange Multipliers equations
@@ -2042,8 +2113,12 @@ def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size
         LM_Q (np.ndarray): Vector of independent terms associated to the Lagrange Multipliers equations
     """
     # Initialize matrices
-    LM_C = np.zeros((sys_size + num_LM_eq,sys_size + num_LM_eq), dtype=ct.c_double, order = 'F')
-    LM_K = np.zeros((sys_size + num_LM_eq,sys_size + num_LM_eq), dtype=ct.c_double, order = 'F')
+    if sparse:
+        LM_C = SparseMatrixAccumulator(sys_size + num_LM_eq)
+        LM_K = SparseMatrixAccumulator(sys_size + num_LM_eq)
+    else:
+        LM_C = np.zeros((sys_size + num_LM_eq,sys_size + num_LM_eq), dtype=ct.c_double, order = 'F')
+        LM_K = np.zeros((sys_size + num_LM_eq,sys_size + num_LM_eq), dtype=ct.c_double, order = 'F')
     LM_Q = np.zeros((sys_size + num_LM_eq,),dtype=ct.c_double, order = 'F')
 
     # Define the matrices associated to the constratints
@@ -2076,6 +2151,8 @@ def generate_lagrange_matrix(lc_list, MB_beam, MB_tstep, ts, num_LM_eq, sys_size
                         Lambda=Lambda,
                         Lambda_dot=Lambda_dot)
 
+    if sparse:
+        return LM_C.tocsc(), LM_K.tocsc(), LM_Q
     return LM_C, LM_K, LM_Q
 
 
@@ -648,6 +648,42 @@ def crv2tan(psi):
         return np.eye(3) + k1*psi_skew + k2*np.dot(psi_skew, psi_skew)
 
 
+def crv2tan_vec(crv_vec):
+    r"""
+    Batched version of :func:`crv2tan` for an array of Cartesian rotation vectors.
+
+    Args:
+        crv_vec (np.array): ``n x 3`` array of Cartesian rotation vectors.
+
+    Returns:
+        np.array: ``n x 3 x 3`` array of tangential operators.
+    """
+    n_nodes = crv_vec.shape[0]
+    norm_psi = np.sqrt(np.matmul(crv_vec[:, None, :], crv_vec[:, :, None])[:, 0, 0])
+    small = norm_psi < 1e-8
+
+    # series expansion for the small rotations
+    k1 = -0.5*np.ones((n_nodes,))
+    k2 = np.ones((n_nodes,))/6.0
+    norm_large = norm_psi[~small]
+    k1[~small] = (np.cos(norm_large) - 1.0)/(norm_large*norm_large)
+    k2[~small] = (1.0 - np.sin(norm_large)/norm_large)/(norm_large*norm_large)
+
+    psi_skew = np.zeros((n_nodes, 3, 3))
+    psi_skew[:, 1, 2] = -crv_vec[:, 0]
+    psi_skew[:, 2, 0] = -crv_vec[:, 1]
+    psi_skew[:, 0, 1] = -crv_vec[:, 2]
+    psi_skew[:, 2, 1] = crv_vec[:, 0]
+    psi_skew[:, 0, 2] = crv_vec[:, 1]
+    psi_skew[:, 1, 0] = crv_vec[:, 2]
+
+    tan = np.zeros((n_nodes, 3, 3))
+    tan[:] = np.eye(3)
+    tan += k1[:, None, None]*psi_skew
+    tan += k2[:, None, None]*np.matmul(psi_skew, psi_skew)
+    return tan
+
+
 def crv2invtant(psi):
     tan = crv2tan(psi).T
     return np.linalg.inv(tan)
@@ -672,6 +708,47 @@ def crv2triad_vec(crv_vec):
     return v1, v2, v3
 
 
+def crv2rotation_vec(crv_vec):
+    r"""
+    Batched version of :func:`crv2rotation` for an array of Cartesian rotation vectors.
+
+    The operations are performed in the same order as in :func:`crv2rotation` such that the result for each vector
+    matches the scalar function.
+
+    Args:
+        crv_vec (np.array): ``n x 3`` array of Cartesian rotation vectors.
+
+    Returns:
+        np.array: ``n x 3 x 3`` array of rotation matrices.
+    """
+    n_nodes = crv_vec.shape[0]
+    norm_psi = np.sqrt(np.matmul(crv_vec[:, None, :], crv_vec[:, :, None])[:, 0, 0])
+    small = norm_psi < 1e-15
+
+    # series expansion for the small rotations
+    normal = crv_vec.copy()
+    normal[~small] /= norm_psi[~small, None]
+    sin_term = np.ones((n_nodes,))
+    cos_term = 0.5*np.ones((n_nodes,))
+    sin_term[~small] = np.sin(norm_psi[~small])
+    cos_term[~small] = 1.0 - np.cos(norm_psi[~small])
+
+    skew_normal = np.zeros((n_nodes, 3, 3))
+    skew_normal[:, 1, 2] = -normal[:, 0]
+    skew_normal[:, 2, 0] = -normal[:, 1]
+    skew_normal[:, 0, 1] = -normal[:, 2]
+    skew_normal[:, 2, 1] = normal[:, 0]
+    skew_normal[:, 0, 2] = normal[:, 1]
+    skew_normal[:, 1, 0] = normal[:, 2]
+
+    rot_matrix = np.zeros((n_nodes, 3, 3))
+    rot_matrix[:] = np.eye(3)
+    rot_matrix += sin_term[:, None, None]*skew_normal
+    rot_matrix += cos_term[:, None, None]*np.matmul(skew_normal, skew_normal)
+
+    return rot_matrix
+
+
 def quat2rotation(q1):
     r"""Calculate rotation matrix based on quaternions.
 
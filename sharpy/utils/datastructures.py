@@ -182,61 +182,55 @@ class AeroTimeStepInfo(object):
         Returns a copy of a deepcopy of a :class:`~sharpy.utils.datastructures.AeroTimeStepInfo`
         """
         copied = AeroTimeStepInfo(self.dimensions, self.dimensions_star)
-        # generate placeholder for aero grid zeta coordinates
-        for i_surf in range(copied.n_surf):
-            copied.zeta[i_surf] = self.zeta[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        for i_surf in range(copied.n_surf):
-            copied.zeta_dot[i_surf] = self.zeta_dot[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        # panel normals
-        for i_surf in range(copied.n_surf):
-            copied.normals[i_surf] = self.normals[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        # panel forces
-        for i_surf in range(copied.n_surf):
-            copied.forces[i_surf] = self.forces[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
-
-        # panel forces
-        for i_surf in range(copied.n_surf):
-            copied.dynamic_forces[i_surf] = self.dynamic_forces[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        self.copy_into(copied)
 
-        # generate placeholder for aero grid zeta_star coordinates
-        for i_surf in range(copied.n_surf):
-            copied.zeta_star[i_surf] = self.zeta_star[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        return copied
 
-        # placeholder for external velocity
-        for i_surf in range(copied.n_surf):
-            copied.u_ext[i_surf] = self.u_ext[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+    def copy_into(self, dest):
+        """
+        Copies the contents of this time step into an existing
+        :class:`~sharpy.utils.datastructures.AeroTimeStepInfo`, reusing its arrays.
 
-        for i_surf in range(copied.n_surf):
-            copied.u_ext_star[i_surf] = self.u_ext_star[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        Arrays in ``dest`` are overwritten in place when their shape matches the one in this time step, otherwise new
+        arrays are allocated. This makes ``dest`` a deep copy of this time step without any heap allocation when both
+        share the same dimensions, such that scratch time steps can be reused through the FSI iterations.
 
-        # allocate gamma and gamma star matrices
-        for i_surf in range(copied.n_surf):
-            copied.gamma[i_surf] = self.gamma[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        Args:
+            dest (AeroTimeStepInfo): time step to which the information is copied
 
-        for i_surf in range(copied.n_surf):
-            copied.gamma_dot[i_surf] = self.gamma_dot[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        Returns:
+            AeroTimeStepInfo: ``dest``, with the information of this time step
+        """
+        dest.dimensions = copy_array_into(self.dimensions, dest.dimensions, dtype=self.dimensions.dtype)
+        dest.dimensions_star = copy_array_into(self.dimensions_star, dest.dimensions_star,
+                                               dtype=self.dimensions_star.dtype)
+        dest.n_surf = self.n_surf
+
+        for name in ['zeta', 'zeta_dot', 'normals', 'forces', 'dynamic_forces', 'zeta_star', 'u_ext', 'u_ext_star',
+                     'gamma', 'gamma_dot', 'gamma_star', 'dist_to_orig']:
+            source_list = getattr(self, name)
+            dest_list = getattr(dest, name)
+            if len(dest_list) != len(source_list):
+                dest_list = [None]*len(source_list)
+                setattr(dest, name, dest_list)
+            for i_surf in range(len(source_list)):
+                dest_list[i_surf] = copy_array_into(source_list[i_surf], dest_list[i_surf])
 
-        for i_surf in range(copied.n_surf):
-            copied.gamma_star[i_surf] = self.gamma_star[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        # total forces
+        dest.inertial_steady_forces = copy_array_into(self.inertial_steady_forces, dest.inertial_steady_forces)
+        dest.body_steady_forces = copy_array_into(self.body_steady_forces, dest.body_steady_forces)
+        dest.inertial_unsteady_forces = copy_array_into(self.inertial_unsteady_forces, dest.inertial_unsteady_forces)
+        dest.body_unsteady_forces = copy_array_into(self.body_unsteady_forces, dest.body_unsteady_forces)
 
-        for i_surf in range(copied.n_surf):
-            copied.dist_to_orig[i_surf] = self.dist_to_orig[i_surf].astype(dtype=ct.c_double, copy=True, order='C')
+        dest.postproc_cell = copy_value_into(self.postproc_cell, dest.postproc_cell)
+        dest.postproc_node = copy_value_into(self.postproc_node, dest.postproc_node)
 
-        # total forces
-        copied.inertial_steady_forces = self.inertial_steady_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        copied.body_steady_forces = self.body_steady_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        copied.inertial_unsteady_forces = self.inertial_unsteady_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        copied.body_unsteady_forces = self.body_unsteady_forces.astype(dtype=ct.c_double, copy=True, order='C')
-        
-        copied.postproc_cell = copy.deepcopy(self.postproc_cell)
-        copied.postproc_node = copy.deepcopy(self.postproc_node)
+        dest.in_global_AFoR = self.in_global_AFoR
 
-        copied.control_surface_deflection = self.control_surface_deflection.astype(dtype=ct.c_double, copy=True)
+        dest.control_surface_deflection = copy_array_into(self.control_surface_deflection,
+                                                          dest.control_surface_deflection)
 
-        return copied
+        return dest
 
     def generate_ctypes_pointers(self):
         """
@@ -431,6 +425,65 @@ class AeroTimeStepInfo(object):
                 del self.postproc_cell[k]
 
 
+def copy_array_into(source, dest, order='C', dtype=ct.c_double):
+    """
+    Copies ``source`` into ``dest`` in place if both arrays are compatible. Otherwise, a new array is allocated.
+
+    Args:
+        source (np.ndarray): array to copy. Can be ``None``
+        dest (np.ndarray): array where ``source`` is copied if it has the same shape and type. Can be ``None``
+        order (str): memory layout of the array if it needs to be allocated
+        dtype: type of the array if it needs to be allocated
+
+    Returns:
+        np.ndarray: ``dest`` with the contents of ``source`` or a new copy of ``source``
+    """
+    if source is None:
+        return None
+    if (isinstance(dest, np.ndarray) and dest.shape == source.shape and dest.dtype == dtype
+            and dest.flags.writeable):
+        np.copyto(dest, source)
+        return dest
+    return source.astype(dtype=dtype, order=order, copy=True)
+
+
+def copy_value_into(source, dest):
+    """
+    Deep copies ``source`` reusing, where possible, the arrays already allocated in ``dest``.
+
+    Dictionaries and lists are copied recursively, ``np.ndarray`` are copied in place if their shape and type match
+    and any other object is deep copied.
+
+    Args:
+        source: object to copy
+        dest: object of a previous copy
+
+    Returns:
+        A deep copy of ``source``, sharing the storage of ``dest`` where possible
+    """
+    if isinstance(source, np.ndarray):
+        if (isinstance(dest, np.ndarray) and dest.shape == source.shape and dest.dtype == source.dtype
+                and dest.flags.writeable):
+            np.copyto(dest, source)
+            return dest
+        return copy.deepcopy(source)
+
+    if isinstance(source, dict) and isinstance(dest, dict):
+        for key in list(dest.keys()):
+            if key not in source:
+                del dest[key]
+        for key, value in source.items():
+            dest[key] = copy_value_into(value, dest.get(key, None))
+        return dest
+
+    if isinstance(source, list) and isinstance(dest, list) and len(source) == len(dest):
+        for i_item in range(len(source)):
+            dest[i_item] = copy_value_into(source[i_item], dest[i_item])
+        return dest
+
+    return copy.deepcopy(source)
+
+
 def init_matrix_structure(dimensions, with_dim_dimension, added_size=0):
     matrix = []
     for i_surf in range(len(dimensions)):
@@ -588,56 +641,48 @@ class StructTimeStepInfo(object):
         """
         copied = StructTimeStepInfo(self.num_node, self.num_elem, self.num_node_elem, ct.c_int(len(self.q)-10),
                                     self.mb_quat.shape[0])
+        self.copy_into(copied)
 
-        copied.in_global_AFoR = self.in_global_AFoR
-        copied.num_node = self.num_node
-        copied.num_elem = self.num_elem
-        copied.num_node_elem = self.num_node_elem
+        return copied
 
-        # generate placeholder for node coordinates
-        copied.pos = self.pos.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.pos_dot = self.pos_dot.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.pos_ddot = self.pos_ddot.astype(dtype=ct.c_double, order='F', copy=True)
+    def copy_into(self, dest):
+        """
+        Copies the contents of this time step into an existing
+        :class:`~sharpy.utils.datastructures.StructTimeStepInfo`, reusing its arrays.
 
-        # placeholder for CRV
-        copied.psi = self.psi.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.psi_dot = self.psi_dot.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.psi_ddot = self.psi_ddot.astype(dtype=ct.c_double, order='F', copy=True)
+        Arrays in ``dest`` are overwritten in place when their shape matches the one in this time step, otherwise new
+        arrays are allocated. This makes ``dest`` a deep copy of this time step without any heap allocation when both
+        share the same dimensions, such that scratch time steps can be reused through the FSI iterations.
 
-        # FoR data
-        copied.quat = self.quat.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.for_pos = self.for_pos.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.for_vel = self.for_vel.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.for_acc = self.for_acc.astype(dtype=ct.c_double, order='F', copy=True)
-
-        copied.steady_applied_forces = self.steady_applied_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.unsteady_applied_forces = self.unsteady_applied_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.runtime_steady_forces = self.runtime_steady_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.runtime_unsteady_forces = self.runtime_unsteady_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.gravity_forces = self.gravity_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.total_gravity_forces = self.total_gravity_forces.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.total_forces = self.total_forces.astype(dtype=ct.c_double, order='F', copy=True)
-
-        copied.q = self.q.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.dqdt = self.dqdt.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.dqddt = self.dqddt.astype(dtype=ct.c_double, order='F', copy=True)
-
-        copied.postproc_cell = copy.deepcopy(self.postproc_cell)
-        copied.postproc_node = copy.deepcopy(self.postproc_node)
-
-        copied.psi_local = self.psi_local.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.psi_dot_local = self.psi_dot_local.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.mb_FoR_pos = self.mb_FoR_pos.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.mb_FoR_vel = self.mb_FoR_vel.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.mb_FoR_acc = self.mb_FoR_acc.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.mb_quat = self.mb_quat.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.mb_dquatdt = self.mb_dquatdt.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.forces_constraints_nodes = self.forces_constraints_nodes.astype(dtype=ct.c_double, order='F', copy=True)
-        copied.forces_constraints_FoR = self.forces_constraints_FoR.astype(dtype=ct.c_double, order='F', copy=True)
-
-        copied.mb_dict = copy.deepcopy(self.mb_dict)
+        Args:
+            dest (StructTimeStepInfo): time step to which the information is copied
 
-        return copied
+        Returns:
+            StructTimeStepInfo: ``dest``, with the information of this time step
+        """
+        dest.in_global_AFoR = self.in_global_AFoR
+        dest.num_node = self.num_node
+        dest.num_elem = self.num_elem
+        dest.num_node_elem = self.num_node_elem
+
+        for name in ['pos', 'pos_dot', 'pos_ddot',
+                     'psi', 'psi_dot', 'psi_ddot',
+                     'quat', 'for_pos', 'for_vel', 'for_acc',
+                     'steady_applied_forces', 'unsteady_applied_forces',
+                     'runtime_steady_forces', 'runtime_unsteady_forces',
+                     'gravity_forces', 'total_gravity_forces', 'total_forces',
+                     'q', 'dqdt', 'dqddt',
+                     'psi_local', 'psi_dot_local',
+                     'mb_FoR_pos', 'mb_FoR_vel', 'mb_FoR_acc', 'mb_quat', 'mb_dquatdt',
+                     'forces_constraints_nodes', 'forces_constraints_FoR']:
+            setattr(dest, name, copy_array_into(getattr(self, name), getattr(dest, name), order='F'))
+
+        dest.postproc_cell = copy_value_into(self.postproc_cell, dest.postproc_cell)
+        dest.postproc_node = copy_value_into(self.postproc_node, dest.postproc_node)
+
+        dest.mb_dict = copy_value_into(self.mb_dict, dest.mb_dict)
+
+        return dest
 
     def glob_pos(self, include_rbm=True):
         """
@@ -667,7 +712,7 @@ class StructTimeStepInfo(object):
         return algebra.quat2euler(self.quat)
 
 
-    def get_body(self, beam, num_dof_ibody, ibody):
+    def get_body(self, beam, num_dof_ibody, ibody, index_maps=None):
         """
         get_body
 
@@ -680,22 +725,21 @@ class StructTimeStepInfo(object):
             beam(:class:`~sharpy.structure.models.beam.Beam`): beam information of the multibody system
             num_dof_ibody (int): Number of degrees of freedom associated to the ``ibody``
             ibody(int): body number to be extracted
+            index_maps (tuple): Elements, nodes and first degree of freedom of the body, as given by
+                :func:`sharpy.utils.multibody.get_body_index_maps`. Computed if not given.
 
         Returns:
         	StructTimeStepInfo: timestep information of the isolated body
         """
 
         # Define the nodes and elements belonging to the body
-        ibody_elems, ibody_nodes = mb.get_elems_nodes_list(beam, ibody)
+        if index_maps is None:
+            index_maps = mb.get_body_index_maps(beam, ibody)
+        ibody_elems, ibody_nodes, ibody_first_dof = index_maps
 
         ibody_num_node = len(ibody_nodes)
         ibody_num_elem = len(ibody_elems)
 
-        ibody_first_dof = 0
-        for index_body in range(ibody - 1):
-            aux_elems, aux_nodes = mb.get_elems_nodes_list(beam, index_body)
-            ibody_first_dof += np.sum(beam.vdof[aux_nodes] > -1)*6
-
         # Initialize the new StructTimeStepInfo
         ibody_StructTimeStepInfo = StructTimeStepInfo(ibody_num_node, ibody_num_elem, self.num_node_elem, num_dof = num_dof_ibody, num_bodies = beam.num_bodies)
 
@@ -1016,6 +1060,94 @@ class StructTimeStepInfo(object):
 
         return forces_output
 
+class TimeStepHistory(list):
+    """
+    Time step history with a bounded number of retained time steps
+
+    It behaves as the ``list`` used for ``timestep_info``, such that ``timestep_info[-1]`` or ``timestep_info[ts]``
+    keep working, but only the last ``max_length`` time steps are kept in memory. Older time steps are replaced by
+    ``None`` as new ones are appended, the same way the :class:`~sharpy.postproc.cleanup.Cleanup` postprocessor does.
+    Therefore, they need to be processed by the online postprocessors before they are released.
+
+    The last released time steps are pooled, such that their arrays can be reused by the new time steps (see
+    :func:`append_copy`) instead of allocating new ones.
+
+    Args:
+        iterable (list): initial time steps
+        max_length (int): number of time steps retained. If ``0``, the full history is kept.
+
+    Attributes:
+        max_length (int): number of time steps retained
+        released_steps (list): released time steps available to be recycled
+    """
+    max_released_steps = 2
+
+    def __init__(self, iterable=(), max_length=0):
+        super().__init__(iterable)
+        self.max_length = max_length
+        self.released_steps = []
+        self.release_old_steps()
+
+    def append(self, tstep):
+        super().append(tstep)
+        self.release_old_steps()
+
+    def release_old_steps(self):
+        """
+        Replaces by ``None`` the time steps older than the last ``max_length``.
+        """
+        if self.max_length <= 0:
+            return
+        # the entries before the first None have already been released
+        i_step = len(self) - self.max_length - 1
+        released_steps = []
+        while i_step >= 0 and self[i_step] is not None:
+            tstep = self[i_step]
+            self[i_step] = None
+            if not any(tstep is retained for retained in self[-self.max_length:]):
+                released_steps.append(tstep)
+            i_step -= 1
+        # the latest released steps are recycled first
+        self.released_steps = (released_steps + self.released_steps)[:self.max_released_steps]
+
+    def recycle_step(self):
+        """
+        Removes a released time step from the pool to reuse its arrays.
+
+        Returns:
+            Released time step, ``None`` if there is none.
+        """
+        try:
+            return self.released_steps.pop(0)
+        except IndexError:
+            return None
+
+    def __reduce__(self):
+        return self.__class__, (list(self), self.max_length)
+
+
+def append_copy(timestep_info, tstep):
+    """
+    Appends a copy of ``tstep`` to ``timestep_info``.
+
+    If ``timestep_info`` is a :class:`TimeStepHistory` with released time steps, the copy is made in place into one of
+    them with ``copy_into``, such that no new arrays are allocated.
+
+    Args:
+        timestep_info (list or TimeStepHistory): time steps
+        tstep (AeroTimeStepInfo or StructTimeStepInfo): time step to copy
+    """
+    try:
+        recycled = timestep_info.recycle_step()
+    except AttributeError:
+        recycled = None
+
+    if recycled is None:
+        timestep_info.append(tstep.copy())
+    else:
+        timestep_info.append(tstep.copy_into(recycled))
+
+
 class LinearTimeStepInfo(object):
     """
     Linear timestep info containing the state, input and output variables for a given timestep
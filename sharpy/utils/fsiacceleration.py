@@ -0,0 +1,335 @@
+"""
+Convergence accelerators of the FSI iterations
+
+The coupled solvers iterate the structural forces to the fixed point :math:`\\tilde{\\mathbf{x}}(\\mathbf{x}) =
+\\mathbf{x}`, where :math:`\\tilde{\\mathbf{x}}` are the forces mapped from the aerodynamic solution on the structure
+deformed by the forces :math:`\\mathbf{x}`. The accelerators compute the forces of the next iteration from the
+residual :math:`\\mathbf{r} = \\tilde{\\mathbf{x}} - \\mathbf{x}` instead of using a constant relaxation factor.
+
+The accelerators are selected in the coupled solvers with the ``fsi_accelerator`` setting and configured with
+``fsi_accelerator_settings``.
+"""
+import numpy as np
+import scipy.linalg as scalg
+
+import sharpy.utils.settings as settings_utils
+
+dict_of_accelerators = dict()
+
+
+# decorator
+def accelerator(arg):
+    global dict_of_accelerators
+    try:
+        arg.accelerator_id
+    except AttributeError:
+        raise AttributeError('Class defined as accelerator has no accelerator_id attribute')
+    dict_of_accelerators[arg.accelerator_id] = arg
+    return arg
+
+
+def initialise_accelerator(accelerator_id, relaxation_factor, settings=None):
+    """
+    Generates and initialises an instance of the accelerator ``accelerator_id``.
+
+    Args:
+        accelerator_id (str): Name of the accelerator.
+        relaxation_factor (float): Relaxation factor of the plain relaxation steps, ``0`` is no relaxation and ``-> 1``
+            is very relaxed, as in the coupled solvers.
+        settings (dict): Settings of the accelerator.
+
+    Returns:
+        BaseAccelerator: Initialised accelerator.
+    """
+    try:
+        cls_type = dict_of_accelerators[accelerator_id]
+    except KeyError:
+        raise KeyError('Unknown FSI accelerator %s. Available accelerators are %s' %
+                       (accelerator_id, list(dict_of_accelerators.keys())))
+    instance = cls_type()
+    instance.initialise(relaxation_factor, settings)
+    return instance
+
+
+class BaseAccelerator():
+    """
+    Common interface and iteration statistics of the accelerators.
+
+    Every step of the coupled solver (load or time step) is started with :meth:`new_step` and closed with
+    :meth:`end_step`. The forces of each FSI iteration are given to :meth:`update`, which returns the forces to apply
+    in the next structural solution. A step repeated from its initial state is started again with
+    :meth:`restart_step`.
+
+    The number of iterations saved with respect to the plain relaxation is estimated at the end of each step from the
+    convergence rate of the plain relaxation steps, which is measured whenever an update is a plain relaxation step
+    (e.g. the first iteration of a step). It is the difference between the iterations the plain relaxation would need
+    to reduce the residual from its first to its last value of the step and the iterations actually used.
+
+    Attributes:
+        iterations (int): Total number of iterations with a residual.
+        num_steps (int): Number of closed steps.
+        saved_iterations (int): Estimated total number of iterations saved.
+        relaxation_rate (float): Last measured ratio of the residual norms of consecutive plain relaxation iterations.
+    """
+    accelerator_id = None
+
+    settings_types = dict()
+    settings_default = dict()
+    settings_description = dict()
+
+    def __init__(self):
+        self.settings = None
+        self.omega = 1.
+
+        self.x = None
+        self.residual = None
+        self.x_tilde = None
+
+        self.residual_norms = list()
+        self.relaxation_update = False
+        self.relaxation_rate = None
+
+        self.iterations = 0
+        self.num_steps = 0
+        self.saved_iterations = 0
+
+    def initialise(self, relaxation_factor, settings=None):
+        if settings is None:
+            settings = dict()
+        self.settings = settings
+        settings_utils.to_custom_types(self.settings, self.settings_types, self.settings_default, no_ctype=True)
+        self.omega = 1. - relaxation_factor
+
+    def new_step(self):
+        """
+        Starts a new step, clearing the iteration history of the previous one.
+        """
+        self.x = None
+        self.residual = None
+        self.x_tilde = None
+        self.residual_norms = list()
+        self.relaxation_update = False
+
+    def restart_step(self):
+        """
+        Restarts the current step, discarding the iteration history gathered in it.
+        """
+        self.new_step()
+
+    def end_step(self):
+        """
+        Closes the current step and updates the iteration statistics.
+        """
+        self.num_steps += 1
+        saved = self.estimate_saved_iterations()
+        if saved is not None:
+            self.saved_iterations += saved
+
+    def update(self, x_tilde, x=None):
+        """
+        Forces of the next iteration.
+
+        Args:
+            x_tilde (np.ndarray): Forces computed in the current iteration.
+            x (np.ndarray (optional)): Forces applied in the current iteration. Defaults to the value returned by the
+                previous call in the step.
+
+        Returns:
+            np.ndarray: Forces to apply in the next iteration, with the shape of ``x_tilde``.
+        """
+        if x is None:
+            x = self.x
+        if x is None:
+            self.x = x_tilde.copy()
+            return x_tilde.copy()
+
+        residual = (x_tilde - x).ravel()
+        residual_norm = np.linalg.norm(residual)
+        if self.relaxation_update and len(self.residual_norms) and self.residual_norms[-1] > 0.:
+            self.relaxation_rate = residual_norm/self.residual_norms[-1]
+        self.residual_norms.append(residual_norm)
+        self.iterations += 1
+
+        self.relaxation_update = False
+        x_new = self.accelerate(x.ravel(), x_tilde.ravel(), residual)
+
+        self.x_tilde = x_tilde.ravel().copy()
+        self.residual = residual
+        self.x = x_new.reshape(x_tilde.shape)
+        return self.x.copy()
+
+    def accelerate(self, x, x_tilde, residual):
+        raise NotImplementedError
+
+    def relaxation(self, x, residual):
+        """
+        Plain relaxation step with the solver ``relaxation_factor``.
+        """
+        self.relaxation_update = True
+        return x + self.omega*residual
+
+    def estimate_saved_iterations(self):
+        """
+        Iterations saved in the current step, ``None`` if they cannot be estimated.
+        """
+        if len(self.residual_norms) < 2 or self.relaxation_rate is None:
+            return None
+        if not 0. < self.relaxation_rate < 1.:
+            return None
+        if self.residual_norms[0] == 0. or self.residual_norms[-1] == 0.:
+            return None
+
+        relaxation_iterations = int(np.ceil(np.log(self.residual_norms[-1]/self.residual_norms[0])/
+                                            np.log(self.relaxation_rate)))
+        return relaxation_iterations - (len(self.residual_norms) - 1)
+
+    def summary(self):
+        return ('%s FSI accelerator: %u iterations in %u steps, %i iterations saved (estimate)' %
+                (self.accelerator_id, self.iterations, self.num_steps, self.saved_iterations))
+
+
+@accelerator
+class Aitken(BaseAccelerator):
+    r"""
+    Aitken dynamic relaxation.
+
+    The relaxation factor of each iteration is computed from the last two residuals as
+
+    .. math:: \omega_k = -\omega_{k-1}\frac{\mathbf{r}_{k-1}^T(\mathbf{r}_k - \mathbf{r}_{k-1})}{||\mathbf{r}_k -
+        \mathbf{r}_{k-1}||^2}
+
+    and the forces of the next iteration are :math:`\mathbf{x}_{k+1} = \mathbf{x}_k + \omega_k\mathbf{r}_k`. The first
+    iteration of every step uses :math:`\omega_0 = 1 - ` ``relaxation_factor``.
+
+    See Küttler, U., Wall, W. A., Fixed-point fluid-structure interaction solvers with dynamic relaxation.
+    Computational Mechanics, 2008.
+    """
+    accelerator_id = 'Aitken'
+
+    settings_types = dict()
+    settings_default = dict()
+    settings_description = dict()
+
+    settings_types['min_factor'] = 'float'
+    settings_default['min_factor'] = 1e-2
+    settings_description['min_factor'] = 'Lower bound of the dynamic relaxation factor :math:`\\omega_k`'
+
+    settings_types['max_factor'] = 'float'
+    settings_default['max_factor'] = 1.
+    settings_description['max_factor'] = 'Upper bound of the dynamic relaxation factor :math:`\\omega_k`'
+
+    def __init__(self):
+        super().__init__()
+        self.omega_k = None
+
+    def new_step(self):
+        super().new_step()
+        self.omega_k = None
+
+    def accelerate(self, x, x_tilde, residual):
+        if self.residual is None:
+            self.omega_k = self.omega
+            return self.relaxation(x, residual)
+
+        delta_residual = residual - self.residual
+        delta_norm = np.dot(delta_residual, delta_residual)
+        if delta_norm > 0.:
+            self.omega_k = -self.omega_k*np.dot(self.residual, delta_residual)/delta_norm
+            self.omega_k = min(max(self.omega_k, self.settings['min_factor']), self.settings['max_factor'])
+
+        return x + self.omega_k*residual
+
+
+@accelerator
+class IQNILS(BaseAccelerator):
+    r"""
+    Interface quasi-Newton with an inverse Jacobian from a least-squares model (IQN-ILS).
+
+    The differences of the residuals and of the computed forces between iterations are stored in the columns of
+    :math:`\mathbf{V}` and :math:`\mathbf{W}`. The forces of the next iteration are
+
+    .. math:: \mathbf{x}_{k+1} = \tilde{\mathbf{x}}_k + \mathbf{W}\mathbf{c}
+
+    where :math:`\mathbf{c}` minimises :math:`||\mathbf{V}\mathbf{c} + \mathbf{r}_k||`. The columns of the last
+    ``reuse_steps`` steps are retained, such that the secant information of previous time steps is used from the
+    first iteration of a new step. Without columns, a plain relaxation step is taken. Nearly linearly dependent columns
+    are removed with a QR filter, older columns first.
+
+    See Degroote, J., Bathe, K. J., Vierendeels, J., Performance of a new partitioned procedure versus a monolithic
+    procedure in fluid-structure interaction. Computers & Structures, 2009.
+    """
+    accelerator_id = 'IQN-ILS'
+
+    settings_types = dict()
+    settings_default = dict()
+    settings_description = dict()
+
+    settings_types['reuse_steps'] = 'int'
+    settings_default['reuse_steps'] = 4
+    settings_description['reuse_steps'] = 'Number of previous steps whose secant information is reused'
+
+    settings_types['filter_tolerance'] = 'float'
+    settings_default['filter_tolerance'] = 1e-8
+    settings_description['filter_tolerance'] = 'Columns whose diagonal entry of the QR decomposition is below this ' \
+                                               'fraction of their norm are removed'
+
+    def __init__(self):
+        super().__init__()
+        # secant differences of the current and previous steps, newest first
+        self.V = list()
+        self.W = list()
+        self.previous_V = list()
+        self.previous_W = list()
+
+    def new_step(self):
+        super().new_step()
+        if self.V:
+            self.previous_V.insert(0, self.V)
+            self.previous_W.insert(0, self.W)
+        del self.previous_V[self.settings['reuse_steps']:]
+        del self.previous_W[self.settings['reuse_steps']:]
+        self.V = list()
+        self.W = list()
+
+    def restart_step(self):
+        # the secant differences of the discarded iterations are not reused
+        self.V = list()
+        self.W = list()
+        super().restart_step()
+
+    def accelerate(self, x, x_tilde, residual):
+        if self.residual is not None:
+            self.V.insert(0, residual - self.residual)
+            self.W.insert(0, x_tilde - self.x_tilde)
+
+        V = self.V + [column for step in self.previous_V for column in step]
+        W = self.W + [column for step in self.previous_W for column in step]
+        if len(V) and V[0].shape != residual.shape:
+            # the size of the problem has changed, discard the history
+            self.previous_V, self.previous_W, self.V, self.W = list(), list(), list(), list()
+            V, W = list(), list()
+
+        Q, R, columns = self.qr_filter(V)
+        if not columns:
+            return self.relaxation(x, residual)
+
+        c = scalg.solve_triangular(R, -Q.T.dot(residual))
+        return x_tilde + np.column_stack([W[i_column] for i_column in columns]).dot(c)
+
+    def qr_filter(self, V):
+        """
+        Economic QR decomposition of the columns of ``V`` without those that are nearly linearly dependent.
+
+        Returns:
+            tuple: ``Q``, ``R`` and indices of the retained columns.
+        """
+        columns = [i_column for i_column in range(len(V)) if np.linalg.norm(V[i_column]) > 0.]
+        while columns:
+            Q, R = scalg.qr(np.column_stack([V[i_column] for i_column in columns]), mode='economic')
+            dependent = np.where(np.abs(np.diag(R)) <
+                                 self.settings['filter_tolerance']*np.linalg.norm(R, axis=0))[0]
+            if not len(dependent):
+                return Q, R, columns
+            del columns[dependent[0]]
+
+        return None, None, columns
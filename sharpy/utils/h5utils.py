@@ -9,6 +9,8 @@ Set of utilities for opening/reading files
 import h5py as h5
 import os
 import errno
+import queue
+import threading
 
 import numpy as np
 import warnings
@@ -419,3 +421,187 @@ def save_list_as_array(list_obj, grp_target, compress_float=False):
 
                 return True
     return False
+
+
+class TimeSeriesWriter:
+    """
+    Streams time series of arrays into chunked and extendable datasets of an open ``h5`` file.
+
+    Each variable is stored in a dataset of shape ``(n_steps, ...)``, with the time step index along the first
+    dimension, such that a single dataset per variable is extended through the simulation instead of creating a new
+    group per time step. The time step indices are stored in the ``ts`` dataset.
+
+    Variables are given as a ``dict`` whose values may be arrays or ``list`` and ``dict`` of arrays. These are saved
+    as sub-groups with the same ``_read_as`` convention of :func:`add_as_grp`. The dataset of each variable is created
+    in the first time step where it appears, with the rows of the previous time steps filled with ``NaN`` (integer
+    variables appearing after the first time step are stored as floats for this purpose). Time steps without the
+    variable, or where it is empty, are filled with ``NaN`` (zeros for integer datasets). The shape of a variable
+    cannot change through the time series, a ``ValueError`` is raised instead.
+
+    Time steps are buffered and written to the file in batches of ``chunk_steps``. If ``threaded``, the writing takes
+    place in a background thread, so the caller does not wait for the disk. Exceptions raised while writing are
+    raised again in the next call to :meth:`write` or :meth:`close`.
+
+    Args:
+        grp (h5py.Group): group where the datasets are created. The file needs to be kept open until :meth:`close`
+        chunk_steps (int): number of time steps in each chunk and in each batch written to the file
+        compression (str): ``h5py`` compression filter (``gzip`` or ``lzf``). No compression if ``None``
+        compress_float (bool): save 64-bit float arrays in single precision
+        threaded (bool): write in a background thread
+    """
+    def __init__(self, grp, chunk_steps=10, compression=None, compress_float=False, threaded=True):
+        self.grp = grp
+        self.chunk_steps = max(chunk_steps, 1)
+        self.compression = compression
+        self.compress_float = compress_float
+
+        self.datasets = None
+        self.buffer = []
+        self.error = None
+
+        self.queue = None
+        self.thread = None
+        if threaded:
+            self.queue = queue.Queue()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def write(self, ts, variables):
+        """
+        Adds a time step to the time series. The arrays are copied, so they may be modified after the call.
+
+        Args:
+            ts (int): time step index
+            variables (dict): arrays, or ``list`` and ``dict`` of arrays, to save
+        """
+        self._raise_error()
+        entry = (ts, self._flatten(variables))
+        if self.thread is None:
+            self._append(entry)
+        else:
+            self.queue.put(entry)
+
+    def close(self):
+        """
+        Writes the buffered time steps and waits for the background thread to finish. The file is not closed.
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.error is None:
+            self._flush_buffer()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error = self.error
+            self.error = None
+            raise error
+
+    def _run(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self._append(entry)
+            except Exception as error:
+                self.error = error
+
+    def _flatten(self, variables, path='', flat=None):
+        if flat is None:
+            flat = dict()
+        if isinstance(variables, dict):
+            items = variables.items()
+        else:
+            items = (('%.5d' % i_item, item) for i_item, item in enumerate(variables))
+        for name, value in items:
+            if isinstance(value, (dict, list, tuple)):
+                flat[path + name] = 'dict' if isinstance(value, dict) else 'list'
+                self._flatten(value, path + name + '/', flat)
+            elif isinstance(value, ndarray) and value.dtype != object:
+                flat[path + name] = value.copy()
+            elif isinstance(value, BasicNumTypes) and not isinstance(value, complex):
+                flat[path + name] = array(value)
+        return flat
+
+    def _append(self, entry):
+        self.buffer.append(entry)
+        if len(self.buffer) >= self.chunk_steps:
+            self._flush_buffer()
+
+    def _create_dataset(self, name, value, n_steps, backfill):
+        """
+        Creates the dataset of the variable ``name`` with ``n_steps`` rows. ``backfill`` if the variable is missing in
+        previous time steps.
+        """
+        dtype = value.dtype
+        if self.compress_float and dtype == float64:
+            dtype = float32
+        if backfill and not (np.issubdtype(dtype, np.floating) or np.issubdtype(dtype, np.complexfloating)):
+            # the previous time steps are filled with NaN
+            dtype = float64
+        fillvalue = None
+        if np.issubdtype(dtype, np.floating) or np.issubdtype(dtype, np.complexfloating):
+            fillvalue = np.nan
+        self.datasets[name] = self.grp.create_dataset(name,
+                                                      shape=(n_steps,) + value.shape,
+                                                      maxshape=(None,) + value.shape,
+                                                      dtype=dtype,
+                                                      chunks=(self.chunk_steps,) + value.shape,
+                                                      compression=self.compression,
+                                                      fillvalue=fillvalue)
+
+    def _flush_buffer(self):
+        if len(self.buffer) == 0:
+            return
+        if self.datasets is None:
+            self.datasets = dict()
+            self.datasets['ts'] = self.grp.create_dataset('ts', shape=(0,), maxshape=(None,), dtype=int64,
+                                                          chunks=(self.chunk_steps,))
+
+        n_new = len(self.buffer)
+        n_old = self.datasets['ts'].shape[0]
+
+        # new variables and shapes, checked before any dataset is modified
+        new_variables = dict()
+        for i_entry, (ts, variables) in enumerate(self.buffer):
+            for name, value in variables.items():
+                if isinstance(value, str) or value.size == 0:
+                    continue
+                if name in self.datasets:
+                    shape = self.datasets[name].shape[1:]
+                else:
+                    shape = new_variables.setdefault(name, (value, n_old + i_entry > 0))[0].shape
+                if value.shape != shape:
+                    raise ValueError('The shape of %s changes from %s to %s in time step %u. Variables whose shape '
+                                     'changes cannot be written to a time series' %
+                                     (self.grp.name + '/' + name, shape, value.shape, ts))
+
+        for ts, variables in self.buffer:
+            for name, value in variables.items():
+                if isinstance(value, str) and name not in self.grp:
+                    # sub-group
+                    sub_grp = self.grp.create_group(name)
+                    sub_grp['_read_as'] = value
+        for name, (value, backfill) in new_variables.items():
+            self._create_dataset(name, value, n_old, backfill)
+
+        for name, dataset in self.datasets.items():
+            if name == 'ts':
+                block = array([entry[0] for entry in self.buffer], dtype=int64)
+            else:
+                block = np.zeros((n_new,) + dataset.shape[1:], dtype=dataset.dtype)
+                if dataset.fillvalue is not None and np.isnan(dataset.fillvalue):
+                    block.fill(np.nan)
+                for i_entry, entry in enumerate(self.buffer):
+                    value = entry[1].get(name, None)
+                    if isinstance(value, ndarray) and value.size > 0:
+                        block[i_entry] = value
+            dataset.resize(n_old + n_new, axis=0)
+            dataset[n_old:] = block
+        self.buffer = []
+        self.grp.file.flush()
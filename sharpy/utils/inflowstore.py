@@ -0,0 +1,292 @@
+"""Turbulent Inflow Store
+
+Memory-mapped storage of turbulent velocity fields defined in a rectilinear grid.
+
+The velocity snapshots are converted once into a contiguous binary array of shape ``(n_snapshots, 3, nx, ny, nz)``
+(a ``.npy`` file) and a small header with the grid and time information (``.npz`` file with the same base name).
+The store is then opened as a ``np.memmap`` and only the slabs of the snapshots touched by the points being
+interpolated are paged in memory.
+
+Space and time are interpolated with a single trilinear kernel: the cell indices and weights of the points are
+computed once per call and applied to the (at most) two snapshots that bound the requested time.
+"""
+import os
+
+import numpy as np
+
+
+def header_file(filename):
+    """
+    Returns the name of the header file of the store ``filename``
+    """
+    return os.path.splitext(filename)[0] + '.npz'
+
+
+def create_store(filename, grid, n_snapshots, time=(0., 1.), dtype=np.float64, attributes=None):
+    """
+    Creates an empty inflow store on disk.
+
+    Args:
+        filename (str): path of the ``.npy`` file of the store
+        grid (tuple): ``(x_grid, y_grid, z_grid)`` monotonically increasing coordinates of the grid
+        n_snapshots (int): number of time snapshots
+        time (tuple): ``(start, stride)`` of the snapshot times
+        dtype (np.dtype): data type of the velocity field
+        attributes (dict, optional): additional entries of the header, such as the options the field was converted
+            with, which are checked by :func:`store_matches`
+
+    Returns:
+        InflowStore: writable store. Snapshots are written with :meth:`InflowStore.write_snapshot`.
+    """
+    shape = (n_snapshots, 3) + tuple(len(coord) for coord in grid)
+    data = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=shape)
+    if attributes is None:
+        attributes = dict()
+    np.savez(header_file(filename),
+             x_grid=grid[0],
+             y_grid=grid[1],
+             z_grid=grid[2],
+             time=np.array(time, dtype=float),
+             **attributes)
+    return InflowStore(filename, data=data)
+
+
+def store_matches(filename, shape=None, sources=(), attributes=None):
+    """
+    Checks whether the store ``filename`` can be reused instead of converting the field again: it exists, it is newer
+    than the ``sources`` files it was converted from and, if given, it holds a field of the given ``shape`` and its
+    header has the given ``attributes``.
+    """
+    if not (os.path.isfile(filename) and os.path.isfile(header_file(filename))):
+        return False
+    for source in sources:
+        if os.path.getmtime(source) > os.path.getmtime(filename):
+            return False
+    if attributes:
+        with np.load(header_file(filename)) as header:
+            for key, value in attributes.items():
+                if key not in header or not np.array_equal(header[key], value):
+                    return False
+    if shape is None:
+        return True
+    try:
+        data = np.load(filename, mmap_mode='r')
+    except ValueError:
+        return False
+    return data.shape == tuple(shape)
+
+
+def bts_attributes(case_with_tower=False, new_orientation='xyz'):
+    """
+    Header attributes of a store converted from a TurbSim ``.bts`` file with :func:`bts_to_store`
+    """
+    return {'case_with_tower': case_with_tower, 'new_orientation': new_orientation}
+
+
+def bts_to_store(bts_file, filename, case_with_tower=False, new_orientation='xyz'):
+    """
+    Converts a TurbSim ``.bts`` file into a single-snapshot inflow store.
+
+    The axes of the field are reoriented as in :class:`~sharpy.generators.turbvelocityfieldbts.TurbVelocityFieldBts`.
+    The grid and velocities are then stored in the :math:`G^*` frame of the XDMF fields read by
+    :class:`~sharpy.generators.turbvelocityfield.TurbVelocityField`, where :math:`x^* = x`, :math:`y^* = z` and
+    :math:`z^* = -y`.
+
+    Args:
+        bts_file (str): TurbSim binary file
+        filename (str): path of the ``.npy`` file of the store
+        case_with_tower (bool): the field includes the tower points (see
+            :class:`~sharpy.generators.turbvelocityfieldbts.TurbVelocityFieldBts`)
+        new_orientation (str): new orientation of the axes (see
+            :class:`~sharpy.generators.turbvelocityfieldbts.TurbVelocityFieldBts`)
+
+    Returns:
+        InflowStore: the converted store
+    """
+    from sharpy.generators.turbvelocityfieldbts import TurbVelocityFieldBts
+
+    x_grid, y_grid, z_grid, vel = TurbVelocityFieldBts.read_turbsim_bts(bts_file, case_with_tower)
+    if not new_orientation == 'xyz':
+        x_grid, y_grid, z_grid, vel = TurbVelocityFieldBts.change_orientation(x_grid, y_grid, z_grid, vel,
+                                                                              new_orientation)
+    store = create_store(filename, (x_grid, z_grid, -y_grid[::-1]), 1,
+                         attributes=bts_attributes(case_with_tower, new_orientation))
+    vel_star = vel[[0, 2, 1]].transpose(0, 1, 3, 2)[:, :, :, ::-1]
+    vel_star[2] *= -1.
+    store.write_snapshot(0, vel_star)
+    store.flush()
+    return store
+
+
+class InflowStore(object):
+    """
+    Memory-mapped turbulent inflow field
+
+    Args:
+        filename (str): path of the ``.npy`` file of the store
+        grid (tuple, optional): ``(x_grid, y_grid, z_grid)`` coordinates replacing the ones in the header, for example
+            to apply an offset to the field. They must have the same number of points as the stored field.
+        in_memory (bool): load the whole field in memory instead of memory-mapping it
+        data (np.ndarray, optional): already opened field. Used by :func:`create_store`.
+
+    Attributes:
+        grid (tuple): ``(x_grid, y_grid, z_grid)`` coordinates of the grid
+        time (np.ndarray): ``(start, stride)`` of the snapshot times
+        n_snapshots (int): number of time snapshots
+        padding (int): number of extra grid points read on each side of the requested slabs, so that slightly moving
+            lattices do not page new slabs in every call
+    """
+    padding = 2
+
+    def __init__(self, filename, grid=None, in_memory=False, data=None):
+        self.filename = filename
+        if data is None:
+            data = np.load(filename, mmap_mode=None if in_memory else 'r')
+        self.data = data
+        self.n_snapshots = self.data.shape[0]
+
+        with np.load(header_file(filename)) as header:
+            if grid is None:
+                grid = (header['x_grid'], header['y_grid'], header['z_grid'])
+            self.time = header['time']
+        self.grid = tuple(np.asarray(coord, dtype=float) for coord in grid)
+        for i_dim in range(3):
+            if len(self.grid[i_dim]) != self.data.shape[2 + i_dim]:
+                raise ValueError('The grid has {:d} points in direction {:d} but the '
+                                 'stored field {:d}'.format(len(self.grid[i_dim]), i_dim, self.data.shape[2 + i_dim]))
+
+        # paged slabs: snapshot -> (lower grid indices, slab)
+        self._slabs = dict()
+
+    def write_snapshot(self, i_snapshot, velocity):
+        """
+        Writes the ``(3, nx, ny, nz)`` velocity field of the snapshot ``i_snapshot``
+        """
+        self.data[i_snapshot] = velocity
+        self._slabs.pop(i_snapshot, None)
+
+    def flush(self):
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+    def bbox(self):
+        """
+        Returns the ``(3, 2)`` bounding box of the grid
+        """
+        return np.array([[coord[0], coord[-1]] for coord in self.grid])
+
+    def snapshots(self, t):
+        """
+        Snapshots bounding the time ``t`` and linear interpolation coefficient between them.
+
+        Times before the first snapshot take the first one and times after the last snapshot take the last one.
+
+        Returns:
+            tuple: ``(i_snapshot0, i_snapshot1, coeff)``, where the field is
+            ``(1 - coeff)*field[i_snapshot0] + coeff*field[i_snapshot1]``
+        """
+        if t is None or self.n_snapshots == 1:
+            return 0, 0, 0.
+        it0 = int(max(0, np.floor((t - self.time[0])/self.time[1])))
+        if it0 >= self.n_snapshots - 1:
+            return self.n_snapshots - 1, self.n_snapshots - 1, 0.
+        coeff = (t - (it0*self.time[1] + self.time[0]))/self.time[1]
+        return it0, it0 + 1, max(0., coeff)
+
+    def interpolate(self, points, t=None, fill_value=0.):
+        """
+        Interpolates the velocity field in space and time
+
+        Args:
+            points (np.ndarray): ``(n_points, 3)`` coordinates of the points
+            t (float, optional): time. If ``None``, the first snapshot is used (frozen field).
+            fill_value (float): value assigned to the points outside the grid
+
+        Returns:
+            np.ndarray: ``(n_points, 3)`` velocity at the points
+        """
+        it0, it1, coeff = self.snapshots(t)
+        output = np.full((points.shape[0], 3), fill_value, dtype=float)
+
+        cell, weights, isin = self.cell_weights(points)
+        if not isin.any():
+            return output
+
+        lower = np.array([ind.min() - 1 for ind in cell])
+        upper = np.array([ind.max() + 1 for ind in cell])
+        inner_output = self._trilinear(it0, cell, weights, lower, upper)
+        if coeff != 0. and it1 != it0:
+            inner_output *= 1. - coeff
+            inner_output += coeff*self._trilinear(it1, cell, weights, lower, upper)
+        self._release_slabs((it0, it1))
+
+        output[isin, :] = inner_output
+        return output
+
+    def cell_weights(self, points):
+        """
+        Cell indices and trilinear weights of the points inside the grid
+
+        Returns:
+            tuple: ``(cell, weights, isin)``, where ``cell`` is a list with the indices of the upper corner of the cell
+            in each direction, ``weights`` the local coordinates in the cell in each direction and ``isin`` the mask of
+            the points inside the grid.
+        """
+        isin = np.ones((points.shape[0],), dtype=bool)
+        for i_dim in range(3):
+            isin &= (points[:, i_dim] <= self.grid[i_dim][-1]) & (points[:, i_dim] >= self.grid[i_dim][0])
+        inner_points = points[isin, :]
+
+        cell = [None]*3
+        weights = [None]*3
+        for i_dim in range(3):
+            coord = self.grid[i_dim]
+            cell[i_dim] = np.clip(np.searchsorted(coord, inner_points[:, i_dim], side='right'), 1, len(coord) - 1)
+            coord_0 = coord[cell[i_dim] - 1]
+            coord_1 = coord[cell[i_dim]]
+            weights[i_dim] = (inner_points[:, i_dim] - coord_0)/(coord_1 - coord_0)
+        return cell, weights, isin
+
+    def _trilinear(self, i_snapshot, cell, weights, lower, upper):
+        slab_lower, slab = self._page(i_snapshot, lower, upper)
+        ix, iy, iz = [cell[i_dim] - slab_lower[i_dim] for i_dim in range(3)]
+        x, y, z = weights
+        output = np.zeros((len(x), 3))
+        for corner_x in range(2):
+            weight_x = x if corner_x else 1. - x
+            for corner_y in range(2):
+                weight_y = y if corner_y else 1. - y
+                for corner_z in range(2):
+                    weight_z = z if corner_z else 1. - z
+                    corner_value = slab[:, ix - 1 + corner_x, iy - 1 + corner_y, iz - 1 + corner_z]
+                    output += (weight_x*weight_y*weight_z)[:, None]*corner_value.T
+        return output
+
+    def _page(self, i_snapshot, lower, upper):
+        """
+        Returns the slab of the snapshot ``i_snapshot`` covering the grid indices ``[lower, upper]``, reading it from
+        the store only if the one already in memory does not cover them.
+        """
+        try:
+            slab_lower, slab = self._slabs[i_snapshot]
+            slab_upper = slab_lower + np.array(slab.shape[1:]) - 1
+            if np.all(slab_lower <= lower) and np.all(upper <= slab_upper):
+                return slab_lower, slab
+        except KeyError:
+            pass
+
+        n_points = np.array(self.data.shape[2:])
+        slab_lower = np.maximum(lower - self.padding, 0)
+        slab_upper = np.minimum(upper + self.padding, n_points - 1)
+        slab = np.array(self.data[i_snapshot,
+                                  :,
+                                  slab_lower[0]:slab_upper[0] + 1,
+                                  slab_lower[1]:slab_upper[1] + 1,
+                                  slab_lower[2]:slab_upper[2] + 1], dtype=float)
+        self._slabs[i_snapshot] = (slab_lower, slab)
+        return slab_lower, slab
+
+    def _release_slabs(self, keep):
+        for i_snapshot in list(self._slabs.keys()):
+            if i_snapshot not in keep:
+                del self._slabs[i_snapshot]
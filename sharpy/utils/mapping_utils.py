@@ -0,0 +1,79 @@
+"""
+Reference implementation of the aerodynamic to structural force mapping
+
+The nested-loop mapping that :func:`sharpy.aero.utils.mapping.aero2struct_force_mapping` vectorises, and a random
+wing case to compare both, as used by the tests and the benchmarks.
+"""
+import numpy as np
+import sharpy.utils.algebra as algebra
+
+
+def aero2struct_force_mapping_loop(aero_forces, struct2aero_mapping, zeta, pos_def, psi_def, conn, cag=np.eye(3)):
+    """
+    Reference nested-loop implementation of the aerodynamic to structural force mapping
+    """
+    n_node, _ = pos_def.shape
+    n_elem, _, _ = psi_def.shape
+    struct_forces = np.zeros((n_node, 6))
+
+    nodes = []
+
+    for i_elem in range(n_elem):
+        for i_local_node in range(3):
+
+            i_global_node = conn[i_elem, i_local_node]
+            if i_global_node in nodes:
+                continue
+
+            nodes.append(i_global_node)
+            for mapping_info in struct2aero_mapping[i_global_node]:
+                i_surf = mapping_info['i_surf']
+                i_n = mapping_info['i_n']
+                _, n_m, _ = aero_forces[i_surf].shape
+
+                crv = psi_def[i_elem, i_local_node, :]
+                cab = algebra.crv2rotation(crv)
+                cbg = np.dot(cab.T, cag)
+
+                for i_m in range(n_m):
+                    chi_g = zeta[i_surf][:, i_m, i_n] - np.dot(cag.T, pos_def[i_global_node, :])
+                    struct_forces[i_global_node, 0:3] += np.dot(cbg, aero_forces[i_surf][0:3, i_m, i_n])
+                    struct_forces[i_global_node, 3:6] += np.dot(cbg, aero_forces[i_surf][3:6, i_m, i_n])
+                    struct_forces[i_global_node, 3:6] += np.dot(cbg, algebra.cross3(chi_g,
+                                                                                    aero_forces[i_surf][0:3, i_m, i_n]))
+
+    return struct_forces
+
+
+def generate_wing_case(num_elem_surf=10, m=8, seed=0):
+    """
+    Two surfaces (right and left wing) of three-noded elements sharing the root node, with random forces and
+    deformations.
+    """
+    rng = np.random.default_rng(seed)
+    n_surf = 2
+    n_elem = n_surf * num_elem_surf
+    n_node = 2 * n_elem + 1
+
+    conn = np.zeros((n_elem, 3), dtype=int)
+    struct2aero_mapping = [[] for _ in range(n_node)]
+    aero_dimensions = np.zeros((n_surf, 2), dtype=int)
+    for i_surf in range(n_surf):
+        surf_nodes = [0] + list(range(1 + i_surf * 2 * num_elem_surf, 1 + (i_surf + 1) * 2 * num_elem_surf))
+        for i_elem_surf in range(num_elem_surf):
+            i_elem = i_surf * num_elem_surf + i_elem_surf
+            conn[i_elem, :] = [surf_nodes[2 * i_elem_surf],
+                               surf_nodes[2 * i_elem_surf + 2],
+                               surf_nodes[2 * i_elem_surf + 1]]
+        for i_n, i_node in enumerate(surf_nodes):
+            struct2aero_mapping[i_node].append({'i_surf': i_surf, 'i_n': i_n})
+        aero_dimensions[i_surf, :] = [m, len(surf_nodes) - 1]
+
+    zeta = [rng.normal(size=(3, dim[0] + 1, dim[1] + 1)) for dim in aero_dimensions]
+    forces = [rng.normal(size=(6, dim[0] + 1, dim[1] + 1)) for dim in aero_dimensions]
+    pos = rng.normal(size=(n_node, 3))
+    psi = rng.normal(size=(n_elem, 3, 3))
+    psi[0, 0, :] = 0.
+    cag = algebra.crv2rotation(np.array([0.1, -0.3, 0.2]))
+
+    return forces, struct2aero_mapping, zeta, pos, psi, conn, cag, aero_dimensions
@@ -13,7 +13,53 @@ import ctypes as ct
 import traceback
 
 
-def split_multibody(beam, tstep, mb_data_dict, ts):
+def get_bodies(beam):
+    """
+    get_bodies
+
+    This function builds the structural information of each body of a multibody system
+
+    The topology of the bodies (connectivities, elements, stiffness and mass databases and Fortran arrays) does not
+    change in time, hence the bodies can be built once and reused by :func:`split_multibody`, which then only gathers
+    the timestep information of each body.
+
+    Args:
+    	beam (:class:`~sharpy.structure.models.beam.Beam`): structural information of the multibody system
+
+    Returns:
+        MB_beam (list(:class:`~sharpy.structure.models.beam.Beam`)): each entry represents a body
+    """
+
+    return [beam.get_body(ibody=ibody) for ibody in range(beam.num_bodies)]
+
+
+def refresh_bodies(beam, MB_beam):
+    """
+    refresh_bodies
+
+    This function updates the bodies built with :func:`get_bodies` after the multibody structure has been modified at
+    run time (e.g. by the ``ModifyStructure`` generator)
+
+    The lumped masses of each element, the mass database and the steady applied forces are copied from the multibody
+    structure and the Fortran arrays of the bodies are generated again. The lumped masses are taken from the elements
+    rather than from the lumped mass arrays, since the latter only hold the last increment of the modified masses.
+
+    Args:
+    	beam (:class:`~sharpy.structure.models.beam.Beam`): structural information of the multibody system
+        MB_beam (list(:class:`~sharpy.structure.models.beam.Beam`)): bodies to update
+    """
+
+    for ibody_beam in MB_beam:
+        ibody_beam.mass_db = beam.mass_db.astype(dtype=ct.c_double, order='F', copy=True)
+        ibody_beam.steady_app_forces = beam.steady_app_forces[ibody_beam.global_nodes_num, :].astype(
+            dtype=ct.c_double, order='F', copy=True)
+        for ielem, global_elem in enumerate(ibody_beam.global_elems_num):
+            rbmass = beam.elements[global_elem].rbmass
+            ibody_beam.elements[ielem].rbmass = None if rbmass is None else rbmass.copy()
+        ibody_beam.generate_fortran()
+
+
+def split_multibody(beam, tstep, mb_data_dict, ts, MB_beam=None):
     """
     split_multibody
 
@@ -24,13 +70,16 @@ def split_multibody(beam, tstep, mb_data_dict, ts):
     	tstep (:class:`~sharpy.utils.datastructures.StructTimeStepInfo`): timestep information of the multibody system
         mb_data_dict (dict): Dictionary including the multibody information
         ts (int): time step number
+        MB_beam (list(:class:`~sharpy.structure.models.beam.Beam`)): bodies previously built with
+            :func:`get_bodies`. If given, only their timestep information is updated.
 
     Returns:
         MB_beam (list(:class:`~sharpy.structure.models.beam.Beam`)): each entry represents a body
         MB_tstep (list(:class:`~sharpy.utils.datastructures.StructTimeStepInfo`)): each entry represents a body
     """
 
-    MB_beam = []
+    if MB_beam is None:
+        MB_beam = get_bodies(beam)
     MB_tstep = []
 
     quat0 = tstep.quat.astype(dtype=ct.c_double, order='F', copy=True)
@@ -42,10 +91,12 @@ def split_multibody(beam, tstep, mb_data_dict, ts):
     ini_for0_vel = beam.ini_info.for_vel.astype(dtype=ct.c_double, order='F', copy=True)
 
     for ibody in range(beam.num_bodies):
-        ibody_beam = None
-        ibody_tstep = None
-        ibody_beam = beam.get_body(ibody = ibody)
-        ibody_tstep = tstep.get_body(beam, ibody_beam.num_dof, ibody = ibody)
+        ibody_beam = MB_beam[ibody]
+        index_maps = ibody_beam.body_index_maps
+        ibody_beam.ini_info = beam.ini_info.get_body(beam, ibody_beam.num_dof, ibody, index_maps=index_maps)
+        ibody_beam.timestep_info = beam.timestep_info[-1].get_body(beam, ibody_beam.num_dof, ibody,
+                                                                   index_maps=index_maps)
+        ibody_tstep = tstep.get_body(beam, ibody_beam.num_dof, ibody, index_maps=index_maps)
 
         ibody_beam.FoR_movement = mb_data_dict['body_%02d' % ibody]['FoR_movement']
 
@@ -55,7 +106,6 @@ def split_multibody(beam, tstep, mb_data_dict, ts):
             ibody_tstep.compute_psi_local_AFoR(for0_pos, for0_vel, quat0)
         ibody_tstep.change_to_local_AFoR(for0_pos, for0_vel, quat0)
 
-        MB_beam.append(ibody_beam)
         MB_tstep.append(ibody_tstep)
 
     return MB_beam, MB_tstep
@@ -279,3 +329,29 @@ def get_elems_nodes_list(beam, ibody):
     ibody_nodes = np.sort(np.unique(beam.connectivities[ibody_elements, :].reshape(-1)))
 
     return ibody_elements, ibody_nodes
+
+
+def get_body_index_maps(beam, ibody):
+    """
+        get_body_index_maps
+
+        This function returns the elements and nodes that belong to the body number ``ibody`` (see
+        :func:`get_elems_nodes_list`) and the first degree of freedom of the body in the vector of states of
+        the multibody system, which are used to gather the timestep information of the body
+
+        Args:
+    	   beam (:class:`~sharpy.structure.models.beam.Beam`): structural information of the multibody system
+           ibody (int): Body number about which the information is required
+
+        Returns:
+            tuple: ``(ibody_elements, ibody_nodes, ibody_first_dof)``
+
+    """
+    ibody_elements, ibody_nodes = get_elems_nodes_list(beam, ibody)
+
+    ibody_first_dof = 0
+    for index_body in range(ibody - 1):
+        aux_elems, aux_nodes = get_elems_nodes_list(beam, index_body)
+        ibody_first_dof += np.sum(beam.vdof[aux_nodes] > -1)*6
+
+    return ibody_elements, ibody_nodes, ibody_first_dof
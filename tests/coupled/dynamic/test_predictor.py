@@ -0,0 +1,114 @@
+import ctypes as ct
+import types
+import unittest
+
+import numpy as np
+
+import sharpy.solvers.dynamiccoupled as dynamiccoupled
+import sharpy.utils.fsiacceleration as fsiacceleration
+from sharpy.utils.datastructures import StructTimeStepInfo
+
+
+class TestPredictor(unittest.TestCase):
+    """
+    Extrapolation predictor of the structural state in the DynamicCoupled FSI iteration
+    """
+
+    def setUp(self):
+        np.random.seed(3)
+        self.solver = dynamiccoupled.DynamicCoupled()
+        self.solver.settings = {'predictor_order': 2}
+        self.solver.scratch_steps = dict()
+        self.solver.accelerator = None
+        self.solver.data = types.SimpleNamespace(structure=types.SimpleNamespace(timestep_info=[]))
+
+        # structural states quadratic in time
+        self.coefficients = dict()
+        for name in dynamiccoupled.predicted_variables:
+            if name != 'quat':
+                shape = getattr(self.new_step(), name).shape
+                self.coefficients[name] = [np.random.rand(*shape) for i in range(3)]
+
+    @staticmethod
+    def new_step():
+        return StructTimeStepInfo(5, 2, 3, num_dof=ct.c_int(24))
+
+    def step_at(self, t):
+        step = self.new_step()
+        for name, coefficients in self.coefficients.items():
+            getattr(step, name)[:] = coefficients[0] + coefficients[1]*t + coefficients[2]*t**2
+        step.quat[:] = [1., 0., 0., 0.]
+        return step
+
+    def test_extrapolation_coefficients(self):
+        for order in range(1, 5):
+            with self.subTest(order=order):
+                polynomial = np.random.rand(order + 1)
+                values = np.polyval(polynomial, np.arange(order, -1, -1))
+                self.assertAlmostEqual(dynamiccoupled.extrapolation_coefficients(order).dot(values),
+                                       np.polyval(polynomial, order + 1))
+
+        np.testing.assert_array_equal(dynamiccoupled.extrapolation_coefficients(1), [2., -1.])
+        np.testing.assert_array_equal(dynamiccoupled.extrapolation_coefficients(2), [3., -3., 1.])
+
+    def test_predict_structural_step(self):
+        self.solver.data.structure.timestep_info = [self.step_at(t) for t in range(4)]
+        structural_kstep = self.solver.data.structure.timestep_info[-1].copy()
+        # change introduced by a controller
+        structural_kstep.for_vel[0] += 1.
+
+        predicted_kstep = self.solver.predict_structural_step(structural_kstep)
+        exact_kstep = self.step_at(4)
+        exact_kstep.for_vel[0] += 1.
+        for name in dynamiccoupled.predicted_variables:
+            np.testing.assert_allclose(getattr(predicted_kstep, name), getattr(exact_kstep, name), err_msg=name)
+        self.assertIsNot(predicted_kstep, structural_kstep)
+        self.assertEqual(structural_kstep.for_vel[0], self.solver.data.structure.timestep_info[-1].for_vel[0] + 1.)
+
+        # the released time steps limit the order of the extrapolation
+        self.solver.data.structure.timestep_info = [self.step_at(0), None, self.step_at(2), self.step_at(3)]
+        predicted_kstep = self.solver.predict_structural_step(self.step_at(3))
+        np.testing.assert_allclose(predicted_kstep.q, 2*self.step_at(3).q - self.step_at(2).q)
+
+        self.solver.data.structure.timestep_info = [None, self.step_at(3)]
+        self.assertIsNone(self.solver.predict_structural_step(self.step_at(3)))
+        self.solver.settings['predictor_order'] = 0
+        self.solver.data.structure.timestep_info = [self.step_at(t) for t in range(4)]
+        self.assertIsNone(self.solver.predict_structural_step(self.step_at(3)))
+
+    def test_repeat_time_step(self):
+        accelerator = fsiacceleration.initialise_accelerator('IQN-ILS', 0.3)
+        self.solver.accelerator = accelerator
+        controlled_kstep = self.step_at(0)
+
+        # previous time step and iterations from the predicted state
+        accelerator.new_step()
+        for i_iter in range(3):
+            accelerator.update(np.random.rand(6))
+        accelerator.end_step()
+        accelerator.new_step()
+        for i_iter in range(4):
+            accelerator.update(np.random.rand(6))
+        previous_V = [list(step) for step in accelerator.previous_V]
+
+        structural_kstep = self.solver.copy_to_scratch(self.step_at(1), 'structural_kstep')
+        structural_kstep.runtime_steady_forces[:] = np.random.rand(*structural_kstep.runtime_steady_forces.shape)
+        runtime_steady_forces = structural_kstep.runtime_steady_forces.copy()
+
+        structural_kstep = self.solver.repeat_time_step(structural_kstep, controlled_kstep)
+
+        np.testing.assert_array_equal(structural_kstep.q, controlled_kstep.q)
+        np.testing.assert_array_equal(structural_kstep.steady_applied_forces, controlled_kstep.steady_applied_forces)
+        # the runtime forces of the last iteration are kept
+        np.testing.assert_array_equal(structural_kstep.runtime_steady_forces, runtime_steady_forces)
+        # the secant information of the discarded iterations is not reused
+        self.assertEqual(accelerator.V, [])
+        self.assertIsNone(accelerator.x)
+        self.assertEqual(len(accelerator.previous_V), len(previous_V))
+        for step, previous_step in zip(accelerator.previous_V, previous_V):
+            for column, previous_column in zip(step, previous_step):
+                np.testing.assert_array_equal(column, previous_column)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -308,6 +308,27 @@ class TestDoublePendulum(unittest.TestCase):
         beam1.generate_h5_files(SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
         gc.generate_multibody_file(LC, MB,SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
 
+        # Same case with the lumped mass of the second pendulum modified at run time
+        global name_modified_mass
+        name_modified_mass = 'dpg_modified_mass'
+        SimInfo.solvers['SHARPy']['case'] = name_modified_mass
+
+        np.savetxt(SimInfo.solvers['SHARPy']['route'] + name_modified_mass + '_lumped_mass.txt',
+                   np.linspace(m2, 2.*m2, numtimesteps + 1))
+        SimInfo.solvers['DynamicCoupled']['runtime_generators'] = {
+            'ModifyStructure': {'change_variable': ['lumped_mass'],
+                                'variable_index': [1],
+                                'file_list': [SimInfo.solvers['SHARPy']['route'] + name_modified_mass +
+                                              '_lumped_mass.txt']}}
+
+        gc.clean_test_files(SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
+        SimInfo.generate_solver_file()
+        SimInfo.generate_dyn_file(numtimesteps)
+        beam1.generate_h5_files(SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
+        gc.generate_multibody_file(LC, MB,SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
+
+        SimInfo.solvers['DynamicCoupled']['runtime_generators'] = dict()
+
         # Same case without dissipation
         global name_nb_zero_dis
         name_nb_zero_dis = 'dpg_nb_zero_dis'
@@ -365,6 +386,20 @@ class TestDoublePendulum(unittest.TestCase):
         beam1.generate_h5_files(SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
         gc.generate_multibody_file(LC, MB,SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
 
+        # Same case with the sparse solver and the modified Newton method
+        global name_sparse
+        name_sparse = 'dpg_spherical_sparse'
+        SimInfo.solvers['SHARPy']['case'] = name_sparse
+
+        SimInfo.solvers['NonLinearDynamicMultibody']['sparse_solver'] = True
+        SimInfo.solvers['NonLinearDynamicMultibody']['newton_method'] = 'modified'
+
+        gc.clean_test_files(SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
+        SimInfo.generate_solver_file()
+        SimInfo.generate_dyn_file(numtimesteps)
+        beam1.generate_h5_files(SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
+        gc.generate_multibody_file(LC, MB,SimInfo.solvers['SHARPy']['route'], SimInfo.solvers['SHARPy']['case'])
+
     def run_and_assert(self, name):
         import sharpy.sharpy_main
 
@@ -384,6 +419,9 @@ class TestDoublePendulum(unittest.TestCase):
     def test_doublependulum_spherical(self):
         self.run_and_assert(name_spherical)
 
+    def test_doublependulum_sparse(self):
+        self.run_and_assert(name_sparse)
+
     def test_doublependulum_ga(self):
         import sharpy.sharpy_main
 
@@ -404,10 +442,40 @@ class TestDoublePendulum(unittest.TestCase):
         self.assertAlmostEqual(nb_pos_tip_data[-1, 2], ga_pos_tip_data[-1, 2], 4)
         self.assertAlmostEqual(nb_pos_tip_data[-1, 3], ga_pos_tip_data[-1, 3], 4)
 
+    def test_doublependulum_cached_bodies(self):
+        import unittest.mock
+        import sharpy.sharpy_main
+        import sharpy.utils.multibody as mb
+        from sharpy.solvers.nonlineardynamicmultibody import NonLinearDynamicMultibody
+
+        # the bodies built once give the same results as the bodies rebuilt every time they are used
+        solver_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)) + '/' + name_hinge + '.sharpy')
+        output_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__))) + '/output/' + name_hinge + '/WriteVariablesTime/'
+        sharpy.sharpy_main.main(['', solver_path])
+        pos_tip_cached = np.loadtxt(("%sstruct_pos_node%d.dat" % (output_path, nnodes1*2-1)), )
+        shutil.rmtree(output_path)
+
+        with unittest.mock.patch.object(NonLinearDynamicMultibody, 'get_bodies',
+                                        lambda solver: mb.get_bodies(solver.data.structure)):
+            sharpy.sharpy_main.main(['', solver_path])
+        pos_tip_rebuilt = np.loadtxt(("%sstruct_pos_node%d.dat" % (output_path, nnodes1*2-1)), )
+        np.testing.assert_array_equal(pos_tip_cached, pos_tip_rebuilt)
+
+        # the lumped masses of the bodies are refreshed when they are modified at run time
+        solver_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)) + '/' + name_modified_mass + '.sharpy')
+        data = sharpy.sharpy_main.main(['', solver_path])
+        structure = data.structure
+        MB_beam = mb.get_bodies(structure)
+        mb.refresh_bodies(structure, MB_beam)
+        for ibody_beam in MB_beam:
+            np.testing.assert_array_equal(ibody_beam.fortran['rbmass'],
+                                          structure.fortran['rbmass'][ibody_beam.global_elems_num])
+        self.assertAlmostEqual(np.max(MB_beam[1].fortran['rbmass'][:, :, 0, 0]), 2.)
+
     def tearDown(self):
         solver_path = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
         solver_path += '/'
-        for name in [name_hinge, name_spherical, name_ga, name_nb_zero_dis]:
+        for name in [name_hinge, name_spherical, name_ga, name_nb_zero_dis, name_sparse, name_modified_mass]:
             files_to_delete = [name + '.aero.h5',
                                name + '.dyn.h5',
                                name + '.fem.h5',
@@ -415,6 +483,7 @@ class TestDoublePendulum(unittest.TestCase):
                                name + '.sharpy']
             for f in files_to_delete:
                 os.remove(solver_path + f)
+        os.remove(solver_path + name_modified_mass + '_lumped_mass.txt')
 
         shutil.rmtree(solver_path + 'output/')
 
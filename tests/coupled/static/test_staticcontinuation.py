@@ -0,0 +1,246 @@
+import os
+import shutil
+import types
+import unittest
+import unittest.mock
+
+import numpy as np
+
+import sharpy.solvers.staticcontinuation as staticcontinuation
+import sharpy.generators.straightwake as straightwake
+import sharpy.utils.algebra as algebra
+import sharpy.utils.exceptions as exc
+
+
+class State():
+    """
+    Structural or aerodynamic time step
+    """
+    def __init__(self, pos):
+        self.pos = pos
+        self.psi = np.zeros_like(pos)
+        self.quat = np.array([1., 0., 0., 0.])
+
+    def copy(self):
+        state = State(self.pos.copy())
+        state.psi = self.psi.copy()
+        state.quat = self.quat.copy()
+        return state
+
+
+class QuadraticModel():
+    """
+    Stand-in of StaticCoupled whose solution is ``pos = rho**2``. It converges in ``n_iterations`` if ``rho`` is no
+    further than ``max_step`` from its last converged point.
+    """
+    n_iterations = 3
+    max_step = np.inf
+
+    def __init__(self):
+        self.data = None
+        self.settings = None
+        self.aero_solver = types.SimpleNamespace(settings={'rho': 0.,
+                                                           'velocity_field_input': {'u_inf': 10.,
+                                                                                    'u_inf_direction': [1., 0., 0.]}},
+                                                 velocity_generator=unittest.mock.Mock(),
+                                                 update_step=unittest.mock.Mock())
+        self.converged = False
+        self.last_rho = None
+        self.initial_states = []
+
+    def initialise(self, data, custom_settings=None, restart=False):
+        self.data = data
+        self.settings = custom_settings
+
+    def run(self, **kwargs):
+        rho = self.aero_solver.settings['rho']
+        self.initial_states.append((rho, [tstep.pos.copy() for tstep in self.data.structure.timestep_info]))
+        self.converged = self.last_rho is None or np.abs(rho - self.last_rho) <= self.max_step*(1 + 1e-10)
+        if self.converged:
+            self.last_rho = rho
+            self.data.structure.timestep_info[-1].pos[:] = rho**2
+        return self.data
+
+
+class TrimModel():
+    """
+    Stand-in of StaticTrim around a :class:`QuadraticModel`, whose trim inputs are ``[rho, 2 rho, 3 rho]``
+    """
+    n_iterations = 2
+
+    def __init__(self):
+        self.data = None
+        self.settings = None
+        self.solver = QuadraticModel()
+        self.trimmed_values = None
+        self.jacobian = None
+        self.converged_states = []
+        self.runs = []
+
+    def initialise(self, data, custom_settings=None, restart=False):
+        self.data = data
+        self.settings = custom_settings
+        self.solver.initialise(data, dict())
+
+    def run(self, **kwargs):
+        self.runs.append({'jacobian': kwargs['jacobian'],
+                          'initial_inputs': [self.settings[name] for name in ['initial_alpha', 'initial_deflection',
+                                                                              'initial_thrust']],
+                          'converged_states': list(self.converged_states)})
+        self.data = self.solver.run()
+        rho = self.solver.aero_solver.settings['rho']
+        self.trimmed_values = [rho, 2*rho, 3*rho]
+        self.jacobian = rho*np.eye(3)
+        return self.data
+
+
+class TestStaticContinuation(unittest.TestCase):
+    """
+    Continuation of StaticContinuation on stand-ins of the static solvers
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+    def initialise_continuation(self, settings, model=QuadraticModel):
+        data = types.SimpleNamespace()
+        data.output_folder = self.route_test_dir + '/output/'
+        data.ts = 0
+        data.structure = types.SimpleNamespace(timestep_info=[State(np.zeros(4))],
+                                               ini_info=State(np.zeros(4)))
+        data.aero = types.SimpleNamespace(timestep_info=[State(np.zeros(2))])
+
+        continuation = staticcontinuation.StaticContinuation()
+        with unittest.mock.patch.object(staticcontinuation.solver_interface, 'initialise_solver',
+                                        lambda solver_name: model()):
+            continuation.initialise(data, custom_settings=dict({'print_info': False,
+                                                                'parameter': 'rho',
+                                                                'start_value': 0.,
+                                                                'end_value': 2.,
+                                                                'initial_step': 0.1,
+                                                                'max_step': 0.8}, **settings))
+        return continuation
+
+    def test_step_growth(self):
+        continuation = self.initialise_continuation({'target_iterations': 6})
+        continuation.run()
+
+        # the model converges in half the target iterations, hence the step is doubled up to max_step
+        np.testing.assert_allclose(continuation.parameter_values, [0., 0.1, 0.3, 0.7, 1.5, 2.])
+        self.assertEqual(len(continuation.data.structure.timestep_info), 6)
+        np.testing.assert_allclose([tstep.pos[0] for tstep in continuation.data.structure.timestep_info],
+                                   np.array(continuation.parameter_values)**2)
+
+    def test_step_halving(self):
+        continuation = self.initialise_continuation({'target_iterations': 6})
+        model = continuation.solver
+        model.max_step = 0.25
+        continuation.run()
+
+        # the doubled steps of 0.4 are halved and repeated from the last converged point
+        np.testing.assert_allclose(continuation.parameter_values,
+                                   np.concatenate(([0.], np.arange(0.1, 2., 0.2), [2.])))
+        self.assertEqual(len(model.initial_states) - len(continuation.parameter_values), 8)
+        for rho, initial_states in model.initial_states:
+            self.assertEqual(len(initial_states), 1)
+
+        continuation = self.initialise_continuation({'max_refinements': 2})
+        continuation.solver.max_step = 0.
+        with self.assertRaises(exc.NotConvergedSolver):
+            continuation.run()
+        # the first point and the initial step with its two halvings
+        self.assertEqual(len(continuation.solver.initial_states), 4)
+        self.assertEqual(continuation.parameter_values, [0.])
+
+    def test_start_not_converged(self):
+        continuation = self.initialise_continuation({})
+        continuation.solver.last_rho = 1.
+        continuation.solver.max_step = 0.
+        with self.assertRaises(exc.NotConvergedSolver):
+            continuation.run()
+        # the start point is not accepted
+        self.assertEqual(continuation.parameter_values, [])
+
+    def test_predictor(self):
+        continuation = self.initialise_continuation({'target_iterations': 6})
+        model = continuation.solver
+        continuation.run()
+
+        # the structure of each point is extrapolated from the last two converged points
+        for i_point in range(2, len(continuation.parameter_values)):
+            rho, initial_states = model.initial_states[i_point]
+            rho_0, rho_1 = continuation.parameter_values[i_point - 2:i_point]
+            np.testing.assert_allclose(initial_states[0],
+                                       rho_1**2 + (rho - rho_1)/(rho_1 - rho_0)*(rho_1**2 - rho_0**2))
+        self.assertEqual(model.aero_solver.update_step.call_count, len(continuation.parameter_values) - 2)
+
+    def test_trim(self):
+        continuation = self.initialise_continuation({'solver': 'StaticTrim',
+                                                     'solver_settings': {'initial_alpha': 0.,
+                                                                         'initial_deflection': 0.,
+                                                                         'initial_thrust': 0.}},
+                                                    model=TrimModel)
+        trim = continuation.solver
+        continuation.run()
+
+        self.assertTrue(trim.settings['warm_start'])
+        np.testing.assert_allclose(continuation.parameter_values, [0., 0.1, 0.3, 0.7, 1.5, 2.])
+        self.assertIsNone(trim.runs[0]['jacobian'])
+        self.assertEqual(trim.runs[0]['converged_states'], [])
+        for i_point in range(1, len(continuation.parameter_values)):
+            run = trim.runs[i_point]
+            rho_1 = continuation.parameter_values[i_point - 1]
+            # the Jacobian and the only converged state are those of the previous point
+            np.testing.assert_allclose(run['jacobian'], rho_1*np.eye(3))
+            self.assertEqual(len(run['converged_states']), 1)
+            np.testing.assert_allclose(run['converged_states'][0][0], [rho_1, 2*rho_1, 3*rho_1])
+            np.testing.assert_allclose(run['converged_states'][0][1].pos, rho_1**2)
+            if i_point >= 2:
+                # the trim inputs are extrapolated and the deflection is relative to alpha
+                rho = continuation.parameter_values[i_point]
+                np.testing.assert_allclose(run['initial_inputs'], [rho, rho, 3*rho])
+
+    def test_set_parameter(self):
+        continuation = self.initialise_continuation({'parameter': 'u_inf'})
+        data = continuation.data
+        aero_solver = continuation.coupled_solver.aero_solver
+        data.aero.wake_shape_generator = straightwake.StraightWake()
+        data.aero.wake_shape_generator.initialise(data, {'u_inf': 10., 'u_inf_direction': [1., 0., 0.], 'dt': 0.1})
+
+        continuation.set_parameter(25.)
+        self.assertEqual(aero_solver.settings['velocity_field_input']['u_inf'], 25.)
+        aero_solver.velocity_generator.initialise.assert_called_with(aero_solver.settings['velocity_field_input'])
+        # the wake panels follow the free stream velocity
+        self.assertEqual(data.aero.wake_shape_generator.u_inf, 25.)
+        self.assertAlmostEqual(data.aero.wake_shape_generator.get_all_surface_parameters(0)[2], 2.5)
+
+        continuation.settings['parameter'] = 'rho'
+        continuation.set_parameter(0.5)
+        self.assertEqual(aero_solver.settings['rho'], 0.5)
+
+        continuation.settings['parameter'] = 'alpha'
+        continuation.set_parameter(2.*np.pi/180.)
+        quat = algebra.euler2quat(np.array([0., 2.*np.pi/180., 0.]))
+        np.testing.assert_allclose(data.structure.ini_info.quat, quat)
+        np.testing.assert_allclose(data.structure.timestep_info[0].quat, quat)
+        aero_solver.update_step.assert_called_once()
+
+        continuation.settings['parameter'] = 'lumped_mass'
+        continuation.settings['lumped_mass_indices'] = [1]
+        structure = unittest.mock.Mock(lumped_mass=np.array([1., 2.]),
+                                       lumped_mass_nodes=np.array([3, 5]),
+                                       lumped_mass_position=np.array([[0., 0., 0.], [0.5, 0., 0.]]))
+        data.structure = structure
+        continuation.set_parameter(3.5)
+        np.testing.assert_array_equal(structure.lumped_mass, [1., 3.5])
+        # only the mass increment is added to the element
+        self.assertEqual(structure.generate_mass_matrix.call_args[0][0], 1.5)
+        np.testing.assert_array_equal(structure.generate_mass_matrix.call_args[0][1], [0.5, 0., 0.])
+        structure.add_lumped_mass_to_element.assert_called_once_with(5, structure.generate_mass_matrix.return_value)
+        structure.generate_fortran.assert_called_once()
+
+    def tearDown(self):
+        shutil.rmtree(self.route_test_dir + '/output/', ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import types
+import unittest
+import unittest.mock
+
+import numpy as np
+
+import sharpy.solvers.staticcoupled as staticcoupled
+import sharpy.utils.fsiacceleration as fsiacceleration
+
+
+class LinearStructure():
+    """
+    Stand-in of the structural solver whose nodes are displaced linearly with the applied forces
+    """
+    def __init__(self, data, flexibility, pos0):
+        self.data = data
+        self.settings = {'gravity': 0.}
+        self.flexibility = flexibility
+        self.pos0 = pos0
+
+    def run(self):
+        tstep = self.data.structure.timestep_info[self.data.ts]
+        tstep.pos[:] = self.pos0 + self.flexibility.dot(tstep.steady_applied_forces.ravel()).reshape(self.pos0.shape)
+        return self.data
+
+    def update(self, tstep):
+        pass
+
+    def extract_resultants(self, tstep=None):
+        return np.zeros(3), np.zeros(3)
+
+
+class TestStaticCoupled(unittest.TestCase):
+    """
+    FSI iterations of StaticCoupled with an accelerator on linear stand-ins of the solvers
+    """
+
+    n_node = 3
+
+    def setUp(self):
+        np.random.seed(9)
+        self.flexibility = np.random.rand(3*self.n_node, 6*self.n_node)/10.
+        self.stiffness = np.random.rand(6*self.n_node, 3*self.n_node)/10.
+        self.forces0 = np.random.rand(self.n_node, 6)
+        self.pos0 = np.random.rand(self.n_node, 3) + 1.
+
+    def aero2struct_force_mapping(self, forces, struct2aero_mapping, zeta, pos, *args, **kwargs):
+        return self.forces0 + self.stiffness.dot(pos.ravel()).reshape(self.n_node, 6)
+
+    def initialise_coupled(self):
+        data = types.SimpleNamespace(ts=0)
+        data.structure = types.SimpleNamespace(
+            timestep_info=[types.SimpleNamespace(pos=self.pos0.copy(),
+                                                 psi=None,
+                                                 steady_applied_forces=np.zeros((self.n_node, 6)),
+                                                 total_forces=np.zeros(6),
+                                                 postproc_node=dict(),
+                                                 cag=lambda: np.eye(3))],
+            ini_info=types.SimpleNamespace(steady_applied_forces=np.zeros((self.n_node, 6))),
+            node_master_elem=None,
+            connectivities=None)
+        data.aero = types.SimpleNamespace(timestep_info=[types.SimpleNamespace(forces=None, zeta=None)],
+                                          struct2aero_mapping=None,
+                                          aero_dict=None,
+                                          force_mapping_tables=None)
+
+        coupled = staticcoupled.StaticCoupled()
+        coupled.data = data
+        coupled.settings = {'n_load_steps': 0, 'max_iter': 100, 'tolerance': 1e-10, 'relaxation_factor': 0.5}
+        coupled.print_info = False
+        coupled.structural_solver = LinearStructure(data, self.flexibility, self.pos0)
+        coupled.aero_solver = types.SimpleNamespace(run=lambda: data, update_step=lambda: None)
+        coupled.accelerator = fsiacceleration.initialise_accelerator('IQN-ILS', 0.5)
+        return coupled
+
+    def run_coupled(self, coupled):
+        calls = []
+        update = coupled.accelerator.update
+
+        def recorded_update(x_tilde, x=None):
+            x_new = update(x_tilde, x)
+            calls.append((x_tilde.copy(), x.copy(), coupled.accelerator.relaxation_update))
+            return x_new
+
+        with unittest.mock.patch.object(staticcoupled.mapping, 'aero2struct_force_mapping',
+                                        self.aero2struct_force_mapping), \
+                unittest.mock.patch.object(coupled.accelerator, 'update', recorded_update):
+            coupled.run()
+        return calls
+
+    def test_accelerator_forces(self):
+        coupled = self.initialise_coupled()
+        calls = self.run_coupled(coupled)
+
+        # the first iteration relaxes the forces computed on the undeformed structure
+        x_tilde, x, relaxation_update = calls[0]
+        np.testing.assert_array_equal(x, 0.)
+        self.assertTrue(relaxation_update)
+        np.testing.assert_allclose(calls[1][1], 0.5*x_tilde)
+        for i_call in range(1, len(calls)):
+            self.assertFalse(calls[i_call][2])
+
+        coupling = self.stiffness.dot(self.flexibility)
+        forces = np.linalg.solve(np.eye(6*self.n_node) - coupling,
+                                 self.forces0.ravel() + self.stiffness.dot(self.pos0.ravel()))
+        applied_forces = coupled.data.structure.timestep_info[0].steady_applied_forces.copy()
+        np.testing.assert_allclose(applied_forces.ravel(), forces, rtol=1e-6)
+
+        # the next run starts from the forces of the converged structure and reuses the secant information
+        self.forces0[0, 2] += 0.1
+        calls = self.run_coupled(coupled)
+        np.testing.assert_array_equal(calls[0][1], applied_forces)
+        self.assertFalse(calls[0][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import shutil
+import threading
+import types
+import unittest
+import unittest.mock
+
+import numpy as np
+
+import sharpy.solvers.statictrim as statictrim
+
+
+class TrimState():
+    """
+    Structural time step of :class:`LinearTrimModel`, recording the inputs it was converged at
+    """
+    def __init__(self, inputs):
+        self.inputs = inputs
+
+    def copy(self):
+        return TrimState(self.inputs.copy())
+
+
+class LinearTrimModel():
+    """
+    Inner solver of StaticTrim whose outputs ``(fz, m, fx)`` are linear in the inputs ``(alpha, gamma, thrust)``
+    """
+    jacobian = np.array([[30., 5., 0.],
+                         [-2., 4., 0.1],
+                         [0.5, 0.2, 1.]])
+    offset = np.array([3., -0.1, 2.])
+
+    def __init__(self):
+        self.data = None
+        self.inputs = None
+        self.initial_structural_steps = []
+
+    def initialise(self, data, custom_settings=None, restart=False):
+        self.data = data
+
+    def change_trim(self, alpha, thrust, thrust_nodes, tail_deflection, tail_cs_index, initial_structural_step=None):
+        self.inputs = np.array([alpha, alpha + tail_deflection, thrust])
+        self.initial_structural_steps.append(initial_structural_step)
+
+    def run(self):
+        self.data.structure.timestep_info.append(TrimState(self.inputs))
+        return self.data
+
+    def extract_resultants(self):
+        fz, m, fx = self.jacobian.dot(self.inputs) - self.offset
+        return np.array([fx, 0., fz]), np.array([0., m, 0.])
+
+
+class TestStaticTrim(unittest.TestCase):
+    """
+    Trim iterations of StaticTrim on a linear inner solver
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+
+    def initialise_trim(self, settings):
+        data = types.SimpleNamespace()
+        data.output_folder = self.route_test_dir + '/output/'
+        data.structure = types.SimpleNamespace(timestep_info=[TrimState(np.zeros(3))])
+
+        trim = statictrim.StaticTrim()
+        with unittest.mock.patch.object(statictrim.solver_interface, 'initialise_solver',
+                                        lambda solver_name: LinearTrimModel()):
+            trim.initialise(data, custom_settings=dict({'solver': 'LinearTrimModel',
+                                                        'print_info': False}, **settings))
+        return trim
+
+    def test_broyden_iteration(self):
+        trim = self.initialise_trim({'jacobian_update': 'Broyden'})
+        trim.i_iter = 1
+        trim.input_history = [[0.1, 0.2, 3.], [0., 0., 0.]]
+        trim.output_history = [list(trim.evaluate(*trim.input_history[0])), [0., 0., 0.]]
+        trim.gradient_history = [[0., 0., 0.], [0., 0., 0.]]
+        trim.jacobian = np.diag(np.diag(LinearTrimModel.jacobian))
+
+        trim.broyden_iteration()
+
+        # the updated Jacobian satisfies the secant condition of the step
+        delta_input = np.array(trim.input_history[1]) - np.array(trim.input_history[0])
+        delta_output = np.array(trim.output_history[1]) - np.array(trim.output_history[0])
+        np.testing.assert_allclose(trim.jacobian.dot(delta_input), delta_output)
+        np.testing.assert_allclose(trim.gradient_history[1], np.diag(trim.jacobian))
+
+    def test_broyden_trim(self):
+        trim = self.initialise_trim({'jacobian_update': 'Broyden'})
+        trim.run()
+
+        # the finite difference Jacobian of the linear model is exact, hence a single Newton step trims it
+        np.testing.assert_allclose(trim.jacobian, LinearTrimModel.jacobian, atol=1e-10)
+        np.testing.assert_allclose(trim.trimmed_values,
+                                   np.linalg.solve(LinearTrimModel.jacobian, LinearTrimModel.offset))
+        self.assertEqual(trim.n_iterations, 2)
+
+    def test_closest_converged_state(self):
+        trim = self.initialise_trim({'warm_start': True})
+        self.assertIsNone(trim.closest_converged_state(0., 0., 0.))
+
+        states = [TrimState(np.array([0., 0., 0.])),
+                  TrimState(np.array([0.1, 0.1, 0.])),
+                  TrimState(np.array([0., 0., 5.]))]
+        for state in states:
+            trim.store_converged_state(state.inputs, state)
+        trim.store_converged_state([1., 1., 1.], None)
+        self.assertEqual(len(trim.converged_states), 3)
+
+        # the distances are measured in the inputs scaled by the finite difference perturbations
+        self.assertIs(trim.closest_converged_state(0.06, 0.06, 0.), states[1])
+        self.assertIs(trim.closest_converged_state(0., 0., 1.5), states[0])
+        self.assertIs(trim.closest_converged_state(0., 0., 4.), states[2])
+
+        trim.evaluate(0.09, 0.11, 0.5)
+        self.assertIs(trim.solver.initial_structural_steps[-1], states[1])
+        np.testing.assert_array_equal(trim.converged_states[-1][0], [0.09, 0.11, 0.5])
+
+    def test_parallel_jacobian(self):
+        trims = dict()
+        for num_workers in [1, 3]:
+            with self.subTest(num_workers=num_workers):
+                trim = self.initialise_trim({'num_workers': num_workers, 'warm_start': True,
+                                             'jacobian_update': 'Broyden'})
+                trim.run()
+                trims[num_workers] = trim
+
+                # the initial and perturbed evaluations are stored in the parent process
+                self.assertEqual(len(trim.converged_states), trim.n_iterations + 3)
+                for inputs, state in trim.converged_states:
+                    np.testing.assert_allclose(inputs, state.inputs)
+
+        np.testing.assert_allclose(trims[3].gradient_history[0], trims[1].gradient_history[0])
+        np.testing.assert_allclose(trims[3].trimmed_values, trims[1].trimmed_values)
+        # the perturbed evaluations have not run in the parent process
+        self.assertEqual(len(trims[1].solver.initial_structural_steps), trims[1].n_iterations + 3)
+        self.assertEqual(len(trims[3].solver.initial_structural_steps), trims[3].n_iterations)
+
+    def test_no_fork_with_threads(self):
+        trim = self.initialise_trim({'num_workers': 3})
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        try:
+            self.assertFalse(trim.fork_is_safe())
+            outputs = trim.evaluate_perturbations([[0., 0., 0.], [0.1, 0., 0.], [0., 0.1, 0.]])
+        finally:
+            stop.set()
+            thread.join()
+
+        # the perturbed evaluations have run serially in this process
+        self.assertEqual(len(trim.solver.initial_structural_steps), 3)
+        np.testing.assert_allclose(outputs[1], LinearTrimModel.jacobian.dot([0.1, 0., 0.]) - LinearTrimModel.offset)
+
+    def tearDown(self):
+        shutil.rmtree(self.route_test_dir + '/output/', ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import shutil
+import types
+import unittest
+
+import h5py
+import numpy as np
+
+from sharpy.postproc.writevariablestime import WriteVariablesTime
+
+
+class TestWriteVariablesTime(unittest.TestCase):
+    """
+    Buffered ``.dat`` and ``h5`` output of WriteVariablesTime
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+    n_tsteps = 7
+
+    settings = {'FoR_variables': ['for_pos', 'for_vel'],
+                'FoR_number': [0],
+                'structure_variables': ['pos', 'psi'],
+                'structure_nodes': [0, 2],
+                'aero_panels_variables': ['gamma'],
+                'aero_panels_isurf': [0],
+                'aero_panels_im': [1],
+                'aero_panels_in': [0],
+                'aero_nodes_variables': ['zeta'],
+                'aero_nodes_isurf': [0],
+                'aero_nodes_im': [2],
+                'aero_nodes_in': [1],
+                'vel_field_variables': ['uext'],
+                'vel_field_points': [0., 0., 0., 1., 0., 0.],
+                'cleanup_old_solution': True}
+
+    def setUp(self):
+        np.random.seed(7)
+        self.data = types.SimpleNamespace()
+        self.data.settings = {'SHARPy': {'case': 'writevariablestime'}}
+        self.data.output_folder = self.route_test_dir + '/output/'
+        self.data.structure = types.SimpleNamespace(timestep_info=[],
+                                                    node_master_elem=np.array([[0, 0], [0, 2], [1, 2]]))
+        self.data.aero = types.SimpleNamespace(timestep_info=[])
+        self.structure_steps = []
+        self.aero_steps = []
+        for ts in range(self.n_tsteps):
+            self.structure_steps.append(
+                types.SimpleNamespace(for_pos=np.random.rand(6) * 1e3,
+                                      for_vel=np.random.rand(6) - 0.5,
+                                      pos=np.random.rand(3, 3),
+                                      psi=np.random.rand(2, 3, 3)))
+            self.aero_steps.append(
+                types.SimpleNamespace(gamma=[np.random.rand(3, 2)],
+                                      zeta=[np.random.rand(3, 4, 3)]))
+
+    def run_postprocessor(self, settings):
+        self.data.structure.timestep_info = []
+        self.data.aero.timestep_info = []
+        postproc = WriteVariablesTime()
+        postproc.initialise(self.data, custom_settings=dict(self.settings, **settings))
+        postproc.settings['vel_field_variables'] = []
+        for self.data.ts in range(self.n_tsteps):
+            self.data.structure.timestep_info.append(self.structure_steps[self.data.ts])
+            self.data.aero.timestep_info.append(self.aero_steps[self.data.ts])
+            postproc.run(online=True)
+        postproc.teardown()
+        return postproc
+
+    def reference_output(self):
+        """
+        Rows of each file written with the unbuffered methods, one time step at a time
+        """
+        postproc = WriteVariablesTime()
+        reference = dict()
+        for ts in range(self.n_tsteps):
+            tstep = self.structure_steps[ts]
+            aero_tstep = self.aero_steps[ts]
+            # the frame of reference variables are written as 2D arrays
+            rows = {'FoR_00_for_pos': np.atleast_2d(tstep.for_pos),
+                    'FoR_00_for_vel': np.atleast_2d(tstep.for_vel),
+                    'struct_pos_node0': tstep.pos[0, :],
+                    'struct_pos_node2': tstep.pos[2, :],
+                    'struct_psi_node0': tstep.psi[0, 0, :],
+                    'struct_psi_node2': tstep.psi[1, 2, :],
+                    'aero_zeta_node_isurf0_im2_in1': aero_tstep.zeta[0][:, 2, 1]}
+            for name, row in rows.items():
+                with open(self.data.output_folder + name + '.ref', 'a') as fid:
+                    postproc.write_nparray_to_file(fid, ts, row, ' ')
+            with open(self.data.output_folder + 'aero_gamma_panel_isurf0_im1_in0.ref', 'a') as fid:
+                postproc.write_value_to_file(fid, ts, aero_tstep.gamma[0][1, 0], ' ')
+
+        for filename in os.listdir(self.data.output_folder):
+            if filename.endswith('.ref'):
+                with open(self.data.output_folder + filename, 'rb') as fid:
+                    reference[filename[:-len('.ref')]] = fid.read()
+        return reference
+
+    def test_dat_output(self):
+        os.makedirs(self.data.output_folder, exist_ok=True)
+        reference = self.reference_output()
+        self.assertEqual(len(reference), 8)
+
+        for buffer_steps in [1, 3, 10]:
+            with self.subTest(buffer_steps=buffer_steps):
+                postproc = self.run_postprocessor({'buffer_steps': buffer_steps})
+                for name, content in reference.items():
+                    with open(postproc.folder + name + '.dat', 'rb') as fid:
+                        self.assertEqual(fid.read(), content, name)
+
+    def test_h5_output(self):
+        postproc = self.run_postprocessor({'output_format': 'h5', 'buffer_steps': 3})
+
+        self.assertEqual([filename for filename in os.listdir(postproc.folder) if filename.endswith('.dat')], [])
+        with h5py.File(postproc.folder + 'writevariablestime.variables.h5', 'r') as hdfile:
+            np.testing.assert_array_equal(hdfile['ts'][:], np.arange(self.n_tsteps))
+            np.testing.assert_array_equal(hdfile['FoR_00_for_pos'][:],
+                                          [tstep.for_pos for tstep in self.structure_steps])
+            np.testing.assert_array_equal(hdfile['struct_psi_node2'][:],
+                                          [tstep.psi[1, 2, :] for tstep in self.structure_steps])
+            np.testing.assert_array_equal(hdfile['aero_gamma_panel_isurf0_im1_in0'][:, 0],
+                                          [tstep.gamma[0][1, 0] for tstep in self.aero_steps])
+        self.assertIsNone(postproc.hdfile)
+
+    def tearDown(self):
+        shutil.rmtree(self.route_test_dir + '/output/', ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,334 @@
+"""
+Test the vectorised assembly of the linear UVLM derivative and influence
+coefficient matrices against the panel by panel loops they replace.
+"""
+
+import os
+import itertools
+import unittest
+import numpy as np
+
+import sharpy.utils.h5utils as h5utils
+import sharpy.linear.src.assembly as assembly
+import sharpy.linear.src.lib_dbiot as dbiot
+import sharpy.linear.src.multisurfaces as multisurfaces
+import sharpy.linear.src.uvlmutils as uvlmutils
+import sharpy.utils.algebra as algebra
+from sharpy.aero.utils.uvlmlib import dvinddzeta_cpp, get_aic3_cpp, get_induced_velocity_cpp
+
+vortex_radius = 1e-4
+dmver, dnver = assembly.dmver, assembly.dnver
+segments = list(zip(assembly.svec, assembly.avec, assembly.bvec))
+
+
+def vert_index(mm, nn, shape):
+    return [np.ravel_multi_index((cc, mm, nn), shape) for cc in range(3)]
+
+
+def loop_segments(Surf, Surf_star):
+    """
+    Yields the segment number, panel (m,n) indices, vertices indices,
+    circulation and whether the segment is on the trailing edge, for the
+    segments of the bound panels and of the trailing edge in the order of the
+    original loops
+    """
+    M, N = Surf.maps.M, Surf.maps.N
+    shape = Surf.maps.shape_vert_vect
+    for mm, nn in itertools.product(range(M), range(N)):
+        for ll, aa, bb in segments:
+            yield (ll, mm, nn,
+                   vert_index(mm + dmver[aa], nn + dnver[aa], shape),
+                   vert_index(mm + dmver[bb], nn + dnver[bb], shape),
+                   Surf.gamma[mm, nn], False)
+    for nn in range(N):
+        yield 1, M - 1, nn, vert_index(M, nn + 1, shape), vert_index(M, nn, shape), Surf_star.gamma[0, nn], True
+
+
+def nc_dqcdzeta_loop(Surfs, Surfs_star):
+    DAICcoll, DAICvert = [], []
+    for Surf_out in Surfs:
+        Surf_out.generate_collocations()
+        wcv = Surf_out.get_panel_wcv()
+        shape_out = Surf_out.maps.shape_vert_vect
+        Dcoll = np.zeros((Surf_out.maps.K, 3 * Surf_out.maps.Kzeta))
+        DAICvert_sub = []
+        for Surf_in, Surf_star_in in zip(Surfs, Surfs_star):
+            Dvert = np.zeros((Surf_out.maps.K, 3 * Surf_in.maps.Kzeta))
+            for cc_out, (mm, nn) in enumerate(itertools.product(range(Surf_out.maps.M), range(Surf_out.maps.N))):
+                zetac = Surf_out.zetac[:, mm, nn].copy()
+                nc = Surf_out.normals[:, mm, nn]
+                dcoll_b, dvert_b = dvinddzeta_cpp(zetac, Surf_in, is_bound=True, vortex_radius=vortex_radius)
+                dcoll_w, dvert_w = dvinddzeta_cpp(zetac, Surf_star_in, is_bound=False, vortex_radius=vortex_radius,
+                                                  M_in_bound=Surf_in.maps.M)
+                Dvert[cc_out, :] += np.dot(nc, dvert_b + dvert_w)
+                dvindnorm = np.dot(nc, dcoll_b + dcoll_w)
+                for vv in range(4):
+                    Dcoll[cc_out, vert_index(mm + dmver[vv], nn + dnver[vv], shape_out)] += wcv[vv] * dvindnorm
+            DAICvert_sub.append(Dvert)
+        DAICcoll.append(Dcoll)
+        DAICvert.append(DAICvert_sub)
+    return DAICcoll, DAICvert
+
+
+def dfqsdvind_zeta_loop(Surfs, Surfs_star):
+    Dercoll_list, Dervert_list = [], []
+    for ss_out, Surf_out in enumerate(Surfs):
+        Kzeta_out = Surf_out.maps.Kzeta
+        Dercoll = np.zeros((3 * Kzeta_out, 3 * Kzeta_out))
+        Dervert_sub = [np.zeros((3 * Kzeta_out, 3 * Surf_in.maps.Kzeta)) for Surf_in in Surfs]
+        zeta = Surf_out.zeta.reshape((3, -1))
+        for ll, mm, nn, ii_a, ii_b, gamma, _ in loop_segments(Surf_out, Surfs_star[ss_out]):
+            zeta_a, zeta_b = zeta[:, ii_a[0]], zeta[:, ii_b[0]]
+            zeta_mid = 0.5 * (zeta_a + zeta_b)
+            Lskew = algebra.skew((-Surf_out.rho * gamma) * (zeta_b - zeta_a))
+            for ss_in, Surf_in in enumerate(Surfs):
+                for Surf, is_bound in [(Surf_in, True), (Surfs_star[ss_in], False)]:
+                    dvind_mid, dvind_vert = dvinddzeta_cpp(zeta_mid, Surf, is_bound=is_bound,
+                                                           vortex_radius=vortex_radius, M_in_bound=Surf_in.maps.M)
+                    Df = np.dot(0.25 * Lskew, dvind_mid)
+                    for ii_row, ii_col in itertools.product([ii_a, ii_b], [ii_a, ii_b]):
+                        Dercoll[np.ix_(ii_row, ii_col)] += Df
+                    Df = np.dot(0.5 * Lskew, dvind_vert)
+                    Dervert_sub[ss_in][ii_a, :] += Df
+                    Dervert_sub[ss_in][ii_b, :] += Df
+        Dercoll_list.append(Dercoll)
+        Dervert_list.append(Dervert_sub)
+    return Dercoll_list, Dervert_list
+
+
+def dfqsdzeta_vrel0_loop(Surfs, Surfs_star):
+    Der_list = []
+    for ss, Surf in enumerate(Surfs):
+        Der = np.zeros((3 * Surf.maps.Kzeta, 3 * Surf.maps.Kzeta))
+        for ll, mm, nn, ii_a, ii_b, gamma, is_te in loop_segments(Surf, Surfs_star[ss]):
+            vrel_seg = Surf.u_input_seg[:, ll, mm, nn] + Surf.u_ind_seg[:, ll, mm, nn]
+            rho = Surfs_star[ss].rho if is_te else Surf.rho
+            Df = algebra.skew((0.5 * rho * gamma) * vrel_seg)
+            Der[np.ix_(ii_a, ii_a)] += -Df
+            Der[np.ix_(ii_b, ii_a)] += -Df
+            Der[np.ix_(ii_a, ii_b)] += Df
+            Der[np.ix_(ii_b, ii_b)] += Df
+        Der_list.append(Der)
+    return Der_list
+
+
+def dfqsdvind_gamma_loop(Surfs, Surfs_star):
+    Der_list, Der_star_list = [], []
+    for ss_out, Surf_out in enumerate(Surfs):
+        AICs = [Surf_in.get_aic_over_surface(Surf_out, target='segments', Project=False) for Surf_in in Surfs]
+        AICs_star = [Surf_in.get_aic_over_surface(Surf_out, target='segments', Project=False)
+                     for Surf_in in Surfs_star]
+        Der_sub = [np.zeros((3 * Surf_out.maps.Kzeta, aic.shape[1])) for aic in AICs]
+        Der_star_sub = [np.zeros((3 * Surf_out.maps.Kzeta, aic.shape[1])) for aic in AICs_star]
+        zeta = Surf_out.zeta.reshape((3, -1))
+        for ll, mm, nn, ii_a, ii_b, gamma, _ in loop_segments(Surf_out, Surfs_star[ss_out]):
+            Lskew = algebra.skew((-0.5 * Surf_out.rho * gamma) * (zeta[:, ii_b[0]] - zeta[:, ii_a[0]]))
+            for ss_in in range(len(Surfs)):
+                for Der, AIC in [(Der_sub[ss_in], AICs[ss_in]), (Der_star_sub[ss_in], AICs_star[ss_in])]:
+                    Dfs = np.dot(Lskew, AIC[:, :, ll, mm, nn])
+                    Der[ii_a, :] += Dfs
+                    Der[ii_b, :] += Dfs
+        Der_list.append(Der_sub)
+        Der_star_list.append(Der_star_sub)
+    return Der_list, Der_star_list
+
+
+def loop_target_points(Surf_out, target):
+    """
+    Yields the (m,n) panel indices, segment number and coordinates of the target
+    points of Surf_out in the order of the original loops
+    """
+    if target == 'collocation':
+        for mm, nn in itertools.product(range(Surf_out.maps.M), range(Surf_out.maps.N)):
+            yield mm, nn, None, Surf_out.zetac[:, mm, nn]
+    else:
+        for mm, nn in itertools.product(range(Surf_out.maps.M), range(Surf_out.maps.N)):
+            zetav_here = Surf_out.get_panel_vertices_coords(mm, nn)
+            for ll, aa, bb in segments:
+                yield mm, nn, ll, 0.5 * (zetav_here[aa, :] + zetav_here[bb, :])
+
+
+def aic_loop(Surf_in, Surf_out, target, Project):
+    M, N, K_in = Surf_out.maps.M, Surf_out.maps.N, Surf_in.maps.K
+    if target == 'collocation':
+        AIC = np.zeros((3, M, N, K_in))
+    else:
+        AIC = np.zeros((3, K_in, 4, M, N))
+    for mm, nn, ll, zeta_target in loop_target_points(Surf_out, target):
+        aic3 = get_aic3_cpp(Surf_in.maps, Surf_in.zeta, zeta_target, vortex_radius)
+        if target == 'collocation':
+            AIC[:, mm, nn, :] = aic3
+        else:
+            AIC[:, :, ll, mm, nn] = aic3
+    if target == 'collocation':
+        if Project:
+            AIC = np.einsum('imn,imnk->mnk', Surf_out.normals, AIC)
+        AIC = AIC.reshape(AIC.shape[:-3] + (M * N, K_in))
+    return AIC
+
+
+def induced_velocity_loop(Surf_in, Surf_out, target, Project):
+    M, N = Surf_out.maps.M, Surf_out.maps.N
+    if target == 'collocation':
+        Uind = np.zeros((3, M, N))
+    else:
+        Uind = np.zeros((3, 4, M, N))
+    for mm, nn, ll, zeta_target in loop_target_points(Surf_out, target):
+        uind = get_induced_velocity_cpp(Surf_in.maps, Surf_in.zeta, Surf_in.gamma,
+                                        zeta_target, vortex_radius)
+        if target == 'collocation':
+            Uind[:, mm, nn] = uind
+        else:
+            Uind[:, ll, mm, nn] = uind
+    if Project:
+        Uind = np.einsum('imn,imn->mn', Surf_out.normals, Uind)
+    return Uind
+
+
+class Test_assembly_vectorised(unittest.TestCase):
+    """
+    Test the vectorised kernels and assembly methods against the loops over
+    panels and segments.
+    """
+
+    route_test_dir = os.path.dirname(os.path.abspath(__file__))
+    cases = ['goland_mod_Nsurf01_M003_N004_a040', 'goland_mod_Nsurf02_M003_N004_a040']
+
+    def setUp(self):
+        self.MS_list = []
+        for case in self.cases:
+            haero = h5utils.readh5(self.route_test_dir + '/h5input/' + case + '.aero_state.h5')
+            MS = multisurfaces.MultiAeroGridSurfaces(haero.ts00000, vortex_radius)
+            MS.get_normal_ind_velocities_at_collocation_points()
+            MS.get_joukovski_qs()
+            self.MS_list.append(MS)
+
+    def assert_all_close(self, list_vect, list_loop, name):
+        if isinstance(list_loop, (list, tuple)):
+            self.assertEqual(len(list_vect), len(list_loop))
+            for der_vect, der_loop in zip(list_vect, list_loop):
+                self.assert_all_close(der_vect, der_loop, name)
+        else:
+            np.testing.assert_allclose(list_vect, list_loop, rtol=1e-10,
+                                       atol=1e-12 * np.max(np.abs(list_loop)),
+                                       err_msg='%s not matching the loop over panels' % name)
+
+    def test_eval_seg_comp_vect(self):
+        np.random.seed(0)
+        ZetaP = np.random.rand(6, 3)
+        ZetaA = np.random.rand(5, 3)
+        ZetaB = np.random.rand(5, 3)
+        gamma = np.random.rand(5)
+        # points on the segment line and on a segment vertex are within the vortex radius
+        ZetaP[0] = 0.3 * ZetaA[1] + 0.7 * ZetaB[1]
+        ZetaP[1] = ZetaB[2]
+
+        DerP, DerA, DerB = dbiot.eval_seg_comp_vect(ZetaP, ZetaA, ZetaB, vortex_radius, gamma)
+        DerP_coll, _, _ = dbiot.eval_seg_comp_vect(ZetaP, ZetaA, ZetaB, vortex_radius, gamma,
+                                                   der_vertices=False)
+        for pp, ss in itertools.product(range(6), range(5)):
+            DerP_loop, DerA_loop, DerB_loop = dbiot.eval_seg_comp(ZetaP[pp], ZetaA[ss], ZetaB[ss],
+                                                                  vortex_radius, gamma[ss])
+            np.testing.assert_allclose(DerP[pp, ss], DerP_loop, atol=1e-13)
+            np.testing.assert_allclose(DerA[pp, ss], DerA_loop, atol=1e-13)
+            np.testing.assert_allclose(DerB[pp, ss], DerB_loop, atol=1e-13)
+            np.testing.assert_allclose(DerP_coll[pp, ss], DerP_loop, atol=1e-13)
+        self.assertTrue(np.all(np.isfinite(DerP)))
+
+    def test_biot_segment_vect(self):
+        np.random.seed(0)
+        ZetaA, ZetaB = np.random.rand(5, 3), np.random.rand(5, 3)
+        gamma = np.random.rand(5)
+        # include target points on a segment and on its extension
+        ZetaP = np.concatenate((np.random.rand(4, 3),
+                                0.5 * (ZetaA[:1] + ZetaB[:1]), 2. * ZetaB[1:2] - ZetaA[1:2]))
+        Q = uvlmutils.biot_segment_vect(ZetaP, ZetaA, ZetaB, vortex_radius, gamma)
+        for pp, ss in itertools.product(range(ZetaP.shape[0]), range(ZetaA.shape[0])):
+            np.testing.assert_allclose(Q[pp, ss],
+                                       uvlmutils.biot_segment(ZetaP[pp], ZetaA[ss], ZetaB[ss],
+                                                              vortex_radius, gamma[ss]),
+                                       rtol=1e-12, atol=1e-14)
+        self.assertTrue(np.all(Q[4, 0] == 0.) and np.all(Q[5, 1] == 0.))
+
+    def test_aic_over_surface(self):
+        for MS in self.MS_list:
+            for Surf_out, Surf_in in itertools.product(MS.Surfs, MS.Surfs + MS.Surfs_star):
+                for target, Project in [('collocation', True), ('collocation', False), ('segments', False)]:
+                    self.assert_all_close(Surf_in.get_aic_over_surface(Surf_out, target, Project),
+                                          aic_loop(Surf_in, Surf_out, target, Project),
+                                          'get_aic_over_surface')
+
+    def test_induced_velocity_over_surface(self):
+        for MS in self.MS_list:
+            for Surf_out, Surf_in in itertools.product(MS.Surfs, MS.Surfs + MS.Surfs_star):
+                for target, Project in [('collocation', True), ('collocation', False), ('segments', False)]:
+                    self.assert_all_close(Surf_in.get_induced_velocity_over_surface(Surf_out, target, Project),
+                                          induced_velocity_loop(Surf_in, Surf_out, target, Project),
+                                          'get_induced_velocity_over_surface')
+
+    def test_AICs_block(self):
+        batch_size = assembly.batch_size
+        for MS in self.MS_list:
+            for Project in [True, False]:
+                AIC_loop = [[aic_loop(Surf_in, Surf_out, 'collocation', Project) for Surf_in in MS.Surfs]
+                            for Surf_out in MS.Surfs]
+                AIC_star_loop = [[aic_loop(Surf_in, Surf_out, 'collocation', Project) for Surf_in in MS.Surfs_star]
+                                 for Surf_out in MS.Surfs]
+                AIC_loop = np.concatenate([np.concatenate(row, axis=-1) for row in AIC_loop], axis=-2)
+                AIC_star_loop = np.concatenate([np.concatenate(row, axis=-1) for row in AIC_star_loop], axis=-2)
+                self.assert_all_close(assembly.AICs_block(MS.Surfs, MS.Surfs_star, Project),
+                                      [AIC_loop, AIC_star_loop], 'AICs_block')
+                # evaluation in chunks of target points
+                try:
+                    assembly.batch_size = 100
+                    self.assert_all_close(assembly.AICs_block(MS.Surfs, MS.Surfs_star, Project),
+                                          [AIC_loop, AIC_star_loop], 'AICs_block')
+                finally:
+                    assembly.batch_size = batch_size
+
+    def test_dvinddzeta_batch(self):
+        for MS in self.MS_list:
+            Surf = MS.Surfs[0]
+            zetac = np.array([0.5 * (Surf.zeta[:, 1, 2] + Surf.zeta[:, 1, 3]),
+                              Surf.zeta[:, 2, 1],
+                              0.25 * np.sum(Surf.zeta[:, 1:3, 1:3], axis=(1, 2))])
+            for ss_in in range(MS.n_surf):
+                for Surf_in, is_bound in [(MS.Surfs[ss_in], True), (MS.Surfs_star[ss_in], False)]:
+                    M_in_bound = MS.Surfs[ss_in].maps.M
+                    Dercoll, Dervert = assembly.dvinddzeta_batch(zetac, Surf_in, is_bound, M_in_bound=M_in_bound)
+                    for pp in range(zetac.shape[0]):
+                        Dercoll_loop, Dervert_loop = dvinddzeta_cpp(zetac[pp].copy(), Surf_in, is_bound,
+                                                                    vortex_radius, M_in_bound=M_in_bound)
+                        self.assert_all_close(Dercoll[pp], Dercoll_loop, 'dvinddzeta_batch')
+                        self.assert_all_close(Dervert[pp], Dervert_loop, 'dvinddzeta_batch')
+
+    def test_nc_dqcdzeta(self):
+        for MS in self.MS_list:
+            self.assert_all_close(assembly.nc_dqcdzeta(MS.Surfs, MS.Surfs_star),
+                                  nc_dqcdzeta_loop(MS.Surfs, MS.Surfs_star), 'nc_dqcdzeta')
+
+    def test_dfqsdvind_zeta(self):
+        batch_size = assembly.batch_size
+        for MS in self.MS_list:
+            der_loop = dfqsdvind_zeta_loop(MS.Surfs, MS.Surfs_star)
+            self.assert_all_close(assembly.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star), der_loop, 'dfqsdvind_zeta')
+            # evaluation in chunks of target points
+            try:
+                assembly.batch_size = 100
+                self.assert_all_close(assembly.dfqsdvind_zeta(MS.Surfs, MS.Surfs_star), der_loop, 'dfqsdvind_zeta')
+            finally:
+                assembly.batch_size = batch_size
+
+    def test_dfqsdzeta_vrel0(self):
+        for MS in self.MS_list:
+            self.assert_all_close(assembly.dfqsdzeta_vrel0(MS.Surfs, MS.Surfs_star),
+                                  dfqsdzeta_vrel0_loop(MS.Surfs, MS.Surfs_star), 'dfqsdzeta_vrel0')
+
+    def test_dfqsdvind_gamma(self):
+        for MS in self.MS_list:
+            self.assert_all_close(assembly.dfqsdvind_gamma(MS.Surfs, MS.Surfs_star),
+                                  dfqsdvind_gamma_loop(MS.Surfs, MS.Surfs_star), 'dfqsdvind_gamma')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -73,3 +73,70 @@ class TestBalancing(unittest.TestCase):
         Yb2 = ssb2.freqresp(kv)
         er_max = np.max(np.abs(Yb2 - Y))
         assert er_max / np.max(np.abs(Y)) < 1e-10, 'Error too large'
+
+    def test_balreal_lradi(self):
+        np.random.seed(3)
+        Nx, Nu, Ny = 40, 3, 2
+
+        for dt in [0.1, None]:
+            ss = libss.random_ss(Nx, Nu, Ny, dt=dt, stable=True)
+            if dt is None:
+                ss.A -= 1.5 * np.eye(Nx)
+            hsv_ref = librom.balreal_direct_py(ss.A, ss.B, ss.C, DLTI=dt is not None)[0]
+
+            for A in [ss.A, libsp.csc_matrix(ss.A)]:
+                with self.subTest(dt=dt, sparse=type(A) == libsp.csc_matrix):
+                    hsv, T, Ti = librom.balreal_lradi(A, ss.B, ss.C, DLTI=dt is not None)
+                    np.testing.assert_allclose(hsv[:10], hsv_ref[:10], rtol=0, atol=1e-8 * hsv_ref[0])
+                    np.testing.assert_allclose(Ti.dot(T), np.eye(len(hsv)), atol=1e-6)
+
+                    # balanced Gramians
+                    if dt is None:
+                        Wc = scalg.solve_continuous_lyapunov(ss.A, -np.dot(ss.B, ss.B.T))
+                        Wo = scalg.solve_continuous_lyapunov(ss.A.T, -np.dot(ss.C.T, ss.C))
+                    else:
+                        Wc = scalg.solve_discrete_lyapunov(ss.A, np.dot(ss.B, ss.B.T))
+                        Wo = scalg.solve_discrete_lyapunov(ss.A.T, np.dot(ss.C.T, ss.C))
+                    np.testing.assert_allclose(Ti.dot(Wc).dot(Ti.T), np.diag(hsv), atol=1e-6 * hsv[0])
+                    np.testing.assert_allclose(T.T.dot(Wo).dot(T), np.diag(hsv), atol=1e-6 * hsv[0])
+
+    def test_lradi_sparse_input(self):
+        import sharpy.rom.balanced as balanced
+        np.random.seed(5)
+        ss = libss.random_ss(40, 3, 2, dt=0.1, stable=True)
+        hsv_ref = librom.balreal_lradi(ss.A, ss.B, ss.C)[0]
+
+        # sparse state and input matrices, dense output matrix
+        A, B = libsp.csc_matrix(ss.A), libsp.csc_matrix(ss.B)
+        hsv = librom.balreal_lradi(A, B, ss.C)[0]
+        np.testing.assert_allclose(hsv, hsv_ref, rtol=1e-10)
+
+        rom = balanced.LowRankADI()
+        rom.initialise({'num_states': 10})
+        ssrom = rom.run(libss.StateSpace(A, B, ss.C, ss.D, dt=ss.dt))
+        ssrom_ref = rom.run(ss)
+        for M, M_ref in zip(ssrom.get_mats(), ssrom_ref.get_mats()):
+            self.assertIsInstance(M, np.ndarray)
+            np.testing.assert_allclose(M, M_ref, atol=1e-10)
+
+    def test_balfreq_num_workers(self):
+        np.random.seed(4)
+        ss = libss.random_ss(30, 3, 2, dt=0.1, stable=True)
+
+        for A in [ss.A, libsp.csc_matrix(ss.A)]:
+            ss_here = libss.StateSpace(A, ss.B, ss.C, ss.D, dt=ss.dt)
+            outputs = []
+            for num_workers in [1, 4]:
+                settings = {'frequency': 2.,
+                            'method_low': 'gauss',
+                            'options_low': {'partitions': 2, 'order': 4},
+                            'method_high': 'trapz',
+                            'options_high': {'points': 6},
+                            'check_stability': False,
+                            'num_workers': num_workers}
+                outputs.append(librom.balfreq(ss_here, settings))
+
+            with self.subTest(sparse=type(A) == libsp.csc_matrix):
+                # hsv, Zc and Zo are identical when the integration points are distributed among threads
+                for ii in [1, 4, 5]:
+                    np.testing.assert_array_equal(outputs[0][ii], outputs[1][ii])
@@ -3,6 +3,7 @@ Test Krylov ROM using Hospital Building Model
 """
 
 import os
+import tempfile
 import unittest
 import numpy as np
 
@@ -12,6 +13,7 @@ import scipy.io as scio
 import sharpy.utils.sharpydir as sharpydir
 import sharpy.linear.src.libss as libss
 import sharpy.rom.krylov as krylov
+import sharpy.rom.utils.krylovutils as krylovutils
 import sharpy.linear.src.libsparse as libsp
 
 
@@ -89,5 +91,35 @@ class TestKrylov(unittest.TestCase):
         shutil.rmtree(self.test_dir + '/figs/')
         os.remove(self.test_dir + '/rom_data.h5')
 
+
+class TestKrylovSpaces(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(1)
+        n = 100
+        self.A = -np.diag(np.linspace(0.1, 30, n)) + 0.01 * np.random.randn(n, n)
+        self.B = np.random.randn(n, 3)
+        self.C = np.random.randn(3, n)
+
+    def test_build_krylov_spaces(self):
+        frequency = np.array([0., 1., 5.])
+        for A in [self.A, libsp.csc_matrix(self.A)]:
+            with self.subTest(sparse=type(A) is libsp.csc_matrix):
+                requests = [(sigma, 3, 'b', self.B) for sigma in frequency] + \
+                           [(sigma, 3, 'c', self.C.T) for sigma in frequency]
+                reference = [krylovutils.build_krylov_space(*request[:3], A, request[3]) for request in requests]
+
+                with tempfile.TemporaryDirectory() as cache_folder:
+                    for i_run in range(2):
+                        spaces = krylovutils.build_krylov_spaces(A, requests, num_workers=3, cache_folder=cache_folder)
+                        for space, space_ref in zip(spaces, reference):
+                            np.testing.assert_array_equal(space, space_ref)
+                        self.assertEqual(len(os.listdir(cache_folder)), len(requests))
+
+                    # additional interpolation point only adds its own spaces to the cache
+                    krylovutils.build_krylov_spaces(A, requests + [(10., 3, 'b', self.B)], cache_folder=cache_folder)
+                    self.assertEqual(len(os.listdir(cache_folder)), len(requests) + 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+import scipy.linalg as sclalg
+
+import sharpy.linear.src.libss as libss
+import sharpy.linear.src.libsparse as libsp
+from sharpy.linear.src.eigencontinuation import EigenvalueContinuation
+
+
+class TestEigenvalueContinuation(unittest.TestCase):
+    """
+    Tracking of the eigenvalues of a parameter dependent system with known eigenvalues. Mode 0 becomes unstable at
+    p = 1.3 and the frequencies of modes 1 and 2 cross at p = 1.
+    """
+
+    num_states_extra = 60
+
+    @staticmethod
+    def tracked_eigenvalues(p):
+        return np.array([0.3 * (p - 1.3) + 3.j, -0.2 + 1j * (2. + p), -0.25 + 1j * (4. - p), 0.])
+
+    def setUp(self):
+        np.random.seed(0)
+        num_states = 7 + self.num_states_extra
+        self.V = np.eye(num_states) + 0.1 * np.random.rand(num_states, num_states)
+        self.V_inv = np.linalg.inv(self.V)
+
+    def system(self, p, dt, use_sparse):
+        blocks = [np.array([[eig.real, eig.imag], [-eig.imag, eig.real]]) for eig in self.tracked_eigenvalues(p)[:3]]
+        A = self.V.dot(sclalg.block_diag(*blocks, [[0.]],
+                                         np.diag(-1. - 0.05 * np.arange(self.num_states_extra)))).dot(self.V_inv)
+        if dt is not None:
+            A = sclalg.expm(A * dt)
+        if use_sparse:
+            A = libsp.csc_matrix(A)
+        num_states = A.shape[0]
+        return libss.StateSpace(A, np.ones((num_states, 1)), np.ones((1, num_states)), np.zeros((1, 1)), dt=dt)
+
+    def test_track(self):
+        for dt in [None, 0.05]:
+            for use_sparse in [False, True]:
+                with self.subTest(dt=dt, use_sparse=use_sparse):
+                    eigenvalues, eigenvectors = np.linalg.eig(libsp.dense(self.system(0., dt, use_sparse).A))
+                    initial = self.tracked_eigenvalues(0.)
+                    if dt is not None:
+                        initial = np.exp(initial * dt)
+                    modes = [np.argmin(np.abs(eigenvalues - eig)) for eig in initial]
+
+                    continuation = EigenvalueContinuation(lambda p: self.system(p, dt, use_sparse),
+                                                          max_refinements=4)
+                    parameter, eigs_ct = continuation.track(np.linspace(0, 2, 5),
+                                                            eigenvalues[modes], eigenvectors[:, modes])
+
+                    # refined step around the crossing only
+                    self.assertEqual(len(parameter), 9)
+                    for p, eigs in zip(parameter, eigs_ct):
+                        np.testing.assert_allclose(eigs, self.tracked_eigenvalues(p), atol=1e-10)
+
+                    self.assertEqual(len(continuation.crossings), 1)
+                    mode, p_crossing, frequency = continuation.crossings[0]
+                    self.assertEqual(mode, 0)
+                    self.assertAlmostEqual(p_crossing, 1.3, places=8)
+                    self.assertAlmostEqual(frequency, 3., places=8)
+
+
+if __name__ == '__main__':
+    unittest.main()
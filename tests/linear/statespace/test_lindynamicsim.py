@@ -0,0 +1,75 @@
+import os
+import shutil
+import types
+import unittest
+import unittest.mock
+
+import numpy as np
+import scipy.signal as scsig
+
+import sharpy.linear.src.libss as libss
+import sharpy.solvers.lindynamicsim as lindynamicsim
+
+
+class TestLinDynamicSim(unittest.TestCase):
+    """
+    Time marching of continuous and discrete time systems with LinDynamicSim. The unpacking of the state space
+    vectors into the aerodynamic and structural time steps is replaced by the vectors themselves.
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+    n_tsteps = 25
+
+    def setUp(self):
+        np.random.seed(6)
+        self.u = np.random.rand(self.n_tsteps, 2)
+        self.x0 = np.random.rand(6)
+
+    def run_lindynamicsim(self, ss, settings):
+        data = types.SimpleNamespace()
+        data.settings = {'SHARPy': {'route': self.route_test_dir, 'case': 'lindynamicsim'}}
+        data.output_folder = self.route_test_dir + '/output/'
+        data.linear = types.SimpleNamespace(ss=ss, timestep_info=[])
+        data.aero = types.SimpleNamespace(timestep_info=[])
+        data.structure = types.SimpleNamespace(timestep_info=[])
+
+        solver = lindynamicsim.LinDynamicSim()
+        solver.initialise(data, custom_settings=dict(settings, n_tsteps=self.n_tsteps))
+        solver.input_data_dict = {'u': self.u, 'x0': self.x0}
+        with unittest.mock.patch.object(lindynamicsim, 'state_to_timestep', lambda data, x, u, y: (x, y)):
+            return solver.run()
+
+    def test_continuous_time(self):
+        ss = libss.random_ss(6, 2, 3, dt=None, stable=True)
+        data = self.run_lindynamicsim(ss, {'write_dat': ['y']})
+
+        t_dom = np.linspace(0, (self.n_tsteps - 1) * 0.001, self.n_tsteps)
+        y_ref = scsig.lsim((ss.A, ss.B, ss.C, ss.D), self.u, t_dom, X0=self.x0)[1]
+
+        self.assertEqual(len(data.linear.timestep_info), self.n_tsteps - 1)
+        np.testing.assert_allclose(np.array([tstep.y for tstep in data.linear.timestep_info]), y_ref[:-1],
+                                   atol=1e-10)
+        np.testing.assert_allclose(np.loadtxt(data.output_folder + '/lindynamicsim/y_out.dat'), y_ref, atol=1e-10)
+
+    def test_history_length(self):
+        ss = libss.random_ss(6, 2, 3, dt=0.1, stable=True)
+        y_ref, x_ref = libss.DiscreteTimeSimulator(ss).simulate(self.u, self.x0)
+        data = self.run_lindynamicsim(ss, {'chunk_size': 4, 'history_length': 3})
+
+        for timestep_info in [data.linear.timestep_info, data.aero.timestep_info, data.structure.timestep_info]:
+            self.assertEqual(len(timestep_info), self.n_tsteps - 1)
+            self.assertTrue(all(tstep is None for tstep in timestep_info[:-3]))
+            self.assertTrue(all(tstep is not None for tstep in timestep_info[-3:]))
+
+        for tstep, n in zip(data.linear.timestep_info[-3:], range(self.n_tsteps - 4, self.n_tsteps - 1)):
+            # the time step vectors do not keep the chunks in memory
+            self.assertIsNone(tstep.x.base)
+            np.testing.assert_allclose(tstep.x, x_ref[n], atol=1e-10)
+            np.testing.assert_allclose(tstep.y, y_ref[n], atol=1e-10)
+
+    def tearDown(self):
+        shutil.rmtree(self.route_test_dir + '/output/', ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
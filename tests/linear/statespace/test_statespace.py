@@ -3,9 +3,11 @@ import unittest
 import os
 
 import numpy as np
+import scipy.signal as scsig
 
 from sharpy.linear.src import libsparse as libsp
-from sharpy.linear.src.libss import StateSpace, SSconv, compare_ss, scale_SS, Gain, random_ss, couple, join, disc2cont, series
+from sharpy.linear.src.libss import StateSpace, SSconv, compare_ss, scale_SS, Gain, random_ss, couple, join, disc2cont, series, \
+    eigs_shift_invert, DiscreteTimeSimulator
 from sharpy.linear.utils.ss_interface import LinearVector, InputVariable, StateVariable, OutputVariable
 
 
@@ -116,6 +118,84 @@ class Test_dlti(unittest.TestCase):
         er = np.max(np.abs(Y - Y1))
         assert er < 1e-10, 'Test on freqresp failed'
 
+    def test_freqresp_engine(self):
+        # reduced (Hessenberg/sparse pattern) evaluation against a direct solve at each frequency
+        Nx = 30
+        A = np.random.rand(Nx, Nx)
+        A[np.abs(A) < 0.7] = 0.
+        B = np.random.rand(Nx, 2)
+        C = np.random.rand(4, Nx)
+        D = np.random.rand(4, 2)
+        kv = np.linspace(0, 2, 11)
+
+        for dt in [None, 0.3]:
+            zv = np.exp(1j * kv * dt) if dt is not None else 1j * kv
+            Yref = np.zeros((4, 2, len(kv)), dtype=complex)
+            for ii in range(len(kv)):
+                Yref[:, :, ii] = C.dot(np.linalg.solve(zv[ii] * np.eye(Nx) - A, B)) + D
+
+            for Asys in [A, libsp.csc_matrix(A)]:
+                SS = StateSpace(Asys, B, C, D, dt=dt)
+                for num_workers in [1, 3]:
+                    Y = SS.freqresp(kv, num_workers=num_workers)
+                    np.testing.assert_allclose(Y, Yref, rtol=1e-10, atol=1e-10)
+
+    def test_eigs_shift_invert(self):
+        # eigenvalues closest to shifts along the unit circle against the full set of eigenvalues
+        Nx = 200
+        A = np.random.rand(Nx, Nx)
+        A[np.abs(A) < 0.9] = 0.
+        A /= 1.05 * np.max(np.abs(np.linalg.eigvals(A)))
+        eigs_ref = np.linalg.eigvals(A)
+        shifts = np.exp(1j * np.linspace(0, 2, 3))
+        num_evals = 6
+
+        for Asys in [A, libsp.csc_matrix(A)]:
+            eigs, eigenvectors = eigs_shift_invert(Asys, shifts, num_evals)
+            np.testing.assert_allclose(A.dot(eigenvectors), eigenvectors * eigs, atol=1e-10)
+            # conjugate pairs are complete and no eigenvalue is repeated
+            self.assertEqual(len(np.unique(np.round(eigs, 8))), len(eigs))
+            for sigma in shifts:
+                for eig_ref in eigs_ref[np.argsort(np.abs(eigs_ref - sigma))[:num_evals - 1]]:
+                    self.assertLess(np.min(np.abs(eigs - eig_ref)), 1e-8)
+                    self.assertLess(np.min(np.abs(eigs - eig_ref.conj())), 1e-8)
+
+    def test_discrete_time_simulator(self):
+        # chunked marching of dense and sparse systems against scipy, for one and several input histories
+        Nx, Nu, Ny, Nsteps = 40, 3, 2, 55
+        SS = random_ss(Nx, Nu, Ny, dt=.2, stable=True)
+        U = np.random.rand(Nsteps, Nu)
+        x0 = np.random.rand(Nx)
+        t_out, y_ref, x_ref = scsig.dlti(SS.A, SS.B, SS.C, SS.D, dt=SS.dt).output(U, t=np.arange(Nsteps) * SS.dt,
+                                                                                   x0=x0)
+
+        SSsp = StateSpace(libsp.csc_matrix(SS.A), libsp.csc_matrix(SS.B), libsp.csc_matrix(SS.C),
+                          libsp.csc_matrix(SS.D), dt=SS.dt)
+        for SShere in [SS, SSsp]:
+            simulator = DiscreteTimeSimulator(SShere, chunk_size=10)
+            y, x = simulator.simulate(U, x0)
+            np.testing.assert_allclose(y, y_ref, atol=1e-10)
+            np.testing.assert_allclose(x, x_ref, atol=1e-10)
+
+            n_steps = 0
+            for n0, y_chunk, x_chunk in simulator.march(U, x0, save_states=False):
+                self.assertEqual(n0, n_steps)
+                self.assertIsNone(x_chunk)
+                n_steps += y_chunk.shape[0]
+            self.assertEqual(n_steps, Nsteps)
+
+            y_cases, x_cases = simulator.simulate(np.stack([U, -2 * U], axis=2), np.stack([x0, 0 * x0], axis=1))
+            np.testing.assert_allclose(y_cases[:, :, 0], y_ref, atol=1e-10)
+            np.testing.assert_allclose(x_cases[:, :, 0], x_ref, atol=1e-10)
+            np.testing.assert_allclose(y_cases[:, :, 1], -2 * simulator.simulate(U)[0], atol=1e-10)
+
+            y_max, y_min, envelope_max, envelope_min = simulator.envelope(np.stack([U, -2 * U], axis=2),
+                                                                          np.stack([x0, 0 * x0], axis=1))
+            np.testing.assert_allclose(y_max, y_cases.max(axis=0), atol=1e-10)
+            np.testing.assert_allclose(y_min, y_cases.min(axis=0), atol=1e-10)
+            np.testing.assert_allclose(envelope_max, y_cases.max(axis=2), atol=1e-10)
+            np.testing.assert_allclose(envelope_min, y_cases.min(axis=2), atol=1e-10)
+
     def test_couple(self):
         dt = .2
         Nx1, Nu1, Ny1 = 3, 4, 2
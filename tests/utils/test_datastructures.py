@@ -0,0 +1,155 @@
+import ctypes as ct
+import pickle
+import numpy as np
+import unittest
+
+import sharpy.utils.datastructures as datastructures
+
+
+class TestTimeStepCopy(unittest.TestCase):
+    """
+    Tests the in-place copy of the time step information
+    """
+
+    @staticmethod
+    def fill_random(tstep, names, seed=0):
+        np.random.seed(seed)
+        for name in names:
+            value = getattr(tstep, name)
+            if isinstance(value, list):
+                for array in value:
+                    array[...] = np.random.rand(*array.shape)
+            elif value is not None:
+                value[...] = np.random.rand(*value.shape)
+
+    def test_struct_copy_into(self):
+        num_node = 11
+        num_elem = 5
+        num_node_elem = 3
+        tstep = datastructures.StructTimeStepInfo(num_node, num_elem, num_node_elem, ct.c_int(6*(num_node - 1)), 1)
+        names = ['pos', 'pos_dot', 'psi', 'quat', 'for_vel', 'steady_applied_forces', 'runtime_unsteady_forces',
+                 'q', 'dqdt', 'mb_quat']
+        self.fill_random(tstep, names)
+        tstep.postproc_cell['strain'] = np.random.rand(num_elem, 6)
+        tstep.mb_dict = {'constraint_00': {'velocity': np.zeros(3), 'node_in_body': 4}}
+
+        dest = tstep.copy()
+        pointers = {name: getattr(dest, name) for name in names}
+        self.fill_random(tstep, names, seed=1)
+        tstep.postproc_cell['strain'][:] = 2.
+        tstep.mb_dict['constraint_00']['velocity'][:] = 1.
+        tstep.postproc_node['stale'] = np.zeros(3)
+
+        returned = tstep.copy_into(dest)
+        self.assertIs(returned, dest)
+        for name in names:
+            # copied in place, without allocating a new array
+            self.assertIs(getattr(dest, name), pointers[name])
+            np.testing.assert_array_equal(getattr(dest, name), getattr(tstep, name))
+            self.assertIsNot(getattr(dest, name), getattr(tstep, name))
+            self.assertTrue(getattr(dest, name).flags.f_contiguous)
+        np.testing.assert_array_equal(dest.postproc_cell['strain'], tstep.postproc_cell['strain'])
+        np.testing.assert_array_equal(dest.mb_dict['constraint_00']['velocity'], 1.)
+        self.assertIsNot(dest.mb_dict['constraint_00'], tstep.mb_dict['constraint_00'])
+        self.assertIn('stale', dest.postproc_node)
+
+        del tstep.postproc_node['stale']
+        tstep.copy_into(dest)
+        self.assertNotIn('stale', dest.postproc_node)
+
+    def test_aero_copy_into(self):
+        dimensions = np.array([[4, 6], [4, 6]])
+        dimensions_star = np.array([[10, 6], [10, 6]])
+        tstep = datastructures.AeroTimeStepInfo(dimensions, dimensions_star)
+        names = ['zeta', 'zeta_star', 'gamma', 'gamma_star', 'forces', 'u_ext', 'inertial_steady_forces']
+        self.fill_random(tstep, names)
+
+        dest = tstep.copy()
+        zeta = dest.zeta[1]
+        self.fill_random(tstep, names, seed=1)
+        tstep.control_surface_deflection = np.array([0.1, -0.1])
+        tstep.copy_into(dest)
+
+        self.assertIs(dest.zeta[1], zeta)
+        for name in names:
+            value = getattr(tstep, name)
+            if isinstance(value, list):
+                for i_surf in range(len(value)):
+                    np.testing.assert_array_equal(getattr(dest, name)[i_surf], value[i_surf])
+            else:
+                np.testing.assert_array_equal(getattr(dest, name), value)
+        # arrays of different shape are reallocated
+        np.testing.assert_array_equal(dest.control_surface_deflection, tstep.control_surface_deflection)
+        self.assertIsNot(dest.control_surface_deflection, tstep.control_surface_deflection)
+
+
+class TestTimeStepHistory(unittest.TestCase):
+    """
+    Tests the time step history with a bounded number of retained time steps
+    """
+
+    def test_release_old_steps(self):
+        history = datastructures.TimeStepHistory([0, 1], max_length=3)
+        for ts in range(2, 10):
+            history.append(ts)
+            self.assertEqual(len(history), ts + 1)
+            self.assertEqual(history[-1], ts)
+            self.assertEqual(history[ts], ts)
+            self.assertEqual(history[-3:], [ts - 2, ts - 1, ts])
+            self.assertEqual(sum(x is not None for x in history), 3)
+
+        # steps reset as in DynamicCoupled.cleanup_timestep_info
+        history[0] = history[-1]
+        while len(history) - 1:
+            del history[-1]
+        for ts in range(1, 5):
+            history.append(ts)
+        self.assertEqual(history, [None, None, 2, 3, 4])
+
+        copied = pickle.loads(pickle.dumps(history))
+        self.assertIsInstance(copied, datastructures.TimeStepHistory)
+        self.assertEqual(copied.max_length, 3)
+        self.assertEqual(copied, history)
+
+    def test_full_history(self):
+        history = datastructures.TimeStepHistory()
+        for ts in range(10):
+            history.append(ts)
+        self.assertEqual(history, list(range(10)))
+        self.assertIsNone(history.recycle_step())
+
+    def test_recycle_released_steps(self):
+        num_node = 5
+        tstep = datastructures.StructTimeStepInfo(num_node, 2, 3, ct.c_int(6*(num_node - 1)), 1)
+        history = datastructures.TimeStepHistory([tstep], max_length=2)
+        for ts in range(1, 8):
+            history[-1].q[:] = ts - 1
+            datastructures.append_copy(history, history[-1])
+            # one step is released and recycled at every append
+            self.assertLessEqual(len(history.released_steps), 1)
+        self.assertEqual(sum(x is not None for x in history), 2)
+
+        released = history.released_steps[0]
+        last_step = history[-1]
+        last_step.q[:] = 10.
+        datastructures.append_copy(history, last_step)
+        # the arrays of the released step are reused for the copy
+        self.assertIs(history[-1], released)
+        np.testing.assert_array_equal(history[-1].q, 10.)
+        self.assertIsNot(history[-1].q, last_step.q)
+        self.assertEqual(len(set(id(x) for x in history if x is not None)), 2)
+
+        # steps still retained are not pooled, and the pool is bounded
+        steps = [object() for ts in range(6)]
+        history = datastructures.TimeStepHistory(steps, max_length=1)
+        self.assertEqual(history.released_steps, [steps[4], steps[3]])
+        history.append(history[-1])
+        self.assertEqual(history.released_steps, [steps[4], steps[3]])
+        self.assertIs(history.recycle_step(), steps[4])
+        self.assertIs(history.recycle_step(), steps[3])
+        self.assertIsNone(history.recycle_step())
+
+        steps = [tstep]
+        datastructures.append_copy(steps, tstep)
+        self.assertIsNot(steps[1], tstep)
+        np.testing.assert_array_equal(steps[1].q, tstep.q)
@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+
+import sharpy.utils.fsiacceleration as fsiacceleration
+
+
+class TestFSIAcceleration(unittest.TestCase):
+    """
+    Convergence of the FSI accelerators on the fixed point of a linear map whose plain iteration diverges, as in FSI
+    problems with strong coupling.
+    """
+
+    relaxation_factor = 0.8
+    tolerance = 1e-10
+
+    def setUp(self):
+        np.random.seed(0)
+        num_dofs = 30
+        V = np.eye(num_dofs) + 0.1*np.random.rand(num_dofs, num_dofs)
+        self.A = V.dot(np.diag(np.linspace(-1.5, 0.5, num_dofs))).dot(np.linalg.inv(V))
+        self.b = np.random.rand(num_dofs // 2, 2)
+
+    def fixed_point(self, b):
+        return np.linalg.solve(np.eye(self.A.shape[0]) - self.A, b.ravel()).reshape(b.shape)
+
+    def iterate(self, accelerator, b, max_iter=2000):
+        x = np.zeros_like(b)
+        accelerator.new_step()
+        for i_iter in range(max_iter):
+            x_tilde = self.A.dot(x.ravel()).reshape(b.shape) + b
+            if np.linalg.norm(x_tilde - x) < self.tolerance:
+                accelerator.end_step()
+                return x, i_iter
+            x = accelerator.update(x_tilde, x)
+        accelerator.end_step()
+        return x, max_iter
+
+    def relaxation_iterations(self, b):
+        x = np.zeros_like(b)
+        for i_iter in range(2000):
+            x_tilde = self.A.dot(x.ravel()).reshape(b.shape) + b
+            if np.linalg.norm(x_tilde - x) < self.tolerance:
+                return i_iter
+            x = (1. - self.relaxation_factor)*x_tilde + self.relaxation_factor*x
+        return 2000
+
+    def test_accelerators(self):
+        relaxation_iterations = self.relaxation_iterations(self.b)
+        for accelerator_id in ['Aitken', 'IQN-ILS']:
+            with self.subTest(accelerator=accelerator_id):
+                accelerator = fsiacceleration.initialise_accelerator(accelerator_id, self.relaxation_factor)
+                x, iterations = self.iterate(accelerator, self.b)
+
+                np.testing.assert_allclose(x, self.fixed_point(self.b), atol=1e-8)
+                self.assertLess(iterations, relaxation_iterations)
+                self.assertEqual(accelerator.iterations, iterations)
+                self.assertGreater(accelerator.saved_iterations, 0)
+
+    def test_iqn_reuse(self):
+        b_new = self.b + 0.1*np.random.rand(*self.b.shape)
+        iterations = []
+        for reuse_steps in [0, 4]:
+            accelerator = fsiacceleration.initialise_accelerator('IQN-ILS', self.relaxation_factor,
+                                                                 {'reuse_steps': reuse_steps})
+            self.iterate(accelerator, self.b)
+            x, step_iterations = self.iterate(accelerator, b_new)
+            np.testing.assert_allclose(x, self.fixed_point(b_new), atol=1e-8)
+            iterations.append(step_iterations)
+
+        # the secant information of the previous step converges the linear problem almost at once
+        self.assertLess(iterations[1], iterations[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import shutil
+import unittest
+
+import h5py
+import numpy as np
+
+import sharpy.utils.h5utils as h5utils
+
+
+class TestTimeSeriesWriter(unittest.TestCase):
+    """
+    Tests the streaming of time series to ``h5`` files
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+    output_dir = route_test_dir + '/output/'
+
+    def setUp(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    @staticmethod
+    def generate_step(ts):
+        return {'pos': np.full((5, 3), ts, dtype=float),
+                'gamma': [np.full((2, 4), -ts, dtype=float), np.full((3, 4), 2 * ts, dtype=float)],
+                'postproc_cell': {'strain': np.arange(6) * ts},
+                'num_node': 5,
+                'name': 'skipped'}
+
+    def run_writer(self, threaded, compression=None):
+        n_steps = 23
+        filename = self.output_dir + 'timeseries.h5'
+        with h5py.File(filename, 'w') as hdfile:
+            writer = h5utils.TimeSeriesWriter(hdfile.create_group('timeseries'), chunk_steps=5,
+                                              compression=compression, threaded=threaded)
+            for ts in range(1, n_steps + 1):
+                variables = self.generate_step(ts)
+                if ts == 10:
+                    # missing variable
+                    del variables['pos']
+                writer.write(ts, variables)
+                # the writer keeps a copy
+                variables['gamma'][0][:] = 1e3
+            writer.close()
+
+        with h5py.File(filename, 'r') as hdfile:
+            grp = hdfile['timeseries']
+            np.testing.assert_array_equal(grp['ts'][()], np.arange(1, n_steps + 1))
+            self.assertEqual(grp['pos'].shape, (n_steps, 5, 3))
+            self.assertEqual(grp['pos'].chunks, (5, 5, 3))
+            self.assertTrue(np.isnan(grp['pos'][9]).all())
+            np.testing.assert_array_equal(grp['pos'][10, 0], 11.)
+            np.testing.assert_array_equal(grp['gamma']['00000'][:, 0, 0], -np.arange(1, n_steps + 1))
+            self.assertEqual(grp['gamma']['00001'].shape, (n_steps, 3, 4))
+            np.testing.assert_array_equal(grp['postproc_cell']['strain'][2], np.arange(6) * 3)
+            np.testing.assert_array_equal(grp['num_node'][()], 5)
+            self.assertNotIn('name', grp)
+            self.assertEqual(grp['gamma']['_read_as'].asstr()[()], 'list')
+            self.assertEqual(grp['postproc_cell']['_read_as'].asstr()[()], 'dict')
+
+    def test_threaded(self):
+        self.run_writer(threaded=True, compression='gzip')
+
+    def test_serial(self):
+        self.run_writer(threaded=False)
+
+    def test_static_and_dynamic_steps(self):
+        filename = self.output_dir + 'timeseries.h5'
+        for threaded in [True, False]:
+            with self.subTest(threaded=threaded):
+                with h5py.File(filename, 'w') as hdfile:
+                    writer = h5utils.TimeSeriesWriter(hdfile.create_group('timeseries'), chunk_steps=4,
+                                                      threaded=threaded)
+                    # static step
+                    writer.write(0, {'pos': np.zeros((5, 3)),
+                                     'postproc_node': {'aero_steady_forces': np.ones((5, 6))}})
+                    # dynamic steps, with variables that do not exist in the static one
+                    for ts in range(1, 7):
+                        writer.write(ts, {'pos': np.full((5, 3), ts, dtype=float),
+                                          'postproc_node': {'aero_steady_forces': np.ones((5, 6)),
+                                                            'aero_unsteady_forces': np.full((5, 6), ts,
+                                                                                            dtype=float)},
+                                          'n_substeps': np.array(ts, dtype=int)})
+                    writer.close()
+
+                    # the shape of a variable cannot change
+                    writer = h5utils.TimeSeriesWriter(hdfile.create_group('zeta_star'), chunk_steps=4,
+                                                      threaded=threaded)
+                    writer.write(0, {'zeta_star': np.zeros((3, 1, 4))})
+                    writer.write(1, {'zeta_star': np.zeros((3, 2, 4))})
+                    with self.assertRaisesRegex(ValueError, 'zeta_star'):
+                        writer.close()
+
+                with h5py.File(filename, 'r') as hdfile:
+                    grp = hdfile['timeseries']
+                    np.testing.assert_array_equal(grp['ts'][()], np.arange(7))
+                    unsteady_forces = grp['postproc_node']['aero_unsteady_forces'][()]
+                    self.assertEqual(unsteady_forces.shape, (7, 5, 6))
+                    self.assertTrue(np.isnan(unsteady_forces[0]).all())
+                    np.testing.assert_array_equal(unsteady_forces[1:, 2, 3], np.arange(1, 7))
+                    n_substeps = grp['n_substeps'][()]
+                    self.assertTrue(np.isnan(n_substeps[0]))
+                    np.testing.assert_array_equal(n_substeps[1:], np.arange(1, 7))
+                    np.testing.assert_array_equal(grp['pos'][:, 0, 0], np.arange(7))
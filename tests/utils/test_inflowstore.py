@@ -0,0 +1,90 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+import sharpy.utils.inflowstore as inflowstore
+
+
+class TestInflowStore(unittest.TestCase):
+    """
+    Tests the memory-mapped turbulent inflow store
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+    output_dir = route_test_dir + '/output/'
+
+    grid = (np.linspace(-6., 0., 13), np.array([-2., -1.5, 0., 0.5, 2.]), np.linspace(-1., 1., 9))
+    time = (0.5, 0.2)
+    n_snapshots = 4
+    # multilinear fields in space and time are interpolated exactly
+    coeff = np.array([[1., 2., -1., 0.5, 3.],
+                      [0., -1., 3., 0.2, -2.],
+                      [2., 0.5, 0.5, -1., 1.]])
+
+    def field(self, x, y, z, t):
+        return np.array([c[0] + c[1]*x + c[2]*y*z + c[3]*x*y*z + c[4]*t*x for c in self.coeff])
+
+    def setUp(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.filename = self.output_dir + 'field.npy'
+        store = inflowstore.create_store(self.filename, self.grid, self.n_snapshots, time=self.time,
+                                         dtype=np.float32)
+        x, y, z = np.meshgrid(*self.grid, indexing='ij')
+        for it in range(self.n_snapshots):
+            store.write_snapshot(it, self.field(x, y, z, self.time[0] + it*self.time[1]))
+        store.flush()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_interpolate(self):
+        store = inflowstore.InflowStore(self.filename)
+        self.assertEqual(store.n_snapshots, self.n_snapshots)
+        self.assertIsInstance(store.data, np.memmap)
+        np.testing.assert_array_equal(store.bbox(), [[-6., 0.], [-2., 2.], [-1., 1.]])
+
+        np.random.seed(0)
+        points = np.random.rand(300, 3)*np.array([7., 5., 2.4]) - np.array([6.5, 2.5, 1.2])
+        points[:2, :] = np.array([[-6., -2., -1.],
+                                  [0., 2., 1.]])
+        isin = np.all([(points[:, i] >= self.grid[i][0]) & (points[:, i] <= self.grid[i][-1]) for i in range(3)],
+                      axis=0)
+        for t in [None, 0.5, 0.61, 0.9, 1.1, 3.]:
+            output = store.interpolate(points, t, fill_value=-5.)
+            t_field = min(max(t, self.time[0]), self.time[0] + (self.n_snapshots - 1)*self.time[1]) \
+                if t is not None else self.time[0]
+            expected = self.field(*points.T, t_field).T
+            np.testing.assert_allclose(output[isin], expected[isin], atol=1e-5)
+            np.testing.assert_array_equal(output[~isin], -5.)
+            # only the slabs of the bounding snapshots are kept in memory
+            self.assertLessEqual(len(store._slabs), 2)
+
+    def test_paging(self):
+        store = inflowstore.InflowStore(self.filename)
+        points = np.array([[-3.1, 0.1, 0.1],
+                           [-2.6, 0.2, -0.1]])
+        store.interpolate(points, t=0.6)
+        slab_lower, slab = store._slabs[0]
+        # only the cells around the points, with the padding, are read from the store
+        np.testing.assert_array_equal(slab_lower, [3, 0, 1])
+        self.assertEqual(slab.shape, (3, 8, 5, 8))
+
+        # the paged slab is reused for points inside it
+        store.interpolate(points + 0.1, t=0.6)
+        self.assertIs(store._slabs[0][1], slab)
+
+        store_in_memory = inflowstore.InflowStore(self.filename, in_memory=True)
+        self.assertNotIsInstance(store_in_memory.data, np.memmap)
+        np.testing.assert_array_equal(store_in_memory.interpolate(points, t=0.6), store.interpolate(points, t=0.6))
+
+    def test_store_matches(self):
+        shape = (self.n_snapshots, 3) + tuple(len(coord) for coord in self.grid)
+        self.assertTrue(inflowstore.store_matches(self.filename, shape))
+        self.assertFalse(inflowstore.store_matches(self.filename, (1,) + shape[1:]))
+        self.assertFalse(inflowstore.store_matches(self.output_dir + 'missing.npy'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+import sharpy.utils.algebra as algebra
+import sharpy.aero.utils.mapping as mapping
+from sharpy.utils.mapping_utils import aero2struct_force_mapping_loop, generate_wing_case
+
+
+class TestForceMapping(unittest.TestCase):
+    """
+    Tests the vectorised aerodynamic to structural force mapping against the reference nested-loop implementation
+    """
+
+    def test_crv2rotation_vec(self):
+        rng = np.random.default_rng(1)
+        psi = rng.normal(size=(50, 3))
+        psi[:5, :] *= 1e-16
+        rot = algebra.crv2rotation_vec(psi)
+        for i_node in range(psi.shape[0]):
+            np.testing.assert_allclose(rot[i_node], algebra.crv2rotation(psi[i_node]), rtol=1e-14, atol=1e-15)
+
+    def test_force_mapping(self):
+        forces, struct2aero_mapping, zeta, pos, psi, conn, cag, aero_dimensions = generate_wing_case()
+        ref_forces = aero2struct_force_mapping_loop(forces, struct2aero_mapping, zeta, pos, psi, conn, cag)
+
+        mapping_tables = mapping.aero2struct_mapping_tables(struct2aero_mapping, conn, aero_dimensions)
+        for tables in [None, mapping_tables]:
+            with self.subTest(precomputed_tables=tables is not None):
+                struct_forces = mapping.aero2struct_force_mapping(forces, struct2aero_mapping, zeta, pos, psi,
+                                                                  None, conn, cag, mapping_tables=tables)
+                np.testing.assert_allclose(struct_forces, ref_forces, rtol=1e-12, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
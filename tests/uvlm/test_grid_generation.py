@@ -0,0 +1,104 @@
+import unittest
+import numpy as np
+import scipy.interpolate
+import sharpy.utils.algebra as algebra
+import sharpy.aero.models.aerogrid as aerogrid
+
+
+class TestGridGeneration(unittest.TestCase):
+    """
+    Tests the batched generation of the chordwise strips against the strip-by-strip generation
+    """
+
+    n_strips = 7
+    m = 6
+
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        camber = np.zeros((11, 2))
+        camber[:, 0] = np.linspace(0, 1, 11)
+        camber[:, 1] = 0.05*np.sin(np.pi*camber[:, 0])
+        self.airfoil_db = {0: scipy.interpolate.interp1d(camber[:, 0], camber[:, 1], kind='quadratic',
+                                                         fill_value='extrapolate', assume_sorted=True)}
+
+        self.chord = rng.uniform(0.5, 2., self.n_strips)
+        self.eaxis = rng.uniform(0.2, 0.5, self.n_strips)
+        self.twist = rng.uniform(-0.1, 0.1, self.n_strips)
+        self.twist[0] = 0.
+        self.sweep = rng.uniform(-0.3, 0.3, self.n_strips)
+        self.pos = rng.normal(size=(self.n_strips, 3))
+        self.pos_dot = rng.normal(size=(self.n_strips, 3))
+        self.psi = 0.3*rng.normal(size=(self.n_strips, 3))
+        self.psi[0, :] = 0.
+        self.psi_dot = rng.normal(size=(self.n_strips, 3))
+        self.cga = algebra.crv2rotation(np.array([0.05, 0.1, -0.02]))
+        self.control_surface = -np.ones((self.n_strips,), dtype=int)
+        self.control_surface[3:6] = 0
+        self.control_surface_info = {'deflection': np.array([0.2]),
+                                     'deflection_dot': np.array([1.5]),
+                                     'with_velocity': np.array([True]),
+                                     'chord': np.array([2]),
+                                     'hinge_coords': [None]}
+
+    def strip_info(self, first_twist):
+        coords_b_frame = np.zeros((self.n_strips, 3, self.m + 1))
+        coords_b_frame[:, 1, :] = np.linspace(0, 1, self.m + 1)
+        coords_b_frame[:, 2, :] = self.airfoil_db[0](coords_b_frame[:, 1, :])
+        coords_b_frame[:, 1, :] -= self.eaxis[:, None]
+        twist_matrix = np.array([algebra.rotation3d_x(t) if np.abs(t) > 1e-6 else np.eye(3) for t in self.twist])
+        sweep_matrix = np.array([algebra.rotation3d_z(s) for s in self.sweep])
+        return {'i_n': np.arange(self.n_strips),
+                'M': self.m,
+                'M_distribution': 'uniform',
+                'chord': self.chord,
+                'twist_matrix': twist_matrix,
+                'sweep_matrix': sweep_matrix,
+                'first_twist': first_twist,
+                'coords_b_frame': coords_b_frame,
+                'control_surface': self.control_surface}
+
+    def test_generate_strips(self):
+        for first_twist in [True, False]:
+            with self.subTest(first_twist=first_twist):
+                zeta, zeta_dot = aerogrid.generate_strips(self.strip_info(first_twist),
+                                                          self.pos,
+                                                          self.pos_dot,
+                                                          self.psi,
+                                                          self.psi_dot,
+                                                          self.cga,
+                                                          orientation_in=np.array([1, 0, 0]),
+                                                          control_surface_info=self.control_surface_info,
+                                                          calculate_zeta_dot=True)
+
+                for i_strip in range(self.n_strips):
+                    if self.control_surface[i_strip] >= 0:
+                        control_surface = {'type': 'dynamic',
+                                           'deflection': self.control_surface_info['deflection'][0],
+                                           'deflection_dot': self.control_surface_info['deflection_dot'][0],
+                                           'chord': self.control_surface_info['chord'][0],
+                                           'hinge_coords': None}
+                    else:
+                        control_surface = None
+                    node_info = {'M': self.m,
+                                 'M_distribution': 'uniform',
+                                 'airfoil': 0,
+                                 'chord': self.chord[i_strip],
+                                 'eaxis': self.eaxis[i_strip],
+                                 'twist': self.twist[i_strip],
+                                 'sweep': self.sweep[i_strip],
+                                 'control_surface': control_surface,
+                                 'beam_coord': self.pos[i_strip],
+                                 'pos_dot': self.pos_dot[i_strip],
+                                 'beam_psi': self.psi[i_strip],
+                                 'psi_dot': self.psi_dot[i_strip],
+                                 'cga': self.cga}
+                    ref_zeta, ref_zeta_dot = aerogrid.generate_strip(node_info, self.airfoil_db, False,
+                                                                     orientation_in=np.array([1, 0, 0]),
+                                                                     calculate_zeta_dot=True,
+                                                                     first_twist=first_twist)
+                    np.testing.assert_allclose(zeta[i_strip], ref_zeta, rtol=1e-12, atol=1e-12)
+                    np.testing.assert_allclose(zeta_dot[i_strip], ref_zeta_dot, rtol=1e-12, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
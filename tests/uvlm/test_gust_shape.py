@@ -0,0 +1,103 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+import sharpy.generators.gustvelocityfield as gustvelocityfield
+
+
+def reference_gust_shape(gust_id, gust, x, y, z, time=0):
+    """
+    Point by point gust profiles, as evaluated before the profiles were vectorised
+    """
+    settings = gust.settings
+    vel = np.zeros((3,))
+    if gust_id in ['1-cos', 'DARPA']:
+        if x > 0.0 or x < -settings['gust_length']:
+            return vel
+        vel[settings['gust_component']] = ((1.0 - np.cos(2.0 * np.pi * x / settings['gust_length'])) *
+                                           settings['gust_intensity'] * 0.5)
+        if gust_id == 'DARPA':
+            vel[settings['gust_component']] *= -np.cos(y / settings['span'] * np.pi)
+    elif gust_id == 'continuous_sin':
+        if x > 0.0:
+            return vel
+        vel[settings['gust_component']] = (0.5 * settings['gust_intensity'] *
+                                           np.sin(2 * np.pi * x / settings['gust_length']))
+    elif gust_id == 'time varying global':
+        for counter, idim in enumerate(settings['gust_component']):
+            vel[idim] = gust.list_interpolated_velocity_field_functions[counter](time)
+    elif gust_id == 'time varying':
+        d = np.dot(np.array([x, y, z]), gust.u_inf_direction)
+        if d <= 0.0:
+            for counter, idim in enumerate(settings['gust_component']):
+                vel[idim] = gust.list_interpolated_velocity_field_functions[counter](d)
+    elif gust_id == 'span sine':
+        d = np.dot(np.array([x, y, z]), settings['span_dir'])
+        if np.abs(d) <= settings['span_with_gust'] / 2:
+            vel = 0.5 * settings['gust_intensity'] * np.sin(
+                d * 2. * np.pi / (settings['span'] / settings['periods_per_span']))
+        return vel * settings['perturbation_dir']
+    return vel
+
+
+class TestGustShape(unittest.TestCase):
+    """
+    Tests that the gust profiles evaluated on whole arrays of coordinates and point by point match the point by point
+    profiles before the vectorisation
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+    output_dir = route_test_dir + '/output/'
+
+    gust_parameters = {'1-cos': {'gust_length': 5., 'gust_intensity': 0.3},
+                       'DARPA': {'gust_length': 5., 'gust_intensity': 0.3, 'span': 20.},
+                       'continuous_sin': {'gust_length': 5., 'gust_intensity': 0.3, 'gust_component': 1},
+                       'time varying': {},
+                       'time varying global': {},
+                       'span sine': {'gust_intensity': 0.3, 'span': 20., 'periods_per_span': 2,
+                                     'span_with_gust': 14.}}
+
+    def setUp(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.time_file = self.output_dir + 'time_varying.txt'
+        np.savetxt(self.time_file, np.array([[0., 0.1, 0.2, 0.3],
+                                             [0.5, 1., -1., 2.],
+                                             [1., 0., 0.5, -0.4],
+                                             [3., 2., 2., 2.]]))
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_gust_shape_arrays(self):
+        np.random.seed(0)
+        zeta = np.random.rand(3, 9, 40)*np.array([20., 30., 3.])[:, None, None] - np.array([12., 15., 1.])[:, None, None]
+
+        for gust_id, parameters in self.gust_parameters.items():
+            gust = gustvelocityfield.dict_of_gusts[gust_id]()
+            gust.u_inf = 10.
+            gust.u_inf_direction = np.array([0.8, 0.6, 0.])
+            if gust_id.startswith('time varying'):
+                parameters = {'file': self.time_file}
+            gust.initialise(dict(parameters))
+
+            for t in [0., 0.7]:
+                vel = gust.gust_shape(zeta[0], zeta[1], zeta[2], t)
+                self.assertEqual(vel.shape, zeta.shape)
+                self.assertGreater(np.count_nonzero(vel), 0)
+                for i in range(zeta.shape[1]):
+                    for j in range(zeta.shape[2]):
+                        expected = reference_gust_shape(gust_id, gust, zeta[0, i, j], zeta[1, i, j], zeta[2, i, j], t)
+                        err_msg = 'Gust {:s} at t = {:f}'.format(gust_id, t)
+                        np.testing.assert_allclose(vel[:, i, j], expected, rtol=1e-12, atol=1e-14, err_msg=err_msg)
+                        np.testing.assert_allclose(gust.gust_shape(zeta[0, i, j], zeta[1, i, j], zeta[2, i, j], t),
+                                                   expected, rtol=1e-12, atol=1e-14, err_msg=err_msg)
+
+    def test_abstract_gust_shape(self):
+        with self.assertRaises(TypeError):
+            gustvelocityfield.BaseGust()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+from sharpy.generators.turbvelocityfield import TurbVelocityField
+from sharpy.generators.turbvelocityfieldbts import TurbVelocityFieldBts, interp_rectgrid_vectorfield
+import sharpy.utils.inflowstore as inflowstore
+
+
+def write_turbsim_bts(fname, vel_int, scaling, offset, dz=1., dy=2., dt=0.1, u_mean=10.):
+    """
+    Writes a TurbSim ``.bts`` file with the velocity field ``vel_int`` ``[time step, z, y, velocity component]``
+    """
+    ntime_steps, nz, ny, _ = vel_int.shape
+    description = b'Synthetic field for testing purposes.'
+    header = np.zeros(1, dtype=np.dtype([
+        ("id", np.int16),
+        ("nz", np.int32),
+        ("ny", np.int32),
+        ("tower_points", np.int32),
+        ("ntime_steps", np.int32),
+        ("dz", np.float32),
+        ("dy", np.float32),
+        ("dt", np.float32),
+        ("u_mean", np.float32),
+        ("HubHt", np.float32),
+        ("Zbottom", np.float32),
+        ("scaling", np.float32, (6,)),
+        ("n_char_description", np.int32),
+        ("description", np.dtype((bytes, len(description))))]))
+    header['id'] = 7
+    header['nz'] = nz
+    header['ny'] = ny
+    header['ntime_steps'] = ntime_steps
+    header['dz'] = dz
+    header['dy'] = dy
+    header['dt'] = dt
+    header['u_mean'] = u_mean
+    header['HubHt'] = 90.
+    header['Zbottom'] = 80.
+    header['scaling'] = np.column_stack((scaling, offset)).ravel()
+    header['n_char_description'] = len(description)
+    header['description'] = description
+    with open(fname, 'wb') as fid:
+        fid.write(header.tobytes())
+        fid.write(vel_int.astype(np.int16).tobytes())
+
+
+class TestTurbSimBts(unittest.TestCase):
+    """
+    Tests the reading and interpolation of TurbSim turbulent velocity fields
+    """
+
+    route_test_dir = os.path.abspath(os.path.dirname(os.path.realpath(__file__)))
+    output_dir = route_test_dir + '/output/'
+
+    def setUp(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_read_turbsim_bts(self):
+        ntime_steps, nz, ny = 6, 4, 5
+        np.random.seed(0)
+        vel_int = np.random.randint(-1000, 1000, size=(ntime_steps, nz, ny, 3))
+        scaling = np.array([100., 200., 300.], dtype=np.float32)
+        offset = np.array([-10., 5., 0.], dtype=np.float32)
+        fname = self.output_dir + 'synthetic.bts'
+        write_turbsim_bts(fname, vel_int, scaling, offset)
+
+        x_grid, y_grid, z_grid, vel = TurbVelocityFieldBts.read_turbsim_bts(fname)
+
+        self.assertEqual(vel.shape, (3, ntime_steps, ny, nz))
+        for ix in range(ntime_steps):
+            for iz in range(nz):
+                for iy in range(ny):
+                    for ivel in range(3):
+                        expected = (np.float32(vel_int[ix, iz, iy, ivel]) - offset[ivel])/scaling[ivel]
+                        self.assertEqual(vel[ivel, -ix, iy, iz], expected)
+        np.testing.assert_allclose(x_grid, np.linspace(-ntime_steps + 1, 0, ntime_steps)*0.1*10., rtol=1e-6)
+        np.testing.assert_allclose(y_grid, np.linspace(-4., 4., ny))
+        np.testing.assert_allclose(z_grid, np.linspace(-1.5, 1.5, nz))
+
+        _, _, z_grid, _ = TurbVelocityFieldBts.read_turbsim_bts(fname, case_with_tower=True)
+        np.testing.assert_allclose(z_grid, np.linspace(80., 83., nz))
+
+    def test_interp_rectgrid_vectorfield(self):
+        grid = (np.linspace(-3., 0., 7), np.linspace(-2., 2., 5), np.array([-1., -0.5, 0.8, 1.]))
+        # multilinear fields are interpolated exactly
+        coeff = np.array([[1., 2., -1., 0.5],
+                          [0., -1., 3., 0.2],
+                          [2., 0.5, 0.5, -1.]])
+
+        np.random.seed(1)
+        points = np.random.rand(200, 3)*np.array([4., 5., 2.4]) - np.array([3.5, 2.5, 1.2])
+        # points on the boundaries of the box
+        points[:3, :] = np.array([[-3., -2., -1.],
+                                  [0., 2., 1.],
+                                  [-1.5, 0., 0.8]])
+        out_value = np.array([10., 20., 30.])
+
+        for regular_grid in [True, False]:
+            if regular_grid:
+                grid_test = grid[:2] + (np.linspace(-1., 1., 4),)
+            else:
+                grid_test = grid
+            x, y, z = np.meshgrid(*grid_test, indexing='ij')
+            vector_field = np.array([c[0] + c[1]*x + c[2]*y*z + c[3]*x*y*z for c in coeff])
+            output = interp_rectgrid_vectorfield(points, grid_test, vector_field, out_value,
+                                                 regularGrid=regular_grid)
+            for ipoint in range(points.shape[0]):
+                x, y, z = points[ipoint]
+                isin = all(grid_test[idim][0] <= points[ipoint, idim] <= grid_test[idim][-1] for idim in range(3))
+                if isin:
+                    expected = coeff[:, 0] + coeff[:, 1]*x + coeff[:, 2]*y*z + coeff[:, 3]*x*y*z
+                else:
+                    expected = out_value
+                np.testing.assert_allclose(output[ipoint], expected, atol=1e-12)
+
+    def test_bts_to_store(self):
+        ntime_steps, nz, ny = 6, 4, 5
+        np.random.seed(2)
+        vel_int = np.random.randint(-1000, 1000, size=(ntime_steps, nz, ny, 3))
+        scaling = np.array([100., 200., 300.], dtype=np.float32)
+        offset = np.array([-10., 5., 0.], dtype=np.float32)
+        fname = self.output_dir + 'synthetic.bts'
+        write_turbsim_bts(fname, vel_int, scaling, offset)
+
+        x_grid, y_grid, z_grid, vel = TurbVelocityFieldBts.read_turbsim_bts(fname)
+        store = inflowstore.bts_to_store(fname, self.output_dir + 'synthetic.npy')
+
+        # the store is in the G* frame: (x, z, -y)
+        points = np.random.rand(100, 3)*np.array([5., 8., 3.]) - np.array([5., 4., 1.5])
+        points_star = np.column_stack((points[:, 0], points[:, 2], -points[:, 1]))
+        expected = interp_rectgrid_vectorfield(points, (x_grid, y_grid, z_grid), vel, np.zeros(3))
+        output = inflowstore.InflowStore(self.output_dir + 'synthetic.npy').interpolate(points_star)
+        self.assertEqual(store.n_snapshots, 1)
+        np.testing.assert_allclose(np.column_stack((output[:, 0], -output[:, 2], output[:, 1])), expected,
+                                   atol=1e-12)
+
+    def test_turbvelocityfield_bts(self):
+        ntime_steps, nz, ny = 6, 4, 5
+        np.random.seed(3)
+        vel_int = np.random.randint(-1000, 1000, size=(ntime_steps, nz, ny, 3))
+        scaling = np.array([100., 200., 300.], dtype=np.float32)
+        offset = np.array([-10., 5., 0.], dtype=np.float32)
+        fname = self.output_dir + 'synthetic.bts'
+        write_turbsim_bts(fname, vel_int, scaling, offset)
+
+        for new_orientation in ['xyz', '-zyx']:
+            with self.subTest(new_orientation=new_orientation):
+                settings = {'turbulent_field': fname,
+                            'new_orientation': new_orientation,
+                            'u_fed': [10., 0., 0.],
+                            'extra_offset': 0.5,
+                            'print_info': False}
+                bts_generator = TurbVelocityFieldBts()
+                bts_generator.initialise(dict(settings, u_out=[0., 0., 0.], use_3_4_interpolation=False))
+                generator = TurbVelocityField()
+                generator.initialise(dict(settings, periodicity='', inflow_store=self.output_dir + 'synthetic.npy'))
+
+                bbox = bts_generator.bbox
+                zeta = [np.random.rand(3, 4, 6)*(bbox[:, 1] - bbox[:, 0])[:, None, None] +
+                        bbox[:, 0][:, None, None]]
+                # the field is 5 m long in the fed direction, hence it is recirculated
+                for t in [0., 0.23, 0.61, 1.37]:
+                    params = {'zeta': zeta, 'for_pos': np.zeros(6), 't': t}
+                    uext = [np.zeros_like(zeta[0])]
+                    uext_bts = [np.zeros_like(zeta[0])]
+                    generator.generate(params, uext)
+                    bts_generator.generate(params, uext_bts)
+                    self.assertGreater(np.count_nonzero(uext[0]), 0)
+                    np.testing.assert_allclose(uext[0], uext_bts[0], atol=1e-12)
+                self.assertGreater(generator.dist_to_recirculate, 0.)
@@ -0,0 +1,81 @@
+import unittest
+
+import numpy as np
+import scipy.sparse as sp
+
+import sharpy.structure.utils.lagrangeconstraints as lagrangeconstraints
+import sharpy.solvers.timeintegrators as timeintegrators
+
+
+class TestSparseAssembly(unittest.TestCase):
+    """
+    Tests the sparse assembly of the multibody system of equations against the dense one
+    """
+
+    sys_size = 20
+    num_LM_eq = 4
+
+    def add_contributions(self, LM_C, LM_K):
+        # same operations as the Lagrange Constraints equations
+        np.random.seed(0)
+        size = self.sys_size + self.num_LM_eq
+        B = np.random.rand(3, self.sys_size)
+        B[:, 5:] = 0.
+        LM_K[self.sys_size:self.sys_size + 3, :self.sys_size] += 1e3*B
+        LM_K[:self.sys_size, self.sys_size:self.sys_size + 3] += 1e3*np.transpose(B)
+        LM_C[self.sys_size + 3:size, :self.sys_size] += B[0:1, :]
+        LM_C[:self.sys_size, self.sys_size + 3:size] += B[0:1, :].T
+        LM_C[:self.sys_size, :self.sys_size] += 2.*np.dot(B.T, B)
+        for node_dof in [0, 6, 6]:
+            LM_K[node_dof:node_dof + 3, node_dof:node_dof + 3] += 3.*np.eye(3)
+            LM_K[node_dof:node_dof + 3, 12:15] += -np.random.rand(3, 3)
+            LM_C[node_dof:node_dof + 3, 16:20] -= np.random.rand(3, 4)
+
+    def test_sparse_accumulator(self):
+        size = self.sys_size + self.num_LM_eq
+        dense_C = np.zeros((size, size))
+        dense_K = np.zeros((size, size))
+        sparse_C = lagrangeconstraints.SparseMatrixAccumulator(size)
+        sparse_K = lagrangeconstraints.SparseMatrixAccumulator(size)
+
+        self.add_contributions(dense_C, dense_K)
+        self.add_contributions(sparse_C, sparse_K)
+        with self.assertRaises(NotImplementedError):
+            sparse_K[0:3, 0:3] = np.eye(3)
+
+        sparse_C = sparse_C.tocsc()
+        sparse_K = sparse_K.tocsc()
+        self.assertTrue(sp.issparse(sparse_C))
+        np.testing.assert_allclose(sparse_C.toarray(), dense_C, rtol=1e-14, atol=1e-14)
+        np.testing.assert_allclose(sparse_K.toarray(), dense_K, rtol=1e-14, atol=1e-14)
+        # only the non-zero entries are stored
+        self.assertLess(sparse_K.nnz, np.count_nonzero(dense_K) + 1)
+
+    def test_assemble_system(self):
+        np.random.seed(1)
+        M = sp.random(self.sys_size, self.sys_size, density=0.2, random_state=1) + sp.eye(self.sys_size)
+        C = sp.random(self.sys_size, self.sys_size, density=0.2, random_state=2)
+        K = sp.random(self.sys_size, self.sys_size, density=0.2, random_state=3) + 10.*sp.eye(self.sys_size)
+        kBnh = sp.random(self.num_LM_eq, self.sys_size, density=0.5, random_state=4)
+        Q = np.random.rand(self.sys_size)
+        LM_Q = np.random.rand(self.num_LM_eq)
+
+        integrators = [timeintegrators.NewmarkBeta(), timeintegrators.GeneralisedAlpha()]
+        settings = [{'dt': 0.01, 'newmark_damp': 0.1}, {'dt': 0.01, 'am': 0.5, 'af': 0.5}]
+        for integrator, integrator_settings in zip(integrators, settings):
+            for num_LM_eq in [0, self.num_LM_eq]:
+                integrator_settings.update({'sys_size': self.sys_size, 'num_LM_eq': num_LM_eq})
+                integrator.initialise(None, integrator_settings)
+
+                Asys_dense, Q_dense = integrator.build_matrix(M.toarray(), C.toarray(), K.toarray(), Q,
+                                                              kBnh.toarray()[:num_LM_eq], LM_Q[:num_LM_eq])
+                Asys_sparse, Q_sparse = integrator.build_matrix(M.tocsc(), C.tocsc(), K.tocsc(), Q,
+                                                                kBnh.tocsc()[:num_LM_eq], LM_Q[:num_LM_eq])
+
+                self.assertTrue(sp.isspmatrix_csc(Asys_sparse))
+                np.testing.assert_allclose(Asys_sparse.toarray(), Asys_dense, rtol=1e-14)
+                np.testing.assert_array_equal(Q_sparse, Q_dense)
+
+
+if __name__ == '__main__':
+    unittest.main()